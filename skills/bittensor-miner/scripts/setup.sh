@@ -44,7 +44,7 @@ echo "✅ pip upgraded"
 # Install Python dependencies
 echo ""
 echo "4. Installing Python dependencies..."
-pip install bittensor latinum-wallet-mcp aiohttp cryptography requests > /dev/null 2>&1
+pip install bittensor latinum-wallet-mcp aiohttp cryptography requests numpy > /dev/null 2>&1
 echo "✅ Dependencies installed"
 
 # Create required directories
@@ -73,9 +73,9 @@ EOF
     echo "✅ Created miner-state.json"
 fi
 
-if [ ! -f "$SKILL_DIR/state/task-history.jsonl" ]; then
-    touch "$SKILL_DIR/state/task-history.jsonl"
-    echo "✅ Created task-history.jsonl"
+if [ ! -d "$SKILL_DIR/state/history" ]; then
+    mkdir -p "$SKILL_DIR/state/history"
+    echo "✅ Created state/history/ (daily task history segments)"
 fi
 
 if [ ! -f "$SKILL_DIR/state/performance-metrics.json" ]; then
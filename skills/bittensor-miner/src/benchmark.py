@@ -0,0 +1,639 @@
+#!/usr/bin/env python3
+"""
+Miner Benchmark
+End-to-end benchmark of the daemon: mock validators load its axon with
+signed requests, tasks run through the real pipeline to local stub LLM
+providers, and throughput, per-stage latency, memory per in-flight task
+and startup time are recorded for comparison between commits.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+import miner_daemon
+from miner_daemon import MinerDaemon
+from task_handler import TaskHandler
+from simulator import ProviderModel, write_configs, SKILL_DIR
+from utils.axon_bench import run_load
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = SKILL_DIR / "config" / "benchmark.json"
+DEFAULT_RESULTS_DIR = SKILL_DIR / "state" / "benchmarks"
+
+# Settings every benchmark runs with: no network, no wallet process, and
+# axons on loopback (on free ports, see free_axon_ports)
+BENCHMARK_CONFIG = {
+    'miner-config.json': {
+        'bittensor': {'chain_pool': {'endpoints': []}},
+        'wallet_mcp': {'enabled': False},
+        'daemon': {'axon': {'host': '127.0.0.1'}},
+    },
+}
+
+# Pipeline stages timed during the load phase, in pipeline order
+STAGES = ('queue_wait', 'decode', 'classify', 'should_respond', 'route', 'prompt', 'reserve',
+          'inference', 'draft_score', 'commit', 'history', 'process_task', 'handler', 'respond')
+
+# Regression checks: (metric path, higher is better, smallest change that counts)
+HEADLINE_METRICS = (
+    ('throughput.requests_per_second', True, 0.0),
+    ('latency_ms.end_to_end.p50', False, 0.0),
+    ('latency_ms.end_to_end.p95', False, 0.0),
+    ('latency_ms.end_to_end.p99', False, 0.0),
+    ('memory.bytes_per_task', False, 0.0),
+    ('startup.ready_seconds', False, 0.0),
+)
+STAGE_MIN_DELTA_MS = 0.1
+
+CORPUS = (
+    "validators reward answers that are correct complete and concise so the miner "
+    "explains each step states its assumptions and checks the result before replying "
+    "a structured response lists the key facts then reasons from them to a conclusion "
+    "with numbers units and sources where they matter and no filler around them "
+) * 64
+
+TOPICS = ('binary search', 'proof of stake', 'TCP congestion control', 'gradient descent',
+          'the CAP theorem', 'photosynthesis', 'compound interest', 'garbage collection')
+
+
+def _percentiles(values: List[float], scale: float = 1000.0) -> Dict[str, Any]:
+    """count, mean, p50, p95, p99 (in ms for seconds)"""
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * scale, 3)
+    return {'count': len(ordered), 'mean': round(statistics.fmean(ordered) * scale, 3),
+            'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99)}
+
+
+class SyntheticTasks:
+    """
+    Seeded validator traffic: prompts of varied length and shape, as the
+    request bodies the axon receives or as tasks ready for a bulkhead.
+    """
+
+    def __init__(self, seed: int = 0, prompt_tokens: Tuple[int, int] = (40, 400),
+                 validators: int = 16):
+        self.rng = random.Random(seed)
+        self.prompt_tokens = prompt_tokens
+        self.validators = [f"validator-{i}" for i in range(validators)]
+        self._next_id = 0
+
+    def prompt(self) -> str:
+        tokens = self.rng.randint(*self.prompt_tokens)
+        question = self.rng.choice((
+            "Explain {topic} step by step.",
+            "Compare two approaches to {topic} and recommend one.",
+            "Rate this explanation of {topic} from 0 to 1 and justify the score.",
+            "Summarize {topic} for a beginner.",
+        )).format(topic=self.rng.choice(TOPICS))
+        start = self.rng.randrange(0, len(CORPUS) // 2)
+        context = CORPUS[start:start + max(0, tokens * 4 - len(question) - 1)]
+        return f"{question} {context}"
+
+    def body(self) -> bytes:
+        """One request body (bittensor-style messages or plain content)"""
+        prompt = self.prompt()
+        if self.rng.random() < 0.5:
+            return json.dumps({'messages': [{'role': 'user', 'content': prompt}]}).encode()
+        return json.dumps({'content': prompt}).encode()
+
+    def bodies(self, count: int) -> List[bytes]:
+        return [self.body() for _ in range(count)]
+
+    def task(self, timeout: float = 60.0) -> Dict[str, Any]:
+        """A task as the axon hands it to the daemon (body still encoded)"""
+        self._next_id += 1
+        now = time.time()
+        return {
+            'id': f"bench-{self._next_id}",
+            'caller': self.rng.choice(self.validators),
+            'synapse': 'TextPrompting',
+            'body': memoryview(self.body()),
+            'received_at': now,
+            'deadline': now + timeout,
+        }
+
+
+def free_axon_ports(daemon: MinerDaemon) -> None:
+    """Bind every axon to a free port, so a running daemon is never disturbed"""
+    daemon.axon_ports = dict.fromkeys(daemon.axon_ports, 0)
+
+
+class StubProvider:
+    """
+    Local stand-in for an LLM API: waits out a sampled latency (real
+    time, no CPU) and fails at its error rate, per its ProviderModel.
+    """
+
+    def __init__(self, model: ProviderModel, seed: int = 0):
+        self.model = model
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'errors': 0}
+
+    def complete(self, prompt: str, max_tokens: int) -> Optional[str]:
+        with self._lock:
+            latency, output_tokens, _ = self.model.sample(self.rng, max_tokens)
+            start = self.rng.randrange(0, len(CORPUS) // 2)
+            self.stats['calls'] += 1
+            self.stats['errors'] += output_tokens is None
+        time.sleep(latency)
+        if output_tokens is None:
+            return None
+        return CORPUS[start:start + output_tokens * 4]
+
+
+class BenchTaskHandler(TaskHandler):
+    """The real task pipeline with stub providers behind execute_inference"""
+
+    def __init__(self, config_path: str, providers: Dict[str, StubProvider]):
+        super().__init__(config_path)
+        self.providers = providers
+        self.gate = threading.Event()  # Cleared to hold tasks in flight
+        self.gate.set()
+
+    def execute_inference(self, task: Dict[str, Any],
+                          llm_config: Optional[Dict] = None) -> Optional[str]:
+        self.gate.wait()
+        provider = self.providers.get((llm_config or {}).get('model'))
+        if provider is None:
+            return super().execute_inference(task, llm_config)
+        return provider.complete(task.get('prompt', ''), (llm_config or {}).get('max_tokens', 1000))
+
+
+class BenchDaemon(MinerDaemon):
+    """MinerDaemon running BenchTaskHandler"""
+
+    def __init__(self, providers: Dict[str, StubProvider], config_path: str = "config/miner-config.json"):
+        self.providers = providers
+        super().__init__(config_path)
+
+    def _create_task_handler(self) -> TaskHandler:
+        return BenchTaskHandler(str(self.config_path), self.providers)
+
+    def setup_axons(self) -> bool:
+        free_axon_ports(self)
+        return super().setup_axons()
+
+
+class StageTimer:
+    """Wall time per pipeline stage, collected by wrapping the callables that implement it"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    def wrap(self, owner: Any, name: str, stage: str) -> None:
+        """Replace owner.name with a timed version recording under stage"""
+        original = getattr(owner, name)
+        samples = self.samples[stage]
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - started)
+        setattr(owner, name, timed)
+
+    def instrument(self, daemon: MinerDaemon) -> None:
+        handler = daemon.task_handler
+        self.wrap(miner_daemon, 'decode_task', 'decode')
+        self.wrap(handler, 'classify_task', 'classify')
+        self.wrap(handler, 'should_respond', 'should_respond')
+        self.wrap(handler.llm_router, 'select_cascade', 'route')
+        self.wrap(handler.prompt_manager, 'compile_prompt', 'prompt')
+        self.wrap(handler.budget_manager, 'reserve_tokens', 'reserve')
+        self.wrap(handler, 'execute_inference', 'inference')
+        self.wrap(handler.draft_scorer, 'score', 'draft_score')
+        self.wrap(handler.budget_manager, 'commit_reservation', 'commit')
+        self.wrap(handler.history_writer, 'submit', 'history')
+        self.wrap(handler, 'process_task', 'process_task')
+        queue_wait = self.samples['queue_wait']
+        for bulkhead in daemon.bulkheads.bulkheads.values():
+            run_handler = bulkhead.handler
+
+            def waited(task, run_handler=run_handler):
+                queue_wait.append(time.time() - task.get('received_at', time.time()))
+                return run_handler(task)
+            bulkhead.handler = waited
+            self.wrap(bulkhead, 'handler', 'handler')
+            self.wrap(bulkhead, 'on_result', 'respond')
+
+    def reset(self) -> None:
+        for samples in self.samples.values():
+            samples.clear()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {stage: _percentiles(samples) for stage, samples in self.samples.items() if samples}
+
+
+STARTUP_PROBE = """
+import json, time
+started = time.perf_counter()
+from miner_daemon import MinerDaemon
+imported = time.perf_counter()
+daemon = MinerDaemon()
+ok = daemon.initialize()
+daemon.axon_ports = dict.fromkeys(daemon.axon_ports, 0)  # As free_axon_ports
+ok = ok and daemon.setup_axons()
+daemon.bulkheads.start()
+ready = time.perf_counter()
+print(json.dumps({'ok': bool(ok), 'import_seconds': imported - started,
+                  'initialize_seconds': ready - imported}), flush=True)
+daemon.shutdown()
+"""
+
+
+class Benchmark:
+    """
+    One benchmark run: startup, load and memory phases against a daemon
+    built from a copy of the configs (with the benchmark's overrides) in
+    a scratch directory.
+    """
+
+    def __init__(self, config: Dict[str, Any], workdir: Optional[str] = None):
+        """
+        Args:
+            config: Parsed benchmark config (see config/benchmark.json)
+            workdir: Directory for configs and state (None = a new temp dir)
+        """
+        self.config = config
+        self.workdir = Path(workdir or tempfile.mkdtemp(prefix='miner-bench-')).resolve()
+        seed = config.get('seed', 0)
+        self.providers = {model: StubProvider(ProviderModel.from_config(settings), seed + i)
+                          for i, (model, settings) in enumerate(sorted(config.get('providers', {}).items()))}
+        self.tasks = SyntheticTasks(seed, tuple(config.get('prompt_tokens', (40, 400))),
+                                    config.get('validators', 16))
+        self.timer = StageTimer()
+
+    def run(self, phases: Tuple[str, ...] = ('startup', 'load', 'memory')) -> Dict[str, Any]:
+        """
+        Run the phases.
+
+        Returns:
+            Results: environment, config, startup, throughput, latency_ms,
+            memory (phases not run are absent)
+        """
+        self._write_configs()
+        results = self._environment()
+        if 'startup' in phases:
+            results['startup'] = self.measure_startup()
+
+        if 'load' in phases or 'memory' in phases:
+            cwd = os.getcwd()
+            os.chdir(self.workdir)
+            saved_handlers = self._log_to_workdir()
+            daemon = None
+            try:
+                daemon = BenchDaemon(self.providers)
+                if not (daemon.initialize() and daemon.setup_axons()):
+                    raise RuntimeError("Benchmark daemon failed to start")
+                daemon.bulkheads.start()
+                self.timer.instrument(daemon)
+                if 'load' in phases:
+                    results.update(self.measure_load(daemon))
+                if 'memory' in phases:
+                    results['memory'] = self.measure_memory(daemon)
+                results['providers'] = {model: dict(provider.stats)
+                                        for model, provider in self.providers.items()}
+            finally:
+                if daemon is not None:
+                    daemon.shutdown()
+                    daemon.task_handler.history_writer.close()
+                    daemon.task_handler.budget_manager.close()
+                logging.getLogger().handlers[:] = saved_handlers
+                os.chdir(cwd)
+        return results
+
+    def measure_startup(self) -> Dict[str, Any]:
+        """
+        Cold daemon starts in fresh interpreters: process spawn to axons
+        listening, with imports and initialize() timed inside.
+        """
+        env = dict(os.environ, PYTHONPATH=str(SKILL_DIR / 'src'))
+        runs = []
+        for _ in range(self.config.get('startup_runs', 3)):
+            started = time.perf_counter()
+            process = subprocess.Popen([sys.executable, '-c', STARTUP_PROBE], cwd=self.workdir, env=env,
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            probe = None
+            for line in process.stdout:
+                if line.startswith('{'):
+                    probe = json.loads(line)
+                    probe['ready_seconds'] = time.perf_counter() - started
+                    break
+            process.communicate(timeout=60)
+            if probe is None or not probe['ok']:
+                raise RuntimeError("Daemon failed to start in the startup probe")
+            runs.append(probe)
+
+        def median(key: str) -> float:
+            return round(statistics.median(run[key] for run in runs), 4)
+        return {'runs': len(runs), 'ready_seconds': median('ready_seconds'),
+                'import_seconds': median('import_seconds'),
+                'initialize_seconds': median('initialize_seconds'),
+                'ready_seconds_min': round(min(run['ready_seconds'] for run in runs), 4)}
+
+    def measure_load(self, daemon: MinerDaemon) -> Dict[str, Any]:
+        """Signed requests from mock validators over keep-alive connections to the first axon"""
+        client = daemon.clients[0]
+        bodies = self.tasks.bodies(self.config.get('distinct_bodies', 256))
+        load = dict(host='127.0.0.1', port=client.miner.port, hotkey='validator-0',
+                    connections=self.config.get('connections', 32),
+                    processes=self.config.get('processes', 2), bodies=bodies,
+                    hotkeys=self.tasks.validators, sign=client.miner.verifier is not None,
+                    axon_hotkey=client.hotkey)
+
+        warmup = self.config.get('warmup_requests', 0)
+        if warmup:
+            run_load(requests=warmup, **load)
+            self._drain(daemon)
+        self.timer.reset()
+        processed = daemon.bulkheads.processed()
+
+        report = run_load(requests=self.config.get('requests', 2000), **load)
+        self._drain(daemon)
+        return {
+            'throughput': {
+                'requests': report['requests'],
+                'seconds': report['seconds'],
+                'requests_per_second': report['requests_per_second'],
+                'tasks_processed': daemon.bulkheads.processed() - processed,
+                'statuses': report['statuses'],
+            },
+            'latency_ms': {
+                'end_to_end': {'p50': report['p50_ms'], 'p95': report['p95_ms'],
+                               'p99': report['p99_ms'], 'max': report['max_ms']},
+                'stages': self.timer.summary(),
+            },
+            'bulkheads': daemon.bulkheads.snapshot(),
+        }
+
+    def measure_memory(self, daemon: MinerDaemon) -> Dict[str, Any]:
+        """
+        Python heap per in-flight task: with providers held, fill every
+        worker and queue slot, and divide the growth by the tasks held.
+        Covers the task, its decoded request and pipeline state; not the
+        axon's connection buffers.
+        """
+        handler = daemon.task_handler
+        bulkheads = list(daemon.bulkheads.bulkheads.values())
+        on_result = {bulkhead.subnet_id: bulkhead.on_result for bulkhead in bulkheads}
+        for bulkhead in bulkheads:
+            bulkhead.on_result = None  # Nobody is waiting for these answers
+        clients = {client.subnet_id: client for client in daemon.clients}
+
+        handler.gate.clear()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            held = 0
+            for bulkhead in bulkheads:
+                for _ in range(bulkhead.max_concurrent + bulkhead.queue_size):
+                    held += daemon._accept(clients[bulkhead.subnet_id], self.tasks.task())
+            deadline = time.monotonic() + 10
+            while (any(bulkhead.in_flight < bulkhead.max_concurrent for bulkhead in bulkheads)
+                   and time.monotonic() < deadline):
+                time.sleep(0.01)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            handler.gate.set()
+            self._drain(daemon)
+            tracemalloc.stop()
+            for bulkhead in bulkheads:
+                bulkhead.on_result = on_result[bulkhead.subnet_id]
+
+        return {
+            'in_flight_tasks': held,
+            'bytes_per_task': int((current - before) / held) if held else None,
+            'traced_bytes': current - before,
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+
+    def _write_configs(self) -> None:
+        """Scratch configs: the benchmark's overrides, and its bulkhead sizes on every miner"""
+        write_configs(self.workdir, BENCHMARK_CONFIG, self.config.get('overrides', {}))
+        path = self.workdir / 'config' / 'miner-config.json'
+        with open(path, 'r') as f:
+            miner_config = json.load(f)
+        for miner in miner_config['bittensor']['miners']:
+            miner.update(self.config.get('miners', {}))
+        with open(path, 'w') as f:
+            json.dump(miner_config, f, indent=2)
+
+    def _drain(self, daemon: MinerDaemon, timeout: float = 60.0) -> None:
+        """Wait until every queued and running task has finished"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if all(bulkhead.queued() == 0 and bulkhead.in_flight == 0
+                   for bulkhead in daemon.bulkheads.bulkheads.values()):
+                return
+            time.sleep(0.01)
+        logger.warning("Benchmark tasks still running after the drain timeout")
+
+    def _log_to_workdir(self) -> list:
+        """Send the daemon's log lines to the scratch dir (keeps the file cost, spares the console)"""
+        root = logging.getLogger()
+        saved = list(root.handlers)
+        (self.workdir / 'logs').mkdir(exist_ok=True)
+        handler = logging.FileHandler(self.workdir / 'logs' / 'miner.log')
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        root.handlers[:] = [handler]
+        return saved
+
+    def _environment(self) -> Dict[str, Any]:
+        return {
+            'commit': _git('rev-parse', '--short', 'HEAD'),
+            # Runtime state, logs and past results are untracked; only edits count
+            'dirty': bool(_git('status', '--porcelain', '--untracked-files=no', '--', str(SKILL_DIR))),
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+            'config': {key: value for key, value in self.config.items() if key != 'notes'},
+        }
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(['git', *args], cwd=SKILL_DIR, capture_output=True, text=True,
+                              timeout=10, check=True).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _metric(results: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = results
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value if isinstance(value, (int, float)) else None
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Metric by metric change from baseline to current.
+
+    A metric regresses when it moves the wrong way by more than threshold
+    (relative) and by more than its smallest meaningful change.
+
+    Returns:
+        Rows with metric, baseline, current, change (fraction) and status
+    """
+    checks = list(HEADLINE_METRICS)
+    stages = set(current.get('latency_ms', {}).get('stages', {})) | \
+        set(baseline.get('latency_ms', {}).get('stages', {}))
+    checks += [(f"latency_ms.stages.{stage}.p95", False, STAGE_MIN_DELTA_MS)
+               for stage in STAGES if stage in stages]
+
+    rows = []
+    for path, higher_is_better, min_delta in checks:
+        before, after = _metric(baseline, path), _metric(current, path)
+        row = {'metric': path, 'baseline': before, 'current': after, 'change': None, 'status': 'n/a'}
+        if before is not None and after is not None:
+            row['change'] = round((after - before) / before, 4) if before else None
+            worse = (before - after) if higher_is_better else (after - before)
+            if worse > abs(before) * threshold and worse > min_delta:
+                row['status'] = 'REGRESSION'
+            elif -worse > abs(before) * threshold and -worse > min_delta:
+                row['status'] = 'improved'
+            else:
+                row['status'] = 'ok'
+        rows.append(row)
+    return rows
+
+
+def save_results(results: Dict[str, Any], results_dir: Path) -> Path:
+    """Write the full results and append their headline numbers to history.jsonl"""
+    results_dir.mkdir(parents=True, exist_ok=True)
+    stamp = results['timestamp'].replace(':', '').replace('-', '')
+    path = results_dir / f"{stamp}-{results['commit'] or 'nogit'}{'-dirty' if results['dirty'] else ''}.json"
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    entry = {'commit': results['commit'], 'dirty': results['dirty'], 'timestamp': results['timestamp'],
+             'file': path.name}
+    entry.update({path_: _metric(results, path_) for path_, _, _ in HEADLINE_METRICS})
+    with open(results_dir / 'history.jsonl', 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+    return path
+
+
+def find_baseline(results_dir: Path, current: Dict[str, Any],
+                  ref: Optional[str] = None) -> Optional[Path]:
+    """
+    Stored results to compare against.
+
+    Args:
+        results_dir: Where results are stored
+        current: This run's results (its own entry is never chosen)
+        ref: A results file, a commit (prefix), or None for the latest
+            run of a different commit (else the latest earlier run)
+    """
+    if ref and Path(ref).is_file():
+        return Path(ref)
+    history_path = results_dir / 'history.jsonl'
+    if not history_path.exists():
+        return None
+    with open(history_path, 'r') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries = [entry for entry in entries if entry['timestamp'] != current['timestamp']
+               and (results_dir / entry['file']).exists()]
+    if ref:
+        matches = [entry for entry in entries if (entry['commit'] or '').startswith(ref)]
+    else:
+        matches = [entry for entry in entries if entry['commit'] != current['commit']] or entries
+    return results_dir / matches[-1]['file'] if matches else None
+
+
+def _print_summary(results: Dict[str, Any]) -> None:
+    print(f"commit {results['commit']}{' (dirty)' if results['dirty'] else ''}, {results['machine']}")
+    if 'startup' in results:
+        startup = results['startup']
+        print(f"startup: {startup['ready_seconds']}s to axons listening "
+              f"(imports {startup['import_seconds']}s, initialize {startup['initialize_seconds']}s)")
+    if 'throughput' in results:
+        throughput, e2e = results['throughput'], results['latency_ms']['end_to_end']
+        print(f"throughput: {throughput['requests_per_second']} req/s "
+              f"({throughput['requests']} requests, statuses {throughput['statuses']})")
+        print(f"end to end: p50 {e2e['p50']}ms  p95 {e2e['p95']}ms  p99 {e2e['p99']}ms")
+        print(f"{'stage':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for stage, stats in results['latency_ms']['stages'].items():
+            print(f"{stage:<16}{stats['count']:>8}{stats['p50']:>10}{stats['p95']:>10}{stats['p99']:>10}")
+    if 'memory' in results:
+        memory = results['memory']
+        print(f"memory: {memory['bytes_per_task']} bytes per in-flight task "
+              f"({memory['in_flight_tasks']} held), peak RSS {memory['peak_rss_mb']} MB")
+
+
+def main():
+    """Benchmark the daemon end to end and compare with earlier runs"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--config', default=str(DEFAULT_CONFIG))
+    parser.add_argument('--phases', default='startup,load,memory',
+                        help='Comma-separated subset of startup,load,memory')
+    parser.add_argument('--requests', type=int, help='Override the config\'s request count')
+    parser.add_argument('--results-dir', default=str(DEFAULT_RESULTS_DIR))
+    parser.add_argument('--baseline', help='Results file or commit to compare with '
+                                           '(default: latest run of another commit)')
+    parser.add_argument('--threshold', type=float, help='Relative change counted as a regression')
+    parser.add_argument('--no-save', action='store_true', help='Do not store this run')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit 1 on any regression')
+    parser.add_argument('--workdir', help='Keep configs, state and logs here (default: a temp dir, removed)')
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    if args.requests:
+        config['requests'] = args.requests
+
+    benchmark = Benchmark(config, args.workdir)
+    try:
+        results = benchmark.run(tuple(phase.strip() for phase in args.phases.split(',')))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(benchmark.workdir, ignore_errors=True)
+    _print_summary(results)
+
+    results_dir = Path(args.results_dir)
+    if not args.no_save:
+        print(f"saved {save_results(results, results_dir)}")
+
+    baseline_path = find_baseline(results_dir, results, args.baseline)
+    if baseline_path is None:
+        print("no earlier results to compare with")
+        return
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    threshold = args.threshold if args.threshold is not None else config.get('regression_threshold', 0.1)
+    rows = compare(baseline, results, threshold)
+    print(f"\nvs {baseline_path.name} (commit {baseline.get('commit')}), threshold {threshold:.0%}:")
+    for row in rows:
+        change = f"{row['change']:+.1%}" if row['change'] is not None else '-'
+        print(f"  {row['metric']:<40}{str(row['baseline']):>12}{str(row['current']):>12}{change:>9}  {row['status']}")
+    if args.fail_on_regression and any(row['status'] == 'REGRESSION' for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,14 @@ Phase 1: Basic routing rules.
 
 import json
 import logging
+import os
+import threading
+import time
+from collections import defaultdict
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
+
+from utils.ab_testing import ABTestManager, DEFAULT_STATE_FILE, state_path, load_state, overlay_state
 
 logger = logging.getLogger(__name__)
 
@@ -16,19 +22,39 @@ class LLMRouter:
     """
     Routes tasks to appropriate LLM APIs based on task characteristics.
     Phase 1: Simple rule-based routing.
+
+    Profiles are subnet-profiles.json with the A/B state file (splits and
+    promotions saved by performance_tracker) overlaid. Both are reloaded
+    when either mtime changes (checked at most every reload_check_seconds),
+    so promotions take effect without a restart.
     """
 
-    def __init__(self, profile_path: str = "config/subnet-profiles.json"):
+    def __init__(self, profile_path: str = "config/subnet-profiles.json",
+                 reload_check_seconds: float = 1.0):
         self.profile_path = Path(profile_path)
+        self.state_path = Path(DEFAULT_STATE_FILE)
+        self.reload_check_seconds = reload_check_seconds
+        self._next_reload_check = time.monotonic() + reload_check_seconds
+        self._reload_lock = threading.Lock()
         self.profiles = self._load_profiles()
+        self._profiles_mtime = self._stat_profiles()
+        self.experiments = ABTestManager(self.profiles.get('ab_testing', {}))
+        self.cascade_stats = defaultdict(lambda: {
+            'tasks': 0,
+            'resolved_by_stage': defaultdict(int),
+            'escalations': 0,
+            'escalations_skipped_deadline': 0,
+        })
+        self._stats_lock = threading.Lock()  # Bulkhead workers share one router
         logger.debug("LLMRouter initialized")
 
     def _load_profiles(self) -> Dict[str, Any]:
-        """Load subnet profiles"""
+        """Load subnet profiles, with the A/B state overlaid"""
         try:
             with open(self.profile_path, 'r') as f:
                 profiles = json.load(f)
-            return profiles
+            self.state_path = state_path(profiles)
+            return overlay_state(profiles, load_state(self.state_path))
         except FileNotFoundError:
             logger.warning(f"Subnet profiles not found: {self.profile_path}")
             return {}
@@ -36,6 +62,37 @@ class LLMRouter:
             logger.error(f"Invalid profiles JSON: {e}")
             return {}
 
+    def _stat_profiles(self) -> Optional[Tuple[int, Optional[int]]]:
+        """mtimes of the profiles and the A/B state (None if the profiles are missing)"""
+        try:
+            profiles_mtime = os.stat(self.profile_path).st_mtime_ns
+        except OSError:
+            return None
+        try:
+            return profiles_mtime, os.stat(self.state_path).st_mtime_ns
+        except OSError:
+            return profiles_mtime, None
+
+    def _maybe_reload(self) -> None:
+        """Reload profiles (and A/B splits) if either file changed since last time"""
+        now = time.monotonic()
+        if now < self._next_reload_check or not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_reload_check = now + self.reload_check_seconds
+            mtime = self._stat_profiles()
+            if mtime is None or mtime == self._profiles_mtime:
+                return
+            self._profiles_mtime = mtime
+            profiles = self._load_profiles()
+            if not profiles:
+                return  # Keep serving the last good profiles
+            self.experiments = ABTestManager(profiles.get('ab_testing', {}))
+            self.profiles = profiles
+            logger.info(f"Reloaded subnet profiles from {self.profile_path}")
+        finally:
+            self._reload_lock.release()
+
     def select_llm(self, task_type: str = 'generation',
                    reasoning_depth: str = 'medium',
                    subnet_id: int = 1) -> Dict[str, Any]:
@@ -66,15 +123,128 @@ class LLMRouter:
             # Default to subnet preference
             selected_llm = preferred_llm
 
-        config = {
-            'model': selected_llm,
-            'provider': self._get_provider(selected_llm),
+        config = self.config_for_model(selected_llm, subnet_id)
+
+        logger.debug(f"Selected LLM {selected_llm} for {task_type}/{reasoning_depth}")
+        return config
+
+    def config_for_model(self, model: str, subnet_id: int = 1) -> Dict[str, Any]:
+        """LLM configuration for a specific model under a subnet's limits"""
+        subnet = self.profiles.get('subnets', {}).get(str(subnet_id), {})
+        return {
+            'model': model,
+            'provider': self._get_provider(model),
             'max_tokens': subnet.get('max_tokens_per_task', 1000),
+            'max_input_tokens': subnet.get('max_input_tokens_per_task', 2000),
             'temperature': 0.7,
         }
 
-        logger.debug(f"Selected LLM {selected_llm} for {task_type}/{reasoning_depth}")
-        return config
+    def get_cascade_config(self, subnet_id: int = 1) -> Dict[str, Any]:
+        """Get cascade settings for a subnet (empty dict if cascade is off)"""
+        subnet = self.profiles.get('subnets', {}).get(str(subnet_id), {})
+        cascade = subnet.get('cascade', {})
+        if not cascade.get('enabled', False) or not cascade.get('models'):
+            return {}
+        return cascade
+
+    def select_cascade(self, task_type: str = 'generation',
+                       reasoning_depth: str = 'medium',
+                       subnet_id: int = 1) -> List[Dict[str, Any]]:
+        """
+        Select an ordered list of LLMs to try, cheapest first.
+        Falls back to the single select_llm() choice when the subnet
+        has no cascade configured.
+
+        Args:
+            task_type: Type of task (generation, evaluation, ranking)
+            reasoning_depth: Reasoning complexity (simple, medium, complex)
+            subnet_id: Target subnet
+
+        Returns:
+            List of LLM configuration dicts, in escalation order
+        """
+        self._maybe_reload()
+        cascade = self.get_cascade_config(subnet_id)
+        if not cascade:
+            return [self.select_llm(task_type, reasoning_depth, subnet_id)]
+
+        models = list(cascade['models'])
+
+        # Complex reasoning is not worth a cheap draft; start at Claude
+        if reasoning_depth == 'complex' and 'claude-sonnet' in models:
+            models = models[models.index('claude-sonnet'):]
+
+        stages = [
+            dict(self.config_for_model(model, subnet_id), cascade_stage=stage)
+            for stage, model in enumerate(models)
+        ]
+
+        logger.debug(
+            f"Cascade for {task_type}/{reasoning_depth} on subnet {subnet_id}: "
+            f"{' -> '.join(models)}"
+        )
+        return stages
+
+    def should_escalate(self, draft_score: float, subnet_id: int = 1,
+                        seconds_remaining: Optional[float] = None) -> bool:
+        """
+        Decide whether a draft should be escalated to the next model.
+
+        Args:
+            draft_score: Local quality/confidence score of the draft (0-1)
+            subnet_id: Target subnet
+            seconds_remaining: Time left before the task deadline (None = no deadline)
+
+        Returns:
+            True if the next cascade stage should run
+        """
+        cascade = self.get_cascade_config(subnet_id)
+        if not cascade:
+            return False
+
+        threshold = cascade.get('escalation_threshold', 0.6)
+        if draft_score >= threshold:
+            return False
+
+        min_remaining = cascade.get('min_remaining_seconds', 0)
+        if seconds_remaining is not None and seconds_remaining < min_remaining:
+            logger.debug(
+                f"Draft score {draft_score:.2f} below {threshold} but only "
+                f"{seconds_remaining:.1f}s left, keeping draft"
+            )
+            with self._stats_lock:
+                self.cascade_stats[str(subnet_id)]['escalations_skipped_deadline'] += 1
+            return False
+
+        with self._stats_lock:
+            self.cascade_stats[str(subnet_id)]['escalations'] += 1
+        return True
+
+    def record_cascade_outcome(self, subnet_id: int, resolved_stage: int) -> None:
+        """Record which cascade stage produced the submitted response"""
+        with self._stats_lock:
+            stats = self.cascade_stats[str(subnet_id)]
+            stats['tasks'] += 1
+            stats['resolved_by_stage'][resolved_stage] += 1
+
+    def get_cascade_stats(self) -> Dict[str, Any]:
+        """
+        Get cascade hit-rate metrics per subnet.
+        hit_rate is the share of tasks resolved by the first (cheapest) stage.
+        """
+        result = {}
+        with self._stats_lock:
+            for subnet_id, stats in self.cascade_stats.items():
+                tasks = stats['tasks']
+                first_stage = stats['resolved_by_stage'].get(0, 0)
+                result[subnet_id] = {
+                    'tasks': tasks,
+                    'hit_rate': first_stage / tasks if tasks else 0.0,
+                    'resolved_by_stage': dict(stats['resolved_by_stage']),
+                    'escalations': stats['escalations'],
+                    'escalations_skipped_deadline': stats['escalations_skipped_deadline'],
+                }
+        return result
 
     def _get_provider(self, model_name: str) -> str:
         """Get provider for a model"""
@@ -88,7 +258,8 @@ class LLMRouter:
 
     def should_respond(self, task: Dict[str, Any],
                        subnet_id: int = 1,
-                       current_budget_percent: float = 50.0) -> bool:
+                       current_budget_percent: float = 50.0,
+                       pace: float = 1.0) -> bool:
         """
         Determine if we should respond to a task.
         Phase 1: Simple threshold-based decision.
@@ -97,6 +268,7 @@ class LLMRouter:
             task: Task data
             subnet_id: Target subnet
             current_budget_percent: Current budget utilization (0-100)
+            pace: Budget pacing factor from TokenBudgetManager.get_pace()
 
         Returns:
             True if should respond, False otherwise
@@ -118,8 +290,8 @@ class LLMRouter:
             logger.debug(f"Confidence {confidence} below threshold {min_threshold}")
             return False
 
-        # Check participation rate
-        participation_rate = subnet.get('participation_rate', 1.0)
+        # Check participation rate, scaled by budget pacing
+        participation_rate = min(1.0, subnet.get('participation_rate', 1.0) * pace)
         import random
         if random.random() > participation_rate:
             logger.debug(f"Participation rate check failed")
@@ -129,20 +301,23 @@ class LLMRouter:
 
     def allocate_tokens(self, task: Dict[str, Any],
                         llm_config: Dict[str, Any],
-                        remaining_budget: int) -> int:
+                        remaining_budget: int,
+                        pace: float = 1.0) -> int:
         """
         Allocate token budget for a task.
         Phase 1: Simple allocation.
 
         Args:
             task: Task data
-            llm_config: LLM configuration
+            llm_config: LLM configuration (max_tokens already capped to the
+                learned output length, so reservations stay close to real need)
             remaining_budget: Remaining tokens available
+            pace: Budget pacing factor (< 1.0 shrinks max_tokens when ahead of schedule)
 
         Returns:
             Allocated tokens for this task
         """
-        max_tokens = llm_config.get('max_tokens', 1000)
+        max_tokens = int(llm_config.get('max_tokens', 1000) * min(1.0, pace))
 
         # Ensure we have budget
         if remaining_budget < max_tokens:
@@ -151,17 +326,26 @@ class LLMRouter:
 
         return max_tokens
 
-    def get_best_strategy(self, task_type: str) -> str:
+    def get_best_strategy(self, task_type: str, subnet_id: Optional[int] = None) -> str:
         """
         Get best prompt strategy for task type.
-        Phase 1: Simple mapping.
+        Phase 1: Simple mapping, unless an A/B test promoted a strategy
+        for this subnet and task type.
 
         Args:
             task_type: Type of task
+            subnet_id: Target subnet (for promoted strategy overrides)
 
         Returns:
             Strategy name
         """
+        self._maybe_reload()
+        if subnet_id is not None:
+            subnet = self.profiles.get('subnets', {}).get(str(subnet_id), {})
+            overrides = subnet.get('strategy_overrides', {})
+            if task_type in overrides or '*' in overrides:
+                return overrides.get(task_type, overrides.get('*'))
+
         if task_type in ['evaluation', 'ranking']:
             return 'structured_reasoning'
         elif task_type == 'generation':
@@ -14,9 +14,13 @@ import socket
 import os
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from utils.bittensor_client import BittensorClientWrapper
+from utils.bulkhead import SubnetBulkhead, BulkheadGroup
+from utils.axon_server import decode_task
+from utils.earnings_ledger import EarningsLedger
+from task_handler import TaskHandler
 from wallet_manager import WalletManager
 
 # Configure logging
@@ -39,6 +43,11 @@ class MinerDaemon:
     """
     Main miner daemon process.
     Listens for tasks, routes to task_handler, returns responses.
+
+    One daemon mines every (subnet, hotkey) listed in bittensor.miners.
+    All of them share one TaskHandler (provider pools, caches, budget
+    ledger, history) and one chain backend, while each subnet gets its own
+    queue and worker threads so a slow subnet can't starve the others.
     """
 
     def __init__(self, config_path: str = "config/miner-config.json"):
@@ -49,8 +58,14 @@ class MinerDaemon:
         self.socket = None
 
         # Initialize components
-        self.bittensor = None
-        self.wallet = WalletManager()
+        self.bittensor = None  # Client of the first miner (single-subnet callers)
+        self.clients: List[BittensorClientWrapper] = []
+        self.task_handler: Optional[TaskHandler] = None
+        self.bulkheads = BulkheadGroup()
+        self.axon_ports: Dict[tuple, int] = {}  # (subnet_id, hotkey) -> axon port
+        self.wallet = WalletManager(config=self.config.get('wallet_mcp'))
+        self.earnings: Optional[EarningsLedger] = None
+        self.earnings_synced_at = 0.0  # monotonic time of the last earnings sync
         self.state_file = Path("state/miner-state.json")
 
         # Signal handlers for graceful shutdown
@@ -90,6 +105,16 @@ class MinerDaemon:
                 'last_task_received': None,  # Phase 1
                 'tasks_processed': self.tasks_processed,
                 'uptime_seconds': int(time.time()),
+                'miners': [{'subnet_id': client.subnet_id, 'hotkey': client.hotkey}
+                           for client in self.clients],
+                'subnets': self.bulkheads.snapshot(),
+                'axons': {str(self.axon_ports[(client.subnet_id, client.hotkey)]): client.miner.snapshot()
+                          for client in self.clients if client.miner is not None},
+                'signatures': {verifier.scheme.name: verifier.snapshot() for verifier in {
+                    client.miner.verifier for client in self.clients
+                    if client.miner is not None and client.miner.verifier is not None}},
+                'wallet': self.wallet.snapshot() if self.wallet else None,
+                'earnings': self._earnings_snapshot(),
             }
             self.state_file.parent.mkdir(exist_ok=True)
             with open(self.state_file, 'w') as f:
@@ -112,30 +137,230 @@ class MinerDaemon:
             logger.error("Failed to start wallet MCP server")
             return False
 
-        # Initialize Bittensor client
-        bittensor_config = self.config['bittensor']
-        self.bittensor = BittensorClientWrapper(
-            wallet_name=bittensor_config['wallet_name'],
-            hotkey=bittensor_config['hotkey'],
-            subnet_id=bittensor_config['subnet_id'],
-            network=bittensor_config['network']
-        )
-
-        if not self.bittensor.initialize():
-            logger.error("Failed to initialize Bittensor client")
+        # One task pipeline for every subnet
+        self.task_handler = self._create_task_handler()
+        subnet_profiles = self.task_handler.llm_router.profiles.get('subnets', {})
+
+        miners = [miner for miner in self._miner_configs()
+                  if self._subnet_enabled(subnet_profiles, miner['subnet_id'])]
+        if not miners:
+            logger.error("No enabled subnets to mine (check bittensor.miners and subnet-profiles.json)")
             return False
 
-        # Check registration
-        if not self.bittensor.is_registered():
-            logger.error(
-                f"Hotkey not registered to subnet {bittensor_config['subnet_id']}\n"
-                "Register with: btcli subnet register --wallet.name openclawd-miner --subnet.id 1"
-            )
+        # Bittensor clients, one per (subnet, hotkey), sharing the chain
+        # backend and each subnet's metagraph cache
+        bittensor_config = self.config['bittensor']
+        pairs = [(miner['subnet_id'], hotkey) for miner in miners for hotkey in miner['hotkeys']]
+        backend = None
+        chain_backend = BittensorClientWrapper.backend_kind(bittensor_config)
+        if chain_backend == 'mock':
+            backend = BittensorClientWrapper.mock_backend(pairs)
+        metagraphs = {}
+        for miner in miners:
+            subnet_id = miner['subnet_id']
+            registered = 0
+            for hotkey in miner['hotkeys']:
+                client = BittensorClientWrapper(
+                    wallet_name=miner.get('wallet_name', bittensor_config['wallet_name']),
+                    hotkey=hotkey,
+                    subnet_id=subnet_id,
+                    network=bittensor_config['network'],
+                    backend=backend,
+                    metagraph_config=bittensor_config.get('metagraph'),
+                    pool_config=bittensor_config.get('chain_pool'),
+                    metagraph=metagraphs.get(subnet_id),
+                    chain_backend=chain_backend
+                )
+                if not client.initialize():
+                    logger.error(f"Failed to initialize Bittensor client for {hotkey} on subnet {subnet_id}")
+                    continue
+                backend = client.backend
+                metagraphs[subnet_id] = client.metagraph
+
+                # Check registration (skip this hotkey, keep mining the rest)
+                if not client.is_registered():
+                    logger.error(
+                        f"Hotkey {hotkey} not registered to subnet {subnet_id}\n"
+                        f"Register with: btcli subnet register --wallet.name {client.wallet_name} "
+                        f"--wallet.hotkey {hotkey} --subnet.id {subnet_id}"
+                    )
+                    continue
+                self.clients.append(client)
+                self.axon_ports[(subnet_id, hotkey)] = (
+                    miner['axon_port'] + miner['hotkeys'].index(hotkey) if 'axon_port' in miner
+                    else self.config['daemon'].get('port', 8000) + len(self.clients) - 1
+                )
+                registered += 1
+
+            if registered:
+                # Waiting tasks are served in proportion to validator stake
+                self.bulkheads.add(SubnetBulkhead(
+                    subnet_id, self._process_task,
+                    max_concurrent=miner['max_concurrent_tasks'],
+                    queue_size=miner['queue_size'],
+                    on_result=self._submit_result,
+                    weight_of=metagraphs[subnet_id].get_stake_cached,
+                    max_queued_per_caller=miner['max_queued_per_validator']
+                ))
+
+        if not self.clients:
+            logger.error("No registered hotkeys to mine with")
             return False
+        self.bittensor = self.clients[0]
+
+        # TAO income rollups, ingested from the chain by block range
+        earnings_config = bittensor_config.get('earnings', {})
+        if earnings_config.get('enabled', True):
+            addresses = {client.hotkey for client in self.clients}
+            addresses.update(earnings_config.get('addresses', []))
+            self.earnings = EarningsLedger.from_config(earnings_config, self.clients[0].backend, sorted(addresses))
+            self.wallet.earnings = self.earnings
+            self.sync_earnings(force=True)
 
         logger.info("✅ All components initialized")
         return True
 
+    def _create_task_handler(self) -> TaskHandler:
+        """The task pipeline shared by every subnet (the simulator substitutes its own)"""
+        return TaskHandler(str(self.config_path))
+
+    def sync_earnings(self, force: bool = False) -> int:
+        """
+        Ingest new chain blocks into the earnings ledger, at most once per
+        bittensor.earnings.sync_interval_seconds.
+
+        Returns:
+            Number of new earning events
+        """
+        if self.earnings is None:
+            return 0
+        interval = self.config['bittensor'].get('earnings', {}).get('sync_interval_seconds', 60)
+        if not force and time.monotonic() - self.earnings_synced_at < interval:
+            return 0
+        self.earnings_synced_at = time.monotonic()
+        return self.earnings.sync()
+
+    def _earnings_snapshot(self) -> Optional[Dict[str, Any]]:
+        """TAO earned and TAO per 1K tokens for the state file (day rollups, no chain access)"""
+        if self.earnings is None:
+            return None
+        spend = self.task_handler.budget_manager.windows if self.task_handler else None
+        return {
+            'last_block': self.earnings.last_block,
+            'tao_today': self.earnings.tao_earned(1),
+            'tao_7d': self.earnings.tao_earned(7),
+            'daily': self.earnings.daily(7, spend),
+            'by_subnet_7d': self.earnings.roi_by_subnet(7, spend) if spend else {},
+            'stats': dict(self.earnings.stats),
+        }
+
+    def _miner_configs(self) -> List[Dict[str, Any]]:
+        """
+        Subnets to mine from bittensor.miners, falling back to the single
+        subnet_id/hotkey pair.
+
+        Returns:
+            One dict per subnet: subnet_id, hotkeys, max_concurrent_tasks,
+            queue_size, max_queued_per_validator
+        """
+        bittensor_config = self.config['bittensor']
+        daemon_config = self.config.get('daemon', {})
+        entries = bittensor_config.get('miners') or [{
+            'subnet_id': bittensor_config['subnet_id'],
+            'hotkeys': [bittensor_config['hotkey']],
+        }]
+
+        miners = {}
+        for entry in entries:
+            subnet_id = int(entry['subnet_id'])
+            hotkeys = entry.get('hotkeys') or [entry.get('hotkey', bittensor_config.get('hotkey', 'default'))]
+            miner = miners.setdefault(subnet_id, {
+                'subnet_id': subnet_id,
+                'hotkeys': [],
+                'max_concurrent_tasks': entry.get('max_concurrent_tasks',
+                                                  daemon_config.get('max_concurrent_tasks', 3)),
+                'queue_size': entry.get('queue_size', 50),
+                'max_queued_per_validator': entry.get('max_queued_per_validator', 8),
+            })
+            for key in ('wallet_name', 'axon_port'):
+                if key in entry:
+                    miner[key] = entry[key]
+            miner['hotkeys'].extend(hotkey for hotkey in hotkeys if hotkey not in miner['hotkeys'])
+        return list(miners.values())
+
+    @staticmethod
+    def _subnet_enabled(subnet_profiles: Dict[str, Any], subnet_id: int) -> bool:
+        """Subnets without a profile are mined with defaults; disabled ones are skipped"""
+        if not subnet_profiles.get(str(subnet_id), {}).get('enabled', True):
+            logger.info(f"Subnet {subnet_id} is disabled in subnet-profiles.json, not mining it")
+            return False
+        return True
+
+    def setup_axons(self) -> bool:
+        """
+        Start one axon per mining hotkey; requests go straight to the
+        subnet's bulkhead.
+
+        Returns:
+            True if every axon is listening
+        """
+        axon_config = dict(self.config['daemon'].get('axon', {}))
+        axon_config.setdefault('request_timeout', self.config['daemon'].get('task_timeout_seconds', 60))
+        for client in self.clients:
+            port = self.axon_ports[(client.subnet_id, client.hotkey)]
+            on_task = lambda task, client=client: self._accept(client, task)
+            if not (client.setup_miner(port, on_task, axon_config) and client.start_mining()):
+                logger.error(f"Failed to start axon for {client.hotkey} on port {port}")
+                return False
+        return True
+
+    def _accept(self, client: BittensorClientWrapper, task: Dict[str, Any]) -> bool:
+        """Axon callback (event loop thread): queue without blocking"""
+        task['subnet_id'] = client.subnet_id
+        task['hotkey'] = client.hotkey
+        return self.bulkheads.submit(task)
+
+    def _process_task(self, task: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Bulkhead handler: decode the request body, then run the pipeline"""
+        try:
+            decode_task(task)
+        except (ValueError, UnicodeDecodeError) as e:
+            logger.warning(f"Malformed request {task.get('id')} from {task.get('caller')}: {e}")
+            task['reject_status'] = 400
+            return None
+        return self.task_handler.process_task(task)
+
+    def poll_tasks(self) -> int:
+        """
+        Pull pending tasks from every miner into its subnet's bulkhead.
+
+        Returns:
+            Number of tasks queued
+        """
+        queued = 0
+        for client in self.clients:
+            bulkhead = self.bulkheads.bulkheads.get(client.subnet_id)
+            free = bulkhead.queue_size - bulkhead.queued() if bulkhead else 0
+            if free <= 0:
+                continue
+            for task in client.get_pending_tasks(max_tasks=free):
+                task['subnet_id'] = client.subnet_id
+                task['hotkey'] = client.hotkey
+                queued += self.bulkheads.submit(task)
+        return queued
+
+    def _submit_result(self, task: Dict[str, Any], result: Optional[Dict[str, Any]]) -> None:
+        """Bulkhead callback: answer through the hotkey that received the task"""
+        for client in self.clients:
+            if client.subnet_id == task['subnet_id'] and client.hotkey == task.get('hotkey'):
+                if not result:
+                    client.decline_task(task['id'], task.get('reject_status', 204))
+                    return
+                client.submit_response(result['task_id'], result['response'])
+                self.tasks_processed += 1
+                return
+        logger.warning(f"No client for subnet {task['subnet_id']} hotkey {task.get('hotkey')}")
+
     def setup_ipc_socket(self) -> bool:
         """
         Setup Unix socket for IPC communication with task_handler.
@@ -177,12 +402,20 @@ class MinerDaemon:
             logger.error("IPC socket setup failed")
             return
 
+        if not self.setup_axons():
+            logger.error("Axon setup failed")
+            self.shutdown()
+            return
+
         self.running = True
+        self.bulkheads.start()
         self._save_state()
 
         logger.info("=" * 60)
         logger.info("🤖 BITTENSOR MINER DAEMON STARTED")
-        logger.info(f"   Subnet: {self.config['bittensor']['subnet_id']}")
+        for client in self.clients:
+            logger.info(f"   Subnet: {client.subnet_id} (hotkey {client.hotkey}, "
+                        f"axon port {self.axon_ports[(client.subnet_id, client.hotkey)]})")
         logger.info(f"   Network: {self.config['bittensor']['network']}")
         logger.info(f"   Socket: {self.config['daemon']['socket_path']}")
         logger.info("=" * 60)
@@ -190,10 +423,11 @@ class MinerDaemon:
         try:
             while self.running:
                 logger.info("Waiting for tasks...")
-                # Phase 1: Mock task receiving
-                # In real implementation, would listen on socket and poll Bittensor
+                # Axons push requests into the bulkheads; this only picks
+                # up tasks from clients running without an axon callback
+                self.poll_tasks()
+                self.sync_earnings()
 
-                # Simulate task reception every 10 seconds
                 time.sleep(10)
                 logger.debug(f"Status: {self.tasks_processed} tasks processed")
 
@@ -219,8 +453,9 @@ class MinerDaemon:
             except Exception as e:
                 logger.error(f"Error closing socket: {e}")
 
-        if self.bittensor:
-            self.bittensor.shutdown()
+        self.bulkheads.stop()
+        for client in self.clients:
+            client.shutdown()
 
         if self.wallet:
             self.wallet.stop_mcp_server()
@@ -5,13 +5,21 @@ Analyzes results and adapts strategy based on validator feedback.
 Phase 1: Data collection and basic metrics.
 """
 
+import argparse
 import json
 import logging
 import sys
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, Any, Optional, List
-from collections import defaultdict
+
+from utils.history_writer import HistoryWriter
+from utils.score_ingestion import ScoreIngestor
+from utils.performance_aggregates import PerformanceAggregates
+from utils.performance_report import ReportEngine
+from utils.history_columns import HistoryColumns, NUMPY_AVAILABLE
+from utils.ab_testing import ABTestManager
+from utils.earnings_ledger import EarningsLedger
 
 log_dir = Path("logs")
 log_dir.mkdir(exist_ok=True)
@@ -34,17 +42,51 @@ class PerformanceTracker:
     Phase 1: Collects metrics, identifies trends.
     """
 
-    def __init__(self, history_file: str = "state/task-history.jsonl",
-                 metrics_file: str = "state/performance-metrics.json"):
-        self.history_file = Path(history_file)
+    def __init__(self, history_dir: str = "state/history",
+                 metrics_file: str = "state/performance-metrics.json",
+                 aggregates_file: str = "state/performance-aggregates.json",
+                 columns_dir: str = "state/history-columns",
+                 pending_scores_file: str = "state/pending-scores.json",
+                 score_ttl_seconds: float = 3600,
+                 profile_path: str = "config/subnet-profiles.json",
+                 earnings_file: str = "state/earnings-ledger.json"):
+        # Shared with TaskHandler: one batched writer per history directory
+        self.writer = HistoryWriter.shared({'history_dir': history_dir})
+        self.store = self.writer.store
         self.metrics_file = Path(metrics_file)
+        self.aggregates = PerformanceAggregates(self.store, aggregates_file)
+        self.writer.add_listener(self.aggregates.note_append)
+
+        # TAO income rollups kept by the daemon (read-only here: no chain access)
+        self.earnings = EarningsLedger(state_file=earnings_file)
+        self.report_engine = ReportEngine(self.aggregates, earnings=self.earnings)
+        self.roi_threshold = self._load_thresholds(profile_path).get('roi_threshold_tao_per_1k_tokens')
+
+        # Late validator scores are joined onto their task record by task_id
+        self.scores = ScoreIngestor(self.writer, pending_scores_file, score_ttl_seconds)
+
+        # Columnar history for A/B test analysis (needs numpy)
+        self.columns = HistoryColumns(self.store, columns_dir) if NUMPY_AVAILABLE else None
+        self.experiments = ABTestManager.from_profiles(profile_path, self.columns)
         logger.debug("PerformanceTracker initialized")
 
+    @staticmethod
+    def _load_thresholds(profile_path: str) -> Dict[str, Any]:
+        """'performance_thresholds' section of subnet-profiles.json"""
+        try:
+            with open(profile_path, 'r') as f:
+                return json.load(f).get('performance_thresholds', {})
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"No performance thresholds from {profile_path}: {e}")
+            return {}
+
     def record_task_result(self, task_id: str, validator_score: float,
                           tokens_spent: int, llm_used: str,
                           prompt_strategy: str, subnet_id: int = 1) -> None:
         """
         Record result of a completed task.
+        The task's own history record wins; the arguments are only used
+        when there is none.
 
         Args:
             task_id: Unique task identifier
@@ -55,30 +97,42 @@ class PerformanceTracker:
             subnet_id: Target subnet
         """
         try:
-            result = {
-                'timestamp': datetime.utcnow().isoformat(),
-                'task_id': task_id,
-                'validator_score': validator_score,
-                'tokens_spent': tokens_spent,
-                'llm_used': llm_used,
-                'prompt_strategy': prompt_strategy,
+            self.scores.ingest(task_id, validator_score, fallback={
+                'tokens': tokens_spent,
+                'llm': llm_used,
+                'strategy': prompt_strategy,
                 'subnet_id': subnet_id,
-            }
-
-            # Append to history
-            self.history_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.history_file, 'a') as f:
-                f.write(json.dumps(result) + '\n')
-
+            })
             logger.debug(f"Recorded task {task_id}: score={validator_score}")
 
         except Exception as e:
             logger.error(f"Failed to record task result: {e}")
 
+    def record_validator_score(self, task_id: str, validator_score: float,
+                               **extra: Any) -> Optional[Dict[str, Any]]:
+        """
+        Record a validator score that arrived after submission.
+
+        Args:
+            task_id: Task the score is for
+            validator_score: Validator score (0-1)
+            **extra: Extra context kept on the record (e.g. validator hotkey)
+
+        Returns:
+            Joined score record, or None if buffered until the task record appears
+        """
+        try:
+            return self.scores.ingest(task_id, validator_score, **extra)
+        except Exception as e:
+            logger.error(f"Failed to record validator score for {task_id}: {e}")
+            return None
+
     def analyze_performance(self, days: int = 7) -> Dict[str, Any]:
         """
         Analyze performance over a time window.
-        Phase 1: Basic statistics.
+        Only history added since the last call is parsed. The window sums
+        the hourly rollups; score, latency, TTFT and token percentiles come
+        from the daily sketches.
 
         Args:
             days: Number of days to analyze
@@ -87,86 +141,42 @@ class PerformanceTracker:
             Dict with performance metrics
         """
         try:
-            history = self._load_history()
-
-            # Filter to time window
-            cutoff_time = datetime.utcnow() - timedelta(days=days)
-            filtered = [
-                task for task in history
-                if datetime.fromisoformat(task.get('timestamp', ''))
-                > cutoff_time
-            ]
+            self.scores.expire_pending()
+            self.writer.flush()
+            self.aggregates.refresh()
+            metrics = self.aggregates.summarize(days)
+            metrics['percentiles'] = self.aggregates.percentiles(days)
 
-            if not filtered:
+            if not metrics['tasks_completed']:
                 logger.warning(f"No tasks in {days}-day window")
                 return self._empty_metrics()
 
-            # Calculate metrics
-            metrics = {
-                'period_days': days,
-                'tasks_completed': len(filtered),
-                'average_score': sum(t.get('validator_score', 0) for t in filtered) / len(filtered),
-                'success_rate': sum(1 for t in filtered if t.get('validator_score', 0) > 0.5) / len(filtered),
-                'total_tokens_spent': sum(t.get('tokens_spent', 0) for t in filtered),
-                'by_llm': self._analyze_by_llm(filtered),
-                'by_strategy': self._analyze_by_strategy(filtered),
-            }
-
             return metrics
 
         except Exception as e:
             logger.error(f"Failed to analyze performance: {e}")
             return self._empty_metrics()
 
-    def _analyze_by_llm(self, tasks: List[Dict]) -> Dict[str, Any]:
-        """Analyze performance by LLM"""
-        by_llm = defaultdict(list)
-        for task in tasks:
-            llm = task.get('llm_used', 'unknown')
-            by_llm[llm].append(task.get('validator_score', 0))
-
-        result = {}
-        for llm, scores in by_llm.items():
-            result[llm] = {
-                'tasks': len(scores),
-                'avg_score': sum(scores) / len(scores),
-                'success_rate': sum(1 for s in scores if s > 0.5) / len(scores),
-            }
-        return result
-
-    def _analyze_by_strategy(self, tasks: List[Dict]) -> Dict[str, Any]:
-        """Analyze performance by prompt strategy"""
-        by_strategy = defaultdict(list)
-        for task in tasks:
-            strategy = task.get('prompt_strategy', 'unknown')
-            by_strategy[strategy].append(task.get('validator_score', 0))
-
-        result = {}
-        for strategy, scores in by_strategy.items():
-            result[strategy] = {
-                'tasks': len(scores),
-                'avg_score': sum(scores) / len(scores),
-                'success_rate': sum(1 for s in scores if s > 0.5) / len(scores),
-            }
-        return result
-
-    def _load_history(self) -> List[Dict[str, Any]]:
-        """Load task history from file"""
-        if not self.history_file.exists():
-            return []
-
-        history = []
+    def analyze_experiments(self, promote: bool = False) -> Dict[str, Any]:
+        """
+        Confidence intervals and win probabilities for the running A/B tests.
+        Cheap enough for every heartbeat (columnar history, resampled
+        histograms).
+
+        Args:
+            promote: Shift traffic towards (and eventually adopt) winners
+
+        Returns:
+            Dict with per-experiment 'results' and the promotion 'steps' taken
+        """
         try:
-            with open(self.history_file, 'r') as f:
-                for line in f:
-                    try:
-                        history.append(json.loads(line))
-                    except json.JSONDecodeError:
-                        continue
+            self.writer.flush()
+            results = self.experiments.analyze_all()
+            steps = self.experiments.promote_winners(results) if promote else []
+            return {'results': results, 'steps': steps}
         except Exception as e:
-            logger.error(f"Failed to load history: {e}")
-
-        return history
+            logger.error(f"Failed to analyze experiments: {e}")
+            return {'results': {}, 'steps': []}
 
     def _empty_metrics(self) -> Dict[str, Any]:
         """Return empty metrics dict"""
@@ -178,8 +188,31 @@ class PerformanceTracker:
             'total_tokens_spent': 0,
             'by_llm': {},
             'by_strategy': {},
+            'by_subnet': {},
+            'percentiles': {},
         }
 
+    def build_report(self) -> Dict[str, Any]:
+        """
+        24h/7-day/30-day blocks plus week-over-week deltas, computed
+        together from the pre-rolled buckets (one pass, no history scan).
+        """
+        try:
+            self.writer.flush()
+            self.aggregates.refresh()
+            self.earnings.load()
+            return self.report_engine.build()
+        except Exception as e:
+            logger.error(f"Failed to build performance report: {e}")
+            return {}
+
+    def update_metrics(self) -> Dict[str, Any]:
+        """Rebuild the multi-window report and write performance-metrics.json"""
+        report = self.build_report()
+        if report:
+            self.save_metrics(report)
+        return report
+
     def save_metrics(self, metrics: Dict[str, Any]) -> None:
         """Save metrics to file"""
         try:
@@ -191,13 +224,17 @@ class PerformanceTracker:
         except Exception as e:
             logger.error(f"Failed to save metrics: {e}")
 
-    def get_recommendations(self, metrics: Dict[str, Any]) -> List[str]:
+    def get_recommendations(self, metrics: Dict[str, Any],
+                            experiments: Optional[Dict[str, Any]] = None) -> List[str]:
         """
         Generate recommendations based on performance.
-        Phase 1: Simple heuristics.
+        Phase 1: Simple heuristics. Best LLM/strategy is only named among
+        groups with enough tasks; A/B test results, when given, say whether
+        a difference is real.
 
         Args:
             metrics: Performance metrics dict
+            experiments: Output of analyze_experiments()
 
         Returns:
             List of recommendation strings
@@ -212,24 +249,51 @@ class PerformanceTracker:
         if success_rate < 0.5:
             recommendations.append("Task success rate is poor. Review task selection logic.")
 
-        # Find best LLM
-        by_llm = metrics.get('by_llm', {})
-        if by_llm:
-            best_llm = max(by_llm.items(), key=lambda x: x[1].get('avg_score', 0))
-            recommendations.append(f"Best performing LLM: {best_llm[0]}")
-
-        # Find best strategy
-        by_strategy = metrics.get('by_strategy', {})
-        if by_strategy:
-            best_strategy = max(by_strategy.items(), key=lambda x: x[1].get('avg_score', 0))
-            recommendations.append(f"Best performing strategy: {best_strategy[0]}")
+        roi = metrics.get('tao_per_1k_tokens')
+        if roi is not None and self.roi_threshold is not None and roi < self.roi_threshold:
+            recommendations.append(f"Token ROI {roi:.6f} TAO/1K tokens is below {self.roi_threshold}. "
+                                   f"Cut spend on low-earning subnets or use cheaper LLMs.")
+
+        # Best LLM / strategy, ignoring groups too small to trust
+        min_tasks = self.report_engine.min_tasks_for_best
+        for label, dim in (('LLM', 'by_llm'), ('strategy', 'by_strategy')):
+            eligible = {name: stats for name, stats in metrics.get(dim, {}).items()
+                        if stats.get('tasks', 0) >= min_tasks}
+            if eligible:
+                name, stats = max(eligible.items(), key=lambda x: x[1].get('avg_score', 0))
+                recommendations.append(f"Highest scoring {label}: {name} "
+                                       f"({stats['avg_score']:.2f} over {stats['tasks']} tasks)")
+
+        for name, result in (experiments or {}).get('results', {}).items():
+            leader = result['leader']
+            if result['status'] == 'winner':
+                stats = result['variants'][leader]
+                recommendations.append(
+                    f"A/B {name}: {leader} wins (P(best) {stats['p_best']:.1%}, "
+                    f"avg {stats['avg_score']:.2f} CI {stats['score_ci'][0]:.2f}-{stats['score_ci'][1]:.2f})"
+                )
+            elif result['status'] == 'inconclusive':
+                recommendations.append(f"A/B {name}: no significant difference yet "
+                                       f"(leader {leader}, keep the split)")
+            else:
+                samples = min(v['samples'] for v in result['variants'].values())
+                recommendations.append(f"A/B {name}: collecting ({samples}/"
+                                       f"{self.experiments.min_samples} tasks per variant)")
+
+        for step in (experiments or {}).get('steps', []):
+            action = 'adopted' if step['final'] else f"moved to {step['share']:.0%} of traffic"
+            recommendations.append(f"A/B {step['experiment']}: {step['winner']} {action}")
 
         return recommendations
 
-    def generate_report(self, days: int = 7) -> str:
+    def generate_report(self, days: int = 7,
+                        experiments: Optional[Dict[str, Any]] = None) -> str:
         """Generate a human-readable performance report"""
         metrics = self.analyze_performance(days=days)
-        recommendations = self.get_recommendations(metrics)
+        self.earnings.load()
+        metrics['tao_earned'] = self.earnings.tao_earned(days) if self.earnings.synced else None
+        metrics['tao_per_1k_tokens'] = EarningsLedger.roi(metrics['tao_earned'], metrics['total_tokens_spent'])
+        recommendations = self.get_recommendations(metrics, experiments)
 
         report_lines = [
             f"\n📊 Performance Report ({days}-day window)",
@@ -238,7 +302,20 @@ class PerformanceTracker:
             f"Average score: {metrics['average_score']:.2f}",
             f"Success rate: {metrics['success_rate']:.1%}",
             f"Tokens spent: {metrics['total_tokens_spent']}",
+            f"TAO earned: {self._fmt(metrics, 'tao_earned', 6)}",
         ]
+        if metrics['tao_per_1k_tokens'] is not None:
+            report_lines.append(f"ROI: {metrics['tao_per_1k_tokens']:.6f} TAO per 1K tokens")
+
+        percentiles = metrics.get('percentiles', {})
+        score = percentiles.get('score', {}).get('total')
+        if score:
+            report_lines.append(f"Score p5/p50/p95: {self._fmt(score, 'p5')} / "
+                                f"{self._fmt(score, 'p50')} / {self._fmt(score, 'p95')}")
+        latency = percentiles.get('latency_ms', {}).get('total')
+        if latency:
+            report_lines.append(f"Latency p50/p95/p99: {self._fmt(latency, 'p50', 0)} / "
+                                f"{self._fmt(latency, 'p95', 0)} / {self._fmt(latency, 'p99', 0)} ms")
 
         if recommendations:
             report_lines.append("\n💡 Recommendations:")
@@ -247,11 +324,60 @@ class PerformanceTracker:
 
         return '\n'.join(report_lines)
 
+    @staticmethod
+    def _fmt(summary: Dict[str, Any], key: str, digits: int = 2) -> str:
+        value = summary.get(key)
+        return 'n/a' if value is None else f"{value:.{digits}f}"
+
+
+def format_detailed(report: Dict[str, Any]) -> str:
+    """Per-window breakdowns and week-over-week deltas for the weekly review"""
+    lines = []
+    for name in ('performance_24h', 'performance_7day', 'performance_30day'):
+        block = report.get(name)
+        if not block:
+            continue
+        lines.append(f"\n{name}: {block['tasks_completed']} tasks, "
+                     f"avg {block['average_score']:.2f}, success {block['success_rate']:.1%}, "
+                     f"{block['token_spend']} tokens, best strategy {block['best_strategy']}")
+        for dim in ('by_llm', 'by_strategy', 'by_subnet'):
+            for group, stats in sorted(block[dim].items()):
+                lines.append(f"  {dim[3:]:<8} {group:<24} {stats['tasks']:>6} tasks  "
+                             f"avg {stats['avg_score']:.2f}  success {stats['success_rate']:.1%}")
+
+    deltas = report.get('week_over_week')
+    if deltas:
+        lines.append("\nWeek over week:")
+        for metric, delta in deltas.items():
+            pct = 'n/a' if delta['change_pct'] is None else f"{delta['change_pct']:+.1f}%"
+            lines.append(f"  {metric:<18} {delta['previous']:.4g} -> {delta['current']:.4g} ({pct})")
+    return '\n'.join(lines)
+
 
 def main():
-    """Test performance tracker"""
+    """Analyze performance, or record test results when run without options"""
+    parser = argparse.ArgumentParser(description='Bittensor miner performance tracker')
+    parser.add_argument('--analyze', action='store_true',
+                        help='Update performance-metrics.json and print a report')
+    parser.add_argument('--days', type=int, default=7, help='Report window in days')
+    parser.add_argument('--detailed', action='store_true',
+                        help='Include per-window breakdowns and week-over-week deltas')
+    parser.add_argument('--experiments', action='store_true',
+                        help='Include A/B test confidence intervals and win probabilities')
+    parser.add_argument('--promote', action='store_true',
+                        help='With --experiments: shift traffic towards significant winners')
+    args = parser.parse_args()
+
     tracker = PerformanceTracker()
 
+    if args.analyze:
+        report = tracker.update_metrics()
+        experiments = tracker.analyze_experiments(args.promote) if args.experiments else None
+        print(tracker.generate_report(days=args.days, experiments=experiments))
+        if args.detailed:
+            print(format_detailed(report))
+        return
+
     # Record some test results
     for i in range(5):
         tracker.record_task_result(
@@ -264,11 +390,10 @@ def main():
         )
 
     # Analyze
-    metrics = tracker.analyze_performance(days=1)
     print(tracker.generate_report(days=1))
 
-    # Save
-    tracker.save_metrics(metrics)
+    # Save (multi-window layout read by check-status.sh)
+    tracker.update_metrics()
 
 
 if __name__ == "__main__":
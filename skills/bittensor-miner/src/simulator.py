@@ -0,0 +1,684 @@
+#!/usr/bin/env python3
+"""
+Miner Simulator
+Runs the daemon's scheduler, router, budget and earnings pipeline on a
+virtual clock against synthetic validator traffic, modeled LLM providers
+and a local chain paying emissions, for offline policy evaluation.
+"""
+
+import argparse
+import copy
+import heapq
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import signal
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+from utils.virtual_clock import VirtualClock
+from miner_daemon import MinerDaemon
+from task_handler import TaskHandler
+
+logger = logging.getLogger(__name__)
+
+SKILL_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_SCENARIO = SKILL_DIR / "config" / "simulation.json"
+CONFIG_FILES = ('miner-config.json', 'subnet-profiles.json', 'token-budgets.json')
+
+# Settings every simulation runs with, whatever the scenario says: no
+# network, no wallet process, and no background thread acting on its own
+# schedule (writers and ledgers are flushed from the simulating thread)
+SIMULATION_CONFIG = {
+    'miner-config.json': {
+        'bittensor': {
+            'chain_pool': {'endpoints': []},
+            # Equal intervals make every metagraph refresh an inline sync;
+            # no snapshot, since a simulated miner never restarts
+            'metagraph': {'refresh_interval_seconds': 360, 'max_stale_seconds': 360,
+                          'snapshot_file': None},
+        },
+        'wallet_mcp': {'enabled': False, 'cache_file': None},
+        'performance_tracking': {
+            'history_writer': {'batch_size': 10 ** 9, 'linger_ms': 365 * 86400 * 1000,
+                               'max_queue': 10 ** 6, 'fsync': 'never'},
+        },
+        'daemon': {'axon': {'signatures': {'enabled': False}}},
+    },
+    'token-budgets.json': {
+        'ledger': {'commit_batch_size': 10 ** 9, 'commit_interval_seconds': 3600,
+                   'compact_every': 10 ** 5},
+    },
+}
+
+
+def deep_merge(base: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of base with overrides merged in (nested dicts merged, the rest replaced)"""
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def write_configs(workdir: Path, *overrides: Dict[str, Any], config_dir: Optional[Path] = None) -> None:
+    """
+    Copy the miner's configs into workdir/config with overrides merged in
+    (in order), and create workdir/state.
+
+    Args:
+        workdir: Run directory (the process chdirs here to run the miner)
+        *overrides: {config file name: partial config} mappings
+        config_dir: Configs to start from (default: the skill's config/)
+    """
+    config_dir = Path(config_dir or SKILL_DIR / 'config')
+    (workdir / 'config').mkdir(parents=True, exist_ok=True)
+    (workdir / 'state').mkdir(exist_ok=True)
+    for name in CONFIG_FILES:
+        with open(config_dir / name, 'r') as f:
+            config = json.load(f)
+        for override in overrides:
+            config = deep_merge(config, override.get(name, {}))
+        if name == 'miner-config.json':
+            # Absolute, so the process-wide history writer is this run's own
+            config['performance_tracking']['history_dir'] = str(workdir / 'state' / 'history')
+        with open(workdir / 'config' / name, 'w') as f:
+            json.dump(config, f, indent=2)
+
+
+def parse_override(text: str) -> Dict[str, Any]:
+    """
+    Turn 'file:dotted.path=value' into an overrides entry.
+
+    'subnet-profiles:subnets.1.participation_rate=0.9' becomes
+    {'subnet-profiles.json': {'subnets': {'1': {'participation_rate': 0.9}}}}.
+    The value is parsed as JSON when it is JSON, else kept as a string.
+    """
+    target, _, value = text.partition('=')
+    file_name, _, path = target.partition(':')
+    if not path or not _:
+        raise ValueError(f"Expected file:dotted.path=value, got '{text}'")
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        parsed = value
+    for key in reversed(path.split('.')):
+        parsed = {key: parsed}
+    if not file_name.endswith('.json'):
+        file_name += '.json'
+    return {file_name: parsed}
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    """Poisson sample (normal approximation for large means)"""
+    if lam <= 0:
+        return 0
+    if lam > 50:
+        return max(0, int(round(rng.gauss(lam, math.sqrt(lam)))))
+    threshold, count, product = math.exp(-lam), 0, rng.random()
+    while product > threshold:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class ProviderModel:
+    """
+    Latency, failure, output length and quality of one LLM endpoint.
+
+    Latency and output length are lognormal around their medians. The
+    validator's score of a response is drawn around score_mean; a
+    response cut off by max_tokens scores truncation_penalty of that.
+    """
+
+    def __init__(self, latency_ms: float = 2000.0, latency_sigma: float = 0.4,
+                 error_rate: float = 0.0, score_mean: float = 0.6, score_sd: float = 0.15,
+                 output_tokens: int = 300, output_tokens_sigma: float = 0.5,
+                 truncation_penalty: float = 0.6):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.score_mean = score_mean
+        self.score_sd = score_sd
+        self.output_tokens = output_tokens
+        self.output_tokens_sigma = output_tokens_sigma
+        self.truncation_penalty = truncation_penalty
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'ProviderModel':
+        """Create from one entry of the scenario's 'providers' section"""
+        return cls(**config)
+
+    def sample(self, rng: random.Random, max_tokens: int) -> Tuple[float, Optional[int], float]:
+        """
+        One call.
+
+        Returns:
+            (latency seconds, output tokens or None on error, validator score)
+        """
+        latency = self.latency_ms / 1000 * math.exp(rng.gauss(0.0, self.latency_sigma))
+        if rng.random() < self.error_rate:
+            return latency, None, 0.0
+        wanted = max(1, int(self.output_tokens * math.exp(rng.gauss(0.0, self.output_tokens_sigma))))
+        score = min(1.0, max(0.0, rng.gauss(self.score_mean, self.score_sd)))
+        if wanted > max_tokens:
+            return latency * max_tokens / wanted, max_tokens, score * self.truncation_penalty
+        return latency, wanted, score
+
+
+class SimulatedDraftScorer:
+    """Stands in for DraftScorer: the validator score plus the local scorer's error"""
+
+    def __init__(self, estimates: Dict[str, float]):
+        self.estimates = estimates
+
+    def score(self, response: str, task_content: str = '', strategy: Optional[str] = None) -> float:
+        return self.estimates.pop(response, 0.0)
+
+
+class SimTaskHandler(TaskHandler):
+    """
+    The real task pipeline with modeled providers behind execute_inference.
+
+    Each call advances the virtual clock by the provider's latency, so
+    deadlines and escalation decisions see the time the cascade took.
+    should_respond is the real participation policy (participation_rate
+    scaled by budget pace), the knob the simulation exists to tune;
+    skipped tasks are only marked so the run can count them.
+    """
+
+    def __init__(self, config_path: str, providers: Dict[str, ProviderModel],
+                 clock: VirtualClock, rng: random.Random, draft_noise: float = 0.1):
+        super().__init__(config_path)
+        self.providers = providers
+        self.default_provider = ProviderModel()
+        self.clock = clock
+        self.rng = rng
+        self.draft_noise = draft_noise
+        self.estimates: Dict[str, float] = {}
+        self.draft_scorer = SimulatedDraftScorer(self.estimates)
+        self.calls: Dict[str, Dict[str, Any]] = {}
+
+    def should_respond(self, task: Dict[str, Any]) -> bool:
+        respond = super().should_respond(task)
+        task['sim_skipped'] = not respond
+        return respond
+
+    def execute_inference(self, task: Dict[str, Any],
+                          llm_config: Optional[Dict] = None) -> Optional[str]:
+        model = (llm_config or {}).get('model', 'default')
+        provider = self.providers.get(model, self.default_provider)
+        latency, output_tokens, score = provider.sample(self.rng, (llm_config or {}).get('max_tokens', 1000))
+        self.clock.advance(latency)
+
+        calls = self.calls.setdefault(model, {'calls': 0, 'errors': 0, 'latency_seconds': 0.0})
+        calls['calls'] += 1
+        calls['latency_seconds'] += latency
+        if output_tokens is None:
+            calls['errors'] += 1
+            return None
+
+        prefix = f"[{model} {task.get('id')} {calls['calls']}] "
+        response = prefix + 'x' * max(0, output_tokens * 4 - len(prefix))
+        task.setdefault('sim_scores', {})[response] = score
+        self.estimates[response] = min(1.0, max(0.0, score + self.rng.gauss(0.0, self.draft_noise)))
+        return response
+
+
+class SimulatedDaemon(MinerDaemon):
+    """MinerDaemon whose pipeline and result callback belong to a Simulator"""
+
+    def __init__(self, simulator: 'Simulator', config_path: str = "config/miner-config.json"):
+        self.simulator = simulator
+        super().__init__(config_path)
+
+    def _create_task_handler(self) -> TaskHandler:
+        sim = self.simulator
+        return SimTaskHandler(str(self.config_path), sim.providers, sim.clock, sim.rng,
+                              sim.scenario.get('draft_noise', 0.1))
+
+    def _submit_result(self, task: Dict[str, Any], result: Optional[Dict[str, Any]]) -> None:
+        self.simulator.record(task, result)
+
+
+class Simulator:
+    """
+    One deterministic run of a scenario.
+
+    The scenario's configs are copied into a work directory (with its
+    overrides applied) and a SimulatedDaemon is initialized there: the
+    real bulkheads, stake-weighted queues, router, cascade, budget
+    manager, ledgers and earnings ledger, over a local chain. Validator
+    requests arrive per subnet as a Poisson process with a daily cycle.
+    A discrete-event loop hands them to the bulkheads and runs each
+    dequeued task to completion at its start time; the providers'
+    latency moves the clock inside the task, and its worker stays busy
+    until then. Tasks overlapping in simulated time run one after
+    another, so clock readings may step back by up to one task's length.
+
+    Each tempo, every subnet pays our hotkey tao_per_day for the tempo
+    scaled by the mean validator score over all requests offered (late
+    and unanswered ones score 0). Everything random comes from the seed,
+    so a scenario and seed always give the same report.
+    """
+
+    def __init__(self, scenario: Dict[str, Any], seed: Optional[int] = None,
+                 days: Optional[float] = None, workdir: Optional[str] = None,
+                 config_dir: Optional[str] = None):
+        """
+        Args:
+            scenario: Parsed scenario (see config/simulation.json)
+            seed: Random seed (None = the scenario's)
+            days: Simulated days (None = the scenario's)
+            workdir: Directory for configs and state (None = a new temp dir)
+            config_dir: Configs to start from (default: the skill's config/)
+        """
+        self.scenario = scenario
+        self.seed = scenario.get('seed', 0) if seed is None else seed
+        self.days = float(scenario.get('days', 30) if days is None else days)
+        self.workdir = Path(workdir or tempfile.mkdtemp(prefix='miner-sim-')).resolve()
+        self.config_dir = Path(config_dir or SKILL_DIR / 'config')
+
+        start = datetime.fromisoformat(scenario.get('start', '2026-01-01T00:00:00'))
+        self.start = start.replace(tzinfo=timezone.utc).timestamp()
+        self.clock = VirtualClock(self.start)
+        self.rng = random.Random(self.seed)
+        self.providers = {model: ProviderModel.from_config(config)
+                          for model, config in scenario.get('providers', {}).items()}
+
+        self.daemon: Optional[SimulatedDaemon] = None
+        self.subnets: Dict[int, Dict[str, Any]] = {}
+        self.daily: Dict[str, Dict[str, Any]] = {}
+        self._events: List[tuple] = []
+        self._seq = 0
+
+    def prepare(self) -> None:
+        """Write the scenario's configs (base + overrides + simulation settings) to the workdir"""
+        write_configs(self.workdir, self.scenario.get('overrides', {}), SIMULATION_CONFIG,
+                      config_dir=self.config_dir)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run the scenario.
+
+        Returns:
+            The report (see report())
+        """
+        self.prepare()
+        cwd = os.getcwd()
+        global_random = random.getstate()
+        handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)}
+        random.seed(self.seed)  # LLMRouter.should_respond draws from the global generator
+        logging.disable(logging.WARNING)  # Per-task chatter; the report has the outcomes
+        os.chdir(self.workdir)
+        try:
+            with self.clock.install():
+                self.daemon = SimulatedDaemon(self)
+                if not self.daemon.initialize():
+                    raise RuntimeError("Simulated daemon failed to initialize")
+                self._setup_traffic()
+                self._loop(self.start + self.days * 86400)
+                report = self.report()
+                self._close()
+            return report
+        finally:
+            os.chdir(cwd)
+            logging.disable(logging.NOTSET)
+            random.setstate(global_random)
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    # Traffic and chain ----------------------------------------------------
+
+    def _setup_traffic(self) -> None:
+        """Per-subnet traffic state, validator stakes and the first events"""
+        traffic = self.scenario.get('traffic', {})
+        backend = self.daemon.clients[0].backend
+        for client in self.daemon.clients:
+            subnet_id = client.subnet_id
+            if subnet_id in self.subnets:
+                self.subnets[subnet_id]['clients'].append(client)
+                continue
+            config = traffic.get(str(subnet_id), {})
+            validators = sorted(client.metagraph.validators)[:config.get('validators', 64)]
+            for hotkey in validators:
+                stake = 1000.0 * math.exp(self.rng.gauss(0.0, config.get('stake_sigma', 1.0)))
+                backend.set_stake(subnet_id, hotkey, round(stake, 3))
+            self.subnets[subnet_id] = {
+                'config': config,
+                'clients': [client],
+                'validators': validators,
+                'bulkhead': self.daemon.bulkheads.bulkheads[subnet_id],
+                'free_workers': self.daemon.bulkheads.bulkheads[subnet_id].max_concurrent,
+                'tempo_seconds': client.metagraph.tempo * 12.0,
+                'tempo_offered': 0,
+                'tempo_score': 0.0,
+                'stats': {'offered': 0, 'answered': 0, 'late': 0, 'skipped': 0, 'failed': 0,
+                          'evicted': 0, 'score_sum': 0.0, 'tokens': 0, 'tao_paid': 0.0,
+                          'accepted_stage': {}, 'accepted_model': {}},
+                'latencies': [],
+                'next_id': 0,
+            }
+            self._push(self.start + self.subnets[subnet_id]['tempo_seconds'], 'tempo', subnet_id)
+        self._push(self.start, 'hour', None)
+
+    def _push(self, ts: float, kind: str, subnet_id: Optional[int], payload: Any = None) -> None:
+        self._seq += 1
+        heapq.heappush(self._events, (ts, self._seq, kind, subnet_id, payload))
+
+    def _arrivals(self, hour_start: float) -> None:
+        """Draw the next hour's requests for every subnet"""
+        hour = datetime.utcfromtimestamp(hour_start).hour
+        for subnet_id, subnet in self.subnets.items():
+            config = subnet['config']
+            phase = 2 * math.pi * (hour - config.get('peak_hour_utc', 15) + 6) / 24
+            rate = config.get('tasks_per_hour', 60) * (1 + config.get('diurnal_amplitude', 0.0) * math.sin(phase))
+            for ts in sorted(hour_start + self.rng.random() * 3600 for _ in range(_poisson(self.rng, rate))):
+                self._push(ts, 'arrival', subnet_id, self._make_task(subnet_id, ts))
+
+    def _make_task(self, subnet_id: int, ts: float) -> Dict[str, Any]:
+        subnet = self.subnets[subnet_id]
+        config = subnet['config']
+        low, high = config.get('prompt_tokens', [50, 400])
+        prompt_tokens = self.rng.randint(low, high)
+        subnet['next_id'] += 1
+        return {
+            'id': f"sim-{subnet_id}-{subnet['next_id']}",
+            'caller': self.rng.choice(subnet['validators']),
+            'synapse': 'TextSynapse',
+            'body': json.dumps({'content': ('lorem ipsum ' * (prompt_tokens // 3 + 1))[:prompt_tokens * 4]}).encode(),
+            'received_at': ts,
+            'deadline': ts + config.get('timeout_seconds', 24),
+        }
+
+    def _pay_tempo(self, subnet_id: int, now: float) -> None:
+        """Emission for the tempo just ended, by mean score over requests offered"""
+        subnet = self.subnets[subnet_id]
+        tao_per_day = subnet['config'].get('tao_per_day', 0.0)
+        if subnet['tempo_offered'] and tao_per_day:
+            quality = subnet['tempo_score'] / subnet['tempo_offered']
+            amount = tao_per_day * subnet['tempo_seconds'] / 86400 * quality
+            if amount > 0:
+                hotkey = subnet['clients'][0].hotkey
+                subnet['clients'][0].backend.credit(hotkey, amount, netuid=subnet_id, ts=now)
+                subnet['stats']['tao_paid'] += amount
+        subnet['tempo_offered'] = 0
+        subnet['tempo_score'] = 0.0
+
+    # Event loop -----------------------------------------------------------
+
+    def _loop(self, end: float) -> None:
+        handler = self.daemon.task_handler
+        while self._events and self._events[0][0] < end:
+            ts, _, kind, subnet_id, payload = heapq.heappop(self._events)
+            self.clock.set(ts)
+            if kind == 'arrival':
+                subnet = self.subnets[subnet_id]
+                subnet['stats']['offered'] += 1
+                subnet['tempo_offered'] += 1
+                self._day()['offered'] += 1
+                client = subnet['clients'][subnet['stats']['offered'] % len(subnet['clients'])]
+                self.daemon._accept(client, payload)
+                self._dispatch(subnet_id, ts)
+            elif kind == 'done':
+                self.subnets[subnet_id]['free_workers'] += 1
+                self._dispatch(subnet_id, ts)
+            elif kind == 'tempo':
+                self._pay_tempo(subnet_id, ts)
+                self._push(ts + self.subnets[subnet_id]['tempo_seconds'], 'tempo', subnet_id)
+            elif kind == 'hour':
+                handler.history_writer.flush()
+                self.daemon.sync_earnings()
+                if int(ts - self.start) % 86400 == 0:
+                    self._day()['pace'] = {model: round(handler.budget_manager.get_pace(model), 3)
+                                           for model in sorted(handler.budget_manager.budgets)}
+                self._arrivals(ts)
+                self._push(ts + 3600, 'hour', None)
+
+        self.clock.set(end)
+        handler.history_writer.flush()
+        self.daemon.sync_earnings(force=True)
+
+    def _dispatch(self, subnet_id: int, now: float) -> None:
+        """Start waiting tasks on free workers; each runs to completion from now"""
+        subnet = self.subnets[subnet_id]
+        while subnet['free_workers'] > 0:
+            task = subnet['bulkhead'].poll()
+            if task is None:
+                return
+            subnet['bulkhead'].run(task)
+            finished = self.clock.time()
+            self.clock.set(now)
+            if finished > now:
+                subnet['free_workers'] -= 1
+                self._push(finished, 'done', subnet_id)
+
+    def record(self, task: Dict[str, Any], result: Optional[Dict[str, Any]]) -> None:
+        """Outcome of one request (called by the bulkhead as the task finishes)"""
+        subnet = self.subnets[task['subnet_id']]
+        stats = subnet['stats']
+        if result is None:
+            if task.get('reject_status') == 503:
+                stats['evicted'] += 1
+            else:
+                stats['skipped' if task.get('sim_skipped') else 'failed'] += 1
+            return
+
+        finished = self.clock.time()
+        latency = finished - task['received_at']
+        late = finished > task['deadline']
+        score = 0.0 if late else task['sim_scores'].get(result['response'], 0.0)
+        stats['answered'] += 1
+        stats['late'] += late
+        stats['score_sum'] += score
+        stats['tokens'] += result['tokens']
+        stage = str(result['cascade']['accepted_stage'])
+        stats['accepted_stage'][stage] = stats['accepted_stage'].get(stage, 0) + 1
+        stats['accepted_model'][result['llm']] = stats['accepted_model'].get(result['llm'], 0) + 1
+        subnet['tempo_score'] += score
+        subnet['latencies'].append(latency)
+
+        day = self._day()
+        day['answered'] += 1
+        day['score_sum'] += score
+        day['tokens'] += result['tokens']
+
+    def _day(self) -> Dict[str, Any]:
+        label = datetime.utcfromtimestamp(self.clock.time()).strftime('%Y-%m-%d')
+        day = self.daily.get(label)
+        if day is None:
+            day = self.daily[label] = {'offered': 0, 'answered': 0, 'score_sum': 0.0, 'tokens': 0}
+        return day
+
+    def _close(self) -> None:
+        handler = self.daemon.task_handler
+        self.daemon.shutdown()
+        handler.history_writer.close()
+        handler.budget_manager.close()
+
+    # Report ---------------------------------------------------------------
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Deterministic summary of the run (no wall-clock values).
+
+        Returns:
+            Dict with per-subnet traffic, scores, latency, tokens and TAO;
+            per-model calls, spend and pace; totals; cascade stats; daily rows
+        """
+        handler = self.daemon.task_handler
+        budget = handler.budget_manager
+        now = self.clock.time()
+        span_days = math.ceil(self.days) + 1
+        earnings = self.daemon.earnings
+        earned = earnings.totals(span_days, 0, self.clock.utcnow())['by_subnet'] if earnings else {}
+
+        subnets = {}
+        for subnet_id, subnet in sorted(self.subnets.items()):
+            stats = subnet['stats']
+            latencies = sorted(subnet['latencies'])
+            tao = earned.get(str(subnet_id), 0.0)
+            subnets[str(subnet_id)] = {
+                'offered': stats['offered'],
+                'answered': stats['answered'],
+                'answer_rate': _round(stats['answered'] / stats['offered']) if stats['offered'] else None,
+                'late': stats['late'],
+                'skipped': stats['skipped'],
+                'failed': stats['failed'],
+                'evicted': stats['evicted'],
+                'queue': {key: subnet['bulkhead'].stats[key] for key in ('rejected', 'expired')},
+                'avg_score': _round(stats['score_sum'] / stats['answered']) if stats['answered'] else None,
+                'score_per_offered': _round(stats['score_sum'] / stats['offered']) if stats['offered'] else None,
+                'latency_seconds': {f"p{int(q * 100)}": _round(_percentile(latencies, q))
+                                    for q in (0.5, 0.95, 0.99)},
+                'tokens': stats['tokens'],
+                'tao_earned': _round(tao, 6),
+                'tao_per_1k_tokens': _round(tao / (stats['tokens'] / 1000), 6) if stats['tokens'] else None,
+                'accepted_stage': dict(sorted(stats['accepted_stage'].items())),
+                'accepted_model': dict(sorted(stats['accepted_model'].items())),
+            }
+
+        models = {}
+        for model, info in sorted(budget.budgets.items()):
+            tokens = sum(budget.windows.daily_totals(span_days, now, model=model).values())
+            calls = handler.calls.get(model, {'calls': 0, 'errors': 0, 'latency_seconds': 0.0})
+            models[model] = {
+                'calls': calls['calls'],
+                'errors': calls['errors'],
+                'mean_latency_seconds': _round(calls['latency_seconds'] / calls['calls']) if calls['calls'] else None,
+                'tokens': tokens,
+                'cost_usd': _round(tokens / 1000 * info.get('cost_per_1k_tokens', 0.0), 2),
+                'used_this_month': info.get('used_this_month', 0),
+                'final_pace': _round(budget.get_pace(model)),
+            }
+
+        total_tokens = sum(subnet['tokens'] for subnet in subnets.values())
+        total_tao = sum(subnet['tao_earned'] for subnet in subnets.values())
+        tao_by_day = {row['day']: row['tao_earned'] for row in earnings.daily(span_days, now=self.clock.utcnow())} \
+            if earnings else {}
+        return {
+            'scenario': self.scenario.get('name', 'unnamed'),
+            'seed': self.seed,
+            'days': self.days,
+            'start': datetime.utcfromtimestamp(self.start).isoformat(),
+            'overrides': self.scenario.get('overrides', {}),
+            'totals': {
+                'offered': sum(subnet['offered'] for subnet in subnets.values()),
+                'answered': sum(subnet['answered'] for subnet in subnets.values()),
+                'tokens': total_tokens,
+                'cost_usd': _round(sum(model['cost_usd'] for model in models.values()), 2),
+                'tao_earned': _round(total_tao, 6),
+                'tao_per_1k_tokens': _round(total_tao / (total_tokens / 1000), 6) if total_tokens else None,
+                'wallet_earnings': _round(self.daemon.wallet.get_earnings(span_days), 6),
+            },
+            'subnets': subnets,
+            'models': models,
+            'cascade': handler.llm_router.get_cascade_stats(),
+            'daily': [
+                {'day': label, 'offered': day['offered'], 'answered': day['answered'],
+                 'avg_score': _round(day['score_sum'] / day['answered']) if day['answered'] else None,
+                 'tokens': day['tokens'], 'tao_earned': _round(tao_by_day.get(label, 0.0), 6),
+                 'pace': day.get('pace')}
+                for label, day in sorted(self.daily.items())
+            ],
+        }
+
+
+def _round(value: Optional[float], digits: int = 4) -> Optional[float]:
+    return round(value, digits) if value is not None else None
+
+
+def compare(baseline: Dict[str, Any], variant: Dict[str, Any]) -> Dict[str, Any]:
+    """Totals and per-subnet headline metrics of two reports side by side"""
+    def row(before: Dict[str, Any], after: Dict[str, Any], keys: Tuple[str, ...]) -> Dict[str, Any]:
+        rows = {}
+        for key in keys:
+            a, b = before.get(key), after.get(key)
+            delta = _round(b - a, 6) if isinstance(a, (int, float)) and isinstance(b, (int, float)) else None
+            rows[key] = {'baseline': a, 'variant': b, 'delta': delta}
+        return rows
+
+    comparison = {'totals': row(baseline['totals'], variant['totals'],
+                                ('answered', 'tokens', 'cost_usd', 'tao_earned', 'tao_per_1k_tokens'))}
+    for subnet_id in sorted(set(baseline['subnets']) | set(variant['subnets'])):
+        comparison[f"subnet {subnet_id}"] = row(
+            baseline['subnets'].get(subnet_id, {}), variant['subnets'].get(subnet_id, {}),
+            ('answer_rate', 'avg_score', 'score_per_offered', 'tokens', 'tao_earned', 'tao_per_1k_tokens')
+        )
+    return comparison
+
+
+def load_scenario(path: str, overrides: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Read a scenario file and merge --set overrides into its 'overrides'"""
+    with open(path, 'r') as f:
+        scenario = json.load(f)
+    for text in overrides or []:
+        scenario['overrides'] = deep_merge(scenario.get('overrides', {}), parse_override(text))
+    return scenario
+
+
+def _write_report(report: Dict[str, Any], output: Optional[str]) -> Path:
+    path = Path(output) if output else (
+        SKILL_DIR / 'state' / 'simulations' / f"{report['scenario']}-seed{report['seed']}.json")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    return path
+
+
+def main():
+    """Simulate the miner on a virtual clock and report"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--scenario', default=str(DEFAULT_SCENARIO))
+    parser.add_argument('--days', type=float, help='Simulated days (default: the scenario\'s)')
+    parser.add_argument('--seed', type=int, help='Random seed (default: the scenario\'s)')
+    parser.add_argument('--set', action='append', default=[], metavar='FILE:PATH=VALUE',
+                        help="Config override, e.g. subnet-profiles:subnets.1.participation_rate=0.9")
+    parser.add_argument('--compare', action='store_true',
+                        help='Also run the scenario without --set overrides and print the differences')
+    parser.add_argument('--workdir', help='Keep configs and state here (default: a temp dir, removed)')
+    parser.add_argument('--output', help='Report path (default: state/simulations/<scenario>-seed<N>.json)')
+    args = parser.parse_args()
+
+    runs = [('variant' if args.compare else 'run', load_scenario(args.scenario, args.set))]
+    if args.compare:
+        runs.insert(0, ('baseline', load_scenario(args.scenario)))
+
+    reports = {}
+    for label, scenario in runs:
+        if args.compare and label == 'variant':
+            scenario['name'] = f"{scenario.get('name', 'unnamed')}-variant"
+        workdir = os.path.join(args.workdir, label) if args.workdir else None
+        simulator = Simulator(scenario, seed=args.seed, days=args.days, workdir=workdir)
+        started = time.perf_counter()
+        reports[label] = simulator.run()
+        elapsed = time.perf_counter() - started
+        if not args.workdir:
+            shutil.rmtree(simulator.workdir, ignore_errors=True)
+        path = _write_report(reports[label], args.output if not args.compare else None)
+        totals = reports[label]['totals']
+        print(f"{label}: {simulator.days:g} days simulated in {elapsed:.1f}s -> {path}")
+        print(f"  answered {totals['answered']}/{totals['offered']}, tokens {totals['tokens']}, "
+              f"cost ${totals['cost_usd']}, TAO {totals['tao_earned']} "
+              f"({totals['tao_per_1k_tokens']} per 1K tokens)")
+
+    if args.compare:
+        print(json.dumps(compare(reports['baseline'], reports['variant']), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,15 @@ Phase 1: Stub that logs tasks and returns echo responses.
 import json
 import logging
 import sys
+import time
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
-from utils.prompt_templates import PromptTemplateManager
+from utils.prompt_templates import PromptTemplateManager, estimate_tokens
 from utils.token_budget import TokenBudgetManager
+from utils.draft_scorer import DraftScorer
+from utils.history_writer import HistoryWriter
+from utils.output_lengths import OutputLengthModel
 from llm_router import LLMRouter
 
 # Setup logging
@@ -40,12 +44,20 @@ class TaskHandler:
     def __init__(self, config_path: str = "config/miner-config.json"):
         self.config_path = Path(config_path)
         self.config = self._load_config()
-        self.task_history_file = Path("state/task-history.jsonl")
+        tracking_config = self.config.get('performance_tracking', {})
+        self.history_writer = HistoryWriter.shared(tracking_config)
+        self.history_store = self.history_writer.store
+
+        # Learned max_tokens caps, kept current from the history writer
+        self.output_lengths = OutputLengthModel.from_config(tracking_config, self.history_store)
+        self.output_lengths.refresh()
+        self.history_writer.add_listener(self.output_lengths.note_append)
 
         # Initialize components
         self.llm_router = LLMRouter()
         self.prompt_manager = PromptTemplateManager()
         self.budget_manager = TokenBudgetManager()
+        self.draft_scorer = DraftScorer()
 
         logger.info("TaskHandler initialized")
 
@@ -84,7 +96,9 @@ class TaskHandler:
     def should_respond(self, task: Dict[str, Any]) -> bool:
         """
         Decide whether to respond to a task.
-        Phase 1: Always respond to test.
+        Applies the router's policy (confidence threshold, participation
+        rate) with the budget utilization and pace of the model this
+        subnet's cascade starts with.
 
         Args:
             task: Task data including classification
@@ -92,8 +106,18 @@ class TaskHandler:
         Returns:
             True if should respond, False if should skip
         """
-        # Phase 1: Accept all tasks for testing
-        return True
+        subnet_id = task.get('subnet_id', self.config.get('bittensor', {}).get('subnet_id', 1))
+        classification = task.get('classification', {})
+        model = self.llm_router.select_cascade(
+            task_type=classification.get('task_type', 'generation'),
+            reasoning_depth=classification.get('reasoning_depth', 'medium'),
+            subnet_id=subnet_id
+        )[0]['model']
+        return self.llm_router.should_respond(
+            task, subnet_id,
+            self.budget_manager.get_budget_utilization_percent(model),
+            pace=self.budget_manager.get_pace(model)
+        )
 
     def execute_inference(self, task: Dict[str, Any],
                           llm_config: Optional[Dict] = None) -> Optional[str]:
@@ -121,6 +145,155 @@ class TaskHandler:
             logger.error(f"Inference failed: {e}")
             return None
 
+    def execute_cascade(self, task: Dict[str, Any],
+                        classification: Dict[str, Any],
+                        subnet_id: int = 1) -> Tuple[Optional[str], Dict[str, Any], Dict[str, Any]]:
+        """
+        Execute inference through the model cascade.
+        Tries the cheapest model first, scores the draft locally and only
+        escalates when the score misses the subnet threshold and the
+        deadline leaves room for another call.
+
+        Tasks in a strategy A/B test use their assigned strategy; tasks in
+        a model A/B test run only their assigned model, so the score is
+        attributable to it. max_tokens starts from the learned output-length
+        cap for the subnet, task type and strategy.
+
+        Args:
+            task: Task data
+            classification: Task classification
+            subnet_id: Target subnet
+
+        Returns:
+            Tuple of (response or None, accepted LLM config, cascade info)
+        """
+        task_type = classification['task_type']
+        task_id = str(task.get('id', 'unknown'))
+        experiments = {}
+
+        llm_variant = self.llm_router.experiments.assign(task_id, subnet_id, task_type, 'llm')
+        if llm_variant:
+            experiments[llm_variant[0]] = llm_variant[1]
+            stages = [self.llm_router.config_for_model(llm_variant[1], subnet_id)]
+        else:
+            stages = self.llm_router.select_cascade(
+                task_type=task_type,
+                reasoning_depth=classification['reasoning_depth'],
+                subnet_id=subnet_id
+            )
+
+        strategy_variant = self.llm_router.experiments.assign(task_id, subnet_id, task_type, 'strategy')
+        if strategy_variant:
+            experiments[strategy_variant[0]] = strategy_variant[1]
+            strategy = strategy_variant[1]
+        else:
+            strategy = self.llm_router.get_best_strategy(task_type, subnet_id)
+        for llm_config in stages:
+            llm_config['max_tokens'] = self.output_lengths.cap(
+                subnet_id, task_type, strategy, llm_config['max_tokens']
+            )
+            # Pacing and budget may cut max_tokens further below; truncation
+            # is judged against the learned cap alone
+            llm_config['learned_max_tokens'] = llm_config['max_tokens']
+        deadline = self._get_deadline(task)
+
+        input_budget = self.prompt_manager.get_input_budget(strategy, stages[0]['max_input_tokens'])
+
+        best = None  # (score, response, llm_config, stage)
+        draft_scores = []  # Indexed by stage; None where a stage was skipped
+        stages_run = 0
+        last_stage = 0
+        tokens_spent = 0
+        for stage, llm_config in enumerate(stages):
+            last_stage = stage
+            remaining = self.budget_manager.get_remaining_budget(llm_config['model'])
+            llm_config['max_tokens'] = self.llm_router.allocate_tokens(
+                task, llm_config, remaining,
+                pace=self.budget_manager.get_pace(llm_config['model'])
+            )
+            if llm_config['max_tokens'] <= 0:
+                logger.debug(f"No budget left for {llm_config['model']}, skipping cascade stage {stage}")
+                draft_scores.append(None)
+                continue
+
+            # Fit the prompt to what this model's budget leaves after the output
+            task['prompt'] = self.prompt_manager.compile_prompt(
+                strategy, task.get('content', ''), input_budget,
+                remaining_budget=remaining, max_output_tokens=llm_config['max_tokens']
+            )
+            prompt_tokens = estimate_tokens(task['prompt'])
+            if prompt_tokens + llm_config['max_tokens'] > remaining:
+                logger.debug(f"No room for the prompt on {llm_config['model']}, skipping cascade stage {stage}")
+                draft_scores.append(None)
+                continue
+
+            # Reserve the worst case up front so concurrent workers can't overspend
+            reservation_id = self.budget_manager.reserve_tokens(
+                llm_config['model'], prompt_tokens + llm_config['max_tokens']
+            )
+            if reservation_id is None:
+                draft_scores.append(None)
+                continue
+
+            stages_run += 1
+            response = None
+            try:
+                response = self.execute_inference(task, llm_config)
+            finally:
+                if response:
+                    stage_tokens = prompt_tokens + estimate_tokens(response)
+                    tokens_spent += stage_tokens
+                    self.budget_manager.commit_reservation(
+                        reservation_id, llm_config['model'], stage_tokens,
+                        subnet_id=subnet_id, task_type=classification['task_type']
+                    )
+                else:
+                    self.budget_manager.release_reservation(reservation_id)
+
+            score = 0.0
+            if response:
+                score = self.draft_scorer.score(response, task.get('content', ''), strategy)
+                if best is None or score >= best[0]:
+                    best = (score, response, llm_config, stage)
+            draft_scores.append(round(score, 3))
+            logger.debug(f"Cascade stage {stage} ({llm_config['model']}): score {score:.2f}")
+
+            if stage == len(stages) - 1:
+                break
+            if not self.llm_router.should_escalate(score, subnet_id, deadline - time.time()):
+                break
+
+        output_tokens = estimate_tokens(best[1]) if best else None
+        at_limit = bool(best) and output_tokens >= best[2]['max_tokens']
+        cascade_info = {
+            'stages_run': stages_run,
+            'draft_scores': draft_scores,
+            'accepted_stage': best[3] if best else None,
+            'strategy': strategy,
+            'tokens': tokens_spent,
+            'output_tokens': output_tokens,
+            'truncated': bool(best) and output_tokens >= best[2]['learned_max_tokens'],
+            # Stopped by a pacing/budget limit under the learned cap: the
+            # length says nothing about the real need
+            'clipped': at_limit and best[2]['max_tokens'] < best[2]['learned_max_tokens'],
+            'experiments': experiments,
+        }
+
+        if best is None:
+            return None, stages[last_stage], cascade_info
+
+        if self.llm_router.get_cascade_config(subnet_id):
+            self.llm_router.record_cascade_outcome(subnet_id, best[3])
+
+        return best[1], best[2], cascade_info
+
+    def _get_deadline(self, task: Dict[str, Any]) -> float:
+        """Get the task deadline as a unix timestamp"""
+        if 'deadline' in task:
+            return float(task['deadline'])
+        timeout = self.config.get('daemon', {}).get('task_timeout_seconds', 60)
+        return task.get('received_at', time.time()) + timeout
+
     def format_response(self, task: Dict[str, Any], response: str) -> str:
         """
         Format response per subnet requirements.
@@ -149,6 +322,7 @@ class TaskHandler:
         """
         try:
             task_id = task.get('id', 'unknown')
+            started = time.monotonic()
             logger.info(f"Processing task {task_id}")
 
             # 1. Classify the task
@@ -160,15 +334,12 @@ class TaskHandler:
                 logger.info(f"Skipping task {task_id}")
                 return None
 
-            # 3. Route to LLM
-            llm_config = self.llm_router.select_llm(
-                task_type=classification['task_type'],
-                reasoning_depth=classification['reasoning_depth']
+            # 3. Route to LLM and 4. execute inference (cheapest model first)
+            subnet_id = task.get('subnet_id', self.config.get('bittensor', {}).get('subnet_id', 1))
+            response, llm_config, cascade_info = self.execute_cascade(
+                task, classification, subnet_id
             )
             logger.debug(f"Selected LLM: {llm_config.get('model', 'default')}")
-
-            # 4. Execute inference
-            response = self.execute_inference(task, llm_config)
             if not response:
                 logger.warning(f"Inference failed for task {task_id}")
                 return None
@@ -179,11 +350,22 @@ class TaskHandler:
             # 6. Log result
             result = {
                 'task_id': task_id,
-                'response': formatted,
+                'subnet_id': subnet_id,
                 'llm': llm_config.get('model', 'unknown'),
+                'strategy': cascade_info['strategy'],
+                'task_type': classification['task_type'],
+                'tokens': cascade_info['tokens'],
+                'output_tokens': cascade_info['output_tokens'],
+                'truncated': cascade_info['truncated'],
+                'clipped': cascade_info['clipped'],
+                'latency_ms': round((time.monotonic() - started) * 1000, 1),
+                'status': 'success',
+                'response': formatted,
                 'classification': classification,
-                'status': 'success'
+                'cascade': cascade_info,
             }
+            if cascade_info['experiments']:
+                result['experiments'] = cascade_info['experiments']
 
             self._log_task_result(result)
             logger.info(f"✅ Task {task_id} processed successfully")
@@ -196,38 +378,34 @@ class TaskHandler:
 
     def _log_task_result(self, result: Dict[str, Any]) -> None:
         """
-        Log task result to history file.
+        Queue task result for the history writer (batched, shared schema).
 
         Args:
             result: Task result dict
         """
         try:
-            self.task_history_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.task_history_file, 'a') as f:
-                f.write(json.dumps(result) + '\n')
+            self.history_writer.submit(result, event='task')
         except Exception as e:
             logger.error(f"Failed to log task result: {e}")
 
     def get_task_history(self, limit: int = 100) -> list:
-        """Get recent task history"""
+        """Get recent task history (reads only the newest segments)"""
         try:
-            if not self.task_history_file.exists():
-                return []
-
-            history = []
-            with open(self.task_history_file, 'r') as f:
-                for line in f:
-                    try:
-                        history.append(json.loads(line))
-                    except json.JSONDecodeError:
-                        continue
-
-            return history[-limit:]  # Return last N tasks
-
+            self.history_writer.flush()
+            return self.history_store.last_n(limit)
         except Exception as e:
             logger.error(f"Failed to get task history: {e}")
             return []
 
+    def get_task_record(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Look up the latest history record for a task via the segment index"""
+        try:
+            self.history_writer.flush()
+            return self.history_store.get(task_id)
+        except Exception as e:
+            logger.error(f"Failed to look up task {task_id}: {e}")
+            return None
+
 
 def main():
     """Test task handler"""
@@ -3,9 +3,63 @@
 from .token_budget import TokenBudgetManager
 from .prompt_templates import PromptTemplateManager
 from .bittensor_client import BittensorClientWrapper
+from .draft_scorer import DraftScorer
+from .budget_pacer import BudgetPacer
+from .token_ledger import TokenLedger
+from .spend_windows import SpendWindows
+from .budget_reservations import BudgetReservations
+from .history_store import HistoryStore
+from .history_writer import HistoryWriter
+from .score_ingestion import ScoreIngestor
+from .performance_aggregates import PerformanceAggregates
+from .history_columns import HistoryColumns
+from .performance_report import ReportEngine
+from .ab_testing import ABTestManager
+from .output_lengths import OutputLengthModel
+from .chain_backend import ChainBackend, LocalChainBackend
+from .metagraph_cache import MetagraphCache
+from .chain_pool import ChainConnectionPool, RPCChainBackend
+from .subtensor_backend import SubtensorChainBackend
+from .bulkhead import SubnetBulkhead, BulkheadGroup
+from .fair_queue import StakeWeightedQueue
+from .axon_server import AxonServer
+from .signatures import SignatureVerifier
+from .mcp_session import MCPSession, MCPSupervisor
+from .ttl_cache import TTLCache
+from .earnings_ledger import EarningsLedger
+from .virtual_clock import VirtualClock
 
 __all__ = [
     'TokenBudgetManager',
     'PromptTemplateManager',
-    'BittensorClientWrapper'
+    'BittensorClientWrapper',
+    'DraftScorer',
+    'BudgetPacer',
+    'TokenLedger',
+    'SpendWindows',
+    'BudgetReservations',
+    'HistoryStore',
+    'HistoryWriter',
+    'ScoreIngestor',
+    'PerformanceAggregates',
+    'HistoryColumns',
+    'ReportEngine',
+    'ABTestManager',
+    'OutputLengthModel',
+    'ChainBackend',
+    'LocalChainBackend',
+    'MetagraphCache',
+    'ChainConnectionPool',
+    'RPCChainBackend',
+    'SubtensorChainBackend',
+    'SubnetBulkhead',
+    'BulkheadGroup',
+    'StakeWeightedQueue',
+    'AxonServer',
+    'SignatureVerifier',
+    'MCPSession',
+    'MCPSupervisor',
+    'TTLCache',
+    'EarningsLedger',
+    'VirtualClock',
 ]
@@ -0,0 +1,450 @@
+"""Strategy and model A/B tests with resampled confidence intervals"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+from .history_columns import HistoryColumns, SUCCESS_THRESHOLD
+
+try:
+    import numpy as np
+except ImportError:  # Optional: assignment works without it, analysis does not
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Experiment dimension -> HistoryColumns column holding the variant
+DIMENSION_COLUMNS = {
+    'strategy': 'strategy_id',
+    'llm': 'llm_id',
+}
+
+# Scores are resampled from a histogram with this many bins over [0, 1]
+SCORE_BINS = 200
+
+# Where promotions are kept when the profiles don't say ('ab_testing.state_file')
+DEFAULT_STATE_FILE = "state/ab-testing.json"
+
+# Experiment fields that promotion changes (and the state file keeps)
+STATE_FIELDS = ('variants', 'enabled', 'promoted')
+
+
+def state_path(profiles: Dict[str, Any]) -> Path:
+    """A/B state file named by the profiles' 'ab_testing' section"""
+    return Path(profiles.get('ab_testing', {}).get('state_file', DEFAULT_STATE_FILE))
+
+
+def load_state(path: Path) -> Dict[str, Any]:
+    """Saved splits and promotions ({} if there are none yet)"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Ignoring unreadable A/B state {path}: {e}")
+        return {}
+
+
+def overlay_state(profiles: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Profiles with the A/B state applied on top; neither input is changed.
+
+    An experiment takes its saved split and promotion unless the profiles
+    now define it with different variants (it was redefined, so the old
+    split no longer applies). Promoted strategy_overrides are merged into
+    the subnet's own; other promoted values (preferred_llm) replace them.
+    Subnets missing from the profiles are ignored.
+
+    Args:
+        profiles: Parsed subnet-profiles.json
+        state: Parsed A/B state file
+
+    Returns:
+        The profiles as the router should see them
+    """
+    if not state:
+        return profiles
+    profiles = dict(profiles)
+    ab_config = dict(profiles.get('ab_testing', {}))
+    experiments = dict(ab_config.get('experiments', {}))
+    for name, saved in state.get('experiments', {}).items():
+        experiment = experiments.get(name)
+        if experiment is None or set(saved.get('variants', {})) != set(experiment.get('variants', {})):
+            continue
+        experiments[name] = dict(experiment, **{k: v for k, v in saved.items() if k in STATE_FIELDS})
+    ab_config['experiments'] = experiments
+    profiles['ab_testing'] = ab_config
+
+    subnets = dict(profiles.get('subnets', {}))
+    for subnet_key, defaults in state.get('subnets', {}).items():
+        if subnet_key not in subnets:
+            continue
+        subnet = dict(subnets[subnet_key])
+        for key, value in defaults.items():
+            if isinstance(value, dict):
+                value = dict(subnet.get(key, {}), **value)
+            subnet[key] = value
+        subnets[subnet_key] = subnet
+    profiles['subnets'] = subnets
+    return profiles
+
+
+class ABTestManager:
+    """
+    Splits traffic between strategy or model variants and decides winners.
+
+    Assignment hashes the task_id, so a task always gets the same variant
+    (across retries and processes) and the split matches the configured
+    weights without any shared state.
+
+    Analysis reads the memory-mapped history columns. Per-variant score
+    means are bootstrapped by drawing multinomial counts over a score
+    histogram, which resamples n scores in O(bins) instead of O(n), so
+    thousands of resamples over 100k tasks take milliseconds. Success
+    rates get a Beta posterior. P(best) is the share of draws in which a
+    variant comes out on top.
+
+    A variant wins once every variant has min_samples_per_variant scored
+    tasks and its P(best) reaches promote_probability. Promotion is gradual:
+    each call moves promotion_step of the traffic to the winner, and the
+    winner becomes the subnet default once it has all of it. Splits and
+    promotions are saved to the A/B state file, which LLMRouter overlays
+    on subnet-profiles.json; the checked-in profiles are never written.
+    """
+
+    def __init__(self, config: Dict[str, Any],
+                 columns: Optional[HistoryColumns] = None,
+                 state_file: Optional[str] = None):
+        """
+        Args:
+            config: The 'ab_testing' section of subnet-profiles.json (with
+                the A/B state overlaid)
+            columns: Columnar history for analysis (None = assignment only)
+            state_file: A/B state file promotions are saved to (None = not saved)
+        """
+        self.config = config
+        self.experiments: Dict[str, Dict[str, Any]] = config.get('experiments', {})
+        self.columns = columns
+        self.state_file = Path(state_file) if state_file else None
+
+        self.enabled = config.get('enabled', False)
+        self.min_samples = config.get('min_samples_per_variant', 200)
+        self.promote_probability = config.get('promote_probability', 0.95)
+        self.promotion_step = config.get('promotion_step', 0.25)
+        self.resamples = config.get('bootstrap_samples', 2000)
+        self.confidence_level = config.get('confidence_level', 0.95)
+        self.seed = config.get('seed', 0)  # Fixed so repeated runs agree
+        self._pending_defaults: Dict[str, Dict[str, Any]] = {}  # subnet -> promoted values, not yet saved
+        logger.debug(f"ABTestManager initialized ({len(self.experiments)} experiments)")
+
+    @classmethod
+    def from_profiles(cls, profile_path: str = "config/subnet-profiles.json",
+                      columns: Optional[HistoryColumns] = None) -> 'ABTestManager':
+        """Create from the 'ab_testing' section of subnet-profiles.json and its state file"""
+        try:
+            with open(profile_path, 'r') as f:
+                profiles = json.load(f)
+        except FileNotFoundError:
+            logger.warning(f"Subnet profiles not found: {profile_path}")
+            profiles = {}
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid profiles JSON: {e}")
+            profiles = {}
+        path = state_path(profiles)
+        config = overlay_state(profiles, load_state(path)).get('ab_testing', {})
+        return cls(config, columns, str(path))
+
+    def assign(self, task_id: str, subnet_id: int, task_type: str,
+               dimension: str) -> Optional[Tuple[str, str]]:
+        """
+        Pick the variant for a task.
+
+        Args:
+            task_id: Task identifier (hashed for a stable assignment)
+            subnet_id: Target subnet
+            task_type: Task type from classification
+            dimension: 'strategy' or 'llm'
+
+        Returns:
+            (experiment name, variant) or None if no experiment applies
+        """
+        if not self.enabled:
+            return None
+        for name, experiment in self.experiments.items():
+            if not self._applies(experiment, subnet_id, task_type, dimension):
+                continue
+            variants = experiment.get('variants', {})
+            total = sum(variants.values())
+            if total <= 0:
+                continue
+            digest = hashlib.blake2b(f"{name}:{task_id}".encode(), digest_size=8).digest()
+            point = int.from_bytes(digest, 'big') / 2 ** 64 * total
+            for variant, weight in variants.items():
+                point -= weight
+                if point < 0:
+                    return name, variant
+            return name, variant
+        return None
+
+    def analyze(self, name: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Confidence intervals and win probabilities for one experiment.
+
+        Args:
+            name: Experiment name
+            now: Unix time the analysis window ends (default: now)
+
+        Returns:
+            Result dict (status 'collecting', 'inconclusive' or 'winner'),
+            or None if the experiment is unknown or analysis is unavailable
+        """
+        experiment = self.experiments.get(name)
+        if experiment is None:
+            logger.warning(f"Unknown experiment '{name}'")
+            return None
+        if self.columns is None or np is None:
+            logger.warning("Experiment analysis needs numpy and the columnar history")
+            return None
+
+        variants = list(experiment.get('variants', {}))
+        scores, variant_ids = self._variant_scores(experiment, variants, now)
+        counts = np.bincount(variant_ids, minlength=len(variants))
+
+        rng = np.random.default_rng(self.seed)
+        means = self._bootstrap_means(scores, variant_ids, counts, rng)
+        successes = np.bincount(variant_ids, weights=scores > SUCCESS_THRESHOLD,
+                                minlength=len(variants))
+        success_draws = rng.beta(1 + successes, 1 + counts - successes,
+                                 size=(self.resamples, len(variants)))
+
+        p_best = self._p_best(means, counts)
+        p_best_success = self._p_best(success_draws, counts)
+        tail = (1 - self.confidence_level) / 2 * 100
+        bounds = (tail, 100 - tail)
+
+        result_variants = {}
+        for i, variant in enumerate(variants):
+            n = int(counts[i])
+            observed = scores[variant_ids == i]
+            stats = {
+                'samples': n,
+                'avg_score': float(observed.mean()) if n else None,
+                'score_ci': self._interval(means[:, i], bounds) if n else None,
+                'success_rate': float(successes[i] / n) if n else None,
+                'success_ci': self._interval(success_draws[:, i], bounds),
+                'p_best': float(p_best[i]),
+                'p_best_success': float(p_best_success[i]),
+            }
+            if i and n and counts[0]:
+                # Lift over the first (control) variant
+                stats['lift'] = float(observed.mean() - scores[variant_ids == 0].mean())
+                stats['lift_ci'] = self._interval(means[:, i] - means[:, 0], bounds)
+            result_variants[variant] = stats
+
+        leader = variants[int(np.argmax(p_best))] if variants and counts.any() else None
+        if not variants or counts.min() < self.min_samples:
+            status = 'collecting'
+        elif result_variants[leader]['p_best'] >= self.promote_probability:
+            status = 'winner'
+        else:
+            status = 'inconclusive'
+
+        return {
+            'experiment': name,
+            'subnet_id': experiment.get('subnet_id'),
+            'dimension': experiment.get('dimension'),
+            'status': status,
+            'leader': leader,
+            'winner': leader if status == 'winner' else None,
+            'variants': result_variants,
+        }
+
+    def analyze_all(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Analyze every enabled experiment (syncs the columns once first)"""
+        if self.columns is None or np is None or not self.enabled:
+            return {}
+        self.columns.sync()
+        results = {}
+        for name, experiment in self.experiments.items():
+            if experiment.get('enabled', True):
+                result = self.analyze(name, now)
+                if result:
+                    results[name] = result
+        return results
+
+    def promote_winners(self, results: Optional[Dict[str, Dict[str, Any]]] = None,
+                        dry_run: bool = False) -> List[Dict[str, Any]]:
+        """
+        Shift traffic towards each experiment's winner.
+
+        Args:
+            results: Output of analyze_all() (computed if not given)
+            dry_run: Report what would change without saving it
+
+        Returns:
+            One dict per promotion step taken
+        """
+        results = self.analyze_all() if results is None else results
+        steps = []
+        for name, result in results.items():
+            if result['status'] != 'winner':
+                continue
+            experiment = self.experiments[name]
+            variants = experiment['variants']
+            total = sum(variants.values())
+            share = min(1.0, variants[result['winner']] / total + self.promotion_step)
+            step = {'experiment': name, 'winner': result['winner'],
+                    'share': round(share, 4), 'final': share >= 1.0 - 1e-9}
+            steps.append(step)
+            if not dry_run:
+                self._apply_step(name, experiment, result, share, step['final'])
+
+        if steps and not dry_run:
+            self._save_state([step['experiment'] for step in steps])
+        return steps
+
+    def _applies(self, experiment: Dict[str, Any], subnet_id: int,
+                 task_type: str, dimension: str) -> bool:
+        """Whether an experiment covers this subnet, task type and dimension"""
+        if not experiment.get('enabled', True) or experiment.get('dimension') != dimension:
+            return False
+        if str(experiment.get('subnet_id')) != str(subnet_id):
+            return False
+        task_types = experiment.get('task_types')
+        return not task_types or task_type in task_types
+
+    def _variant_scores(self, experiment: Dict[str, Any], variants: List[str],
+                        now: Optional[float]) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Scores and variant indexes of the experiment's scored tasks"""
+        columns = self.columns
+        started = experiment.get('started_at')
+        start_ts = (datetime.fromisoformat(started).replace(tzinfo=timezone.utc).timestamp()
+                    if started else 0.0)
+        column = DIMENSION_COLUMNS[experiment['dimension']]
+        data = columns.window(start_ts, now, ('score', 'subnet_id', 'task_type_id', column))
+
+        scores = np.asarray(data['score'], dtype=np.float64)
+        mask = ~np.isnan(scores)
+        mask &= data['subnet_id'] == columns.code('subnet', experiment.get('subnet_id'))
+        if experiment.get('task_types'):
+            codes = [columns.code('task_type', t) for t in experiment['task_types']]
+            mask &= np.isin(data['task_type_id'], codes)
+
+        # Map dictionary codes to variant positions (-1 = not in the experiment)
+        lookup = np.full(len(columns.dictionaries[experiment['dimension']]) + 1, -1, dtype=np.int64)
+        for i, variant in enumerate(variants):
+            code = columns.code(experiment['dimension'], variant)
+            if code >= 0:
+                lookup[code] = i
+        variant_ids = lookup[np.asarray(data[column], dtype=np.int64)]
+        mask &= variant_ids >= 0
+        return np.clip(scores[mask], 0.0, 1.0), variant_ids[mask]
+
+    def _bootstrap_means(self, scores: 'np.ndarray', variant_ids: 'np.ndarray',
+                         counts: 'np.ndarray', rng: Any) -> 'np.ndarray':
+        """
+        Bootstrap distribution of each variant's mean score, (resamples, variants).
+        Resampling n scores with replacement is a multinomial draw over the
+        histogram bins; each bin contributes its exact mean, so only the
+        within-bin spread (1/SCORE_BINS wide) is lost.
+        """
+        n_variants = len(counts)
+        bins = np.minimum((scores * SCORE_BINS).astype(np.int64), SCORE_BINS - 1)
+        flat = variant_ids * SCORE_BINS + bins
+        size = n_variants * SCORE_BINS
+        hist = np.bincount(flat, minlength=size).reshape(n_variants, SCORE_BINS)
+        sums = np.bincount(flat, weights=scores, minlength=size).reshape(n_variants, SCORE_BINS)
+        bin_means = sums / np.maximum(hist, 1)
+
+        safe_counts = np.maximum(counts, 1)
+        probs = hist / safe_counts[:, None]
+        probs[counts == 0, 0] = 1.0  # Empty variants draw nothing useful; keep pvals valid
+        draws = rng.multinomial(counts, probs, size=(self.resamples, n_variants))
+        return np.einsum('rvk,vk->rv', draws, bin_means) / safe_counts
+
+    @staticmethod
+    def _p_best(draws: 'np.ndarray', counts: 'np.ndarray') -> 'np.ndarray':
+        """Share of draws in which each (non-empty) variant is the highest"""
+        if not draws.size:
+            return np.zeros(draws.shape[1])
+        draws = np.where(counts > 0, draws, -np.inf)
+        winners = np.argmax(draws, axis=1)
+        return np.bincount(winners, minlength=draws.shape[1]) / draws.shape[0]
+
+    @staticmethod
+    def _interval(draws: 'np.ndarray', bounds: Tuple[float, float]) -> List[float]:
+        """Percentile interval of resampled draws"""
+        low, high = np.percentile(draws, bounds)
+        return [float(low), float(high)]
+
+    def _apply_step(self, name: str, experiment: Dict[str, Any], result: Dict[str, Any],
+                    share: float, final: bool) -> None:
+        """Reweight the split towards the winner, or make it the subnet default"""
+        winner = result['winner']
+        now = datetime.utcnow().isoformat()
+        if not final:
+            others = {v: w for v, w in experiment['variants'].items() if v != winner}
+            other_total = sum(others.values()) or 1.0
+            experiment['variants'] = {
+                v: round(share if v == winner else (1 - share) * w / other_total, 4)
+                for v, w in experiment['variants'].items()
+            }
+            logger.info(f"Experiment {name}: {winner} now gets {share:.0%} of traffic")
+            return
+
+        experiment['enabled'] = False
+        experiment['promoted'] = {
+            'variant': winner,
+            'at': now,
+            'p_best': result['variants'][winner]['p_best'],
+            'samples': {v: s['samples'] for v, s in result['variants'].items()},
+        }
+        self._set_default(experiment, winner)
+        logger.info(f"Experiment {name}: promoted {winner} to subnet {experiment.get('subnet_id')}")
+
+    def _set_default(self, experiment: Dict[str, Any], winner: str) -> None:
+        """Queue the winner as the subnet default"""
+        defaults = self._pending_defaults.setdefault(str(experiment.get('subnet_id')), {})
+        if experiment['dimension'] == 'strategy':
+            overrides = defaults.setdefault('strategy_overrides', {})
+            for task_type in experiment.get('task_types') or ['*']:
+                overrides[task_type] = winner
+        else:
+            defaults['preferred_llm'] = winner
+
+    def _save_state(self, names: List[str]) -> None:
+        """
+        Write the promoted experiments' splits (and any new subnet
+        defaults) to the state file. Entries saved earlier for other
+        experiments and subnets are kept.
+        """
+        if self.state_file is None:
+            self._pending_defaults = {}
+            return
+        try:
+            state = load_state(self.state_file)
+            saved = state.setdefault('experiments', {})
+            for name in names:
+                experiment = self.experiments[name]
+                saved[name] = {k: experiment[k] for k in STATE_FIELDS if k in experiment}
+            subnets = state.setdefault('subnets', {})
+            for subnet_key, defaults in self._pending_defaults.items():
+                subnet = subnets.setdefault(subnet_key, {})
+                for key, value in defaults.items():
+                    subnet[key] = dict(subnet.get(key, {}), **value) if isinstance(value, dict) else value
+            state['updated_at'] = datetime.utcnow().isoformat()
+
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_file.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logger.error(f"Failed to save A/B state: {e}")
+        finally:
+            self._pending_defaults = {}
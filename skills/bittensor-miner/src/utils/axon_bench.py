@@ -0,0 +1,233 @@
+"""Load generator and benchmark harness for the axon server"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Callable
+
+from .axon_server import (AxonServer, HOTKEY_HEADER, NONCE_HEADER, UUID_HEADER,
+                          SIGNATURE_HEADER, decode_task)
+from .signatures import SignatureVerifier, MockScheme, body_hash, signed_message
+from .bulkhead import SubnetBulkhead
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+BENCH_AXON_HOTKEY = 'bench-axon'
+
+
+async def _client(host: str, port: int, make_request: Callable[[], bytes], count: int,
+                  latencies: List[float], statuses: Dict[int, int]) -> None:
+    """One keep-alive connection sending count requests back to back"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            request = make_request()
+            started = time.perf_counter()
+            writer.write(request)
+            status_line = await reader.readline()
+            if not status_line:
+                statuses[0] = statuses.get(0, 0) + 1
+                return
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                if line[:15].lower() == b'content-length:':
+                    length = int(line[15:])
+            if length:
+                await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            status = int(status_line.split(b' ', 2)[1])
+            statuses[status] = statuses.get(status, 0) + 1
+            if status >= 400 and status != 503:
+                return  # Server closes after a rejection
+    finally:
+        writer.close()
+
+
+def _generate(args: tuple) -> Dict[str, Any]:
+    """Run connections clients in one process; returns raw latencies"""
+    (host, port, hotkeys, synapse, bodies, connections, requests_per_connection,
+     sign, axon_hotkey, offset) = args
+
+    def request_maker(hotkey: str, index: int) -> Callable[[], bytes]:
+        """Requests from one caller, cycling through the bodies"""
+        prepared = []
+        for body in bodies:
+            head = (
+                f"POST /{synapse} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"{HOTKEY_HEADER.decode()}: {hotkey}\r\n"
+            )
+            prepared.append((head, body, body_hash(body)))
+        counter = itertools.count(index)
+        request_uuid = uuid.uuid4().hex  # One dendrite per connection
+
+        def make_request() -> bytes:
+            head, body, digest = prepared[next(counter) % len(prepared)]
+            if not sign:
+                return (head + "\r\n").encode() + body
+            # Fresh nonce per request, signed like a dendrite would (mock scheme)
+            nonce = time.time_ns()
+            signature = MockScheme.sign(hotkey, signed_message(nonce, hotkey, axon_hotkey,
+                                                               request_uuid, digest))
+            return (head + f"{NONCE_HEADER.decode()}: {nonce}\r\n{UUID_HEADER.decode()}: {request_uuid}\r\n"
+                    f"{SIGNATURE_HEADER.decode()}: 0x{signature.hex()}\r\n\r\n").encode() + body
+        return make_request
+
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+
+    async def run():
+        await asyncio.gather(*(
+            _client(host, port, request_maker(hotkeys[(offset + i) % len(hotkeys)], offset + i),
+                    requests_per_connection, latencies, statuses)
+            for i in range(connections)
+        ), return_exceptions=True)
+
+    started = time.time()
+    asyncio.run(run())
+    return {'latencies': latencies, 'statuses': statuses, 'started': started, 'finished': time.time()}
+
+
+def run_load(host: str, port: int, hotkey: str, requests: int = 20000,
+             connections: int = 32, processes: int = 2, synapse: str = 'TextPrompting',
+             body_bytes: int = 512, sign: bool = False,
+             hotkeys: Optional[List[str]] = None, bodies: Optional[List[bytes]] = None,
+             axon_hotkey: str = BENCH_AXON_HOTKEY) -> Dict[str, Any]:
+    """
+    Drive an axon with keep-alive connections and report throughput.
+
+    Args:
+        host: Axon host
+        port: Axon port
+        hotkey: Caller hotkey sent in the dendrite header
+        requests: Total requests
+        connections: Concurrent connections (spread over processes)
+        processes: Load generator processes (keeps the generator off the
+            server's GIL when benchmarking in-process)
+        synapse: Path to POST to
+        body_bytes: Approximate request body size
+        sign: Sign every request (mock scheme, for a verifying echo axon)
+        hotkeys: Callers to spread the connections over (overrides hotkey)
+        bodies: Request bodies each connection cycles through (overrides body_bytes)
+        axon_hotkey: Receiving hotkey the signatures are made out to
+
+    Returns:
+        requests, seconds, requests_per_second, p50_ms, p95_ms, p99_ms,
+        max_ms, statuses
+    """
+    hotkeys = hotkeys or [hotkey]
+    bodies = bodies or [json.dumps({'content': 'x' * max(0, body_bytes - 16)}).encode()]
+    processes = max(1, min(processes, connections))
+    per_process = connections // processes
+    per_connection = max(1, requests // connections)
+    jobs = []
+    offset = 0
+    for i in range(processes):
+        count = per_process + (1 if i < connections % processes else 0)
+        jobs.append((host, port, hotkeys, synapse, bodies, count, per_connection, sign, axon_hotkey, offset))
+        offset += count
+
+    if processes == 1:
+        results = [_generate(jobs[0])]
+    else:
+        with multiprocessing.get_context('spawn').Pool(processes) as pool:
+            results = pool.map(_generate, jobs)
+    # Wall time while load was running (excludes generator process startup)
+    elapsed = max(r['finished'] for r in results) - min(r['started'] for r in results)
+
+    latencies = sorted(latency for result in results for latency in result['latencies'])
+    statuses: Dict[str, int] = {}
+    for result in results:
+        for status, count in result['statuses'].items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+    return {
+        'requests': len(latencies),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        'statuses': statuses,
+    }
+
+
+def start_echo_axon(workers: int = 4, queue_size: int = 1024,
+                    allowed: Optional[set] = None, verify: bool = False) -> AxonServer:
+    """
+    Axon on a free local port whose tasks go through a SubnetBulkhead to a
+    handler that echoes the decoded content, i.e. the daemon's request path
+    without the LLM call. verify checks mock-scheme signatures.
+    """
+    axon = AxonServer(host='127.0.0.1', port=0,
+                      is_allowed=(lambda hotkey: hotkey in allowed) if allowed is not None else None,
+                      verifier=SignatureVerifier(scheme='mock') if verify else None,
+                      axon_hotkey=BENCH_AXON_HOTKEY)
+
+    def echo(task):
+        decode_task(task)
+        return {'task_id': task['id'], 'response': task['content'][:32]}
+
+    def reply(task, result):
+        if result:
+            axon.respond(task['id'], 200, {'completion': result['response']})
+        else:
+            axon.respond(task['id'], 400)
+
+    bulkhead = SubnetBulkhead(0, echo, max_concurrent=workers, queue_size=queue_size,
+                              on_result=reply)
+    axon.on_task = bulkhead.submit
+    bulkhead.start()
+    axon.start()
+    axon.bulkhead = bulkhead
+    return axon
+
+
+def main():
+    """Benchmark the axon: requests/sec and latency percentiles"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0,
+                        help='Axon to load (default: start a local echo axon)')
+    parser.add_argument('--hotkey', default='validator-0')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--connections', type=int, default=32)
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--body-bytes', type=int, default=512)
+    parser.add_argument('--workers', type=int, default=4, help='Echo axon worker threads')
+    parser.add_argument('--sign', action='store_true',
+                        help='Sign requests and verify them in the echo axon (mock scheme)')
+    args = parser.parse_args()
+
+    axon = None
+    port = args.port
+    if not port:
+        axon = start_echo_axon(args.workers, allowed={args.hotkey}, verify=args.sign)
+        port = axon.port
+
+    report = run_load(args.host, port, args.hotkey, args.requests, args.connections,
+                      args.processes, body_bytes=args.body_bytes, sign=args.sign)
+    if axon is not None:
+        report['server'] = axon.snapshot()
+        if axon.verifier is not None:
+            report['signatures'] = axon.verifier.snapshot()
+            axon.verifier.close()
+        axon.stop()
+        axon.bulkhead.stop()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,504 @@
+"""Async HTTP axon: receives validator requests on the axon port"""
+
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+HOTKEY_HEADER = b'bt_header_dendrite_hotkey'
+TIMEOUT_HEADER = b'bt_header_timeout'
+NONCE_HEADER = b'bt_header_dendrite_nonce'
+UUID_HEADER = b'bt_header_dendrite_uuid'
+SIGNATURE_HEADER = b'bt_header_dendrite_signature'
+
+REASONS = {
+    200: 'OK', 204: 'No Content', 400: 'Bad Request', 401: 'Unauthorized',
+    403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed',
+    411: 'Length Required', 413: 'Payload Too Large',
+    431: 'Request Header Fields Too Large', 503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+}
+
+
+def http_response(status: int, body: bytes = b'', keep_alive: bool = True) -> bytes:
+    """Serialize a complete HTTP/1.1 response"""
+    return (
+        f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    ).encode('latin-1') + body
+
+
+def decode_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Parse the request body handed off by the axon into task fields.
+
+    Runs on a worker thread, not the event loop. The body arrives as a
+    memoryview over the receive buffer and is decoded straight from it.
+    The prompt is taken from 'content', 'prompt' or the last of 'messages'.
+
+    Raises:
+        ValueError: Body is not a JSON object
+    """
+    body = task.pop('body', None)
+    if body is None:
+        return task
+    payload = json.loads(str(body, 'utf-8')) if len(body) else {}
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+
+    content = payload.get('content') or payload.get('prompt')
+    if content is None and payload.get('messages'):
+        last = payload['messages'][-1]
+        content = last.get('content') if isinstance(last, dict) else last
+    task['content'] = content or ''
+    task['payload'] = payload
+    return task
+
+
+class AxonServer:
+    """
+    HTTP/1.1 receiver for validator requests (POST /<SynapseName>).
+
+    Runs an asyncio event loop on its own thread so the daemon's worker
+    threads never wait on sockets. Connections are kept alive between
+    requests. Each request is checked from its headers alone, before any
+    of the body is read: size limits, the synapse name, and whether the
+    caller's hotkey is a known validator (is_allowed, answered from the
+    cached metagraph). Bad requests are turned away without buffering a
+    body.
+
+    With a verifier, the caller's signature over the nonce, uuid and body
+    hash is checked once the body is in. The check runs on the verifier's
+    pool, not the event loop. An invalid signature gets 401.
+
+    An accepted body is handed to on_task as a memoryview into the
+    receive buffer, with no copy. The connection waits for respond()
+    (called from any thread) or the request timeout, whichever comes
+    first. If on_task returns False (the queue is full), the caller gets
+    503 at once.
+    """
+
+    def __init__(self, host: str = '0.0.0.0', port: int = 8000,
+                 on_task: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 is_allowed: Optional[Callable[[str], bool]] = None,
+                 synapses: Optional[list] = None,
+                 max_body_bytes: int = 1048576,
+                 max_header_bytes: int = 16384,
+                 keepalive_timeout: float = 15.0,
+                 request_timeout: float = 60.0,
+                 max_connections: int = 1024,
+                 verifier=None, axon_hotkey: Optional[str] = None):
+        """
+        Args:
+            host: Interface to bind
+            port: Axon port (0 = any free port)
+            on_task: Receives each accepted task; returns False to shed it
+                (None = tasks wait in an inbox drained by pop_tasks())
+            is_allowed: Caller hotkey -> whether to serve it (None = everyone)
+            synapses: Accepted synapse names (None = any)
+            max_body_bytes: Larger requests get 413
+            max_header_bytes: Larger request heads get 431
+            keepalive_timeout: Idle seconds before a connection is closed
+            request_timeout: Longest wait for a response (a smaller
+                bt_header_timeout from the caller wins)
+            max_connections: Further connections are closed on accept
+            verifier: SignatureVerifier for caller signatures (None = don't check)
+            axon_hotkey: Our hotkey, part of the signed message
+        """
+        self.host = host
+        self.port = port
+        self.on_task = on_task
+        self.is_allowed = is_allowed
+        self.synapses = set(synapses) if synapses else None
+        self.max_body_bytes = max_body_bytes
+        self.max_header_bytes = max_header_bytes
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        self.max_connections = max_connections
+        self.verifier = verifier
+        self.axon_hotkey = axon_hotkey or ''
+
+        self.inbox: deque = deque()
+        self.pending: Dict[str, '_AxonProtocol'] = {}
+        self.protocols: set = set()
+        self.connections = 0
+        self.stats = {'connections': 0, 'requests': 0, 'accepted': 0, 'responses': 0,
+                      'rejected_caller': 0, 'rejected_size': 0, 'rejected_busy': 0,
+                      'rejected_signature': 0, 'bad_requests': 0, 'timeouts': 0,
+                      'refused_connections': 0, 'paused_reads': 0}
+
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], **kwargs) -> 'AxonServer':
+        """Build from the daemon's 'axon' section; kwargs override"""
+        options = {key: config[key] for key in (
+            'host', 'synapses', 'max_body_bytes', 'max_header_bytes', 'keepalive_timeout',
+            'request_timeout', 'max_connections') if key in config}
+        options.update(kwargs)
+        return cls(**options)
+
+    @property
+    def is_running(self) -> bool:
+        return self._server is not None
+
+    def start(self) -> int:
+        """
+        Start listening on a background event loop.
+
+        Returns:
+            The bound port
+        """
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._server = self._loop.run_until_complete(self._loop.create_server(
+                    lambda: _AxonProtocol(self), self.host, self.port, backlog=1024))
+                self.port = self._server.sockets[0].getsockname()[1]
+            except OSError as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name=f"axon-{self.port}", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        logger.info(f"Axon listening on {self.host}:{self.port}")
+        return self.port
+
+    def stop(self) -> None:
+        """Close the listener and every connection"""
+        if self._server is None:
+            return
+        server, self._server = self._server, None
+
+        def shutdown():
+            server.close()
+            for protocol in list(self.protocols):
+                if protocol.transport is not None:
+                    protocol.transport.close()
+            self._loop.stop()
+
+        self._loop.call_soon_threadsafe(shutdown)
+        self._thread.join(5)
+
+    def respond(self, request_id: str, status: int = 200,
+                payload: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Answer a pending request (thread-safe).
+
+        Args:
+            request_id: Task 'id' handed to on_task
+            status: HTTP status
+            payload: JSON body
+
+        Returns:
+            False if the request already timed out or its caller went away
+        """
+        if request_id not in self.pending or self._loop is None:
+            return False
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self._loop.call_soon_threadsafe(self._complete, request_id, status, body)
+        return True
+
+    def pop_tasks(self, max_tasks: int = 10) -> list:
+        """Drain up to max_tasks from the inbox (when there is no on_task)"""
+        tasks = []
+        while self.inbox and len(tasks) < max_tasks:
+            tasks.append(self.inbox.popleft())
+        return tasks
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self.stats, open_connections=self.connections, in_flight=len(self.pending))
+
+    def _submit(self, task: Dict[str, Any]) -> bool:
+        """Hand a task off (event loop thread)"""
+        if self.on_task is None:
+            self.inbox.append(task)
+            return True
+        try:
+            return bool(self.on_task(task))
+        except Exception as e:
+            logger.error(f"Axon task hand-off failed: {e}")
+            return False
+
+    def _complete(self, request_id: str, status: int, body: bytes) -> None:
+        protocol = self.pending.pop(request_id, None)
+        if protocol is not None:
+            self.stats['responses'] += 1
+            protocol.finish(status, body)
+
+
+class _AxonProtocol(asyncio.Protocol):
+    """One client connection: parse requests, hand off, write responses"""
+
+    def __init__(self, server: AxonServer):
+        self.server = server
+        self.transport = None
+        self.buffer = bytearray()
+        self.body: Optional[bytearray] = None  # Body being filled across reads
+        self.body_filled = 0
+        self.request: Optional[Dict[str, Any]] = None  # Head of the request being read
+        self.in_flight: Optional[str] = None
+        self.verifying = False
+        self.paused = False  # Reading paused until the in-flight request finishes
+        self.keep_alive = True
+        self.idle_timer = None
+        self.request_timer = None
+
+    def connection_made(self, transport) -> None:
+        server = self.server
+        self.transport = transport
+        if server.connections >= server.max_connections:
+            server.stats['refused_connections'] += 1
+            transport.close()
+            self.transport = None
+            return
+        server.connections += 1
+        server.protocols.add(self)
+        server.stats['connections'] += 1
+        self._arm_idle_timer()
+
+    def connection_lost(self, exc) -> None:
+        if self.transport is None:
+            return
+        self.transport = None
+        self.server.connections -= 1
+        self.server.protocols.discard(self)
+        if self.in_flight is not None:
+            self.server.pending.pop(self.in_flight, None)
+        for timer in (self.idle_timer, self.request_timer):
+            if timer is not None:
+                timer.cancel()
+
+    def data_received(self, data: bytes) -> None:
+        if self.transport is None:
+            return
+        if self.body is not None:
+            take = min(len(data), len(self.body) - self.body_filled)
+            self.body[self.body_filled:self.body_filled + take] = data[:take]
+            self.body_filled += take
+            if take < len(data):
+                self._buffer_more(data[take:])
+            if self.body_filled == len(self.body):
+                body, self.body = self.body, None
+                self._dispatch(memoryview(body))
+            return
+
+        self._buffer_more(data)
+        if self.in_flight is None and not self.verifying:
+            self._parse()
+
+    def _buffer_more(self, data: bytes) -> None:
+        """
+        Keep bytes for the next request. Past one full request's worth,
+        stop reading the socket until the current request finishes, so a
+        client pipelining behind a slow request can't grow the buffer.
+        """
+        self.buffer += data
+        server = self.server
+        if not self.paused and len(self.buffer) > server.max_header_bytes + server.max_body_bytes:
+            self.paused = True
+            server.stats['paused_reads'] += 1
+            self.transport.pause_reading()
+
+    def _parse(self) -> None:
+        """Read the next request head from the buffer and act on it"""
+        server = self.server
+        buffer = self.buffer
+        end = buffer.find(b'\r\n\r\n')
+        if end < 0:
+            if len(buffer) > server.max_header_bytes:
+                self._reject(431, 'rejected_size')
+            return
+        if end > server.max_header_bytes:
+            self._reject(431, 'rejected_size')
+            return
+
+        server.stats['requests'] += 1
+
+        lines = bytes(buffer[:end]).split(b'\r\n')
+        parts = lines[0].split(b' ')
+        if len(parts) != 3 or not parts[2].startswith(b'HTTP/1.'):
+            self._reject(400, 'bad_requests')
+            return
+        method, path, version = parts
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(b':')
+            if not sep:
+                self._reject(400, 'bad_requests')
+                return
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get(b'connection', b'').lower()
+        self.keep_alive = connection != b'close' if version == b'HTTP/1.1' else connection == b'keep-alive'
+
+        if method != b'POST':
+            self._reject(405, 'bad_requests')
+            return
+        length = headers.get(b'content-length')
+        if length is None or b'chunked' in headers.get(b'transfer-encoding', b'').lower():
+            self._reject(411, 'bad_requests')
+            return
+        try:
+            length = int(length)
+        except ValueError:
+            self._reject(400, 'bad_requests')
+            return
+        if length < 0:
+            self._reject(400, 'bad_requests')
+            return
+        if length > server.max_body_bytes:
+            self._reject(413, 'rejected_size')
+            return
+        synapse = path.decode('latin-1').lstrip('/').split('?', 1)[0]
+        if server.synapses is not None and synapse not in server.synapses:
+            self._reject(404, 'bad_requests')
+            return
+        hotkey = headers.get(HOTKEY_HEADER, b'').decode('latin-1')
+        if not hotkey:
+            self._reject(401, 'rejected_caller')
+            return
+        if server.is_allowed is not None and not server.is_allowed(hotkey):
+            self._reject(403, 'rejected_caller')
+            return
+
+        timeout = server.request_timeout
+        if TIMEOUT_HEADER in headers:
+            try:
+                timeout = min(timeout, float(headers[TIMEOUT_HEADER]))
+            except ValueError:
+                pass
+        self.request = {'synapse': synapse, 'caller': hotkey, 'timeout': timeout}
+        if server.verifier is not None:
+            try:
+                self.request['nonce'] = int(headers[NONCE_HEADER])
+                self.request['uuid'] = headers.get(UUID_HEADER, b'').decode('latin-1')
+                signature = headers[SIGNATURE_HEADER].decode('latin-1')
+                self.request['signature'] = bytes.fromhex(signature[2:] if signature.startswith('0x') else signature)
+            except (KeyError, ValueError):
+                self._reject(401, 'rejected_signature')
+                return
+
+        start = end + 4
+        available = len(buffer) - start
+        if available >= length:
+            # Whole body already here: hand off a view of this buffer and
+            # start a fresh one with whatever follows it
+            self.buffer = bytearray(buffer[start + length:])
+            self._dispatch(memoryview(buffer)[start:start + length])
+        else:
+            self.body = bytearray(length)
+            self.body[:available] = buffer[start:]
+            self.body_filled = available
+            self.buffer = bytearray()
+
+    def _dispatch(self, body: memoryview) -> None:
+        """Request complete: verify its signature if required, then hand off"""
+        server = self.server
+        request, self.request = self.request, None
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+            self.idle_timer = None
+        if server.verifier is None:
+            self._hand_off(request, body)
+            return
+
+        self.verifying = True
+        future = server.verifier.verify(request['caller'], server.axon_hotkey, request['nonce'],
+                                        request['uuid'], request['signature'], body)
+        if future.done():  # Cache hit or stale nonce
+            self._verified(request, body, future)
+        else:
+            future.add_done_callback(lambda done: server._loop.call_soon_threadsafe(
+                self._verified, request, body, done))
+
+    def _verified(self, request: Dict[str, Any], body: memoryview, future) -> None:
+        self.verifying = False
+        if self.transport is None:
+            return
+        if not future.result():
+            self._reject(401, 'rejected_signature')
+            return
+        self._hand_off(request, body)
+
+    def _hand_off(self, request: Dict[str, Any], body: memoryview) -> None:
+        """Hand the request to the server's task sink"""
+        server = self.server
+        request_id = f"{server.port}-{next(server._ids)}"
+        now = time.time()
+        task = {
+            'id': request_id,
+            'synapse': request['synapse'],
+            'caller': request['caller'],
+            'body': body,
+            'received_at': now,
+            'deadline': now + request['timeout'],
+        }
+        self.in_flight = request_id
+        server.pending[request_id] = self
+        self.request_timer = self.server._loop.call_later(
+            request['timeout'], server._complete, request_id, 504, b'')
+        if not server._submit(task):
+            server.stats['rejected_busy'] += 1
+            server._complete(request_id, 503, b'')
+            return
+        server.stats['accepted'] += 1
+
+    def finish(self, status: int, body: bytes) -> None:
+        """Write the response; then serve the next request or close"""
+        if status == 504:
+            self.server.stats['timeouts'] += 1
+        if self.request_timer is not None:
+            self.request_timer.cancel()
+            self.request_timer = None
+        self.in_flight = None
+        if self.transport is None:
+            return
+        self.transport.write(http_response(status, body, self.keep_alive))
+        if not self.keep_alive:
+            self.transport.close()
+            return
+        self._arm_idle_timer()
+        if self.paused:
+            self.paused = False
+            self.transport.resume_reading()
+        if self.buffer:
+            self._parse()
+
+    def _reject(self, status: int, counter: str) -> None:
+        """Answer from the head alone and close (any body is never read)"""
+        self.server.stats[counter] += 1
+        self.keep_alive = False
+        self.transport.write(http_response(status, keep_alive=False))
+        self.transport.close()
+
+    def _arm_idle_timer(self) -> None:
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+        self.idle_timer = self.server._loop.call_later(
+            self.server.keepalive_timeout, self._idle)
+
+    def _idle(self) -> None:
+        self.idle_timer = None
+        if self.in_flight is None and self.transport is not None:
+            self.transport.close()
@@ -1,7 +1,14 @@
 """Bittensor SDK wrapper for miner operations"""
 
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from .chain_backend import ChainBackend, LocalChainBackend
+from .chain_pool import ChainConnectionPool, RPCChainBackend
+from .metagraph_cache import MetagraphCache
+from .axon_server import AxonServer
+from .signatures import SignatureVerifier
+from .subtensor_backend import SubtensorChainBackend
 
 logger = logging.getLogger(__name__)
 
@@ -10,10 +17,19 @@ class BittensorClientWrapper:
     """
     Wrapper around Bittensor SDK for mining operations.
     Phase 1: Provides basic interface for miner setup
+
+    Registration, stake, balance and subnet queries are answered from a
+    MetagraphCache kept in sync with the chain backend, so hot-path checks
+    ("is this caller a registered validator?") are dict lookups.
     """
 
     def __init__(self, wallet_name: str, hotkey: str,
-                 subnet_id: int = 1, network: str = "finney"):
+                 subnet_id: int = 1, network: str = "finney",
+                 backend: Optional[ChainBackend] = None,
+                 metagraph_config: Optional[Dict[str, Any]] = None,
+                 pool_config: Optional[Dict[str, Any]] = None,
+                 metagraph: Optional[MetagraphCache] = None,
+                 chain_backend: Optional[str] = None):
         """
         Initialize Bittensor client wrapper
 
@@ -22,11 +38,25 @@ class BittensorClientWrapper:
             hotkey: Hotkey name in wallet
             subnet_id: Target subnet ID to mine
             network: Network to connect to ("finney" for testnet, "mainnet" for production)
+            backend: Chain access (None = build one for chain_backend)
+            metagraph_config: The 'metagraph' section of the bittensor config
+            pool_config: The 'chain_pool' section of the bittensor config
+            metagraph: Cache to share with other hotkeys on the same subnet
+                (None = build one in initialize())
+            chain_backend: 'subtensor' (SDK, real network), 'pool'
+                (FakeChainEndpoint over chain_pool, tests and benchmarks)
+                or 'mock' (local chain). None = 'pool' if pool_config
+                lists endpoints, else 'mock'
         """
         self.wallet_name = wallet_name
         self.hotkey = hotkey
         self.subnet_id = subnet_id
         self.network = network
+        self.backend = backend
+        self.metagraph_config = metagraph_config or {}
+        self.pool_config = pool_config or {}
+        self.metagraph = metagraph
+        self.chain_backend = chain_backend or self.backend_kind({'chain_pool': self.pool_config})
         self.client = None
         self.miner = None
 
@@ -53,8 +83,24 @@ class BittensorClientWrapper:
                 'subnet_id': self.subnet_id,
                 'network': self.network,
             })()
-
-            logger.info("✅ Bittensor client initialized (mock mode)")
+            if self.backend is None:
+                self.backend = self._create_backend()
+
+            if self.metagraph is None:
+                config = self.metagraph_config
+                snapshot_file = config.get('snapshot_file')
+                self.metagraph = MetagraphCache(
+                    self.backend, self.subnet_id, self.hotkey,
+                    refresh_interval_seconds=config.get('refresh_interval_seconds', 12.0),
+                    max_stale_seconds=config.get('max_stale_seconds', 120.0),
+                    full_sync_each_epoch=config.get('full_sync_each_epoch', False),
+                    snapshot_file=snapshot_file.format(netuid=self.subnet_id) if snapshot_file else None,
+                )
+                if not self.metagraph.sync() and self.metagraph.block is None:
+                    logger.error("Could not load the metagraph")
+                    return False
+
+            logger.info(f"✅ Bittensor client initialized ({self.chain_backend} chain)")
             return True
 
         except Exception as e:
@@ -63,27 +109,50 @@ class BittensorClientWrapper:
 
     def is_registered(self) -> bool:
         """
-        Check if hotkey is registered to target subnet.
-        Phase 1: Returns mock True
+        Check if hotkey is registered to target subnet (cached metagraph).
 
         Returns:
             True if registered, False otherwise
         """
         logger.debug(f"Checking registration for {self.hotkey} on subnet {self.subnet_id}")
-        # Phase 1: Mock implementation
-        return True
+        if self.metagraph is None:
+            logger.warning("Metagraph not loaded. Call initialize() first.")
+            return False
+        return self.metagraph.is_registered(self.hotkey)
+
+    def is_validator(self, hotkey: str, min_stake: float = 0.0) -> bool:
+        """
+        Check whether a caller is a registered validator with enough stake.
+
+        Args:
+            hotkey: Caller's hotkey address
+            min_stake: Minimum stake in TAO
+
+        Returns:
+            True if the hotkey holds a validator permit and at least min_stake
+        """
+        return self.metagraph is not None and self.metagraph.is_validator(hotkey, min_stake)
+
+    def is_validator_cached(self, hotkey: str, min_stake: float = 0.0) -> bool:
+        """is_validator() that never waits on the chain (for the axon's event loop)"""
+        return self.metagraph is not None and self.metagraph.is_validator_cached(hotkey, min_stake)
+
+    def get_stake(self, hotkey: str) -> float:
+        """Stake (TAO) of a registered hotkey, 0.0 if unknown"""
+        return self.metagraph.get_stake(hotkey) if self.metagraph is not None else 0.0
 
     def get_wallet_balance(self) -> Optional[float]:
         """
-        Get current wallet balance in TAO.
-        Phase 1: Returns mock value
+        Get current wallet balance in TAO (refreshed with the metagraph).
 
         Returns:
             Balance in TAO, or None if failed
         """
         try:
-            # Phase 1: Mock balance
-            balance = 0.05
+            if self.metagraph is None:
+                return None
+            self.metagraph.is_registered()  # Revalidates if stale
+            balance = self.metagraph.balance
             logger.debug(f"Wallet balance: {balance} TAO")
             return balance
         except Exception as e:
@@ -92,48 +161,104 @@ class BittensorClientWrapper:
 
     def get_subnet_info(self) -> Optional[Dict[str, Any]]:
         """
-        Get information about the target subnet.
-        Phase 1: Returns mock data
+        Get information about the target subnet (cached metagraph).
 
         Returns:
             Dict with subnet info, or None if failed
         """
         try:
-            info = {
-                'subnet_id': self.subnet_id,
-                'name': f'Subnet {self.subnet_id}',
-                'active_validators': 100,
-                'active_miners': 500,
-                'current_stake': 0.05,
-                'block_number': 0,
-            }
+            if self.metagraph is None:
+                return None
+            info = {'name': f'Subnet {self.subnet_id}'}
+            info.update(self.metagraph.info())
             logger.debug(f"Subnet info retrieved: {info}")
             return info
         except Exception as e:
             logger.error(f"Failed to get subnet info: {e}")
             return None
 
-    def setup_miner(self, axon_port: int = 8000) -> bool:
+    @staticmethod
+    def backend_kind(bittensor_config: Dict[str, Any]) -> str:
+        """chain_backend from the bittensor config ('pool' if chain_pool lists endpoints, else 'mock')"""
+        kind = bittensor_config.get('chain_backend')
+        if kind:
+            return kind
+        return 'pool' if (bittensor_config.get('chain_pool') or {}).get('endpoints') else 'mock'
+
+    def _create_backend(self) -> ChainBackend:
+        """Chain access for self.chain_backend"""
+        if self.chain_backend == 'subtensor':
+            return SubtensorChainBackend(self.network, [self.subnet_id])
+        if self.chain_backend == 'pool':
+            # Persistent connections shared with every other chain caller
+            backend = RPCChainBackend(ChainConnectionPool.shared(self.pool_config))
+            backend.check_endpoint()
+            return backend
+        return self._mock_backend()
+
+    def _mock_backend(self) -> LocalChainBackend:
+        """Local chain standing in for the network in Phase 1"""
+        return self.mock_backend([(self.subnet_id, self.hotkey)])
+
+    @staticmethod
+    def mock_backend(miners: List[Tuple[int, str]]) -> LocalChainBackend:
+        """
+        Local chain with each subnet in miners holding 100 validators and
+        500 miners including our hotkeys, each hotkey with 0.05 TAO.
+
+        Args:
+            miners: (subnet_id, hotkey) pairs to register
+        """
+        backend = LocalChainBackend(start_block=1, block_time_seconds=12.0)
+        for subnet_id in sorted({subnet_id for subnet_id, _ in miners}):
+            backend.create_subnet(subnet_id)
+            for i in range(100):
+                backend.register(subnet_id, f"validator-{i}", stake=1000.0 + i, validator_permit=True)
+            ours = [hotkey for sid, hotkey in miners if sid == subnet_id]
+            for hotkey in ours:
+                backend.register(subnet_id, hotkey, stake=0.05)
+                backend.set_balance(hotkey, 0.05)
+            for i in range(500 - len(ours)):
+                backend.register(subnet_id, f"miner-{i}", stake=0.01)
+        return backend
+
+    def setup_miner(self, axon_port: int = 8000,
+                    on_task: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                    axon_config: Optional[Dict[str, Any]] = None) -> bool:
         """
         Setup miner instance for receiving tasks.
-        Phase 1: Mock setup
 
         Args:
             axon_port: Port for axon (task receiver)
+            on_task: Receives each validator request as a task; returns
+                False to shed it (None = queue for get_pending_tasks())
+            axon_config: The daemon's 'axon' section (limits, timeouts,
+                min_validator_stake, signatures)
 
         Returns:
             True if successful, False otherwise
         """
         try:
             logger.info(f"Setting up miner on port {axon_port}...")
-
-            # Phase 1: Mock miner setup
-            self.miner = type('MockMiner', (), {
-                'axon_port': axon_port,
-                'is_running': False,
-            })()
-
-            logger.info("✅ Miner setup complete (mock mode)")
+            axon_config = axon_config or {}
+            min_stake = axon_config.get('min_validator_stake', 0.0)
+
+            # Signatures are checked off the event loop by one verifier
+            # (cache and pool) shared by every axon in the daemon
+            signatures = axon_config.get('signatures', {})
+            verifier = None
+            if signatures.get('enabled', True):
+                default_scheme = 'sr25519' if self.chain_backend == 'subtensor' else 'mock'
+                verifier = SignatureVerifier.shared(signatures, default_scheme)
+
+            # Unknown callers are turned away using the cached metagraph
+            self.miner = AxonServer.from_config(
+                axon_config, port=axon_port, on_task=on_task,
+                is_allowed=lambda hotkey: self.is_validator_cached(hotkey, min_stake),
+                verifier=verifier, axon_hotkey=self.hotkey
+            )
+
+            logger.info("✅ Miner setup complete")
             return True
 
         except Exception as e:
@@ -154,8 +279,8 @@ class BittensorClientWrapper:
                 return False
 
             logger.info(f"Starting to listen for tasks on subnet {self.subnet_id}...")
-            self.miner.is_running = True
-            logger.info("✅ Miner listening (mock mode)")
+            port = self.miner.start()
+            logger.info(f"✅ Miner listening on port {port}")
             return True
 
         except Exception as e:
@@ -164,8 +289,7 @@ class BittensorClientWrapper:
 
     def get_pending_tasks(self, max_tasks: int = 10) -> list:
         """
-        Get pending tasks from validators.
-        Phase 1: Returns empty list
+        Get pending tasks from validators (when the axon has no on_task).
 
         Args:
             max_tasks: Maximum tasks to retrieve
@@ -173,13 +297,13 @@ class BittensorClientWrapper:
         Returns:
             List of task dicts
         """
-        # Phase 1: No actual task reception yet
-        return []
+        if self.miner is None:
+            return []
+        return self.miner.pop_tasks(max_tasks)
 
     def submit_response(self, task_id: str, response: str) -> bool:
         """
-        Submit response to a task.
-        Phase 1: Mock submission
+        Submit response to a task (answers the validator's pending request).
 
         Args:
             task_id: ID of the task
@@ -190,15 +314,30 @@ class BittensorClientWrapper:
         """
         try:
             logger.debug(f"Submitting response for task {task_id}")
-            # Phase 1: Mock submission
-            logger.info(f"✅ Response submitted for task {task_id} (mock mode)")
+            if self.miner is None or not self.miner.respond(task_id, 200, {'completion': response}):
+                logger.warning(f"Task {task_id} is no longer pending (timed out or caller left)")
+                return False
+            logger.info(f"✅ Response submitted for task {task_id}")
             return True
         except Exception as e:
             logger.error(f"Failed to submit response: {e}")
             return False
 
+    def decline_task(self, task_id: str, status: int = 204) -> bool:
+        """
+        Answer a task without a response (skipped, failed or malformed).
+
+        Args:
+            task_id: ID of the task
+            status: HTTP status for the caller (204 skipped, 400 malformed)
+
+        Returns:
+            True if the caller was still waiting
+        """
+        return self.miner is not None and self.miner.respond(task_id, status)
+
     def shutdown(self) -> None:
         """Shutdown the client and miner"""
         if self.miner:
-            self.miner.is_running = False
+            self.miner.stop()
         logger.info("Bittensor client shutdown")
@@ -0,0 +1,186 @@
+"""Budget pacing controller that spreads monthly allowances across the month"""
+
+import logging
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetPacer:
+    """
+    PI controller on token spend versus the ideal (linear) monthly trajectory.
+
+    The controller output is a pace factor per API:
+    - 1.0 means we are on schedule
+    - < 1.0 means we are ahead of schedule and should slow down
+    - > 1.0 means we are behind schedule and may speed up
+
+    Callers multiply participation rates and max_tokens by the pace so that
+    throughput stays smooth all month instead of a binge followed by a hard stop.
+    Controller state is shared by all worker threads and guarded by a lock.
+    """
+
+    def __init__(self, pacing_config: Optional[Dict[str, Any]] = None,
+                 tracking_config: Optional[Dict[str, Any]] = None,
+                 buffer_percent: float = 0.1):
+        """
+        Args:
+            pacing_config: 'pacing' section of token-budgets.json
+            tracking_config: 'tracking' section of token-budgets.json
+            buffer_percent: Share of the allowance kept in reserve (0-1)
+        """
+        pacing_config = pacing_config or {}
+        tracking_config = tracking_config or {}
+
+        self.enabled = pacing_config.get('enabled', True)
+        self.kp = pacing_config.get('kp', 2.0)
+        self.ki = pacing_config.get('ki', 0.5)
+        self.min_pace = pacing_config.get('min_pace', 0.2)
+        self.max_pace = pacing_config.get('max_pace', 1.5)
+        self.rate_window_hours = pacing_config.get('rate_window_hours', 6)
+        self.reset_day = tracking_config.get('reset_day_of_month', 1)
+        self.buffer_percent = buffer_percent
+
+        self._integral = {}       # api -> accumulated error (fraction * days)
+        self._last_update = {}    # api -> datetime of last controller step
+        self._decayed_spend = {}  # api -> exponentially decayed token sum
+        self._last_spend = {}     # api -> datetime of last decay
+        self._first_spend = {}    # api -> datetime of first observed spend
+        self._lock = threading.RLock()
+        logger.debug("BudgetPacer initialized")
+
+    def period_bounds(self, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+        """Get (start, end) of the billing period containing now"""
+        now = now or datetime.utcnow()
+        day = min(self.reset_day, 28)
+
+        start = now.replace(day=day, hour=0, minute=0, second=0, microsecond=0)
+        if now < start:
+            start = self._add_months(start, -1)
+        end = self._add_months(start, 1)
+        return start, end
+
+    def elapsed_fraction(self, now: Optional[datetime] = None) -> float:
+        """Share of the billing period that has elapsed (0-1)"""
+        now = now or datetime.utcnow()
+        start, end = self.period_bounds(now)
+        return (now - start).total_seconds() / (end - start).total_seconds()
+
+    def record_spend(self, api_name: str, tokens: int,
+                     now: Optional[datetime] = None) -> None:
+        """Feed an observed spend into the burn-rate estimate"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._decay(api_name, now)
+            self._decayed_spend[api_name] = self._decayed_spend.get(api_name, 0.0) + tokens
+            self._first_spend.setdefault(api_name, now)
+
+    def burn_rate_per_hour(self, api_name: str, used: int,
+                           now: Optional[datetime] = None) -> float:
+        """
+        Estimate current burn rate (tokens/hour).
+        Uses the recent decayed spend once enough history is observed,
+        otherwise the average rate since the start of the period.
+        """
+        now = now or datetime.utcnow()
+        with self._lock:
+            first = self._first_spend.get(api_name)
+            if first and (now - first).total_seconds() >= self.rate_window_hours * 3600:
+                self._decay(api_name, now)
+                return self._decayed_spend.get(api_name, 0.0) / self.rate_window_hours
+
+        start, _ = self.period_bounds(now)
+        elapsed_hours = max((now - start).total_seconds() / 3600, 1.0)
+        return used / elapsed_hours
+
+    def get_pace(self, api_name: str, used: int, allowance: int,
+                 now: Optional[datetime] = None) -> float:
+        """
+        Run one controller step and return the pace factor for an API.
+
+        Args:
+            api_name: Name of the LLM API
+            used: Tokens used this period
+            allowance: Monthly allowance
+
+        Returns:
+            Pace factor clamped to [min_pace, max_pace]
+        """
+        if not self.enabled or allowance <= 0:
+            return 1.0
+
+        now = now or datetime.utcnow()
+        usable = allowance * (1.0 - self.buffer_percent)
+        ideal_used = usable * self.elapsed_fraction(now)
+
+        # Positive error: behind schedule; negative: overspending
+        error = (ideal_used - used) / usable
+
+        with self._lock:
+            last = self._last_update.get(api_name)
+            if last is not None and now > last:
+                dt_days = (now - last).total_seconds() / 86400
+                integral = self._integral.get(api_name, 0.0) + error * dt_days
+                # Anti-windup: the integral alone can never push past the clamps
+                limit = max(self.max_pace - 1.0, 1.0 - self.min_pace) / self.ki if self.ki else 0.0
+                self._integral[api_name] = max(-limit, min(limit, integral))
+            if last is None or now > last:
+                self._last_update[api_name] = now
+            integral = self._integral.get(api_name, 0.0)
+
+        pace = 1.0 + self.kp * error + self.ki * integral
+        return max(self.min_pace, min(self.max_pace, pace))
+
+    def projected_exhaustion(self, api_name: str, used: int, allowance: int,
+                             now: Optional[datetime] = None) -> Optional[datetime]:
+        """
+        Project when the allowance runs out at the current burn rate.
+
+        Returns:
+            Projected exhaustion time, or None if spend is idle
+        """
+        now = now or datetime.utcnow()
+        remaining = allowance - used
+        if remaining <= 0:
+            return now
+
+        rate = self.burn_rate_per_hour(api_name, used, now)
+        if rate <= 0:
+            return None
+        return now + timedelta(hours=remaining / rate)
+
+    def get_status(self, api_name: str, used: int, allowance: int,
+                   now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get pacing status for an API (for heartbeat checks and reports)"""
+        now = now or datetime.utcnow()
+        _, period_end = self.period_bounds(now)
+        exhaustion = self.projected_exhaustion(api_name, used, allowance, now)
+        usable = allowance * (1.0 - self.buffer_percent)
+
+        return {
+            'pace': round(self.get_pace(api_name, used, allowance, now), 3),
+            'ideal_used': int(usable * self.elapsed_fraction(now)),
+            'used': used,
+            'burn_rate_per_day': int(self.burn_rate_per_hour(api_name, used, now) * 24),
+            'projected_exhaustion': exhaustion.isoformat() if exhaustion else None,
+            'exhausts_before_reset': bool(exhaustion and exhaustion < period_end),
+            'period_end': period_end.isoformat(),
+        }
+
+    def _decay(self, api_name: str, now: datetime) -> None:
+        """Decay the spend sum to now"""
+        last = self._last_spend.get(api_name)
+        if last is not None and now > last:
+            hours = (now - last).total_seconds() / 3600
+            factor = math.exp(-hours / self.rate_window_hours)
+            self._decayed_spend[api_name] = self._decayed_spend.get(api_name, 0.0) * factor
+        self._last_spend[api_name] = now
+
+    @staticmethod
+    def _add_months(dt: datetime, months: int) -> datetime:
+        """Shift a datetime by whole months (day must be <= 28)"""
+        month_index = dt.month - 1 + months
+        return dt.replace(year=dt.year + month_index // 12, month=month_index % 12 + 1)
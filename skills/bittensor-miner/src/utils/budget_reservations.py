@@ -0,0 +1,333 @@
+"""Cross-process token budget reservations (reserve/commit/release)"""
+
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple, List
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetReservations:
+    """
+    Shared counter segment for budget reservations across worker processes.
+
+    A small fixed-layout file is memory-mapped by every process and guarded
+    by an exclusive flock, so check-and-reserve is atomic across workers:
+    two processes can no longer both pass the budget check and overspend a
+    hard limit. Each operation is a handful of struct reads/writes.
+
+    The billing period the counters belong to is kept in the header, so
+    the first process to cross a period boundary resets usage once and
+    every other process sees the period already rolled (roll_period).
+
+    Layout:
+        header: magic, max_apis, max_slots, generation, period start
+        apis:   name, used (committed this period), reserved (in flight)
+        slots:  reservation id, api index, pid, tokens, deadline
+    """
+
+    MAGIC = b'OCBRES02'
+    HEADER = struct.Struct('<8sIIQd')
+    API_ENTRY = struct.Struct('<32sqq')
+    SLOT = struct.Struct('<qiiqd')
+
+    # Full expiry scans run at most this often per process
+    REAP_INTERVAL_SECONDS = 1.0
+
+    def __init__(self, path: str = "state/budget-reservations.bin",
+                 max_apis: int = 16, max_slots: int = 256,
+                 default_ttl_seconds: float = 90.0):
+        self.path = Path(path)
+        self.max_apis = max_apis
+        self.max_slots = max_slots
+        self.default_ttl_seconds = default_ttl_seconds
+
+        self._api_offset = self.HEADER.size
+        self._slot_offset = self._api_offset + max_apis * self.API_ENTRY.size
+        self._size = self._slot_offset + max_slots * self.SLOT.size
+        self._api_index = {}  # name -> index (names never move once written)
+        self._thread_lock = threading.Lock()
+        self._last_reap = 0.0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._locked():
+            if os.fstat(self._fd).st_size < self._size:
+                os.ftruncate(self._fd, self._size)
+            self._mm = mmap.mmap(self._fd, self._size)
+            magic, apis, slots, _, _ = self.HEADER.unpack_from(self._mm, 0)
+            if magic != self.MAGIC:
+                # New (or older-layout) segment: start empty, usage is
+                # re-registered from the ledger by register_apis()
+                self._mm[:] = bytes(self._size)
+                self.HEADER.pack_into(self._mm, 0, self.MAGIC, max_apis, max_slots, 0, 0.0)
+            elif (apis, slots) != (max_apis, max_slots):
+                raise ValueError(
+                    f"Reservation segment {self.path} has layout {apis}x{slots}, "
+                    f"expected {max_apis}x{max_slots}"
+                )
+            self._load_api_index()
+
+        logger.debug(f"BudgetReservations mapped at {self.path}")
+
+    @classmethod
+    def from_config(cls, reservations_config: Dict) -> 'BudgetReservations':
+        """Create from the 'reservations' section of token-budgets.json"""
+        return cls(
+            path=reservations_config.get('path', 'state/budget-reservations.bin'),
+            max_apis=reservations_config.get('max_apis', 16),
+            max_slots=reservations_config.get('max_slots', 256),
+            default_ttl_seconds=reservations_config.get('default_ttl_seconds', 90.0),
+        )
+
+    def register_apis(self, used: Dict[str, int]) -> None:
+        """
+        Make sure every API has a counter; new counters start at the given usage.
+        Existing counters are left alone (another process may own newer values).
+        """
+        with self._locked():
+            self._load_api_index()
+            for api_name, tokens in used.items():
+                if api_name in self._api_index:
+                    continue
+                index = len(self._api_index)
+                if index >= self.max_apis:
+                    raise ValueError(f"Reservation segment full ({self.max_apis} APIs)")
+                name = api_name.encode()[:32]
+                self.API_ENTRY.pack_into(self._mm, self._api_pos(index), name, int(tokens), 0)
+                self._api_index[api_name] = index
+
+    def reserve(self, api_name: str, tokens: int, limit: Optional[int] = None,
+                ttl_seconds: Optional[float] = None) -> Optional[int]:
+        """
+        Atomically reserve tokens against an API's limit.
+
+        Args:
+            api_name: Name of the LLM API
+            tokens: Estimated tokens for the task
+            limit: Maximum used + reserved allowed (None = unlimited)
+            ttl_seconds: Reservation auto-releases after this long
+
+        Returns:
+            Reservation id, or None if the limit or slot table is exhausted
+        """
+        ttl = ttl_seconds if ttl_seconds is not None else self.default_ttl_seconds
+        now = time.time()
+        with self._locked():
+            index = self._get_api_index(api_name)
+            if index is None:
+                return None
+
+            free_slot = None
+            if now - self._last_reap < self.REAP_INTERVAL_SECONDS:
+                free_slot = self._find_free_slot()
+            if free_slot is None:
+                free_slot = self._reap_expired(now)
+            _, used, reserved = self._read_api(index)
+            if limit is not None and used + reserved + tokens > limit:
+                return None
+            if free_slot is None:
+                logger.warning("No free reservation slots")
+                return None
+
+            generation = self._next_generation()
+            reservation_id = (generation << 16) | free_slot
+            self.SLOT.pack_into(self._mm, self._slot_pos(free_slot),
+                                reservation_id, index, os.getpid(), tokens, now + ttl)
+            self._write_api(index, used, reserved + tokens)
+            return reservation_id
+
+    def commit(self, reservation_id: int, api_name: str, actual_tokens: int) -> bool:
+        """
+        Convert a reservation into committed usage.
+
+        Returns:
+            False if the reservation was unknown (e.g. expired and reaped);
+            usage is still committed so it is never lost.
+        """
+        with self._locked():
+            slot = self._take_slot(reservation_id)
+            if slot is None:
+                logger.warning(f"Committing unknown/expired reservation {reservation_id}")
+                index, tokens = self._get_api_index(api_name), 0
+                if index is None:
+                    return False
+            else:
+                index, tokens = slot
+            _, used, reserved = self._read_api(index)
+            self._write_api(index, used + actual_tokens, reserved - tokens)
+            return slot is not None
+
+    def release(self, reservation_id: int) -> bool:
+        """Release a reservation without using it (inference failed/skipped)"""
+        with self._locked():
+            slot = self._take_slot(reservation_id)
+            if slot is None:
+                return False
+            index, tokens = slot
+            _, used, reserved = self._read_api(index)
+            self._write_api(index, used, reserved - tokens)
+            return True
+
+    def add_usage(self, api_name: str, tokens: int) -> None:
+        """Commit usage that never went through reserve()"""
+        with self._locked():
+            index = self._get_api_index(api_name)
+            if index is None:
+                return
+            _, used, reserved = self._read_api(index)
+            self._write_api(index, used + tokens, reserved)
+
+    def get_usage(self, api_name: str) -> Tuple[int, int]:
+        """Get (used, reserved) for an API"""
+        with self._locked():
+            index = self._get_api_index(api_name)
+            if index is None:
+                return 0, 0
+            now = time.time()
+            if now - self._last_reap >= self.REAP_INTERVAL_SECONDS:
+                self._reap_expired(now)
+            _, used, reserved = self._read_api(index)
+            return used, reserved
+
+    def reset_usage(self) -> None:
+        """Zero committed usage for all APIs (manual reset)"""
+        with self._locked():
+            self._zero_usage()
+
+    def roll_period(self, period_start: float, last_reset: Optional[float] = None) -> bool:
+        """
+        Move the segment into the billing period starting at period_start,
+        zeroing committed usage if it still belongs to an earlier period.
+        Compare-and-reset under the lock: exactly one process resets.
+
+        Args:
+            period_start: Unix timestamp the current billing period started
+            last_reset: Last known reset (tracking.last_reset), used when
+                the segment has no period recorded yet
+
+        Returns:
+            True if this call reset usage; False if the period was current
+            (including when another process already rolled it)
+        """
+        with self._locked():
+            magic, apis, slots, generation, current = self.HEADER.unpack_from(self._mm, 0)
+            if not current and last_reset is not None:
+                current = last_reset
+            rolled = current < period_start
+            if rolled:
+                self._zero_usage()
+            self.HEADER.pack_into(self._mm, 0, magic, apis, slots, generation, max(current, period_start))
+            return rolled
+
+    def get_period_start(self) -> float:
+        """Start of the billing period the counters belong to (0.0 if never set)"""
+        with self._locked():
+            return self.HEADER.unpack_from(self._mm, 0)[4]
+
+    def close(self) -> None:
+        """Unmap the segment"""
+        with self._thread_lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock across threads (mutex) and processes (flock)"""
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _api_pos(self, index: int) -> int:
+        return self._api_offset + index * self.API_ENTRY.size
+
+    def _slot_pos(self, index: int) -> int:
+        return self._slot_offset + index * self.SLOT.size
+
+    def _read_api(self, index: int) -> Tuple[bytes, int, int]:
+        return self.API_ENTRY.unpack_from(self._mm, self._api_pos(index))
+
+    def _write_api(self, index: int, used: int, reserved: int) -> None:
+        name = self.API_ENTRY.unpack_from(self._mm, self._api_pos(index))[0]
+        self.API_ENTRY.pack_into(self._mm, self._api_pos(index), name, used, max(0, reserved))
+
+    def _load_api_index(self) -> None:
+        """Refresh the name -> index map from the segment (lock held)"""
+        self._api_index = {}
+        for index in range(self.max_apis):
+            name = self._read_api(index)[0].rstrip(b'\0')
+            if not name:
+                break
+            self._api_index[name.decode()] = index
+
+    def _get_api_index(self, api_name: str) -> Optional[int]:
+        """Look up an API, picking up registrations from other processes (lock held)"""
+        if api_name not in self._api_index:
+            self._load_api_index()
+        return self._api_index.get(api_name)
+
+    def _next_generation(self) -> int:
+        magic, apis, slots, generation, period_start = self.HEADER.unpack_from(self._mm, 0)
+        generation += 1
+        self.HEADER.pack_into(self._mm, 0, magic, apis, slots, generation, period_start)
+        return generation
+
+    def _zero_usage(self) -> None:
+        """Zero committed usage for every registered API (lock held)"""
+        self._load_api_index()
+        for index in self._api_index.values():
+            _, _, reserved = self._read_api(index)
+            self._write_api(index, 0, reserved)
+
+    def _take_slot(self, reservation_id: int) -> Optional[Tuple[int, int]]:
+        """Free a slot if it still holds this reservation; returns (api index, tokens)"""
+        slot = reservation_id & 0xFFFF
+        if slot >= self.max_slots:
+            return None
+        slot_id, index, _, tokens, _ = self.SLOT.unpack_from(self._mm, self._slot_pos(slot))
+        if slot_id != reservation_id:
+            return None
+        self.SLOT.pack_into(self._mm, self._slot_pos(slot), 0, 0, 0, 0, 0.0)
+        return index, tokens
+
+    def _find_free_slot(self) -> Optional[int]:
+        """First free slot, without reaping (lock held)"""
+        for slot in range(self.max_slots):
+            if not self.SLOT.unpack_from(self._mm, self._slot_pos(slot))[0]:
+                return slot
+        return None
+
+    def _reap_expired(self, now: float) -> Optional[int]:
+        """Release expired reservations; returns the first free slot (lock held)"""
+        self._last_reap = now
+        free_slot = None
+        expired: List[Tuple[int, int]] = []
+        for slot in range(self.max_slots):
+            slot_id, index, _, tokens, deadline = self.SLOT.unpack_from(self._mm, self._slot_pos(slot))
+            if slot_id and deadline < now:
+                self.SLOT.pack_into(self._mm, self._slot_pos(slot), 0, 0, 0, 0, 0.0)
+                expired.append((index, tokens))
+                slot_id = 0
+            if not slot_id and free_slot is None:
+                free_slot = slot
+
+        for index, tokens in expired:
+            _, used, reserved = self._read_api(index)
+            self._write_api(index, used, reserved - tokens)
+        if expired:
+            logger.warning(f"Released {len(expired)} expired budget reservations")
+        return free_slot
@@ -0,0 +1,193 @@
+"""Per-subnet task queues and concurrency bulkheads"""
+
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional, Callable
+
+from .fair_queue import StakeWeightedQueue
+
+logger = logging.getLogger(__name__)
+
+
+class SubnetBulkhead:
+    """
+    One subnet's bounded queue and fixed pool of worker threads.
+
+    Each subnet gets its own workers, so a subnet whose tasks are slow
+    (long generations, slow validators) can only fill its own queue and
+    occupy its own workers; other subnets keep their full concurrency.
+    When the queue is full new tasks are rejected immediately rather than
+    queued behind work that would miss their deadline, and tasks whose
+    deadline passed while queued are dropped unprocessed.
+
+    Within a subnet, waiting tasks are served stake-weighted per validator
+    (StakeWeightedQueue). A full queue may evict a lighter validator's
+    task to admit a heavier one's; the evicted task is passed to on_result
+    with result None and reject_status 503.
+    """
+
+    def __init__(self, subnet_id: int, handler: Callable[[Dict[str, Any]], Any],
+                 max_concurrent: int = 3, queue_size: int = 50,
+                 on_result: Optional[Callable[[Dict[str, Any], Any], None]] = None,
+                 weight_of: Optional[Callable[[str], float]] = None,
+                 max_queued_per_caller: Optional[int] = None):
+        """
+        Args:
+            subnet_id: Subnet this bulkhead serves
+            handler: Called with each task on a worker thread
+            max_concurrent: Worker threads (tasks in progress at once)
+            queue_size: Tasks allowed to wait
+            on_result: Called with (task, handler result) after each task
+            weight_of: Caller hotkey -> stake for fair queueing (None = equal)
+            max_queued_per_caller: Tasks one validator may have waiting
+                (None = the whole queue)
+        """
+        self.subnet_id = subnet_id
+        self.handler = handler
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.on_result = on_result
+
+        self._queue = StakeWeightedQueue(queue_size, max_queued_per_caller or queue_size, weight_of)
+        self._workers = []
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {'accepted': 0, 'rejected': 0, 'evicted': 0, 'expired': 0,
+                      'declined_on_stop': 0, 'processed': 0, 'failed': 0, 'busy_seconds': 0.0}
+
+    def start(self) -> None:
+        """Start the worker threads"""
+        for i in range(self.max_concurrent):
+            worker = threading.Thread(target=self._work, name=f"subnet-{self.subnet_id}-worker-{i}",
+                                      daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        logger.info(f"Subnet {self.subnet_id} bulkhead: {self.max_concurrent} workers, "
+                    f"queue {self.queue_size}")
+
+    def submit(self, task: Dict[str, Any]) -> bool:
+        """
+        Queue a task without blocking.
+
+        Returns:
+            False if the subnet's queue (or the caller's share of it) is
+            full and the task was rejected
+        """
+        accepted, evicted = self._queue.put(task)
+        if not accepted:
+            self.stats['rejected'] += 1
+            logger.warning(f"Subnet {self.subnet_id} queue full, rejecting task {task.get('id')} "
+                           f"from {task.get('caller')}")
+            return False
+        self.stats['accepted'] += 1
+        if evicted is not None:
+            self.stats['evicted'] += 1
+            logger.info(f"Subnet {self.subnet_id}: task {evicted.get('id')} from {evicted.get('caller')} "
+                        f"evicted for higher-stake {task.get('caller')}")
+            evicted['reject_status'] = 503
+            self._report(evicted, None)
+        return True
+
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue depth, tasks in progress and counters"""
+        return dict(self.stats, queued=self.queued(), in_flight=self.in_flight,
+                    max_concurrent=self.max_concurrent, waiting_by_caller=self._queue.waiting())
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Let workers finish their current task and exit. Tasks still
+        waiting are declined with 503 so their callers aren't left to
+        time out.
+        """
+        self._queue.close()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        self._workers = []
+        for task in self._queue.drain():
+            self.stats['declined_on_stop'] += 1
+            task['reject_status'] = 503
+            self._report(task, None)
+
+    def poll(self) -> Optional[Dict[str, Any]]:
+        """Next waiting task without blocking (None if the queue is empty)"""
+        return self._queue.get(timeout=0)
+
+    def run(self, task: Dict[str, Any]) -> None:
+        """
+        Process one dequeued task: drop it if its deadline has passed,
+        otherwise run the handler and report the result. Worker threads
+        call this; the simulator calls it directly with poll().
+        """
+        deadline = task.get('deadline')
+        if deadline is not None and time.time() >= float(deadline):
+            self.stats['expired'] += 1
+            logger.debug(f"Task {task.get('id')} expired in the subnet {self.subnet_id} queue")
+            return
+
+        with self._lock:
+            self.in_flight += 1
+        started = time.monotonic()
+        result = None
+        try:
+            result = self.handler(task)
+            self.stats['processed' if result else 'failed'] += 1
+        except Exception as e:
+            self.stats['failed'] += 1
+            logger.error(f"Subnet {self.subnet_id} task {task.get('id')} failed: {e}")
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.stats['busy_seconds'] += time.monotonic() - started
+
+        self._report(task, result)
+
+    def _work(self) -> None:
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            self.run(task)
+
+    def _report(self, task: Dict[str, Any], result: Any) -> None:
+        if self.on_result:
+            try:
+                self.on_result(task, result)
+            except Exception as e:
+                logger.error(f"Subnet {self.subnet_id} result callback failed: {e}")
+
+
+class BulkheadGroup:
+    """Bulkheads keyed by subnet, behind one submit() for the daemon"""
+
+    def __init__(self):
+        self.bulkheads: Dict[int, SubnetBulkhead] = {}
+
+    def add(self, bulkhead: SubnetBulkhead) -> None:
+        self.bulkheads[bulkhead.subnet_id] = bulkhead
+
+    def start(self) -> None:
+        for bulkhead in self.bulkheads.values():
+            bulkhead.start()
+
+    def submit(self, task: Dict[str, Any]) -> bool:
+        """Route a task to its subnet's bulkhead (False if unknown or full)"""
+        bulkhead = self.bulkheads.get(task.get('subnet_id'))
+        if bulkhead is None:
+            logger.warning(f"No bulkhead for subnet {task.get('subnet_id')}, dropping task {task.get('id')}")
+            return False
+        return bulkhead.submit(task)
+
+    def processed(self) -> int:
+        return sum(bulkhead.stats['processed'] for bulkhead in self.bulkheads.values())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {str(subnet_id): bulkhead.snapshot() for subnet_id, bulkhead in self.bulkheads.items()}
+
+    def stop(self, timeout: float = 5.0) -> None:
+        for bulkhead in self.bulkheads.values():
+            bulkhead.stop(timeout)
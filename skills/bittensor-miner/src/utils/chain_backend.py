@@ -0,0 +1,257 @@
+"""Chain access interface and an in-memory stand-in chain"""
+
+import abc
+import bisect
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+
+class ChainBackend(abc.ABC):
+    """
+    What the miner needs from the chain. Everything above this (metagraph
+    cache, client wrapper) talks to the chain only through these calls, so
+    a Subtensor-backed implementation can replace LocalChainBackend
+    without touching the callers. A backend missing any of the abstract
+    calls fails at construction rather than on first use.
+    """
+
+    @abc.abstractmethod
+    def get_block_number(self) -> int:
+        """Current block height"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_metagraph(self, netuid: int) -> Dict[str, Any]:
+        """
+        Full metagraph of a subnet.
+
+        Returns:
+            {'netuid', 'block', 'tempo', 'neurons': [neuron dicts]} where a
+            neuron has uid, hotkey, coldkey, stake, validator_permit,
+            active and last_update
+        """
+        raise NotImplementedError
+
+    def get_neuron_updates(self, netuid: int, since_block: int) -> Optional[Dict[str, Any]]:
+        """
+        Neurons changed after since_block.
+
+        Returns:
+            {'block', 'neurons': [changed neuron dicts], 'removed': [uids]},
+            or None if the backend can't answer incrementally (the caller
+            then fetches the full metagraph)
+        """
+        return None
+
+    @abc.abstractmethod
+    def get_balance(self, address: str) -> float:
+        """Free balance of a coldkey/hotkey in TAO"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_earning_events(self, addresses: List[str], from_block: int,
+                           to_block: int) -> List[Dict[str, Any]]:
+        """
+        Emissions and incoming transfers to addresses in a block range.
+
+        Args:
+            addresses: Hotkeys/coldkeys whose income to report
+            from_block: First block (inclusive)
+            to_block: Last block (inclusive)
+
+        Returns:
+            Events in block order: {'block', 'ts', 'kind' ('emission' or
+            'transfer'), 'address', 'amount' (TAO), 'netuid' (emissions)}
+        """
+        raise NotImplementedError
+
+
+class LocalChainBackend(ChainBackend):
+    """
+    In-memory chain for mock mode, tests and benchmarks.
+
+    Subnets, registrations, stakes and balances are plain dicts. Like
+    extrinsics, mutations take effect in the next block: they are logged
+    with block + 1 and show up in get_neuron_updates() once the chain has
+    advanced past the caller's last sync. Blocks advance with advance(),
+    or with wall time when block_time_seconds is given. Every call is
+    counted in self.calls so tests can assert how often the chain was hit.
+    """
+
+    def __init__(self, start_block: int = 0,
+                 block_time_seconds: Optional[float] = None,
+                 change_log_blocks: int = 7200):
+        """
+        Args:
+            start_block: Initial block height
+            block_time_seconds: Advance one block per this many seconds
+                (None = only advance() moves the chain)
+            change_log_blocks: How far back incremental updates can reach
+        """
+        self._start_block = start_block
+        self._manual_blocks = 0
+        self._started = time.monotonic()
+        self.block_time_seconds = block_time_seconds
+        self.change_log_blocks = change_log_blocks
+
+        self.subnets: Dict[int, Dict[str, Any]] = {}
+        self.balances: Dict[str, float] = {}
+        self.events: List[Dict[str, Any]] = []  # Emissions and transfers, in block order
+        self._event_blocks: List[int] = []       # Block of each event, for range lookups
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    # Chain state changes -------------------------------------------------
+
+    def create_subnet(self, netuid: int, tempo: int = 360) -> None:
+        """Add an empty subnet (no-op if it exists)"""
+        with self._lock:
+            self.subnets.setdefault(netuid, {'tempo': tempo, 'neurons': {}, 'changes': [], 'next_uid': 0})
+
+    def register(self, netuid: int, hotkey: str, coldkey: Optional[str] = None,
+                 stake: float = 0.0, validator_permit: bool = False) -> int:
+        """
+        Register a hotkey on a subnet.
+
+        Returns:
+            The neuron's UID
+        """
+        self.create_subnet(netuid)
+        with self._lock:
+            subnet = self.subnets[netuid]
+            for neuron in subnet['neurons'].values():
+                if neuron['hotkey'] == hotkey:
+                    return neuron['uid']
+            uid = subnet['next_uid']
+            subnet['next_uid'] += 1
+            subnet['neurons'][uid] = {
+                'uid': uid,
+                'hotkey': hotkey,
+                'coldkey': coldkey or hotkey,
+                'stake': float(stake),
+                'validator_permit': validator_permit,
+                'active': True,
+                'last_update': self._block() + 1,
+            }
+            self._log_change(subnet, uid)
+            return uid
+
+    def deregister(self, netuid: int, hotkey: str) -> bool:
+        """Remove a hotkey from a subnet (its UID stays free)"""
+        with self._lock:
+            subnet = self.subnets.get(netuid, {'neurons': {}})
+            for uid, neuron in list(subnet['neurons'].items()):
+                if neuron['hotkey'] == hotkey:
+                    del subnet['neurons'][uid]
+                    self._log_change(subnet, uid)
+                    return True
+            return False
+
+    def set_stake(self, netuid: int, hotkey: str, stake: float,
+                  validator_permit: Optional[bool] = None) -> bool:
+        """Change a neuron's stake (and optionally its validator permit)"""
+        with self._lock:
+            for neuron in self.subnets.get(netuid, {'neurons': {}})['neurons'].values():
+                if neuron['hotkey'] == hotkey:
+                    neuron['stake'] = float(stake)
+                    if validator_permit is not None:
+                        neuron['validator_permit'] = validator_permit
+                    neuron['last_update'] = self._block() + 1
+                    self._log_change(self.subnets[netuid], neuron['uid'])
+                    return True
+            return False
+
+    def set_balance(self, address: str, tao: float) -> None:
+        """Set the free balance of an address"""
+        with self._lock:
+            self.balances[address] = float(tao)
+
+    def credit(self, address: str, amount: float, netuid: Optional[int] = None,
+               kind: str = 'emission', ts: Optional[float] = None) -> None:
+        """
+        Pay TAO to an address in the next block (an emission when netuid
+        is given, otherwise a transfer) and log the event.
+        """
+        with self._lock:
+            self.balances[address] = self.balances.get(address, 0.0) + amount
+            self._event_blocks.append(self._block() + 1)
+            self.events.append({
+                'block': self._block() + 1,
+                'ts': ts if ts is not None else time.time(),
+                'kind': kind if netuid is not None else 'transfer',
+                'address': address,
+                'amount': float(amount),
+                'netuid': netuid,
+            })
+
+    def advance(self, blocks: int = 1) -> int:
+        """Produce blocks; returns the new height"""
+        with self._lock:
+            self._manual_blocks += blocks
+            return self._block()
+
+    # ChainBackend ---------------------------------------------------------
+
+    def get_block_number(self) -> int:
+        self.calls['get_block_number'] += 1
+        with self._lock:
+            return self._block()
+
+    def get_metagraph(self, netuid: int) -> Dict[str, Any]:
+        self.calls['get_metagraph'] += 1
+        with self._lock:
+            subnet = self.subnets.get(netuid, {'tempo': 360, 'neurons': {}})
+            return {
+                'netuid': netuid,
+                'block': self._block(),
+                'tempo': subnet['tempo'],
+                'neurons': [dict(neuron) for neuron in subnet['neurons'].values()],
+            }
+
+    def get_neuron_updates(self, netuid: int, since_block: int) -> Optional[Dict[str, Any]]:
+        self.calls['get_neuron_updates'] += 1
+        with self._lock:
+            block = self._block()
+            subnet = self.subnets.get(netuid)
+            if subnet is None or since_block < block - self.change_log_blocks:
+                return None
+            changed = {uid for change_block, uid in subnet['changes']
+                       if since_block < change_block <= block}
+            neurons = [dict(subnet['neurons'][uid]) for uid in changed if uid in subnet['neurons']]
+            removed = [uid for uid in changed if uid not in subnet['neurons']]
+            return {'block': block, 'neurons': neurons, 'removed': removed}
+
+    def get_balance(self, address: str) -> float:
+        self.calls['get_balance'] += 1
+        with self._lock:
+            return self.balances.get(address, 0.0)
+
+    def get_earning_events(self, addresses: List[str], from_block: int,
+                           to_block: int) -> List[Dict[str, Any]]:
+        self.calls['get_earning_events'] += 1
+        wanted = set(addresses)
+        with self._lock:
+            to_block = min(to_block, self._block())
+            start = bisect.bisect_left(self._event_blocks, from_block)
+            end = bisect.bisect_right(self._event_blocks, to_block)
+            return [dict(event) for event in self.events[start:end] if event['address'] in wanted]
+
+    def _block(self) -> int:
+        """Current height (lock held)"""
+        block = self._start_block + self._manual_blocks
+        if self.block_time_seconds:
+            block += int((time.monotonic() - self._started) / self.block_time_seconds)
+        return block
+
+    def _log_change(self, subnet: Dict[str, Any], uid: int) -> None:
+        """Record that uid changes in the next block; trim what's too old to ask for (lock held)"""
+        block = self._block()
+        subnet['changes'].append((block + 1, uid))
+        oldest = block - self.change_log_blocks
+        if subnet['changes'][0][0] < oldest:
+            subnet['changes'] = [change for change in subnet['changes'] if change[0] >= oldest]
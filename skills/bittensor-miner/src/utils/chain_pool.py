@@ -0,0 +1,608 @@
+"""Persistent, pipelined chain RPC connections (FakeChainEndpoint protocol, for tests and benchmarks)"""
+
+import atexit
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+import socket
+import ssl
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, List, Tuple, Callable
+from urllib.parse import urlparse
+
+from .chain_backend import ChainBackend
+
+logger = logging.getLogger(__name__)
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OP_CONTINUATION, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+# Methods RPCChainBackend needs; only FakeChainEndpoint serves the non-standard ones
+MINER_METHODS = ('chain_getHeader', 'neuron_getMetagraph', 'neuron_getUpdates',
+                 'balance_get', 'earnings_getEvents')
+
+
+class ChainRPCError(Exception):
+    """Error returned by the node for a request"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"RPC error {code}: {message}")
+        self.code = code
+        self.message = message
+
+
+class ChainUnavailable(ConnectionError):
+    """No healthy connection to any endpoint right now"""
+
+
+def ws_accept_key(key: str) -> str:
+    """Sec-WebSocket-Accept value for a Sec-WebSocket-Key"""
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def _mask(payload: bytes, key: bytes) -> bytes:
+    """XOR payload with the repeating 4-byte key (both directions)"""
+    length = len(payload)
+    keystream = (key * (length // 4 + 1))[:length]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(keystream, 'big')).to_bytes(length, 'big')
+
+
+def ws_send_frame(sock: socket.socket, opcode: int, payload: bytes, mask: bool) -> None:
+    """Write one unfragmented WebSocket frame (clients must mask, servers must not)"""
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack('!H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('!Q', length)
+    if mask:
+        key = os.urandom(4)
+        header += key
+        payload = _mask(payload, key)
+    sock.sendall(bytes(header) + payload)
+
+
+def ws_recv_frame(rfile) -> Tuple[bool, int, bytes]:
+    """
+    Read one WebSocket frame.
+
+    Returns:
+        (fin, opcode, unmasked payload)
+
+    Raises:
+        ConnectionError: if the stream ends mid-frame
+    """
+    def read(n: int) -> bytes:
+        data = rfile.read(n)
+        if len(data) < n:
+            raise ConnectionError("WebSocket closed")
+        return data
+
+    first, second = read(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', read(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', read(8))[0]
+    key = read(4) if second & 0x80 else None
+    payload = read(length)
+    if key:
+        payload = _mask(payload, key)
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+class WebSocketTransport:
+    """
+    Minimal RFC 6455 client (text messages, ping/pong, close) over a plain
+    or TLS socket. Substrate nodes serve JSON-RPC on ws:// and wss://.
+    """
+
+    def __init__(self, url: str, connect_timeout: float = 5.0, send_timeout: float = 10.0):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.send_timeout = send_timeout
+        self.sock: Optional[socket.socket] = None
+        self._rfile = None
+        self._send_lock = threading.Lock()
+
+    def connect(self) -> None:
+        """Open the socket and complete the upgrade handshake"""
+        parsed = urlparse(self.url)
+        secure = parsed.scheme == 'wss'
+        port = parsed.port or (443 if secure else 80)
+        sock = socket.create_connection((parsed.hostname, port), timeout=self.connect_timeout)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parsed.hostname)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = parsed.path or '/'
+        sock.sendall((
+            f"GET {path} HTTP/1.1\r\nHost: {parsed.hostname}:{port}\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        rfile = sock.makefile('rb')
+        status = rfile.readline().decode('latin-1')
+        headers = {}
+        for line in iter(rfile.readline, b'\r\n'):
+            if not line:
+                sock.close()
+                raise ConnectionError("Handshake interrupted")
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if ' 101 ' not in status or headers.get('sec-websocket-accept') != ws_accept_key(key):
+            sock.close()
+            raise ConnectionError(f"WebSocket handshake with {self.url} failed: {status.strip()}")
+
+        # The reader blocks (liveness comes from timeouts and health checks),
+        # but a send into a stalled peer's full window fails after send_timeout
+        sock.settimeout(None)
+        seconds = max(0.001, self.send_timeout)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO,
+                        struct.pack('ll', int(seconds), int(seconds % 1 * 1_000_000)))
+        self.sock, self._rfile = sock, rfile
+
+    def send(self, text: str) -> None:
+        with self._send_lock:
+            ws_send_frame(self.sock, OP_TEXT, text.encode(), mask=True)
+
+    def recv(self) -> str:
+        """Next text message (answers pings; raises ConnectionError on close)"""
+        parts = []
+        while True:
+            fin, opcode, payload = ws_recv_frame(self._rfile)
+            if opcode == OP_PING:
+                with self._send_lock:
+                    ws_send_frame(self.sock, OP_PONG, payload, mask=True)
+                continue
+            if opcode == OP_CLOSE:
+                raise ConnectionError("WebSocket closed by server")
+            if opcode in (OP_TEXT, OP_BINARY, OP_CONTINUATION):
+                parts.append(payload)
+                if fin:
+                    return b''.join(parts).decode()
+
+    def close(self) -> None:
+        if self.sock is None:
+            return
+        try:
+            with self._send_lock:
+                ws_send_frame(self.sock, OP_CLOSE, b'', mask=True)
+        except OSError:
+            pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class PipelinedConnection:
+    """
+    One persistent connection with many requests in flight.
+
+    Requests are written as soon as they are made and matched to
+    responses by JSON-RPC id on a reader thread, so N concurrent callers
+    share one socket without waiting for each other's round trips.
+
+    A request that times out is forgotten; max_timeouts timeouts in a row
+    with no response in between mark the node hung and abort the
+    connection, so the pool reconnects it.
+    """
+
+    def __init__(self, url: str, connect_timeout: float = 5.0,
+                 on_broken: Optional[Callable[['PipelinedConnection'], None]] = None,
+                 transport_factory: Callable[..., WebSocketTransport] = WebSocketTransport,
+                 send_timeout: float = 10.0, max_timeouts: int = 3):
+        self.url = url
+        self.transport = transport_factory(url, connect_timeout, send_timeout)
+        self.on_broken = on_broken
+        self.max_timeouts = max_timeouts
+        self.healthy = False
+        self.timeouts = 0  # Consecutive timeouts since the last response
+        self.last_activity = time.monotonic()
+        self._ids = itertools.count(1)
+        self._inflight: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._reader = None
+
+    def connect(self) -> None:
+        """Connect and start the response reader"""
+        self.transport.connect()
+        self.healthy = True
+        self.last_activity = time.monotonic()
+        self._reader = threading.Thread(target=self._read_loop, name='chain-rpc-reader', daemon=True)
+        self._reader.start()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def request(self, method: str, params: Optional[list] = None) -> Future:
+        """Send a request now; the Future resolves when its response arrives"""
+        future: Future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            if not self.healthy:
+                raise ConnectionError(f"Connection to {self.url} is down")
+            self._inflight[request_id] = future
+        try:
+            self.transport.send(json.dumps({
+                'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params or [],
+            }))
+        except OSError as e:
+            self._fail(ConnectionError(f"Send to {self.url} failed: {e}"))
+        return future
+
+    def call(self, method: str, params: Optional[list] = None, timeout: float = 10.0) -> Any:
+        return self.wait(self.request(method, params), timeout)
+
+    def wait(self, future: Future, timeout: float) -> Any:
+        """
+        Result of a request made with request().
+
+        Raises:
+            TimeoutError: no response in time (the request is forgotten,
+                and the connection aborted after max_timeouts in a row)
+        """
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            if future.done():
+                return future.result()
+            self.forget([future])
+            raise
+
+    def abort(self, reason: str) -> None:
+        """Drop a connection found to be dead (the pool reconnects it)"""
+        self._fail(ConnectionError(f"Connection to {self.url} aborted: {reason}"))
+
+    def close(self) -> None:
+        """Close without asking the pool to reconnect"""
+        self._fail(ConnectionError(f"Connection to {self.url} closed"), notify=False)
+
+    def _read_loop(self) -> None:
+        try:
+            while True:
+                message = json.loads(self.transport.recv())
+                self.last_activity = time.monotonic()
+                with self._lock:
+                    self.timeouts = 0
+                    future = self._inflight.pop(message.get('id'), None)
+                if future is None:
+                    continue  # Subscription notification or late reply
+                error = message.get('error')
+                if error:
+                    future.set_exception(ChainRPCError(error.get('code', 0), error.get('message', '')))
+                else:
+                    future.set_result(message.get('result'))
+        except (OSError, ValueError, ConnectionError) as e:
+            self._fail(ConnectionError(f"Connection to {self.url} lost: {e}"))
+
+    def forget(self, futures: List[Future]) -> None:
+        """
+        Drop requests that timed out together (counted as one timeout);
+        abort once max_timeouts have passed without a response.
+        """
+        if not futures:
+            return
+        with self._lock:
+            for request_id, pending in list(self._inflight.items()):
+                if pending in futures:
+                    del self._inflight[request_id]
+            self.timeouts += 1
+            hung = self.healthy and self.timeouts >= self.max_timeouts
+        for future in futures:
+            future.cancel()
+        if hung:
+            self.abort(f"{self.timeouts} requests in a row timed out")
+
+    def _fail(self, error: Exception, notify: bool = True) -> None:
+        """Mark broken, fail everything in flight, tell the pool once"""
+        with self._lock:
+            was_healthy = self.healthy
+            self.healthy = False
+            inflight, self._inflight = self._inflight, {}
+        for future in inflight.values():
+            if not future.done():
+                future.set_exception(error)
+        self.transport.close()
+        if was_healthy and notify and self.on_broken:
+            self.on_broken(self)
+
+
+class ChainConnectionPool:
+    """
+    A fixed number of persistent connections, spread over one or more
+    endpoints, shared by every chain caller in the process. It carries
+    RPCChainBackend's requests to a FakeChainEndpoint (tests, simulator,
+    benchmarks); real nodes are reached through the SDK instead.
+
+    Callers never open connections: call() picks the healthy connection
+    with the fewest requests in flight and retries once elsewhere if that
+    connection dies mid-request. When nothing is healthy it raises
+    ChainUnavailable immediately instead of waiting, so callers can fall
+    back to cached data (the metagraph cache serves stale).
+
+    A maintenance thread reconnects broken slots with exponential backoff
+    and jitter (rotating to the next endpoint on each failure) and pings
+    any connection that has received nothing for health_check_interval,
+    whether or not requests are waiting on it, so a silently dead or hung
+    node is found and replaced. Callers' timeouts count against their
+    connection too (see PipelinedConnection).
+    """
+
+    _shared: Dict[Tuple[str, ...], 'ChainConnectionPool'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, endpoints: List[str], size: int = 2,
+                 request_timeout: float = 10.0,
+                 connect_timeout: float = 5.0,
+                 health_check_interval: float = 15.0,
+                 backoff_initial: float = 0.5,
+                 backoff_max: float = 30.0,
+                 max_consecutive_timeouts: int = 3,
+                 transport_factory: Callable[..., WebSocketTransport] = WebSocketTransport):
+        if not endpoints:
+            raise ValueError("ChainConnectionPool needs at least one endpoint")
+        self.endpoints = list(endpoints)
+        self.size = size
+        self.request_timeout = request_timeout
+        self.connect_timeout = connect_timeout
+        self.health_check_interval = health_check_interval
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.max_consecutive_timeouts = max_consecutive_timeouts
+        self.transport_factory = transport_factory
+
+        # slot -> {'conn', 'endpoint', 'failures', 'retry_at'}
+        self._slots = [{'conn': None, 'endpoint': i % len(self.endpoints), 'failures': 0, 'retry_at': 0.0}
+                       for i in range(size)]
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.stats = {'requests': 0, 'retries': 0, 'unavailable': 0,
+                      'connects': 0, 'connect_failures': 0, 'disconnects': 0, 'health_checks': 0,
+                      'timeouts': 0}
+
+        for slot in self._slots:
+            self._connect(slot)  # Best effort; the maintainer retries failures
+        self._maintainer = threading.Thread(target=self._maintain, name='chain-pool', daemon=True)
+        self._maintainer.start()
+        atexit.register(self.close)
+        logger.debug(f"ChainConnectionPool ready ({size} connections over {len(self.endpoints)} endpoints)")
+
+    @classmethod
+    def from_config(cls, pool_config: Dict[str, Any]) -> 'ChainConnectionPool':
+        """Create from the 'chain_pool' section of the bittensor config"""
+        return cls(
+            endpoints=pool_config['endpoints'],
+            size=pool_config.get('size', 2),
+            request_timeout=pool_config.get('request_timeout', 10.0),
+            connect_timeout=pool_config.get('connect_timeout', 5.0),
+            health_check_interval=pool_config.get('health_check_interval', 15.0),
+            backoff_initial=pool_config.get('backoff_initial', 0.5),
+            backoff_max=pool_config.get('backoff_max', 30.0),
+            max_consecutive_timeouts=pool_config.get('max_consecutive_timeouts', 3),
+        )
+
+    @classmethod
+    def shared(cls, pool_config: Dict[str, Any]) -> 'ChainConnectionPool':
+        """
+        The process-wide pool for a set of endpoints, created on first use.
+        Daemon, wallet and tracker code share it instead of each connecting.
+        """
+        key = tuple(pool_config['endpoints'])
+        with cls._shared_lock:
+            pool = cls._shared.get(key)
+            if pool is None or pool._stop.is_set():
+                pool = cls._shared[key] = cls.from_config(pool_config)
+            return pool
+
+    def call(self, method: str, params: Optional[list] = None,
+             timeout: Optional[float] = None, retry: bool = True) -> Any:
+        """
+        Make one RPC call.
+
+        Args:
+            method: JSON-RPC method
+            params: Positional parameters
+            timeout: Seconds to wait for the response (default request_timeout)
+            retry: Retry once on another connection if this one drops
+                (only for idempotent reads)
+
+        Returns:
+            The result
+
+        Raises:
+            ChainUnavailable: no healthy connection
+            ChainRPCError: the node returned an error
+            TimeoutError: no response in time
+        """
+        timeout = self.request_timeout if timeout is None else timeout
+        attempts = 2 if retry else 1
+        for attempt in range(attempts):
+            conn = self._pick()
+            self.stats['requests'] += 1
+            try:
+                return conn.wait(conn.request(method, params), timeout)
+            except ConnectionError:
+                if attempt + 1 == attempts:
+                    raise
+                self.stats['retries'] += 1
+            except TimeoutError:
+                self.stats['timeouts'] += 1
+                raise
+
+    def call_many(self, calls: List[Tuple[str, Optional[list]]],
+                  timeout: Optional[float] = None) -> List[Any]:
+        """
+        Pipeline several calls on one connection and wait for all of them.
+
+        Returns:
+            Results in call order (exceptions raised as for call())
+        """
+        timeout = self.request_timeout if timeout is None else timeout
+        conn = self._pick()
+        self.stats['requests'] += len(calls)
+        futures = [conn.request(method, params) for method, params in calls]
+        deadline = time.monotonic() + timeout
+        try:
+            return [future.result(max(0.0, deadline - time.monotonic())) for future in futures]
+        except TimeoutError:
+            self.stats['timeouts'] += 1
+            conn.forget([future for future in futures if not future.done()])
+            raise
+
+    def healthy_connections(self) -> int:
+        with self._lock:
+            return sum(1 for slot in self._slots if slot['conn'] is not None and slot['conn'].healthy)
+
+    def close(self) -> None:
+        """Stop maintenance and close every connection"""
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            conns = [slot['conn'] for slot in self._slots if slot['conn'] is not None]
+            for slot in self._slots:
+                slot['conn'] = None
+        for conn in conns:
+            conn.close()
+
+    def _pick(self) -> PipelinedConnection:
+        """Healthy connection with the fewest requests in flight"""
+        with self._lock:
+            healthy = [slot['conn'] for slot in self._slots
+                       if slot['conn'] is not None and slot['conn'].healthy]
+        if not healthy:
+            self.stats['unavailable'] += 1
+            raise ChainUnavailable(f"No healthy chain connection ({', '.join(self.endpoints)})")
+        return min(healthy, key=lambda conn: conn.in_flight)
+
+    def _connect(self, slot: Dict[str, Any]) -> bool:
+        """Open a slot's connection; on failure schedule the next try"""
+        url = self.endpoints[slot['endpoint']]
+        conn = PipelinedConnection(url, self.connect_timeout, self._on_broken, self.transport_factory,
+                                   send_timeout=self.request_timeout,
+                                   max_timeouts=self.max_consecutive_timeouts)
+        try:
+            conn.connect()
+        except (OSError, ConnectionError) as e:
+            self.stats['connect_failures'] += 1
+            self._schedule_retry(slot)
+            logger.warning(f"Chain connection to {url} failed: {e}")
+            return False
+        with self._lock:
+            slot['conn'] = conn
+            slot['failures'] = 0
+        self.stats['connects'] += 1
+        logger.debug(f"Connected to {url}")
+        return True
+
+    def _schedule_retry(self, slot: Dict[str, Any]) -> None:
+        """Exponential backoff with jitter; move to the next endpoint"""
+        slot['failures'] += 1
+        delay = min(self.backoff_max, self.backoff_initial * 2 ** (slot['failures'] - 1))
+        slot['retry_at'] = time.monotonic() + delay * random.uniform(0.5, 1.0)
+        slot['endpoint'] = (slot['endpoint'] + 1) % len(self.endpoints)
+
+    def _on_broken(self, conn: PipelinedConnection) -> None:
+        """Reader noticed a dead connection: free its slot and wake the maintainer"""
+        self.stats['disconnects'] += 1
+        with self._lock:
+            for slot in self._slots:
+                if slot['conn'] is conn:
+                    slot['conn'] = None
+                    slot['retry_at'] = 0.0  # First reconnect is immediate
+        logger.warning(f"Chain connection to {conn.url} dropped; reconnecting in the background")
+        self._wake.set()
+
+    def _maintain(self) -> None:
+        """Reconnect empty slots when due and health-check quiet connections"""
+        while not self._stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                slots = list(self._slots)
+            next_due = now + self.health_check_interval
+            for slot in slots:
+                conn = slot['conn']
+                if conn is None:
+                    if slot['retry_at'] <= now:
+                        self._connect(slot)
+                    if slot['conn'] is None:
+                        next_due = min(next_due, slot['retry_at'])
+                elif now - conn.last_activity >= self.health_check_interval:
+                    self._health_check(conn)
+                else:
+                    next_due = min(next_due, conn.last_activity + self.health_check_interval)
+            self._wake.wait(max(0.01, next_due - time.monotonic()))
+            self._wake.clear()
+
+    def _health_check(self, conn: PipelinedConnection) -> None:
+        """Ping a quiet connection; drop it if the node doesn't answer"""
+        self.stats['health_checks'] += 1
+        try:
+            conn.call('system_health', timeout=self.connect_timeout)
+        except Exception as e:
+            logger.warning(f"Health check on {conn.url} failed: {e}")
+            conn.abort(f"health check failed: {e}")
+
+
+class RPCChainBackend(ChainBackend):
+    """
+    ChainBackend over a ChainConnectionPool, for tests, the simulator and
+    benchmarks only.
+
+    Block height uses the standard chain_getHeader call, but metagraph,
+    neuron update, balance and earning event calls use the JSON methods
+    served by FakeChainEndpoint (MINER_METHODS). A real Subtensor node
+    does not serve them; use SubtensorChainBackend (chain_backend
+    'subtensor') there. check_endpoint() refuses such a node at startup.
+    """
+
+    def __init__(self, pool: ChainConnectionPool):
+        self.pool = pool
+
+    def check_endpoint(self) -> None:
+        """
+        Make sure the endpoint serves the miner's methods.
+
+        Raises:
+            RuntimeError: The node lacks them (e.g. a real Subtensor node)
+        """
+        methods = set(self.pool.call('rpc_methods').get('methods', []))
+        missing = [method for method in MINER_METHODS if method not in methods]
+        if missing:
+            raise RuntimeError(f"Chain endpoint does not serve {', '.join(missing)}; the pooled RPC backend "
+                               f"only works with FakeChainEndpoint (use chain_backend 'subtensor' for a node)")
+
+    def get_block_number(self) -> int:
+        header = self.pool.call('chain_getHeader')
+        return int(header['number'], 16)
+
+    def get_metagraph(self, netuid: int) -> Dict[str, Any]:
+        return self.pool.call('neuron_getMetagraph', [netuid])
+
+    def get_neuron_updates(self, netuid: int, since_block: int) -> Optional[Dict[str, Any]]:
+        return self.pool.call('neuron_getUpdates', [netuid, since_block])
+
+    def get_balance(self, address: str) -> float:
+        return float(self.pool.call('balance_get', [address]))
+
+    def get_earning_events(self, addresses: List[str], from_block: int,
+                           to_block: int) -> List[Dict[str, Any]]:
+        return self.pool.call('earnings_getEvents', [addresses, from_block, to_block])
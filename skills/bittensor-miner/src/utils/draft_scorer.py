@@ -0,0 +1,114 @@
+"""Fast local quality/confidence scoring for LLM drafts"""
+
+import logging
+import re
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DraftScorer:
+    """
+    Scores a draft response without calling another model.
+    Used by the model cascade to decide whether a cheap draft is good
+    enough to submit or should be escalated to a stronger model.
+    """
+
+    # Phrases that usually mean the model gave up or hedged heavily
+    REFUSAL_PATTERNS = [
+        r"\bi (?:can(?:no|')t|am unable to|'m unable to)\b",
+        r"\bas an ai\b",
+        r"\bi don'?t know\b",
+        r"\bnot sure\b",
+        r"\bi apologi[sz]e\b",
+    ]
+
+    # Expected response length (words) per strategy: (minimum, comfortable)
+    LENGTH_TARGETS = {
+        'structured_reasoning': (40, 120),
+        'concise_generation': (3, 15),
+        'calibrated_uncertainty': (25, 80),
+    }
+
+    def __init__(self):
+        self._refusal_re = re.compile('|'.join(self.REFUSAL_PATTERNS), re.IGNORECASE)
+        self._step_re = re.compile(r'^\s*(?:\d+[.)]|[-*])\s+', re.MULTILINE)
+        self._confidence_re = re.compile(r'(\d{1,3})\s*%')
+        logger.debug("DraftScorer initialized")
+
+    def score(self, draft: Optional[str], task_content: str = '',
+              strategy: str = 'structured_reasoning') -> float:
+        """
+        Score a draft between 0 and 1.
+
+        Args:
+            draft: Draft response text
+            task_content: Original task text (used to detect echoes)
+            strategy: Prompt strategy the draft was produced with
+
+        Returns:
+            Confidence that the draft is acceptable (0-1)
+        """
+        if not draft or not draft.strip():
+            return 0.0
+
+        components = self.score_components(draft, task_content, strategy)
+        score = (
+            0.35 * components['length'] +
+            0.25 * components['structure'] +
+            0.20 * components['diversity'] +
+            0.20 * components['novelty']
+        )
+        score *= components['refusal_penalty']
+
+        # Calibrated strategies state their own confidence; trust it a little
+        if components.get('self_confidence') is not None:
+            score = 0.7 * score + 0.3 * components['self_confidence']
+
+        return max(0.0, min(1.0, score))
+
+    def score_components(self, draft: str, task_content: str = '',
+                         strategy: str = 'structured_reasoning') -> Dict[str, float]:
+        """Break the score into its individual signals (useful for logging)"""
+        words = draft.split()
+        word_count = len(words)
+
+        minimum, comfortable = self.LENGTH_TARGETS.get(strategy, (10, 50))
+        if word_count < minimum:
+            length = word_count / minimum
+        else:
+            length = min(1.0, 0.7 + 0.3 * word_count / comfortable)
+
+        if strategy == 'structured_reasoning':
+            steps = len(self._step_re.findall(draft))
+            structure = min(1.0, steps / 3)
+        else:
+            structure = 1.0
+
+        unique_ratio = len(set(w.lower() for w in words)) / word_count
+        diversity = min(1.0, unique_ratio / 0.5)
+
+        novelty = 1.0
+        if task_content:
+            task_words = set(task_content.lower().split())
+            if task_words:
+                overlap = sum(1 for w in words if w.lower() in task_words) / word_count
+                novelty = 1.0 - max(0.0, overlap - 0.5)
+
+        refusal_penalty = 0.4 if self._refusal_re.search(draft) else 1.0
+
+        components = {
+            'length': length,
+            'structure': structure,
+            'diversity': diversity,
+            'novelty': novelty,
+            'refusal_penalty': refusal_penalty,
+            'self_confidence': None,
+        }
+
+        if strategy == 'calibrated_uncertainty':
+            match = self._confidence_re.search(draft)
+            if match:
+                components['self_confidence'] = min(100, int(match.group(1))) / 100
+
+        return components
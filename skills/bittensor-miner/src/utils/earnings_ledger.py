@@ -0,0 +1,273 @@
+"""Per-day TAO earnings rollups, ingested incrementally from chain events"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+from .chain_backend import ChainBackend
+from .spend_windows import SpendWindows
+
+logger = logging.getLogger(__name__)
+
+
+def _unix(dt: datetime) -> float:
+    """Unix time of a naive UTC datetime"""
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _empty_day() -> Dict[str, Any]:
+    return {'tao_earned': 0.0, 'emission': 0.0, 'transfers': 0.0, 'events': 0, 'by_subnet': {}}
+
+
+class EarningsLedger:
+    """
+    TAO income per UTC day, in total and per subnet.
+
+    sync() asks the chain only for blocks after the last one folded in (in
+    pages of max_blocks_per_fetch) and adds each emission or incoming
+    transfer to its day. A page is folded into scratch rollups first and
+    applied together with the block cursor, so a page that fails midway
+    leaves nothing behind and is fetched again next time. The rollups and
+    the cursor are saved together, so a restart resumes where it stopped
+    and no event is counted twice. Queries read one rollup per day of the window: O(days),
+    no chain access. Reporting processes load the saved file and answer
+    from it without touching the chain.
+
+    Windows are whole UTC days: (7, 0) is the last seven days including
+    today, (14, 7) the seven before that. Token spend for the same days
+    comes from the day ring of SpendWindows, or from the caller (report
+    blocks), to give TAO per 1K tokens.
+    """
+
+    def __init__(self, backend: Optional[ChainBackend] = None,
+                 addresses: Optional[List[str]] = None,
+                 state_file: Optional[str] = "state/earnings-ledger.json",
+                 lookback_blocks: int = 50400,
+                 max_blocks_per_fetch: int = 7200,
+                 retention_days: int = 400):
+        """
+        Args:
+            backend: Chain access (None = read-only, answers from the saved file)
+            addresses: Hotkeys/coldkeys whose income is ours
+            state_file: Rollups and cursor (None = memory only)
+            lookback_blocks: History fetched on the very first sync (7 days at 12s)
+            max_blocks_per_fetch: Block range per chain request
+            retention_days: Rollups kept
+        """
+        self.backend = backend
+        self.addresses = sorted(set(addresses or []))
+        self.state_file = Path(state_file) if state_file else None
+        self.lookback_blocks = lookback_blocks
+        self.max_blocks_per_fetch = max_blocks_per_fetch
+        self.retention_days = retention_days
+
+        self.days: Dict[str, Dict[str, Any]] = {}  # YYYY-MM-DD -> rollup
+        self.last_block: Optional[int] = None       # Last block folded in
+        self.stats = {'syncs': 0, 'fetches': 0, 'events': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self.load()
+
+    @property
+    def synced(self) -> bool:
+        """True once any block range has been ingested"""
+        return self.last_block is not None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], backend: Optional[ChainBackend] = None,
+                    addresses: Optional[List[str]] = None) -> 'EarningsLedger':
+        """Create from the 'bittensor.earnings' section of miner-config.json"""
+        return cls(
+            backend=backend,
+            addresses=addresses,
+            state_file=config.get('state_file', 'state/earnings-ledger.json'),
+            lookback_blocks=config.get('lookback_blocks', 50400),
+            max_blocks_per_fetch=config.get('max_blocks_per_fetch', 7200),
+            retention_days=config.get('retention_days', 400),
+        )
+
+    def sync(self) -> int:
+        """
+        Fold in events from blocks added since the last sync.
+
+        Returns:
+            Number of events folded in (0 on failure; the cursor then stays put)
+        """
+        if self.backend is None or not self.addresses:
+            return 0
+        folded = 0
+        with self._lock:
+            try:
+                head = self.backend.get_block_number()
+                start = (self.last_block + 1 if self.last_block is not None
+                         else max(0, head - self.lookback_blocks))
+                while start <= head:
+                    end = min(start + self.max_blocks_per_fetch - 1, head)
+                    events = self.backend.get_earning_events(self.addresses, start, end)
+                    self.stats['fetches'] += 1
+                    page: Dict[str, Dict[str, Any]] = {}
+                    for event in events:
+                        self._fold(page, event)
+                    # A page counts only once all of it folded: rollups and cursor move together
+                    self._apply(page)
+                    self.last_block = end
+                    folded += len(events)
+                    self.stats['events'] += len(events)
+                    start = end + 1
+                self.stats['syncs'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Earnings sync failed after block {self.last_block}: {e}")
+            finally:
+                # Pages already applied are kept with their cursor
+                self.save()
+        return folded
+
+    def totals(self, start_days_ago: int, end_days_ago: int = 0,
+               now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Income over a window of whole UTC days.
+
+        Args:
+            start_days_ago: Window starts this many days back (exclusive)
+            end_days_ago: Window ends this many days back (0 = today included)
+            now: Reference time (defaults to now)
+
+        Returns:
+            Dict with tao_earned, emission, transfers and by_subnet (netuid -> TAO)
+        """
+        today = (now or datetime.utcnow()).date()
+        total = _empty_day()
+        for offset in range(end_days_ago, start_days_ago):
+            day = self.days.get((today - timedelta(days=offset)).isoformat())
+            if not day:
+                continue
+            for field in ('tao_earned', 'emission', 'transfers', 'events'):
+                total[field] += day[field]
+            for netuid, tao in day['by_subnet'].items():
+                total['by_subnet'][netuid] = total['by_subnet'].get(netuid, 0.0) + tao
+        total['period_days'] = start_days_ago - end_days_ago
+        return total
+
+    def tao_earned(self, days: int = 7, now: Optional[datetime] = None) -> float:
+        """TAO earned over the last days UTC days (today included)"""
+        return self.totals(days, 0, now)['tao_earned']
+
+    def daily(self, days: int = 7, spend: Optional[SpendWindows] = None,
+              now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        One row per day, oldest first, joined with that day's token spend.
+
+        Args:
+            days: Days to return (today included)
+            spend: Token spend windows (None = no spend columns)
+            now: Reference time (defaults to now)
+        """
+        now = now or datetime.utcnow()
+        tokens = spend.daily_totals(days, _unix(now)) if spend is not None else {}
+        rows = []
+        for offset in range(days - 1, -1, -1):
+            label = (now.date() - timedelta(days=offset)).isoformat()
+            tao = self.days.get(label, {}).get('tao_earned', 0.0)
+            row = {'day': label, 'tao_earned': tao}
+            if spend is not None:
+                row['tokens'] = tokens.get(label, 0)
+                row['tao_per_1k_tokens'] = self.roi(tao, row['tokens'])
+            rows.append(row)
+        return rows
+
+    def roi_by_subnet(self, days: int, spend: SpendWindows,
+                      now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        TAO earned, tokens spent and TAO per 1K tokens per subnet over the
+        last days UTC days. Both sides come from day rollups: O(days) per subnet.
+        """
+        now = now or datetime.utcnow()
+        earned = self.totals(days, 0, now)['by_subnet']
+        subnets = set(earned)
+        subnets.update(key.split(':', 1)[1] for key in spend.keys() if key.startswith('subnet:'))
+        result = {}
+        for netuid in sorted(subnets):
+            tokens = sum(spend.daily_totals(days, _unix(now), subnet_id=netuid).values())
+            tao = earned.get(netuid, 0.0)
+            result[netuid] = {'tao_earned': tao, 'tokens': tokens,
+                              'tao_per_1k_tokens': self.roi(tao, tokens)}
+        return result
+
+    @staticmethod
+    def roi(tao: Optional[float], tokens: Optional[int]) -> Optional[float]:
+        """TAO per 1K tokens (None without spend or earnings data)"""
+        if tao is None or not tokens:
+            return None
+        return tao / (tokens / 1000)
+
+    def load(self) -> bool:
+        """Load saved rollups and cursor; returns False if unavailable"""
+        if self.state_file is None or not self.state_file.exists():
+            return False
+        try:
+            with open(self.state_file, 'r') as f:
+                data = json.load(f)
+            if data.get('addresses', self.addresses) != self.addresses and self.backend is not None:
+                # Different wallets: the saved rollups aren't ours
+                logger.info("Earnings ledger addresses changed, rebuilding")
+                return False
+            self.days = data.get('days', {})
+            self.last_block = data.get('last_block')
+            if self.backend is None:
+                self.addresses = data.get('addresses', [])
+            return True
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"Failed to load earnings ledger: {e}")
+            return False
+
+    def save(self) -> None:
+        """Prune old days and atomically write rollups with the cursor"""
+        if self.state_file is None:
+            return
+        try:
+            oldest = (datetime.utcnow().date() - timedelta(days=self.retention_days)).isoformat()
+            for label in [label for label in self.days if label < oldest]:
+                del self.days[label]
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_file.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump({'last_block': self.last_block, 'addresses': self.addresses,
+                           'saved_at': datetime.utcnow().isoformat(), 'days': self.days}, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logger.error(f"Failed to save earnings ledger: {e}")
+
+    def _apply(self, page: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Add a page's day rollups to the ledger (lock held). Each touched
+        day is replaced by a merged copy, so readers see it before or
+        after the page, never in between.
+        """
+        for label, added in page.items():
+            day = self.days.get(label)
+            merged = dict(day, by_subnet=dict(day['by_subnet'])) if day else _empty_day()
+            for field in ('tao_earned', 'emission', 'transfers', 'events'):
+                merged[field] += added[field]
+            for netuid, tao in added['by_subnet'].items():
+                merged['by_subnet'][netuid] = merged['by_subnet'].get(netuid, 0.0) + tao
+            self.days[label] = merged
+
+    @staticmethod
+    def _fold(days: Dict[str, Dict[str, Any]], event: Dict[str, Any]) -> None:
+        """Add one chain event to its day's rollup in days"""
+        label = datetime.utcfromtimestamp(event.get('ts') or time.time()).strftime('%Y-%m-%d')
+        day = days.setdefault(label, _empty_day())
+        amount = float(event['amount'])
+        day['tao_earned'] += amount
+        day['events'] += 1
+        if event.get('kind') == 'emission':
+            day['emission'] += amount
+            netuid = str(event.get('netuid'))
+            day['by_subnet'][netuid] = day['by_subnet'].get(netuid, 0.0) + amount
+        else:
+            day['transfers'] += amount
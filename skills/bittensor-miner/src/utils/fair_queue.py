@@ -0,0 +1,176 @@
+"""Stake-weighted deficit round robin queue for validator requests"""
+
+import logging
+import threading
+from collections import deque, OrderedDict
+from typing import Dict, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StakeWeightedQueue:
+    """
+    Bounded task queue that serves callers (validators) in proportion to
+    their stake, using deficit round robin.
+
+    Each caller has its own FIFO. Callers with queued work take turns. On
+    its turn, a caller's deficit grows by a quantum proportional to its
+    stake, and it is served one task per whole unit of deficit. Over a
+    busy period each validator gets worker time in proportion to stake,
+    and a low-stake caller is never starved outright. Stake is read when
+    the caller's turn comes, so it follows the metagraph cache. Weights
+    are floored at min_weight_ratio of the heaviest waiting caller; this
+    bounds how long a near-zero-stake caller waits and how far the
+    scheduler has to scan.
+
+    A caller may have at most max_per_caller tasks waiting, so one noisy
+    validator can't fill the queue. When the queue is full, a new task
+    from a heavier caller evicts the newest task of the lightest caller
+    with work waiting. Scarce capacity therefore goes to the requests
+    that pay the most.
+
+    weight_of is called with the queue's lock held (and from put(), on
+    the axon's event loop), so it must not block: pass a cached stake
+    lookup such as MetagraphCache.get_stake_cached, never one that syncs.
+
+    Once closed, put() refuses new tasks and get() returns None even if
+    tasks are still waiting; the owner takes those with drain().
+    """
+
+    def __init__(self, max_size: int = 50, max_per_caller: int = 8,
+                 weight_of: Optional[Callable[[str], float]] = None,
+                 quantum: float = 4.0, min_weight_ratio: float = 0.01):
+        """
+        Args:
+            max_size: Tasks allowed to wait in total
+            max_per_caller: Tasks one caller may have waiting
+            weight_of: Caller hotkey -> weight (stake); None = equal weights
+            quantum: Tasks the heaviest waiting caller may take per turn
+            min_weight_ratio: Weight floor relative to the heaviest waiting caller
+        """
+        self.max_size = max_size
+        self.max_per_caller = max_per_caller
+        self.weight_of = weight_of
+        self.quantum = quantum
+        self.min_weight_ratio = min_weight_ratio
+
+        self._queues: 'OrderedDict[str, deque]' = OrderedDict()  # Turn order = insertion order
+        self._deficit: Dict[str, float] = {}
+        self._turn_started = False  # Head caller already received this turn's quantum
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def qsize(self) -> int:
+        with self._cond:
+            return self._size
+
+    def waiting(self) -> Dict[str, int]:
+        """Queued tasks per caller"""
+        with self._cond:
+            return {caller: len(tasks) for caller, tasks in self._queues.items()}
+
+    def put(self, task: Dict[str, Any]) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Queue a task without blocking.
+
+        Returns:
+            (accepted, evicted task or None)
+        """
+        caller = task.get('caller') or ''
+        with self._cond:
+            if self._closed:
+                return False, None
+            tasks = self._queues.get(caller)
+            if tasks is not None and len(tasks) >= self.max_per_caller:
+                return False, None
+
+            evicted = None
+            if self._size >= self.max_size:
+                victim = self._lightest(exclude=caller)
+                if victim is None or self._weight(victim) >= self._weight(caller):
+                    return False, None
+                evicted = self._queues[victim].pop()
+                self._size -= 1
+                if not self._queues[victim]:
+                    self._remove(victim)
+
+            if tasks is None:
+                tasks = self._queues[caller] = deque()
+                self._deficit[caller] = 0.0
+            tasks.append(task)
+            self._size += 1
+            self._cond.notify()
+            return True, evicted
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Next task in weighted round-robin order, blocking while empty.
+
+        Returns:
+            The task, or None once closed (or on timeout)
+        """
+        with self._cond:
+            while not self._size and not self._closed:
+                if not self._cond.wait(timeout):
+                    return None
+            return None if self._closed else self._next()
+
+    def close(self) -> None:
+        """Refuse new tasks and wake every waiting get() with None"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def drain(self) -> list:
+        """Remove and return every waiting task (oldest first per caller)"""
+        with self._cond:
+            tasks = [task for queue in self._queues.values() for task in queue]
+            self._queues.clear()
+            self._deficit.clear()
+            self._turn_started = False
+            self._size = 0
+            return tasks
+
+    def _next(self) -> Dict[str, Any]:
+        """Deficit round robin over callers with work (lock held, queue non-empty)"""
+        weights = {caller: self._weight(caller) for caller in self._queues}
+        heaviest = max(weights.values())
+        while True:
+            caller, tasks = next(iter(self._queues.items()))
+            if not self._turn_started:
+                share = max(weights[caller] / heaviest, self.min_weight_ratio) if heaviest > 0 else 1.0
+                self._deficit[caller] += self.quantum * share
+                self._turn_started = True
+            if self._deficit[caller] >= 1.0:
+                self._deficit[caller] -= 1.0
+                task = tasks.popleft()
+                self._size -= 1
+                if not tasks:
+                    self._remove(caller)
+                return task
+            # Turn over: back of the line, keeping the leftover deficit
+            self._queues.move_to_end(caller)
+            self._turn_started = False
+
+    def _remove(self, caller: str) -> None:
+        """Caller has nothing waiting: drop it from the rotation (lock held)"""
+        head = next(iter(self._queues))
+        del self._queues[caller]
+        del self._deficit[caller]
+        if caller == head:
+            self._turn_started = False
+
+    def _lightest(self, exclude: str) -> Optional[str]:
+        """Caller with the least weight that has tasks waiting (lock held)"""
+        candidates = [caller for caller in self._queues if caller != exclude]
+        return min(candidates, key=self._weight) if candidates else None
+
+    def _weight(self, caller: str) -> float:
+        if self.weight_of is None:
+            return 1.0
+        try:
+            return max(0.0, float(self.weight_of(caller)))
+        except Exception as e:
+            logger.error(f"Weight lookup for {caller} failed: {e}")
+            return 0.0
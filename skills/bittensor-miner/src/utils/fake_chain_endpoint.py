@@ -0,0 +1,181 @@
+"""Local WebSocket JSON-RPC endpoint serving a LocalChainBackend"""
+
+import json
+import logging
+import socket
+import threading
+from typing import Dict, Any, Optional, List
+
+from .chain_backend import LocalChainBackend
+from .chain_pool import (MINER_METHODS, ws_accept_key, ws_send_frame, ws_recv_frame,
+                         OP_TEXT, OP_CLOSE, OP_PING, OP_PONG)
+
+logger = logging.getLogger(__name__)
+
+
+class FakeChainEndpoint:
+    """
+    Stand-in RPC node for tests and benchmarks of the connection pool.
+
+    Speaks JSON-RPC over WebSocket like a Subtensor node (rpc_methods,
+    system_health, chain_getHeader) plus the non-standard
+    neuron_getMetagraph, neuron_getUpdates, balance_get and
+    earnings_getEvents that RPCChainBackend uses, backed by a
+    LocalChainBackend. Responses can be delayed
+    (latency_seconds, applied per request so pipelined requests overlap),
+    and faults injected: drop_connections() cuts every client, and
+    set_available(False) also refuses new ones until it is turned back on.
+    handshakes counts connection setups, so tests can check that queries
+    reuse connections.
+    """
+
+    def __init__(self, backend: Optional[LocalChainBackend] = None,
+                 host: str = '127.0.0.1', port: int = 0,
+                 latency_seconds: float = 0.0):
+        self.backend = backend or LocalChainBackend()
+        self.host = host
+        self.port = port
+        self.latency_seconds = latency_seconds
+        self.available = True
+        self.handshakes = 0
+        self.requests = 0
+
+        self._server: Optional[socket.socket] = None
+        self._clients: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self) -> str:
+        """Listen in the background; returns the ws:// URL"""
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((self.host, self.port))
+        self._server.listen(64)
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._accept_loop, name='fake-chain-accept', daemon=True).start()
+        logger.debug(f"Fake chain endpoint listening on {self.url}")
+        return self.url
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server:
+            self._server.close()
+        self.drop_connections()
+
+    def drop_connections(self) -> int:
+        """Cut every client connection (an RPC node blip)"""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.close()
+        return len(clients)
+
+    def set_available(self, available: bool) -> None:
+        """False: drop everyone and refuse new connections until set back"""
+        self.available = available
+        if not available:
+            self.drop_connections()
+
+    def _accept_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            if not self.available:
+                client.close()
+                continue
+            threading.Thread(target=self._serve, args=(client,), name='fake-chain-client', daemon=True).start()
+
+    def _serve(self, client: socket.socket) -> None:
+        """Handshake, then answer requests until the client goes away"""
+        rfile = client.makefile('rb')
+        try:
+            request_line = rfile.readline()
+            headers = {}
+            for line in iter(rfile.readline, b'\r\n'):
+                if not line:
+                    return
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if not request_line.startswith(b'GET') or 'sec-websocket-key' not in headers:
+                client.sendall(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+                return
+            client.sendall((
+                "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {ws_accept_key(headers['sec-websocket-key'])}\r\n\r\n"
+            ).encode())
+            with self._lock:
+                self.handshakes += 1
+                self._clients.append(client)
+
+            send_lock = threading.Lock()
+            while not self._stop.is_set():
+                fin, opcode, payload = ws_recv_frame(rfile)
+                if opcode == OP_CLOSE:
+                    return
+                if opcode == OP_PING:
+                    with send_lock:
+                        ws_send_frame(client, OP_PONG, payload, mask=False)
+                    continue
+                if opcode != OP_TEXT:
+                    continue
+                self.requests += 1
+                response = json.dumps(self._handle(json.loads(payload)))
+                if self.latency_seconds:
+                    timer = threading.Timer(self.latency_seconds, self._send, (client, send_lock, response))
+                    timer.daemon = True
+                    timer.start()
+                else:
+                    self._send(client, send_lock, response)
+        except (OSError, ConnectionError, ValueError):
+            return
+        finally:
+            with self._lock:
+                if client in self._clients:
+                    self._clients.remove(client)
+            client.close()
+
+    @staticmethod
+    def _send(client: socket.socket, send_lock: threading.Lock, text: str) -> None:
+        try:
+            with send_lock:
+                ws_send_frame(client, OP_TEXT, text.encode(), mask=False)
+        except OSError:
+            pass
+
+    def _handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """One JSON-RPC request -> response"""
+        method = request.get('method')
+        params = request.get('params') or []
+        backend = self.backend
+        try:
+            if method == 'rpc_methods':
+                result = {'version': 1, 'methods': list(MINER_METHODS) + ['rpc_methods', 'system_health']}
+            elif method == 'system_health':
+                result = {'peers': 1, 'isSyncing': False, 'shouldHavePeers': True}
+            elif method == 'chain_getHeader':
+                result = {'number': hex(backend.get_block_number())}
+            elif method == 'neuron_getMetagraph':
+                result = backend.get_metagraph(int(params[0]))
+            elif method == 'neuron_getUpdates':
+                result = backend.get_neuron_updates(int(params[0]), int(params[1]))
+            elif method == 'balance_get':
+                result = backend.get_balance(str(params[0]))
+            elif method == 'earnings_getEvents':
+                result = backend.get_earning_events(list(params[0]), int(params[1]), int(params[2]))
+            else:
+                return {'jsonrpc': '2.0', 'id': request.get('id'),
+                        'error': {'code': -32601, 'message': f"Method not found: {method}"}}
+        except (IndexError, TypeError, ValueError) as e:
+            return {'jsonrpc': '2.0', 'id': request.get('id'),
+                    'error': {'code': -32602, 'message': f"Invalid params: {e}"}}
+        return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
@@ -0,0 +1,75 @@
+"""Stand-in wallet MCP server (stdio) for tests and benchmarks of the MCP session"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+BALANCE = 0.05
+
+
+def _tool_result(value) -> dict:
+    return {'content': [{'type': 'text', 'text': json.dumps(value)}], 'isError': False}
+
+
+def _call_tool(name: str, arguments: dict) -> dict:
+    if name == 'get_balance':
+        return _tool_result(BALANCE)
+    if name == 'get_earnings':
+        return _tool_result(round(0.001 * int(arguments.get('days', 7)), 6))
+    if name == 'get_stake_info':
+        return _tool_result({'total_stake': BALANCE, 'hotkey': 'default', 'subnet_stake': BALANCE})
+    if name == 'sign_transaction':
+        return _tool_result(f"fake_signature_{abs(hash(json.dumps(arguments, sort_keys=True)))}")
+    if name == 'crash':
+        sys.exit(1)
+    if name == 'hang':
+        time.sleep(3600)  # Alive but never answers
+    return {'content': [{'type': 'text', 'text': f"Unknown tool: {name}"}], 'isError': True}
+
+
+def main():
+    """Speak MCP over stdio; every response is delayed by --latency seconds"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--startup-delay', type=float, default=0.0,
+                        help='Seconds before the server answers at all (a cold start)')
+    args = parser.parse_args()
+
+    time.sleep(args.startup_delay)
+    write_lock = threading.Lock()
+
+    def respond(request: dict) -> None:
+        time.sleep(args.latency)
+        method = request.get('method')
+        if method == 'initialize':
+            result = {'protocolVersion': request['params']['protocolVersion'],
+                      'capabilities': {'tools': {}},
+                      'serverInfo': {'name': 'fake-wallet-mcp', 'version': '0'}}
+        elif method == 'tools/list':
+            result = {'tools': [{'name': name, 'inputSchema': {'type': 'object'}} for name in (
+                'get_balance', 'get_earnings', 'get_stake_info', 'sign_transaction')]}
+        elif method == 'tools/call':
+            params = request.get('params', {})
+            result = _call_tool(params.get('name'), params.get('arguments', {}))
+        else:
+            result = None
+        message = {'jsonrpc': '2.0', 'id': request['id']}
+        if result is None:
+            message['error'] = {'code': -32601, 'message': f"Method not found: {method}"}
+        else:
+            message['result'] = result
+        with write_lock:
+            sys.stdout.write(json.dumps(message) + '\n')
+            sys.stdout.flush()
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        if 'id' not in request:
+            continue  # Notification
+        threading.Thread(target=respond, args=(request,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""Columnar, memory-mapped task history with vectorized analytics"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+
+from .history_store import HistoryStore
+
+try:
+    import numpy as np
+except ImportError:  # Optional: only A/B test analysis needs the columns
+    np = None
+
+logger = logging.getLogger(__name__)
+
+NUMPY_AVAILABLE = np is not None
+
+# Score above which a task counts as a success (matches performance_tracker)
+SUCCESS_THRESHOLD = 0.5
+
+
+def _day(ts: float) -> str:
+    """UTC day of a unix time"""
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d')
+
+
+class HistoryColumns:
+    """
+    Task history stored as raw binary column files, one directory per UTC
+    day of the task timestamps.
+
+    Columns are appended in batches and read through np.memmap, so 7- and
+    30-day windows are a searchsorted in the first and last day plus a few
+    np.bincount group-bys, instead of json.loads on every line.
+    llm/strategy/subnet/task_type are dictionary-encoded to small integer
+    IDs.
+
+    Each day is kept sorted by timestamp: a batch that lands out of order
+    is followed by a compaction that rewrites the day sorted. Days are
+    dropped with the history store's retention_days.
+    """
+
+    COLUMNS = {
+        'timestamp': 'float64',   # unix seconds
+        'score': 'float32',       # validator score, NaN until scored
+        'tokens': 'int32',        # tokens spent
+        'latency_ms': 'float32',  # end-to-end latency, NaN if unknown
+        'llm_id': 'int16',
+        'strategy_id': 'int16',
+        'subnet_id': 'int16',
+        'task_type_id': 'int16',
+    }
+
+    DIMENSIONS = {
+        'llm_id': 'llm',
+        'strategy_id': 'strategy',
+        'subnet_id': 'subnet',
+        'task_type_id': 'task_type',
+    }
+
+    def __init__(self, store: HistoryStore,
+                 directory: str = "state/history-columns"):
+        if np is None:
+            raise ImportError("numpy is required for HistoryColumns")
+
+        self.store = store
+        self.directory = Path(directory)
+        self.meta_file = self.directory / 'meta.json'
+
+        self.cursor = None  # (segment day, offset) of the next unread record
+        self.days: Dict[str, Dict[str, Any]] = {}  # day -> {'count', 'sorted'}
+        self.dictionaries = {dim: [] for dim in self.DIMENSIONS.values()}
+        self._codes = {dim: {} for dim in self.DIMENSIONS.values()}
+        self._maps = {}  # (day, column) -> memmap
+        self._load_meta()
+
+    @property
+    def count(self) -> int:
+        """Rows across all days"""
+        return sum(info['count'] for info in self.days.values())
+
+    def sync(self, batch_size: int = 10000) -> int:
+        """
+        Append history records written to the store since the last sync,
+        then re-sort days that went out of order and apply retention.
+        Running this on a fresh directory is the one-shot conversion.
+
+        Returns:
+            Number of rows appended
+        """
+        start = self.cursor
+        appended = 0
+        batch = []
+        for record, cursor in self.store.iter_since(self.cursor):
+            self.cursor = cursor
+            row = self._to_row(record)
+            if row is not None:
+                batch.append(row)
+            if len(batch) >= batch_size:
+                appended += self._append_rows(batch)
+                batch = []
+        appended += self._append_rows(batch)
+        if self.cursor != start:
+            self._save_meta()
+        self._maintain()
+        return appended
+
+    def append_records(self, records: List[Dict[str, Any]]) -> int:
+        """Append already-parsed records (does not move the store cursor)"""
+        rows = [row for row in (self._to_row(r) for r in records) if row is not None]
+        appended = self._append_rows(rows)
+        self._save_meta()
+        self._maintain()
+        return appended
+
+    def window(self, start_ts: float, end_ts: Optional[float] = None,
+               names: Optional[Iterable[str]] = None) -> Dict[str, 'np.ndarray']:
+        """
+        Columns of the rows with start_ts <= timestamp < end_ts, in time order.
+
+        Args:
+            start_ts: Window start (unix seconds)
+            end_ts: Window end (None = no end)
+            names: Columns to return (default: all)
+
+        Returns:
+            column name -> array (read-only)
+        """
+        names = list(names or self.COLUMNS)
+        first_day = _day(start_ts)
+        last_day = _day(end_ts) if end_ts is not None else None
+        parts = {name: [] for name in names}
+        for day in sorted(self.days):
+            info = self.days[day]
+            if day < first_day or (last_day is not None and day > last_day) or not info['count']:
+                continue
+            ts = self._map(day, 'timestamp')
+            if not info['sorted']:
+                rows = (ts >= start_ts) & (ts < end_ts if end_ts is not None else True)
+            else:
+                lo = int(np.searchsorted(ts, start_ts, side='left')) if day == first_day else 0
+                hi = int(np.searchsorted(ts, end_ts, side='left')) if day == last_day else len(ts)
+                rows = slice(lo, hi)
+            for name in names:
+                parts[name].append(self._map(day, name)[rows])
+
+        return {name: (np.concatenate(parts[name]) if len(parts[name]) > 1 else
+                       parts[name][0] if parts[name] else np.empty(0, dtype=self.COLUMNS[name]))
+                for name in names}
+
+    def code(self, dim: str, value: Any) -> int:
+        """Dictionary code of a dimension value (-1 if never seen)"""
+        return self._codes[dim].get(str(value), -1)
+
+    def reset(self) -> None:
+        """Drop all rows and start over from the beginning of the source"""
+        self._maps = {}
+        if self.directory.exists():
+            for path in self.directory.iterdir():
+                if path.is_dir():
+                    shutil.rmtree(path)
+                elif path.suffix == '.bin':
+                    path.unlink()  # Columns of the single-directory layout
+        self.cursor = None
+        self.days = {}
+        self.dictionaries = {dim: [] for dim in self.DIMENSIONS.values()}
+        self._codes = {dim: {} for dim in self.DIMENSIONS.values()}
+
+    def _to_row(self, record: Dict[str, Any]) -> Optional[Tuple[str, tuple]]:
+        """(day, column tuple) of a history record (None if it has no timestamp)"""
+        timestamp = record.get('timestamp')
+        if not timestamp:
+            return None
+        try:
+            when = datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc)
+        except ValueError:
+            return None
+
+        score = record.get('validator_score')
+        if record.get('status') == 'unmatched':
+            score = None  # Not attributable to a model/strategy
+        latency = record.get('latency_ms')
+        return when.strftime('%Y-%m-%d'), (
+            when.timestamp(),
+            float('nan') if score is None else float(score),
+            int(record.get('tokens') or record.get('tokens_spent') or 0),
+            float('nan') if latency is None else float(latency),
+            self._encode('llm', record.get('llm') or record.get('llm_used') or 'unknown'),
+            self._encode('strategy', record.get('strategy') or record.get('prompt_strategy') or 'unknown'),
+            self._encode('subnet', record.get('subnet_id') if record.get('subnet_id') is not None else 'unknown'),
+            self._encode('task_type', record.get('task_type') or 'unknown'),
+        )
+
+    def _encode(self, dim: str, value: Any) -> int:
+        """Dictionary-encode a dimension value"""
+        value = str(value)
+        codes = self._codes[dim]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.dictionaries[dim])
+            self.dictionaries[dim].append(value)
+        return code
+
+    def _append_rows(self, rows: List[Tuple[str, tuple]]) -> int:
+        """Append rows to their day's column files (rows for expired days are dropped)"""
+        by_day: Dict[str, List[tuple]] = {}
+        cutoff = self._retention_cutoff()
+        for day, row in rows:
+            if day >= cutoff:
+                by_day.setdefault(day, []).append(row)
+
+        for day, day_rows in by_day.items():
+            info = self.days.setdefault(day, {'count': 0, 'sorted': True})
+            self._day_dir(day).mkdir(parents=True, exist_ok=True)
+            columns = list(zip(*day_rows))
+
+            timestamps = np.asarray(columns[0], dtype='float64')
+            if info['sorted']:
+                last = self._map(day, 'timestamp')[-1] if info['count'] else -np.inf
+                info['sorted'] = not (timestamps[0] < last or np.any(np.diff(timestamps) < 0))
+
+            for (name, dtype), values in zip(self.COLUMNS.items(), columns):
+                with open(self._column_path(day, name), 'ab') as f:
+                    np.asarray(values, dtype=dtype).tofile(f)
+            info['count'] += len(day_rows)
+        return sum(len(day_rows) for day_rows in by_day.values())
+
+    def _maintain(self) -> None:
+        """Re-sort out-of-order days and drop expired ones (after the appends are saved)"""
+        changed = False
+        for day, info in sorted(self.days.items()):
+            if not info['sorted']:
+                self._compact(day)
+                info['sorted'] = True
+                changed = True
+
+        cutoff = self._retention_cutoff()
+        for day in [day for day in self.days if day < cutoff]:
+            del self.days[day]
+            changed = True
+        if changed:
+            self._save_meta()
+        self._remove_orphans()
+
+    def _compact(self, day: str) -> None:
+        """
+        Rewrite a day's columns sorted by timestamp. The sorted copy is
+        written next to the day and swapped in by renames; _load_meta
+        finishes or discards a swap interrupted by a crash.
+        """
+        count = self.days[day]['count']
+        order = np.argsort(self._map(day, 'timestamp'), kind='stable')
+        tmp_dir = self.directory / f"{day}.tmp"
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+        for name, dtype in self.COLUMNS.items():
+            values = np.fromfile(self._column_path(day, name), dtype=dtype, count=count)
+            values[order].tofile(tmp_dir / f"{name}.bin")
+
+        self._maps = {key: m for key, m in self._maps.items() if key[0] != day}
+        old_dir = self.directory / f"{day}.old"
+        os.replace(self._day_dir(day), old_dir)
+        os.replace(tmp_dir, self._day_dir(day))
+        shutil.rmtree(old_dir)
+        logger.debug(f"Re-sorted {count} columnar history rows for {day}")
+
+    def _retention_cutoff(self) -> str:
+        """First day kept under the store's retention_days"""
+        return (datetime.utcnow() - timedelta(days=self.store.retention_days)).strftime('%Y-%m-%d')
+
+    def _remove_orphans(self) -> None:
+        """Delete day directories the metadata doesn't list (expired, or never committed)"""
+        if not self.directory.exists():
+            return
+        for path in self.directory.iterdir():
+            if path.is_dir() and path.name not in self.days:
+                self._maps = {key: m for key, m in self._maps.items() if key[0] != path.name}
+                shutil.rmtree(path)
+
+    def _map(self, day: str, name: str) -> 'np.ndarray':
+        """Memory-mapped view of one day's column (read-only)"""
+        count = self.days[day]['count']
+        cached = self._maps.get((day, name))
+        if cached is None or len(cached) != count:
+            cached = np.memmap(self._column_path(day, name), dtype=self.COLUMNS[name],
+                               mode='r', shape=(count,))
+            self._maps[(day, name)] = cached
+        return cached
+
+    def _day_dir(self, day: str) -> Path:
+        return self.directory / day
+
+    def _column_path(self, day: str, name: str) -> Path:
+        return self._day_dir(day) / f"{name}.bin"
+
+    def _load_meta(self) -> None:
+        """Load metadata, finish interrupted compactions and drop uncommitted rows"""
+        if self.meta_file.exists():
+            try:
+                with open(self.meta_file, 'r') as f:
+                    meta = json.load(f)
+                if 'days' not in meta or set(meta.get('dictionaries', {})) != set(self.DIMENSIONS.values()):
+                    # Older layout (single directory, or fewer columns): rebuild
+                    logger.info("Rebuilding columnar history from history segments")
+                    self.reset()
+                    return
+                self.cursor = tuple(meta['cursor']) if meta['cursor'] else None
+                self.days = meta['days']
+                for dim in self.DIMENSIONS.values():
+                    self.dictionaries[dim] = meta.get('dictionaries', {}).get(dim, [])
+                    self._codes[dim] = {v: i for i, v in enumerate(self.dictionaries[dim])}
+            except (json.JSONDecodeError, OSError, KeyError) as e:
+                logger.error(f"Failed to load columnar history metadata, rebuilding: {e}")
+                self.reset()
+                return
+
+        for day in self.days:
+            tmp_dir = self.directory / f"{day}.tmp"
+            old_dir = self.directory / f"{day}.old"
+            if old_dir.exists() and not self._day_dir(day).exists():
+                os.replace(tmp_dir, self._day_dir(day))  # Crashed between the two renames
+            for name, dtype in self.COLUMNS.items():
+                path = self._column_path(day, name)
+                expected = self.days[day]['count'] * np.dtype(dtype).itemsize
+                if path.exists() and path.stat().st_size > expected:
+                    os.truncate(path, expected)
+        self._remove_orphans()
+
+    def _save_meta(self) -> None:
+        """Atomically write metadata (store cursor, per-day row counts, dictionaries)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta = {
+            'cursor': self.cursor,
+            'days': self.days,
+            'dictionaries': self.dictionaries,
+            'updated_at': datetime.utcnow().isoformat(),
+        }
+        tmp_path = self.meta_file.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_file)
+
+
+def main():
+    """Convert the task history segments into the columnar store"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('source', nargs='?', default='state/history',
+                        help='History segment directory')
+    parser.add_argument('--legacy', default='state/task-history.jsonl',
+                        help='Single-file history to migrate into segments first')
+    parser.add_argument('--output', default='state/history-columns')
+    parser.add_argument('--rebuild', action='store_true', help='Discard existing columns first')
+    args = parser.parse_args()
+
+    columns = HistoryColumns(HistoryStore(args.source, legacy_file=args.legacy), args.output)
+    if args.rebuild:
+        columns.reset()
+    appended = columns.sync()
+    print(f"✅ Converted {appended} rows ({columns.count} total) into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,515 @@
+"""Time-partitioned, indexed task history segments"""
+
+import argparse
+import fcntl
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (segment day 'YYYY-MM-DD', byte offset) - position in the history stream
+Cursor = Tuple[str, int]
+
+
+class SegmentIndex:
+    """
+    Sparse in-memory index of one segment, built from its append-only .idx
+    sidecar (one line per record: offset, end, timestamp, task_id).
+
+    Records are grouped into blocks of block_size in write order; a block
+    keeps its first offset, record count and min/max timestamp, so memory
+    is O(records / block_size). Timestamps are not required to be sorted
+    within a segment (batches from several writers interleave), so time
+    queries skip blocks by their [min, max] range instead of bisecting.
+
+    task_id -> offsets is only kept while the segment is inside the task
+    lookup window (task_ids is None otherwise).
+    """
+
+    def __init__(self, path: Path, block_size: int = 64, track_task_ids: bool = True):
+        self.path = path
+        self.block_size = block_size
+        self.blocks: List[List[Any]] = []  # [offset, count, min timestamp, max timestamp]
+        self.task_ids: Optional[Dict[str, List[int]]] = {} if track_task_ids else None
+        self.count = 0
+        self.end = 0        # segment bytes covered by the index
+        self._read_pos = 0  # bytes of the .idx file consumed
+
+    def refresh(self) -> None:
+        """Pick up index lines appended since the last refresh (by any process)"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as f:
+            f.seek(self._read_pos)
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                self._read_pos += len(line.encode())
+                self.add(*self.parse_line(line))
+
+    def add(self, offset: int, end: int, timestamp: str, task_id: str) -> None:
+        if offset < self.end:
+            return  # Already picked up by catch_up()
+        block = self.blocks[-1] if self.blocks else None
+        if block is None or block[1] >= self.block_size:
+            self.blocks.append([offset, 1, timestamp, timestamp])
+        else:
+            block[1] += 1
+            block[2] = min(block[2], timestamp)
+            block[3] = max(block[3], timestamp)
+        if task_id and self.task_ids is not None:
+            self.task_ids.setdefault(task_id, []).append(offset)
+        self.count += 1
+        self.end = max(self.end, end)
+
+    def catch_up(self, segment_path: Path) -> None:
+        """
+        Index complete records the sidecar doesn't cover yet (a crash between
+        the segment and index writes, or a writer mid-append). In memory only.
+        """
+        if not segment_path.exists() or segment_path.stat().st_size <= self.end:
+            return
+        with open(segment_path, 'rb') as f:
+            f.seek(self.end)
+            offset = self.end
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break
+                end = offset + len(raw)
+                try:
+                    record = json.loads(raw)
+                    self.add(offset, end, record.get('timestamp') or '', str(record.get('task_id') or ''))
+                except json.JSONDecodeError:
+                    self.end = end
+                offset = end
+
+    def block_spans(self, start_ts: str, end_ts: Optional[str]) -> List[Tuple[int, int]]:
+        """Byte spans of the blocks that may hold timestamps in [start_ts, end_ts)"""
+        spans = []
+        for i, (offset, _, low, high) in enumerate(self.blocks):
+            if high < start_ts or (end_ts is not None and low >= end_ts):
+                continue
+            stop = self.blocks[i + 1][0] if i + 1 < len(self.blocks) else self.end
+            if spans and spans[-1][1] == offset:
+                spans[-1] = (spans[-1][0], stop)  # Merge adjacent blocks into one read
+            else:
+                spans.append((offset, stop))
+        return spans
+
+    def tail_offset(self, n: int) -> Tuple[int, int]:
+        """(offset to read from, records from there to the end) covering the last n records"""
+        covered = 0
+        for offset, count, _, _ in reversed(self.blocks):
+            covered += count
+            if covered >= n:
+                return offset, covered
+        return (self.blocks[0][0] if self.blocks else self.end), covered
+
+    @staticmethod
+    def format_line(offset: int, end: int, timestamp: str, task_id: str) -> str:
+        return f"{offset}\t{end}\t{timestamp}\t{task_id}\n"
+
+    @staticmethod
+    def parse_line(line: str) -> Tuple[int, int, str, str]:
+        offset, end, timestamp, task_id = line.rstrip('\n').split('\t', 3)
+        return int(offset), int(end), timestamp, task_id
+
+
+class HistoryStore:
+    """
+    Task history split into daily JSONL segments (state/history/YYYY-MM-DD.jsonl).
+
+    Every segment has an append-only .idx sidecar with each record's offset,
+    timestamp and task_id. In memory only a sparse block index per segment
+    is kept, so last-N and time-range queries read just the blocks they
+    need. task_id lookups cover the newest task_lookup_days segments from
+    an in-memory map (a missing id costs a few dict lookups, not a walk of
+    every segment); older segments are searched only when asked for.
+    Old segments are dropped by age and total size. Derived views
+    (aggregates, columnar store) follow the stream with iter_since(cursor).
+    """
+
+    def __init__(self, directory: str = "state/history",
+                 legacy_file: Optional[str] = "state/task-history.jsonl",
+                 retention_days: int = 90,
+                 max_total_mb: float = 500,
+                 index_block_size: int = 64,
+                 task_lookup_days: int = 7):
+        self.directory = Path(directory)
+        self.retention_days = retention_days
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024)
+        self.index_block_size = index_block_size
+        self.task_lookup_days = task_lookup_days
+        self._indexes: Dict[str, SegmentIndex] = {}
+        self._index_lock = threading.Lock()  # queries may run on several threads
+        self._current_day = None
+        self._open_day = None   # segment whose files are held open for appends
+        self._segment_file = None
+        self._index_file = None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if legacy_file and Path(legacy_file).exists():
+            self.migrate_legacy(legacy_file)
+
+    @classmethod
+    def from_config(cls, tracking_config: Dict[str, Any]) -> 'HistoryStore':
+        """Create from the 'performance_tracking' section of miner-config.json"""
+        return cls(
+            directory=tracking_config.get('history_dir', 'state/history'),
+            legacy_file=tracking_config.get('legacy_history_file', 'state/task-history.jsonl'),
+            retention_days=tracking_config.get('history_retention_days', 90),
+            max_total_mb=tracking_config.get('history_max_total_mb', 500),
+            index_block_size=tracking_config.get('history_index_block_size', 64),
+            task_lookup_days=tracking_config.get('history_task_lookup_days', 7),
+        )
+
+    # -- writing -------------------------------------------------------
+
+    def append(self, record: Dict[str, Any], fsync: bool = False) -> Tuple[str, int, int]:
+        """
+        Append a record to today's segment.
+
+        Returns:
+            (segment day, start offset, end offset) of the written line
+        """
+        return self.append_many([record], fsync)[0]
+
+    def append_many(self, records: List[Dict[str, Any]],
+                    fsync: bool = False) -> List[Tuple[str, int, int]]:
+        """
+        Append records to today's segment in one locked write.
+
+        Args:
+            records: History records (timestamp added if missing)
+            fsync: fsync the segment and index before returning
+
+        Returns:
+            (segment day, start offset, end offset) per record
+        """
+        now = datetime.utcnow()
+        day = now.strftime('%Y-%m-%d')
+        for record in records:
+            if not record.get('timestamp'):
+                record['timestamp'] = now.isoformat()
+
+        if day != self._current_day:
+            self._current_day = day
+            self.apply_retention()
+        return self._append_to_segment(day, records, fsync)
+
+    def sync(self) -> None:
+        """fsync the segment currently open for appends"""
+        for handle in (self._segment_file, self._index_file):
+            if handle is not None:
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def close(self) -> None:
+        """Close the segment files held open for appends"""
+        for handle in (self._segment_file, self._index_file):
+            if handle is not None:
+                handle.close()
+        self._open_day = self._segment_file = self._index_file = None
+
+    def _append_to_segment(self, day: str, records: List[Dict[str, Any]],
+                           fsync: bool = False) -> List[Tuple[str, int, int]]:
+        """Write records and their index lines under an exclusive lock"""
+        lines = [(json.dumps(record) + '\n').encode() for record in records]
+        positions = []
+        index_lines = []
+
+        f, idx = self._open_segment(day)
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            offset = f.seek(0, os.SEEK_END)
+            if offset:
+                f.seek(offset - 1)
+                if f.read(1) != b'\n':
+                    # Terminate a line torn by a crashed writer; readers skip it
+                    f.write(b'\n')
+                    offset += 1
+            for record, line in zip(records, lines):
+                end = offset + len(line)
+                positions.append((day, offset, end))
+                index_lines.append(SegmentIndex.format_line(
+                    offset, end, record.get('timestamp', ''), str(record.get('task_id') or '')
+                ))
+                offset = end
+            f.write(b''.join(lines))
+            f.flush()
+            idx.write(''.join(index_lines))
+            idx.flush()
+            if fsync:
+                os.fsync(f.fileno())
+                os.fsync(idx.fileno())
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return positions
+
+    def _open_segment(self, day: str):
+        """Segment and index handles for appends, kept open while the day lasts"""
+        if self._open_day != day:
+            self.close()
+            self._segment_file = open(self._segment_path(day), 'a+b')
+            self._index_file = open(self._index_path(day), 'a')
+            self._open_day = day
+        return self._segment_file, self._index_file
+
+    # -- queries -------------------------------------------------------
+
+    def segments(self) -> List[str]:
+        """Segment days, oldest first"""
+        return sorted(p.stem for p in self.directory.glob('????-??-??.jsonl'))
+
+    def last_n(self, n: int = 100) -> List[Dict[str, Any]]:
+        """Most recent n records, oldest first (touches only the newest segments)"""
+        result: List[Dict[str, Any]] = []
+        for day in reversed(self.segments()):
+            if len(result) >= n:
+                break
+            index = self._get_index(day)
+            offset, covered = index.tail_offset(n - len(result))
+            if not covered:
+                continue
+            result = self._read_from(day, offset, index.end) + result
+        return result[-n:]
+
+    def range(self, start: datetime, end: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        """Records with start <= timestamp < end, in write order"""
+        start_ts = start.isoformat()
+        end_ts = end.isoformat() if end else None
+        first_day = start.strftime('%Y-%m-%d')
+        last_day = end.strftime('%Y-%m-%d') if end else None
+
+        for day in self.segments():
+            if day < first_day or (last_day and day > last_day):
+                continue
+            index = self._get_index(day)
+            for span_start, span_stop in index.block_spans(start_ts, end_ts):
+                for record in self._read_from(day, span_start, span_stop):
+                    timestamp = record.get('timestamp', '')
+                    if timestamp >= start_ts and (end_ts is None or timestamp < end_ts):
+                        yield record
+
+    def find(self, task_id: str, all_segments: bool = False) -> List[Dict[str, Any]]:
+        """
+        All records for a task_id, newest segment first.
+
+        Args:
+            task_id: Task to look up
+            all_segments: Also scan segments older than task_lookup_days
+                (reads their .idx files; for the CLI, not the hot path)
+        """
+        found = []
+        for day, offsets in self._task_offsets(task_id, all_segments):
+            found.extend(self._read_at(day, offset) for offset in offsets)
+        return [record for record in found if record is not None]
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Most recent record for a task_id within task_lookup_days"""
+        for day, offsets in self._task_offsets(task_id):
+            return self._read_at(day, offsets[-1])
+        return None
+
+    def iter_since(self, cursor: Optional[Cursor] = None) -> Iterator[Tuple[Dict[str, Any], Cursor]]:
+        """
+        Yield (record, cursor after record) for everything written after cursor.
+        Used by derived views to tail the history across segments.
+        """
+        for day in self.segments():
+            if cursor and day < cursor[0]:
+                continue
+            offset = cursor[1] if cursor and day == cursor[0] else 0
+            path = self._segment_path(day)
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        break  # Partial line still being written
+                    offset += len(raw)
+                    try:
+                        record = json.loads(raw)
+                    except json.JSONDecodeError:
+                        continue
+                    yield record, (day, offset)
+
+    # -- maintenance ---------------------------------------------------
+
+    def apply_retention(self) -> int:
+        """
+        Delete segments older than retention_days, then oldest-first until
+        the store fits max_total_mb. Today's segment is never deleted.
+
+        Returns:
+            Number of segments removed
+        """
+        days = self.segments()
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        cutoff = (datetime.utcnow() - timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+        sizes = {day: self._segment_path(day).stat().st_size for day in days}
+        total = sum(sizes.values())
+
+        removed = 0
+        for day in days:
+            if day == today or day == self._open_day:
+                break
+            if day >= cutoff and total <= self.max_total_bytes:
+                break
+            self._segment_path(day).unlink(missing_ok=True)
+            self._index_path(day).unlink(missing_ok=True)
+            with self._index_lock:
+                self._indexes.pop(day, None)
+            total -= sizes[day]
+            removed += 1
+
+        if removed:
+            logger.info(f"History retention removed {removed} segments")
+        return removed
+
+    def migrate_legacy(self, legacy_file: str) -> int:
+        """
+        Split a single-file JSONL history into daily segments by timestamp.
+        Rows without a timestamp inherit the previous row's.
+        The legacy file is renamed to *.migrated afterwards.
+
+        Returns:
+            Number of records migrated
+        """
+        legacy_path = Path(legacy_file)
+        lock_path = self.directory / '.migrate.lock'
+        with open(lock_path, 'w') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            if not legacy_path.exists():
+                return 0  # Another process migrated it
+
+            by_day: Dict[str, List[Dict[str, Any]]] = {}
+            last_timestamp = datetime.utcfromtimestamp(legacy_path.stat().st_mtime).isoformat()
+            with open(legacy_path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    timestamp = record.get('timestamp')
+                    if not timestamp or len(timestamp) < 10:
+                        record['timestamp'] = timestamp = last_timestamp
+                    last_timestamp = timestamp
+                    by_day.setdefault(timestamp[:10], []).append(record)
+
+            for day in sorted(by_day):
+                self._append_to_segment(day, by_day[day], fsync=True)
+            self.close()
+            legacy_path.rename(legacy_path.with_name(legacy_path.name + '.migrated'))
+
+        migrated = sum(len(records) for records in by_day.values())
+        logger.info(f"Migrated {migrated} history records into {len(by_day)} daily segments")
+        return migrated
+
+    # -- helpers -------------------------------------------------------
+
+    def _segment_path(self, day: str) -> Path:
+        return self.directory / f"{day}.jsonl"
+
+    def _index_path(self, day: str) -> Path:
+        return self.directory / f"{day}.idx"
+
+    def _lookup_cutoff(self) -> str:
+        """Oldest segment day whose task_ids are kept in memory"""
+        return (datetime.utcnow() - timedelta(days=self.task_lookup_days)).strftime('%Y-%m-%d')
+
+    def _get_index(self, day: str) -> SegmentIndex:
+        with self._index_lock:
+            index = self._indexes.get(day)
+            if index is None:
+                index = self._indexes[day] = SegmentIndex(
+                    self._index_path(day), self.index_block_size, track_task_ids=day >= self._lookup_cutoff()
+                )
+            index.refresh()
+            index.catch_up(self._segment_path(day))
+            return index
+
+    def _task_offsets(self, task_id: str, all_segments: bool = False) -> Iterator[Tuple[str, List[int]]]:
+        """(day, offsets) holding task_id, newest segment first"""
+        cutoff = self._lookup_cutoff()
+        with self._index_lock:
+            for day, index in self._indexes.items():
+                if day < cutoff:
+                    index.task_ids = None  # Aged out of the window: release the map
+
+        for day in reversed(self.segments()):
+            if day >= cutoff:
+                index = self._get_index(day)
+                offsets = index.task_ids.get(task_id) if index.task_ids is not None else None
+            elif all_segments:
+                offsets = self._scan_index_file(day, task_id)
+            else:
+                break
+            if offsets:
+                yield day, offsets
+
+    def _scan_index_file(self, day: str, task_id: str) -> List[int]:
+        """Offsets of task_id in a segment's .idx file, without caching"""
+        offsets = []
+        path = self._index_path(day)
+        if not path.exists():
+            return offsets
+        with open(path, 'r') as f:
+            for line in f:
+                if line.endswith('\n') and line.rstrip('\n').endswith('\t' + task_id):
+                    offsets.append(SegmentIndex.parse_line(line)[0])
+        return offsets
+
+    def _read_from(self, day: str, start: int, stop: int) -> List[Dict[str, Any]]:
+        """Parse records in [start, stop) of a segment"""
+        with open(self._segment_path(day), 'rb') as f:
+            f.seek(start)
+            data = f.read(stop - start)
+        records = []
+        for raw in data.splitlines():
+            try:
+                records.append(json.loads(raw))
+            except json.JSONDecodeError:
+                continue
+        return records
+
+    def _read_at(self, day: str, offset: int) -> Optional[Dict[str, Any]]:
+        """Parse the single record starting at offset"""
+        with open(self._segment_path(day), 'rb') as f:
+            f.seek(offset)
+            try:
+                return json.loads(f.readline())
+            except json.JSONDecodeError:
+                return None
+
+
+def main():
+    """Query the task history from the command line"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--dir', default='state/history')
+    sub = parser.add_subparsers(dest='command', required=True)
+    tail = sub.add_parser('tail', help='Last N records')
+    tail.add_argument('n', type=int, nargs='?', default=10)
+    since = sub.add_parser('since', help='Records from the last H hours')
+    since.add_argument('hours', type=float)
+    task = sub.add_parser('task', help='Records for a task_id')
+    task.add_argument('task_id')
+    args = parser.parse_args()
+
+    store = HistoryStore(args.dir, legacy_file=None)
+    if args.command == 'tail':
+        records = store.last_n(args.n)
+    elif args.command == 'since':
+        records = store.range(datetime.utcnow() - timedelta(hours=args.hours))
+    else:
+        records = store.find(args.task_id, all_segments=True)
+    for record in records:
+        print(json.dumps(record))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""Group-commit history writer shared by the task handler and tracker"""
+
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Tuple
+
+from .history_store import HistoryStore
+
+logger = logging.getLogger(__name__)
+
+# Unified history record schema. Every record carries these keys (None when
+# not known); extra context (response, classification, cascade) rides along.
+HISTORY_FIELDS = (
+    'timestamp',        # ISO UTC time the record was submitted
+    'event',            # 'task' (response submitted) or 'score' (validator feedback)
+    'task_id',
+    'subnet_id',
+    'llm',
+    'strategy',
+    'task_type',
+    'tokens',
+    'latency_ms',
+    'ttft_ms',          # time to first token (streaming providers)
+    'output_tokens',    # tokens in the submitted response
+    'truncated',        # response hit its learned max_tokens cap
+    'clipped',          # response hit a lower pacing/budget limit instead
+    'validator_score',
+    'status',
+)
+
+# Older record keys -> unified names
+LEGACY_FIELD_NAMES = {
+    'llm_used': 'llm',
+    'prompt_strategy': 'strategy',
+    'tokens_spent': 'tokens',
+}
+
+FSYNC_POLICIES = ('batch', 'interval', 'never')
+
+
+def normalize_record(record: Dict[str, Any], event: str = 'task') -> Dict[str, Any]:
+    """
+    Map a record onto the unified history schema.
+
+    Args:
+        record: Task result or score record (legacy key names accepted)
+        event: Default event type if the record has none
+
+    Returns:
+        New dict with every HISTORY_FIELDS key present
+    """
+    normalized = dict.fromkeys(HISTORY_FIELDS)
+    for key, value in record.items():
+        normalized[LEGACY_FIELD_NAMES.get(key, key)] = value
+
+    classification = record.get('classification') or {}
+    if normalized['task_type'] is None:
+        normalized['task_type'] = classification.get('task_type')
+    normalized['event'] = normalized['event'] or event
+    normalized['timestamp'] = normalized['timestamp'] or datetime.utcnow().isoformat()
+    return normalized
+
+
+class HistoryWriter:
+    """
+    Single writer in front of the HistoryStore.
+
+    Records go into a bounded in-memory queue; a background thread writes
+    them to the current segment in batches (when batch_size records are
+    queued or the oldest has lingered linger_seconds), one locked write
+    per batch. If the queue fills up, the submitting thread flushes
+    itself (backpressure) rather than dropping records.
+
+    A failed write is retried with exponential backoff (retry_backoff_seconds,
+    doubling up to max_backoff_seconds). After max_write_retries failures in
+    a row the queued records are dropped to the error log so a broken disk
+    can't pin the flusher or grow the queue forever.
+
+    fsync policy:
+        batch    - fsync after every batch (default)
+        interval - fsync at most every fsync_interval_seconds
+        never    - leave it to the OS
+    """
+
+    _shared: Dict[str, 'HistoryWriter'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, store: HistoryStore,
+                 batch_size: int = 64,
+                 linger_seconds: float = 0.2,
+                 max_queue: int = 10000,
+                 fsync: str = 'batch',
+                 fsync_interval_seconds: float = 1.0,
+                 max_write_retries: int = 5,
+                 retry_backoff_seconds: float = 0.5,
+                 max_backoff_seconds: float = 30.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}' (expected one of {FSYNC_POLICIES})")
+
+        self.store = store
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self.max_queue = max_queue
+        self.fsync = fsync
+        self.fsync_interval_seconds = fsync_interval_seconds
+        self.max_write_retries = max_write_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        self._queue: List[Dict[str, Any]] = []
+        self._first_queued = 0.0
+        self._cond = threading.Condition()
+        self._write_lock = threading.RLock()  # keeps batches in submit order; listeners may re-enter
+        self._listeners: List[Callable[[Dict[str, Any], Tuple[str, int, int]], None]] = []
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+        self._stop = threading.Event()
+        self._flusher = None
+        self._failures = 0       # consecutive failed writes
+        self._retry_at = 0.0     # monotonic time before which writes are skipped
+        self.stats = {'write_errors': 0, 'dropped': 0}
+
+        atexit.register(self.close)
+        logger.debug(f"HistoryWriter ready (batch {batch_size}, fsync {fsync})")
+
+    @classmethod
+    def from_config(cls, tracking_config: Dict[str, Any]) -> 'HistoryWriter':
+        """Create from the 'performance_tracking' section of miner-config.json"""
+        writer_config = tracking_config.get('history_writer', {})
+        return cls(
+            store=HistoryStore.from_config(tracking_config),
+            batch_size=writer_config.get('batch_size', 64),
+            linger_seconds=writer_config.get('linger_ms', 200) / 1000,
+            max_queue=writer_config.get('max_queue', 10000),
+            fsync=writer_config.get('fsync', 'batch'),
+            fsync_interval_seconds=writer_config.get('fsync_interval_seconds', 1.0),
+            max_write_retries=writer_config.get('max_write_retries', 5),
+            retry_backoff_seconds=writer_config.get('retry_backoff_ms', 500) / 1000,
+            max_backoff_seconds=writer_config.get('max_backoff_seconds', 30.0),
+        )
+
+    @classmethod
+    def shared(cls, tracking_config: Dict[str, Any]) -> 'HistoryWriter':
+        """
+        The process-wide writer for a history directory, created on first use.
+        TaskHandler and PerformanceTracker share it so one thread owns the
+        appends; other processes are serialized by the segment flock.
+        """
+        directory = tracking_config.get('history_dir', 'state/history')
+        with cls._shared_lock:
+            writer = cls._shared.get(directory)
+            if writer is None:
+                writer = cls._shared[directory] = cls.from_config(tracking_config)
+            return writer
+
+    def add_listener(self, listener: Callable[[Dict[str, Any], Tuple[str, int, int]], None]) -> None:
+        """Call listener(record, (day, start, end)) for every record once written"""
+        self._listeners.append(listener)
+
+    def submit(self, record: Dict[str, Any], event: str = 'task') -> Dict[str, Any]:
+        """
+        Queue a record for the next batch.
+
+        Args:
+            record: Task result or score record
+            event: 'task' or 'score' (if the record doesn't say)
+
+        Returns:
+            The normalized record as it will be written
+        """
+        record = normalize_record(record, event)
+        with self._cond:
+            if not self._queue:
+                self._first_queued = time.monotonic()
+            self._queue.append(record)
+            queued = len(self._queue)
+            if queued == 1 or queued >= self.batch_size:
+                self._cond.notify()
+
+        if queued >= self.max_queue:
+            logger.warning("History queue full; flushing in the caller")
+            self.flush()
+        else:
+            self._ensure_flusher()
+        return record
+
+    def flush(self, force: bool = False) -> int:
+        """
+        Write everything queued so far (readers call this for read-your-writes).
+
+        Args:
+            force: Try even while backing off after a failed write
+
+        Returns:
+            Number of records written
+        """
+        with self._write_lock:
+            if not force and time.monotonic() < self._retry_at:
+                return 0
+            with self._cond:
+                batch, self._queue = self._queue, []
+            if not batch:
+                if self._unsynced and self.fsync == 'interval':
+                    self._maybe_fsync()
+                return 0
+
+            now = time.monotonic()
+            fsync = self.fsync == 'batch' or (
+                self.fsync == 'interval' and now - self._last_fsync >= self.fsync_interval_seconds
+            )
+            try:
+                positions = self.store.append_many(batch, fsync=fsync)
+            except Exception as e:
+                self._write_failed(batch, e)
+                return 0
+
+            self._failures = 0
+            self._retry_at = 0.0
+            if fsync:
+                self._last_fsync = now
+            self._unsynced = not fsync and self.fsync != 'never'
+
+            for listener in self._listeners:
+                for record, position in zip(batch, positions):
+                    try:
+                        listener(record, position)
+                    except Exception as e:
+                        logger.error(f"History listener failed: {e}")
+            return len(batch)
+
+    def pending(self) -> int:
+        """Records queued but not yet written"""
+        with self._cond:
+            return len(self._queue)
+
+    def close(self) -> None:
+        """Flush queued records and stop the background flusher"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        self.flush(force=True)
+        with self._write_lock:
+            self.store.close()
+
+    def _write_failed(self, batch: List[Dict[str, Any]], error: Exception) -> None:
+        """Requeue a batch for a later attempt, or drop it once retries run out (write lock held)"""
+        self.stats['write_errors'] += 1
+        self._failures += 1
+        if self._failures > self.max_write_retries:
+            with self._cond:
+                dropped = batch + self._queue
+                self._queue = []
+            self.stats['dropped'] += len(dropped)
+            logger.error(f"Dropping {len(dropped)} history records after "
+                         f"{self._failures} failed writes: {error}")
+            for record in dropped:
+                logger.error(f"Unwritten history record: {record}")
+            self._failures = 0
+            self._retry_at = 0.0
+            return
+
+        delay = min(self.retry_backoff_seconds * 2 ** (self._failures - 1), self.max_backoff_seconds)
+        self._retry_at = time.monotonic() + delay
+        logger.error(f"Failed to write {len(batch)} history records "
+                     f"(attempt {self._failures}, retrying in {delay:.1f}s): {error}")
+        with self._cond:
+            self._queue[:0] = batch  # Keep them for the next attempt
+
+    def _maybe_fsync(self) -> None:
+        """Flush the last unsynced batch once the interval has passed (write lock held)"""
+        if time.monotonic() - self._last_fsync >= self.fsync_interval_seconds:
+            self.store.sync()
+            self._last_fsync = time.monotonic()
+            self._unsynced = False
+
+    def _ensure_flusher(self) -> None:
+        """Start the background flusher thread on first use"""
+        if self._flusher is None and not self._stop.is_set():
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name='history-writer', daemon=True
+            )
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        """Write a batch when it is full or its oldest record has lingered long enough"""
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._queue and not self._stop.is_set():
+                    if not self._cond.wait(self.fsync_interval_seconds) and self._unsynced:
+                        break
+                deadline = self._first_queued + self.linger_seconds
+                if self._retry_at > deadline:
+                    deadline = self._retry_at  # Back off after a failed write
+                while (self._queue and (len(self._queue) < self.batch_size or self._retry_at)
+                       and not self._stop.is_set()):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            self.flush()
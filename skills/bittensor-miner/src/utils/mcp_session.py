@@ -0,0 +1,353 @@
+"""Long-lived MCP stdio session with pipelined JSON-RPC, and its supervisor"""
+
+import itertools
+import json
+import logging
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, List, Callable
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = '2024-11-05'
+CLIENT_INFO = {'name': 'openclawd-bittensor-miner', 'version': '1.0'}
+
+
+class MCPError(Exception):
+    """Error returned by the MCP server for a request or tool call"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"MCP error {code}: {message}")
+        self.code = code
+        self.message = message
+
+
+class MCPUnavailable(ConnectionError):
+    """No live session to the MCP server right now"""
+
+
+class MCPSession:
+    """
+    One MCP server process spoken to over stdio (newline-delimited JSON-RPC).
+
+    The process is spawned and the initialize handshake done once. After
+    that every request is written as soon as it is made, and a reader
+    thread matches responses by id. Concurrent callers share the process
+    without waiting on each other's round trips. When the process exits,
+    everything in flight fails at once and on_exit is called.
+
+    A request that times out is forgotten. After max_timeouts timeouts in
+    a row with no response in between, the process is taken to be hung:
+    it is killed and on_exit is called, so the supervisor restarts it.
+    """
+
+    def __init__(self, command: List[str], env: Optional[Dict[str, str]] = None,
+                 on_exit: Optional[Callable[['MCPSession'], None]] = None,
+                 max_timeouts: int = 3):
+        self.command = command
+        self.env = env
+        self.on_exit = on_exit
+        self.max_timeouts = max_timeouts
+        self.process: Optional[subprocess.Popen] = None
+        self.server_info: Dict[str, Any] = {}
+        self.healthy = False
+        self.timeouts = 0  # Consecutive timeouts since the last response
+        self._ids = itertools.count(1)
+        self._inflight: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.healthy and self.process is not None and self.process.poll() is None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def start(self, timeout: float = 15.0) -> Dict[str, Any]:
+        """
+        Spawn the server and complete the MCP handshake.
+
+        Returns:
+            The server's initialize result
+        """
+        self.process = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, env=self.env, bufsize=0
+        )
+        self.healthy = True
+        threading.Thread(target=self._read_loop, name='mcp-reader', daemon=True).start()
+        threading.Thread(target=self._drain_stderr, name='mcp-stderr', daemon=True).start()
+        try:
+            self.server_info = self.call('initialize', {
+                'protocolVersion': PROTOCOL_VERSION,
+                'capabilities': {},
+                'clientInfo': CLIENT_INFO,
+            }, timeout=timeout)
+            self.notify('notifications/initialized')
+        except Exception:
+            self.close()
+            raise
+        return self.server_info
+
+    def request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Future:
+        """Send a request now; the Future resolves when its response arrives"""
+        future: Future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            if not self.healthy:
+                raise MCPUnavailable(f"MCP session {self.command[0]} is down")
+            self._inflight[request_id] = future
+        message = {'jsonrpc': '2.0', 'id': request_id, 'method': method}
+        if params is not None:
+            message['params'] = params
+        self._write(message)
+        return future
+
+    def call(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10.0) -> Any:
+        future = self.request(method, params)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            if future.done():
+                return future.result()
+            self._timed_out(future)
+            raise
+
+    def notify(self, method: str, params: Optional[Dict[str, Any]] = None) -> None:
+        message = {'jsonrpc': '2.0', 'method': method}
+        if params is not None:
+            message['params'] = params
+        self._write(message)
+
+    def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                  timeout: float = 10.0) -> Any:
+        """
+        Call an MCP tool.
+
+        Returns:
+            structuredContent if given, else the text content parsed as JSON
+            when it is JSON (plain text otherwise)
+
+        Raises:
+            MCPError: The tool reported an error
+        """
+        result = self.call('tools/call', {'name': name, 'arguments': arguments or {}}, timeout)
+        text = ''.join(item.get('text', '') for item in result.get('content', [])
+                       if item.get('type') == 'text')
+        if result.get('isError'):
+            raise MCPError(-1, text or f"Tool {name} failed")
+        if 'structuredContent' in result:
+            return result['structuredContent']
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+
+    def close(self) -> None:
+        """Stop the process without triggering on_exit"""
+        self._fail(MCPUnavailable("MCP session closed"), notify=False)
+
+    def _write(self, message: Dict[str, Any]) -> None:
+        line = (json.dumps(message) + '\n').encode()
+        try:
+            with self._write_lock:
+                self.process.stdin.write(line)
+                self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            self._fail(MCPUnavailable(f"Write to {self.command[0]} failed: {e}"))
+
+    def _read_loop(self) -> None:
+        stdout = self.process.stdout
+        for line in iter(stdout.readline, b''):
+            try:
+                message = json.loads(line)
+            except ValueError:
+                logger.debug(f"Ignoring non-JSON line from {self.command[0]}: {line[:200]!r}")
+                continue
+            if 'id' not in message or 'method' in message:
+                continue  # Server notification or request (we offer no client capabilities)
+            with self._lock:
+                self.timeouts = 0
+                future = self._inflight.pop(message['id'], None)
+            if future is None:
+                continue
+            error = message.get('error')
+            if error:
+                future.set_exception(MCPError(error.get('code', 0), error.get('message', '')))
+            else:
+                future.set_result(message.get('result', {}))
+        self._fail(MCPUnavailable(f"{self.command[0]} exited"))
+
+    def _drain_stderr(self) -> None:
+        for line in iter(self.process.stderr.readline, b''):
+            logger.debug(f"{self.command[0]}: {line.decode(errors='replace').rstrip()}")
+
+    def _timed_out(self, future: Future) -> None:
+        """Forget a timed-out request; kill the process once it looks hung"""
+        with self._lock:
+            for request_id, pending in list(self._inflight.items()):
+                if pending is future:
+                    del self._inflight[request_id]
+                    break
+            self.timeouts += 1
+            hung = self.healthy and self.timeouts >= self.max_timeouts
+        future.cancel()
+        if hung:
+            logger.error(f"{self.command[0]} timed out {self.timeouts} times in a row; restarting it")
+            self._fail(MCPUnavailable(f"{self.command[0]} stopped answering"))
+
+    def _fail(self, error: Exception, notify: bool = True) -> None:
+        """Mark down, fail everything in flight, stop the process, tell the supervisor once"""
+        with self._lock:
+            was_healthy = self.healthy
+            self.healthy = False
+            inflight, self._inflight = self._inflight, {}
+        for future in inflight.values():
+            if not future.done():
+                future.set_exception(error)
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if was_healthy and notify and self.on_exit:
+            self.on_exit(self)
+
+
+class MCPSupervisor:
+    """
+    Keeps one MCPSession to a server command running.
+
+    start() returns immediately. A supervisor thread spawns the session,
+    and if the process dies or fails its handshake, restarts it with
+    exponential backoff and jitter. call_tool() never waits for a process
+    to come up: with no live session it raises MCPUnavailable at once, so
+    callers can fall back to cached values.
+    """
+
+    def __init__(self, command: List[str], env: Optional[Dict[str, str]] = None,
+                 request_timeout: float = 10.0, startup_timeout: float = 15.0,
+                 backoff_initial: float = 1.0, backoff_max: float = 60.0,
+                 max_consecutive_timeouts: int = 3):
+        """
+        Args:
+            command: Server command line
+            env: Environment for the server (None = inherit)
+            request_timeout: Default wait for a tool call
+            startup_timeout: Wait for the initialize handshake
+            backoff_initial: First restart delay after a failure
+            backoff_max: Longest restart delay
+            max_consecutive_timeouts: Timed-out calls in a row after which
+                a live but unresponsive process is restarted
+        """
+        self.command = command
+        self.env = env
+        self.request_timeout = request_timeout
+        self.startup_timeout = startup_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.max_consecutive_timeouts = max_consecutive_timeouts
+        self.session: Optional[MCPSession] = None
+        self.stats = {'starts': 0, 'restarts': 0, 'start_failures': 0, 'calls': 0, 'unavailable': 0,
+                      'timeouts': 0}
+
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def alive(self) -> bool:
+        session = self.session
+        return session is not None and session.alive
+
+    def start(self) -> None:
+        """Start supervising (non-blocking)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._supervise, name='mcp-supervisor', daemon=True)
+        self._thread.start()
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Block until a session is up (startup and tests only)"""
+        return self._ready.wait(timeout)
+
+    def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                  timeout: Optional[float] = None) -> Any:
+        """
+        Call a tool on the live session.
+
+        Raises:
+            MCPUnavailable: No live session (starting or restarting)
+            MCPError: The tool reported an error
+        """
+        session = self.session
+        if session is None or not session.alive:
+            self.stats['unavailable'] += 1
+            raise MCPUnavailable(f"{self.command[0]} is not running")
+        self.stats['calls'] += 1
+        try:
+            return session.call_tool(name, arguments, timeout or self.request_timeout)
+        except TimeoutError:
+            self.stats['timeouts'] += 1
+            raise
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self.session is not None:
+            self.session.close()
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def _supervise(self) -> None:
+        backoff = self.backoff_initial
+        started_at = None
+        while not self._stop.is_set():
+            if self.session is None or not self.session.alive:
+                self._ready.clear()
+                if started_at is not None:
+                    # It died: back off unless it had been up for a while
+                    if time.monotonic() - started_at >= self.backoff_max:
+                        backoff = self.backoff_initial
+                    else:
+                        self._backoff(backoff, "exited")
+                        backoff = min(backoff * 2, self.backoff_max)
+                    started_at = None
+                    if self._stop.is_set():
+                        return
+                    self.stats['restarts'] += 1
+
+                self.stats['starts'] += 1
+                session = MCPSession(self.command, self.env, on_exit=lambda _: self._wake.set(),
+                                     max_timeouts=self.max_consecutive_timeouts)
+                try:
+                    info = session.start(self.startup_timeout)
+                except Exception as e:
+                    self.stats['start_failures'] += 1
+                    self._backoff(backoff, f"failed to start: {e}")
+                    backoff = min(backoff * 2, self.backoff_max)
+                    continue
+                self.session = session
+                started_at = time.monotonic()
+                self._ready.set()
+                logger.info(f"MCP session to {self.command[0]} ready "
+                            f"({info.get('serverInfo', {}).get('name', 'unknown server')})")
+            self._wake.wait()
+            self._wake.clear()
+
+    def _backoff(self, backoff: float, reason: str) -> None:
+        """Wait a jittered backoff before the next start"""
+        delay = backoff * (0.5 + random.random() / 2)
+        logger.error(f"{self.command[0]} {reason}; restarting in {delay:.1f}s")
+        self._stop.wait(delay)
@@ -0,0 +1,295 @@
+"""Block-aware local metagraph cache with incremental sync"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from .chain_backend import ChainBackend
+
+logger = logging.getLogger(__name__)
+
+
+class MetagraphCache:
+    """
+    Local copy of one subnet's metagraph (hotkeys, UIDs, stakes, validator
+    permits), our own UID/registration/balance and the block it reflects.
+
+    Lookups (is_validator, get_stake, uid_of, is_registered) are dict reads
+    and never wait on the chain; syncs build new dicts and swap them in, so
+    readers need no lock. Sync is block-aware: nothing is fetched
+    unless the chain has produced a new block, and then only the neurons
+    changed since the cached block (a full metagraph fetch only on first
+    load, on a gap the backend can't answer incrementally, or at a new
+    epoch when full_sync_each_epoch is set).
+
+    Stale-while-revalidate: once the data is refresh_interval_seconds old
+    a lookup still answers from the cache and starts one background
+    refresh; only data older than max_stale_seconds is refreshed inline.
+    Callers that must never wait on the chain (an event loop) use
+    is_validator_cached(), which only ever refreshes in the background.
+    The last good copy is kept on disk so a restart serves from it while
+    the first sync runs.
+    """
+
+    def __init__(self, backend: ChainBackend, netuid: int, our_hotkey: str,
+                 our_coldkey: Optional[str] = None,
+                 refresh_interval_seconds: float = 12.0,
+                 max_stale_seconds: float = 120.0,
+                 full_sync_each_epoch: bool = False,
+                 snapshot_file: Optional[str] = None):
+        """
+        Args:
+            backend: Chain access
+            netuid: Subnet to mirror
+            our_hotkey: Our hotkey address (for UID and registration)
+            our_coldkey: Address whose balance to track (defaults to the hotkey)
+            refresh_interval_seconds: Age at which a background refresh starts
+                (one block time by default)
+            max_stale_seconds: Age at which lookups refresh inline instead
+            full_sync_each_epoch: Refetch the whole metagraph every tempo blocks
+            snapshot_file: JSON copy of the cache for warm restarts (None = memory only)
+        """
+        self.backend = backend
+        self.netuid = netuid
+        self.our_hotkey = our_hotkey
+        self.our_coldkey = our_coldkey or our_hotkey
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.full_sync_each_epoch = full_sync_each_epoch
+        self.snapshot_file = Path(snapshot_file) if snapshot_file else None
+
+        self.block: Optional[int] = None
+        self.tempo = 360
+        self.neurons: Dict[int, Dict[str, Any]] = {}   # uid -> neuron
+        self.uids: Dict[str, int] = {}                 # hotkey -> uid
+        self.stakes: Dict[str, float] = {}             # hotkey -> stake
+        self.validators: Dict[str, float] = {}         # validator-permit hotkey -> stake
+        self.our_uid: Optional[int] = None
+        self.balance: Optional[float] = None
+        self.synced_at = 0.0  # monotonic time of the last successful sync
+        self.stats = {'full_syncs': 0, 'incremental_syncs': 0, 'unchanged': 0,
+                      'background_refreshes': 0, 'errors': 0}
+
+        self._sync_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        self._retry_at = 0.0  # After a failed sync, don't hit the chain again before this
+        self._load_snapshot()
+
+    # Hot-path lookups ------------------------------------------------------
+
+    def is_validator(self, hotkey: str, min_stake: float = 0.0) -> bool:
+        """Registered with a validator permit and at least min_stake"""
+        self._revalidate()
+        stake = self.validators.get(hotkey)
+        return stake is not None and stake >= min_stake
+
+    def is_validator_cached(self, hotkey: str, min_stake: float = 0.0) -> bool:
+        """is_validator() that never syncs inline, however stale the cache"""
+        self._revalidate(inline=False)
+        stake = self.validators.get(hotkey)
+        return stake is not None and stake >= min_stake
+
+    def get_stake(self, hotkey: str) -> float:
+        """Stake of a registered hotkey (0.0 if not registered)"""
+        self._revalidate()
+        return self.stakes.get(hotkey, 0.0)
+
+    def get_stake_cached(self, hotkey: str) -> float:
+        """
+        get_stake() from the current snapshot only: never syncs or starts
+        a refresh, so it is safe under other locks and on the event loop
+        """
+        return self.stakes.get(hotkey, 0.0)
+
+    def uid_of(self, hotkey: str) -> Optional[int]:
+        """UID of a hotkey, or None if not registered"""
+        self._revalidate()
+        return self.uids.get(hotkey)
+
+    def is_registered(self, hotkey: Optional[str] = None) -> bool:
+        """Whether hotkey (default: ours) is registered on the subnet"""
+        self._revalidate()
+        return (hotkey or self.our_hotkey) in self.uids
+
+    def age_seconds(self) -> float:
+        """Seconds since the last successful sync"""
+        return time.monotonic() - self.synced_at if self.synced_at else float('inf')
+
+    def info(self) -> Dict[str, Any]:
+        """Subnet summary in get_subnet_info() form"""
+        self._revalidate()
+        return {
+            'subnet_id': self.netuid,
+            'block_number': self.block,
+            'tempo': self.tempo,
+            'neurons': len(self.neurons),
+            'active_validators': len(self.validators),
+            'active_miners': len(self.neurons) - len(self.validators),
+            'our_uid': self.our_uid,
+            'current_stake': self.stakes.get(self.our_hotkey, 0.0),
+            'cache_age_seconds': round(self.age_seconds(), 1),
+        }
+
+    # Sync -------------------------------------------------------------------
+
+    def sync(self, force_full: bool = False) -> bool:
+        """
+        Bring the cache up to the chain head.
+
+        Args:
+            force_full: Refetch the whole metagraph
+
+        Returns:
+            True if the cache is current, False if the chain could not be reached
+        """
+        with self._sync_lock:
+            try:
+                head = self.backend.get_block_number()
+                if not force_full and self.block is not None and head == self.block:
+                    self.stats['unchanged'] += 1
+                    self.synced_at = time.monotonic()
+                    return True
+
+                new_epoch = (self.block is not None
+                             and head // self.tempo != self.block // self.tempo)
+                updates = None
+                if not force_full and self.block is not None and not (
+                        new_epoch and self.full_sync_each_epoch):
+                    updates = self.backend.get_neuron_updates(self.netuid, self.block)
+
+                if updates is None:
+                    self._apply_full(self.backend.get_metagraph(self.netuid))
+                    self.stats['full_syncs'] += 1
+                else:
+                    self._apply_updates(updates)
+                    self.stats['incremental_syncs'] += 1
+
+                self.balance = self.backend.get_balance(self.our_coldkey)
+                self.synced_at = time.monotonic()
+            except Exception as e:
+                self.stats['errors'] += 1
+                self._retry_at = time.monotonic() + self.refresh_interval_seconds
+                logger.error(f"Metagraph sync for subnet {self.netuid} failed: {e}")
+                return False
+
+        self._save_snapshot()
+        return True
+
+    def refresh_async(self) -> bool:
+        """
+        Start a background sync unless one is already running.
+
+        Returns:
+            True if a refresh was started
+        """
+        with self._refresh_lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+        self.stats['background_refreshes'] += 1
+        threading.Thread(target=self._background_sync, name='metagraph-refresh',
+                         daemon=True).start()
+        return True
+
+    def _background_sync(self) -> None:
+        try:
+            self.sync()
+        finally:
+            self._refreshing = False
+
+    def _revalidate(self, inline: bool = True) -> None:
+        """Serve what we have; refresh in the background or, if too old, inline"""
+        age = self.age_seconds()
+        if age < self.refresh_interval_seconds or time.monotonic() < self._retry_at:
+            return
+        if inline and age >= self.max_stale_seconds:
+            self.sync()
+        else:
+            self.refresh_async()
+
+    def _apply_full(self, metagraph: Dict[str, Any]) -> None:
+        """Replace the cache with a full metagraph (sync lock held)"""
+        neurons = {neuron['uid']: neuron for neuron in metagraph['neurons']}
+        uids, stakes, validators = {}, {}, {}
+        for uid, neuron in neurons.items():
+            uids[neuron['hotkey']] = uid
+            stakes[neuron['hotkey']] = neuron['stake']
+            if neuron.get('validator_permit'):
+                validators[neuron['hotkey']] = neuron['stake']
+
+        self.neurons, self.uids, self.stakes, self.validators = neurons, uids, stakes, validators
+        self.tempo = metagraph.get('tempo', self.tempo)
+        self.block = metagraph['block']
+        self.our_uid = uids.get(self.our_hotkey)
+
+    def _apply_updates(self, updates: Dict[str, Any]) -> None:
+        """Apply changed and removed neurons to copies, then swap (sync lock held)"""
+        if not updates['neurons'] and not updates.get('removed'):
+            self.block = updates['block']
+            return
+        maps = (dict(self.neurons), dict(self.uids), dict(self.stakes), dict(self.validators))
+        neurons, uids, stakes, validators = maps
+        for uid in updates.get('removed', []):
+            self._drop(uid, maps)
+        for neuron in updates['neurons']:
+            uid = neuron['uid']
+            self._drop(uid, maps)
+            neurons[uid] = neuron
+            uids[neuron['hotkey']] = uid
+            stakes[neuron['hotkey']] = neuron['stake']
+            if neuron.get('validator_permit'):
+                validators[neuron['hotkey']] = neuron['stake']
+
+        self.neurons, self.uids, self.stakes, self.validators = maps
+        self.block = updates['block']
+        self.our_uid = uids.get(self.our_hotkey)
+
+    @staticmethod
+    def _drop(uid: int, maps: tuple) -> None:
+        """Forget whichever hotkey held uid"""
+        neurons, uids, stakes, validators = maps
+        old = neurons.pop(uid, None)
+        if old is not None and uids.get(old['hotkey']) == uid:
+            uids.pop(old['hotkey'], None)
+            stakes.pop(old['hotkey'], None)
+            validators.pop(old['hotkey'], None)
+
+    def _load_snapshot(self) -> None:
+        """Start from the last saved copy (stale until the first sync)"""
+        if self.snapshot_file is None or not self.snapshot_file.exists():
+            return
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                data = json.load(f)
+            if data.get('netuid') != self.netuid:
+                return
+            self._apply_full({'block': data['block'], 'tempo': data.get('tempo', 360),
+                              'neurons': data['neurons']})
+            self.balance = data.get('balance')
+            logger.debug(f"Loaded metagraph snapshot for subnet {self.netuid} at block {self.block}")
+        except (json.JSONDecodeError, OSError, KeyError) as e:
+            logger.error(f"Failed to load metagraph snapshot: {e}")
+
+    def _save_snapshot(self) -> None:
+        """Atomically write the cache for warm restarts"""
+        if self.snapshot_file is None:
+            return
+        try:
+            self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.snapshot_file.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'netuid': self.netuid,
+                    'block': self.block,
+                    'tempo': self.tempo,
+                    'neurons': list(self.neurons.values()),
+                    'balance': self.balance,
+                }, f)
+            os.replace(tmp_path, self.snapshot_file)
+        except OSError as e:
+            logger.error(f"Failed to save metagraph snapshot: {e}")
@@ -0,0 +1,304 @@
+"""Learned output-length caps per subnet, task type and strategy"""
+
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from .history_store import HistoryStore
+from .quantile_sketch import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+SKETCH_PARAMS = {'mapping': 'log', 'relative_accuracy': 0.01, 'max_buckets': 256}
+
+
+def length_key(subnet_id: Any, task_type: Optional[str], strategy: Optional[str]) -> str:
+    """Group key 'subnet|task_type|strategy'"""
+    return f"{subnet_id}|{task_type or 'unknown'}|{strategy or 'unknown'}"
+
+
+class OutputLengthModel:
+    """
+    Learns how many output tokens each subnet x task_type x strategy
+    actually needs and caps max_tokens near a high quantile of it.
+
+    Output lengths go into daily QuantileSketches (kept for window_days),
+    fed by the history writer and caught up from the store through a
+    checkpointed cursor, like PerformanceAggregates. The cap is
+    quantile(q) * headroom, rounded up and clamped to [min_tokens, the
+    subnet's max_tokens_per_task]; groups with fewer than min_samples
+    tasks keep the subnet default.
+
+    A capped response that hits the limit is recorded as truncated, and
+    its length is then the cap, not the real need, so the quantile alone
+    would never grow back. Each group therefore also tracks its truncation
+    rate: above target_truncation_rate the cap is multiplied by
+    relax_factor (repeatedly, up to the default), and well below it the
+    extra allowance is withdrawn one step at a time. Responses stopped by
+    a pacing or budget limit below the cap ('clipped') are left out.
+    """
+
+    def __init__(self, store: HistoryStore,
+                 state_file: str = "state/output-lengths.json",
+                 quantile: float = 0.95,
+                 headroom: float = 1.2,
+                 min_samples: int = 50,
+                 window_days: int = 14,
+                 min_tokens: int = 64,
+                 round_to: int = 16,
+                 target_truncation_rate: float = 0.02,
+                 relax_factor: float = 1.25,
+                 enabled: bool = True):
+        self.store = store
+        self.state_file = Path(state_file)
+        self.quantile = quantile
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.window_days = window_days
+        self.min_tokens = min_tokens
+        self.round_to = round_to
+        self.target_truncation_rate = target_truncation_rate
+        self.relax_factor = relax_factor
+        self.enabled = enabled
+
+        self.cursor = None  # (segment day, offset) of the next unread record
+        self.days: Dict[str, Dict[str, Dict[str, Any]]] = {}  # day -> key -> {'sketch', 'tasks', 'truncated'}
+        self.relax: Dict[str, Dict[str, Any]] = {}  # key -> {'boost', 'tasks', 'truncated'} since last adjustment
+        self._base_caps: Dict[str, Optional[float]] = {}  # key -> quantile * headroom (None = too few samples)
+        self._dirty = False
+        self._lock = threading.RLock()  # note_append runs on the history writer thread
+        self.load()
+        atexit.register(self.save)
+
+    @classmethod
+    def from_config(cls, tracking_config: Dict[str, Any], store: HistoryStore) -> 'OutputLengthModel':
+        """Create from the 'performance_tracking' section of miner-config.json"""
+        config = tracking_config.get('output_length', {})
+        return cls(
+            store=store,
+            state_file=config.get('state_file', 'state/output-lengths.json'),
+            quantile=config.get('quantile', 0.95),
+            headroom=config.get('headroom', 1.2),
+            min_samples=config.get('min_samples', 50),
+            window_days=config.get('window_days', 14),
+            min_tokens=config.get('min_tokens', 64),
+            round_to=config.get('round_to', 16),
+            target_truncation_rate=config.get('target_truncation_rate', 0.02),
+            relax_factor=config.get('relax_factor', 1.25),
+            enabled=config.get('enabled', True),
+        )
+
+    def cap(self, subnet_id: Any, task_type: Optional[str], strategy: Optional[str],
+            default: int) -> int:
+        """
+        max_tokens for a task (a dict lookup unless the group just changed).
+
+        Args:
+            subnet_id: Target subnet
+            task_type: Task type from classification
+            strategy: Prompt strategy
+            default: The subnet's static max_tokens_per_task (upper bound)
+
+        Returns:
+            Learned cap, or default when disabled or not enough history
+        """
+        if not self.enabled:
+            return default
+        key = length_key(subnet_id, task_type, strategy)
+        with self._lock:
+            if key not in self._base_caps:
+                self._base_caps[key] = self._compute_base(key)
+            base = self._base_caps[key]
+            boost = self.relax.get(key, {}).get('boost', 1.0)
+        if base is None:
+            return default
+        capped = math.ceil(base * boost / self.round_to) * self.round_to
+        return int(min(default, max(self.min_tokens, capped)))
+
+    def add_record(self, record: Dict[str, Any]) -> bool:
+        """
+        Fold a task record's output length into its group.
+
+        Returns:
+            True if the record carried a usable output length
+        """
+        output_tokens = record.get('output_tokens')
+        timestamp = record.get('timestamp')
+        if record.get('event', 'task') != 'task' or output_tokens is None or not timestamp:
+            return False
+        if record.get('clipped'):
+            return False
+
+        key = length_key(record.get('subnet_id'), record.get('task_type'), record.get('strategy'))
+        truncated = bool(record.get('truncated'))
+        group = self.days.setdefault(timestamp[:10], {}).get(key)
+        if group is None:
+            group = self.days[timestamp[:10]][key] = {
+                'sketch': QuantileSketch(**SKETCH_PARAMS), 'tasks': 0, 'truncated': 0,
+            }
+        group['sketch'].add(output_tokens)
+        group['tasks'] += 1
+        group['truncated'] += truncated
+
+        relax = self.relax.setdefault(key, {'boost': 1.0, 'tasks': 0, 'truncated': 0})
+        relax['tasks'] += 1
+        relax['truncated'] += truncated
+        if relax['tasks'] >= self.min_samples:
+            self._adjust(key, relax)
+
+        # Re-derive the cap every min_samples/5 tasks, not on every task
+        if group['tasks'] % max(1, self.min_samples // 5) == 0:
+            self._base_caps.pop(key, None)
+        self._dirty = True
+        return True
+
+    def note_append(self, record: Dict[str, Any], position: Tuple[str, int, int]) -> None:
+        """
+        Writer listener: count a record just appended at (day, start, end).
+        If the cursor is behind it (a new day's segment, an empty store at
+        startup, or another process's appends) the gap is read from the
+        store first, so learning never stalls until the next refresh().
+        """
+        day, start, end = position
+        with self._lock:
+            if self.cursor == (day, start):
+                self.add_record(record)
+                self.cursor = (day, end)
+            elif self.cursor is None or self.cursor < (day, start):
+                self._catch_up()
+
+    def refresh(self) -> int:
+        """
+        Read history records added since the checkpoint and re-derive caps.
+
+        Returns:
+            Number of output lengths learned
+        """
+        with self._lock:
+            learned = self._catch_up()
+            if self._dirty:
+                self._prune()
+                self._base_caps = {}
+                self.save()
+            return learned
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-group samples, truncation rate, boost and base cap over the window"""
+        with self._lock:
+            totals = {}
+            for groups in self.days.values():
+                for key, group in groups.items():
+                    total = totals.setdefault(key, [0, 0])
+                    total[0] += group['tasks']
+                    total[1] += group['truncated']
+            result = {}
+            for key, (tasks, truncated) in totals.items():
+                base = self._base_caps.get(key) if key in self._base_caps else self._compute_base(key)
+                result[key] = {
+                    'samples': tasks,
+                    'truncation_rate': truncated / tasks if tasks else 0.0,
+                    'boost': self.relax.get(key, {}).get('boost', 1.0),
+                    'base_cap': None if base is None else round(base),
+                }
+            return result
+
+    def load(self) -> None:
+        """Load the checkpoint (cursor, daily sketches, relax state) if present"""
+        if not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                data = json.load(f)
+            self.cursor = tuple(data['cursor']) if data.get('cursor') else None
+            self.days = {
+                day: {
+                    key: {
+                        'sketch': QuantileSketch.from_dict(group['sketch'], **SKETCH_PARAMS),
+                        'tasks': group['tasks'],
+                        'truncated': group['truncated'],
+                    }
+                    for key, group in groups.items()
+                }
+                for day, groups in data.get('days', {}).items()
+            }
+            self.relax = data.get('relax', {})
+        except (json.JSONDecodeError, OSError, KeyError) as e:
+            logger.error(f"Failed to load output-length model, rebuilding: {e}")
+            self.cursor = None
+            self.days = {}
+            self.relax = {}
+
+    def save(self) -> None:
+        """Atomically write the checkpoint"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                'cursor': self.cursor,
+                'days': {
+                    day: {
+                        key: {
+                            'sketch': group['sketch'].to_dict(include_params=False),
+                            'tasks': group['tasks'],
+                            'truncated': group['truncated'],
+                        }
+                        for key, group in groups.items()
+                    }
+                    for day, groups in self.days.items()
+                },
+                'relax': self.relax,
+            }
+            self._dirty = False
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_file.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logger.error(f"Failed to save output-length model: {e}")
+
+    def _catch_up(self) -> int:
+        """Fold records written after the cursor (lock held)"""
+        learned = 0
+        for record, cursor in self.store.iter_since(self.cursor):
+            self.cursor = cursor
+            self._dirty = True
+            if self.add_record(record):
+                learned += 1
+        return learned
+
+    def _compute_base(self, key: str) -> Optional[float]:
+        """quantile * headroom over the window's days (lock held)"""
+        cutoff = (datetime.utcnow() - timedelta(days=self.window_days)).strftime('%Y-%m-%d')
+        merged = QuantileSketch(**SKETCH_PARAMS)
+        for day, groups in self.days.items():
+            if day >= cutoff and key in groups:
+                merged.merge(groups[key]['sketch'])
+        if merged.count < self.min_samples:
+            return None
+        return merged.quantile(self.quantile) * self.headroom
+
+    def _adjust(self, key: str, relax: Dict[str, Any]) -> None:
+        """Loosen the cap if too many responses were cut off, tighten back if few were"""
+        rate = relax['truncated'] / relax['tasks']
+        if rate > self.target_truncation_rate:
+            relax['boost'] = min(relax['boost'] * self.relax_factor, 16.0)
+            logger.info(f"Output cap for {key} relaxed to x{relax['boost']:.2f} "
+                        f"(truncation rate {rate:.1%})")
+        elif rate < self.target_truncation_rate / 4 and relax['boost'] > 1.0:
+            relax['boost'] = max(1.0, relax['boost'] / self.relax_factor)
+        relax['tasks'] = 0
+        relax['truncated'] = 0
+
+    def _prune(self) -> None:
+        """Drop days older than the learning window (lock held)"""
+        cutoff = (datetime.utcnow() - timedelta(days=self.window_days)).strftime('%Y-%m-%d')
+        for day in [d for d in self.days if d < cutoff]:
+            del self.days[day]
@@ -0,0 +1,382 @@
+"""Incrementally maintained performance rollups over the task history"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from .history_store import HistoryStore
+from .quantile_sketch import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+# Score above which a task counts as a success (matches performance_tracker)
+SUCCESS_THRESHOLD = 0.5
+
+# Distribution sketches kept per day and per llm/strategy/subnet
+SKETCH_METRICS = {
+    'score': {'mapping': 'linear', 'low': 0.0, 'high': 1.0, 'bins': 200},
+    'latency_ms': {'mapping': 'log', 'relative_accuracy': 0.01},
+    'ttft_ms': {'mapping': 'log', 'relative_accuracy': 0.01},
+    'tokens': {'mapping': 'log', 'relative_accuracy': 0.01},
+}
+
+# Per-task metrics (taken from task records, not from score records)
+TASK_METRICS = ('latency_ms', 'ttft_ms', 'tokens')
+
+DEFAULT_QUANTILES = (0.05, 0.5, 0.9, 0.95, 0.99)
+
+
+def record_dimensions(record: Dict[str, Any]) -> Tuple[str, str, str]:
+    """(llm, strategy, subnet) of a history record, accepting legacy key names"""
+    return (
+        str(record.get('llm') or record.get('llm_used') or 'unknown'),
+        str(record.get('strategy') or record.get('prompt_strategy') or 'unknown'),
+        str(record.get('subnet_id') if record.get('subnet_id') is not None else 'unknown'),
+    )
+
+
+def extract_scored_record(record: Dict[str, Any]) -> Optional[Tuple[str, float, int, str, str, str]]:
+    """
+    Pull the fields rollups need out of a history record.
+
+    Returns:
+        (hour key 'YYYY-MM-DDTHH', score, tokens, llm, strategy, subnet),
+        or None for records without a validator score or timestamp, and
+        for scores that never matched a task
+    """
+    score = record.get('validator_score')
+    timestamp = record.get('timestamp')
+    if score is None or not timestamp or len(timestamp) < 13 or record.get('status') == 'unmatched':
+        return None
+    return (timestamp[:13], float(score), int(record.get('tokens') or record.get('tokens_spent') or 0),
+            *record_dimensions(record))
+
+
+class PerformanceAggregates:
+    """
+    Hourly rollups of scored tasks (overall and per llm/strategy/subnet).
+
+    Each bucket keeps [tasks, score_sum, successes, tokens]. A checkpointed
+    cursor into the history store means only new records are parsed, so
+    recording is O(1) and summarizing a window is O(buckets), not O(history).
+
+    Alongside the means, daily QuantileSketches of score, latency, TTFT and
+    tokens per task (overall and per llm/strategy/subnet) answer any
+    percentile for a window by merging that window's days.
+    """
+
+    DIMENSIONS = ('llm', 'strategy', 'subnet')
+
+    def __init__(self, store: HistoryStore,
+                 checkpoint_file: str = "state/performance-aggregates.json",
+                 retention_days: int = 90):
+        self.store = store
+        self.checkpoint_file = Path(checkpoint_file)
+        self.retention_days = retention_days
+
+        self.cursor = None  # (segment day, offset) of the next unread record
+        self.hours = {}  # hour key -> {'total': stats, 'llm': {...}, 'strategy': {...}, 'subnet': {...}}
+        self.sketches = {}  # day -> metric -> group key ('total', 'llm:x', ...) -> QuantileSketch
+        self._dirty = False
+        self._lock = threading.RLock()  # note_append runs on the history writer thread
+        self.load()
+
+    def add_record(self, record: Dict[str, Any]) -> bool:
+        """
+        Fold one history record into the rollups and sketches (O(1)).
+
+        Returns:
+            True if the record carried a score and was counted
+        """
+        if record.get('event') != 'score':
+            self._add_task_samples(record)
+
+        fields = extract_scored_record(record)
+        if fields is None:
+            return False
+
+        hour, score, tokens, llm, strategy, subnet = fields
+        bucket = self.hours.get(hour)
+        if bucket is None:
+            bucket = self.hours[hour] = {'total': [0, 0.0, 0, 0], 'llm': {}, 'strategy': {}, 'subnet': {}}
+
+        success = 1 if score > SUCCESS_THRESHOLD else 0
+        for stats in (bucket['total'],
+                      bucket['llm'].setdefault(llm, [0, 0.0, 0, 0]),
+                      bucket['strategy'].setdefault(strategy, [0, 0.0, 0, 0]),
+                      bucket['subnet'].setdefault(subnet, [0, 0.0, 0, 0])):
+            stats[0] += 1
+            stats[1] += score
+            stats[2] += success
+            stats[3] += tokens
+
+        self._add_sample(hour[:10], 'score', score, (llm, strategy, subnet))
+        self._dirty = True
+        return True
+
+    def percentiles(self, days: int = 7, quantiles: Tuple[float, ...] = DEFAULT_QUANTILES,
+                    now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Percentiles per metric for the trailing window (whole days),
+        overall and per llm/strategy/subnet.
+
+        Returns:
+            {metric: {'total': {'count', 'mean', 'p50', ...},
+                      'by_llm': {name: {...}}, 'by_strategy': ..., 'by_subnet': ...}}
+        """
+        return self.percentiles_windows({'window': (days, 0)}, quantiles, now)['window']
+
+    def percentiles_windows(self, windows: Dict[str, Tuple[float, float]],
+                            quantiles: Tuple[float, ...] = DEFAULT_QUANTILES,
+                            now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        percentiles() for several windows in one pass over the daily sketches.
+
+        Args:
+            windows: name -> (days ago the window starts, days ago it ends)
+            quantiles: Quantiles to report
+            now: End reference (defaults to now)
+
+        Returns:
+            name -> percentiles() result
+        """
+        bounds = self._window_bounds(windows, now, '%Y-%m-%d')
+        merged = {name: {} for name in windows}  # name -> metric -> group key -> sketch
+        with self._lock:
+            for day, metrics in self.sketches.items():
+                for name, (start, end) in bounds.items():
+                    if not start <= day < end:
+                        continue
+                    for metric, groups in metrics.items():
+                        into = merged[name].setdefault(metric, {})
+                        for key, sketch in groups.items():
+                            if key not in into:
+                                into[key] = sketch.empty_copy()
+                            into[key].merge(sketch)
+
+        return {name: self._format_percentiles(by_metric, quantiles)
+                for name, by_metric in merged.items()}
+
+    def _add_task_samples(self, record: Dict[str, Any]) -> None:
+        """Latency, TTFT and token samples from a task record"""
+        timestamp = record.get('timestamp')
+        if not timestamp or len(timestamp) < 10:
+            return
+        dims = record_dimensions(record)
+        for metric in TASK_METRICS:
+            value = record.get(metric)
+            if value is None and metric == 'tokens':
+                value = record.get('tokens_spent')
+            if value is not None:
+                self._add_sample(timestamp[:10], metric, value, dims)
+
+    def _add_sample(self, day: str, metric: str, value: float, dims: Tuple[str, str, str]) -> None:
+        """Add a value to the day's total and per-dimension sketches"""
+        groups = self.sketches.setdefault(day, {}).setdefault(metric, {})
+        keys = ['total'] + [f"{dim}:{name}" for dim, name in zip(self.DIMENSIONS, dims)]
+        for key in keys:
+            sketch = groups.get(key)
+            if sketch is None:
+                sketch = groups[key] = QuantileSketch(**SKETCH_METRICS[metric])
+            sketch.add(value)
+        self._dirty = True
+
+    def note_append(self, record: Dict[str, Any], position: Tuple[str, int, int]) -> None:
+        """
+        Count a record the caller just appended at position (day, start, end).
+        If the cursor is behind it (a new day's segment, an empty store at
+        startup, or another process's appends) the gap is read from the
+        store first instead of waiting for the next refresh().
+        """
+        day, start, end = position
+        with self._lock:
+            if self.cursor == (day, start):
+                self.add_record(record)
+                self.cursor = (day, end)
+            elif self.cursor is None or self.cursor < (day, start):
+                self._catch_up()
+
+    def refresh(self) -> int:
+        """
+        Parse history records added since the checkpoint.
+
+        Returns:
+            Number of new records counted
+        """
+        with self._lock:
+            counted = self._catch_up()
+            if self._dirty:
+                self._prune()
+                self.save()
+            return counted
+
+    def _catch_up(self) -> int:
+        """Count records written after the cursor (lock held)"""
+        counted = 0
+        for record, cursor in self.store.iter_since(self.cursor):
+            self.cursor = cursor
+            self._dirty = True
+            if self.add_record(record):
+                counted += 1
+        return counted
+
+    def summarize(self, days: int = 7, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Metrics for the trailing window, in the analyze_performance() format.
+        Resolution is one hour.
+        """
+        return self.summarize_windows({'window': (days, 0)}, now)['window']
+
+    def summarize_windows(self, windows: Dict[str, Tuple[float, float]],
+                          now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        summarize() for several windows in one pass over the hourly buckets.
+
+        Args:
+            windows: name -> (days ago the window starts, days ago it ends),
+                e.g. {'24h': (1, 0), '7day': (7, 0), 'previous_7day': (14, 7)}
+            now: End reference (defaults to now)
+
+        Returns:
+            name -> summarize() result
+        """
+        bounds = self._window_bounds(windows, now, '%Y-%m-%dT%H')
+        totals = {name: [0, 0.0, 0, 0] for name in windows}
+        by_dimension = {name: {dim: {} for dim in self.DIMENSIONS} for name in windows}
+        with self._lock:
+            for hour, bucket in self.hours.items():
+                for name, (start, end) in bounds.items():
+                    if not start <= hour < end:
+                        continue
+                    self._merge(totals[name], bucket['total'])
+                    for dim in self.DIMENSIONS:
+                        for group, stats in bucket[dim].items():
+                            self._merge(by_dimension[name][dim].setdefault(group, [0, 0.0, 0, 0]), stats)
+
+        results = {}
+        for name, (start_days, end_days) in windows.items():
+            total = totals[name]
+            tasks = total[0]
+            results[name] = {
+                'period_days': start_days - end_days,
+                'tasks_completed': tasks,
+                'average_score': total[1] / tasks if tasks else 0.0,
+                'success_rate': total[2] / tasks if tasks else 0.0,
+                'total_tokens_spent': total[3],
+                'by_llm': self._format_breakdown(by_dimension[name]['llm']),
+                'by_strategy': self._format_breakdown(by_dimension[name]['strategy']),
+                'by_subnet': self._format_breakdown(by_dimension[name]['subnet']),
+            }
+        return results
+
+    def load(self) -> None:
+        """Load the checkpoint (cursor + buckets) if present"""
+        if not self.checkpoint_file.exists():
+            return
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                data = json.load(f)
+            if 'cursor' not in data:
+                # Pre-segment checkpoint (single-file byte offset): rebuild
+                logger.info("Rebuilding performance aggregates from history segments")
+                return
+            if 'sketches' not in data:
+                # Checkpoint predates distribution sketches: rebuild
+                logger.info("Rebuilding performance aggregates with distribution sketches")
+                return
+            self.cursor = tuple(data['cursor']) if data['cursor'] else None
+            self.hours = data.get('hours', {})
+            self.sketches = {
+                day: {
+                    metric: {key: QuantileSketch.from_dict(sketch, **SKETCH_METRICS[metric])
+                             for key, sketch in groups.items()}
+                    for metric, groups in metrics.items()
+                }
+                for day, metrics in data['sketches'].items()
+            }
+        except (json.JSONDecodeError, OSError, KeyError) as e:
+            logger.error(f"Failed to load performance aggregates, rebuilding: {e}")
+            self.cursor = None
+            self.hours = {}
+            self.sketches = {}
+
+    def save(self) -> None:
+        """Atomically write the checkpoint"""
+        try:
+            self.checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.checkpoint_file.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'cursor': self.cursor,
+                    'hours': self.hours,
+                    'sketches': {
+                        day: {
+                            metric: {key: sketch.to_dict(include_params=False)
+                                     for key, sketch in groups.items()}
+                            for metric, groups in metrics.items()
+                        }
+                        for day, metrics in self.sketches.items()
+                    },
+                }, f)
+            os.replace(tmp_path, self.checkpoint_file)
+            self._dirty = False
+        except OSError as e:
+            logger.error(f"Failed to save performance aggregates: {e}")
+
+    def _prune(self) -> None:
+        """Drop buckets older than the retention window"""
+        cutoff = (datetime.utcnow() - timedelta(days=self.retention_days)).strftime('%Y-%m-%dT%H')
+        for hour in [h for h in self.hours if h < cutoff]:
+            del self.hours[hour]
+        for day in [d for d in self.sketches if d < cutoff[:10]]:
+            del self.sketches[day]
+
+    @staticmethod
+    def _window_bounds(windows: Dict[str, Tuple[float, float]], now: Optional[datetime],
+                       key_format: str) -> Dict[str, Tuple[str, str]]:
+        """Window name -> [start key, end key) in bucket-key form"""
+        now = now or datetime.utcnow()
+        bounds = {}
+        for name, (start_days, end_days) in windows.items():
+            start = (now - timedelta(days=start_days)).strftime(key_format)
+            # The current bucket is still filling; open-ended windows include it
+            end = (now - timedelta(days=end_days)).strftime(key_format) if end_days else '~'
+            bounds[name] = (start, end)
+        return bounds
+
+    def _format_percentiles(self, by_metric: Dict[str, Dict[str, QuantileSketch]],
+                            quantiles: Tuple[float, ...]) -> Dict[str, Any]:
+        result = {}
+        for metric, groups in by_metric.items():
+            entry = {f'by_{dim}': {} for dim in self.DIMENSIONS}
+            for key, sketch in groups.items():
+                summary = {'count': sketch.count, 'mean': sketch.mean}
+                summary.update(sketch.quantiles(quantiles))
+                if key == 'total':
+                    entry['total'] = summary
+                else:
+                    dim, name = key.split(':', 1)
+                    entry[f'by_{dim}'][name] = summary
+            result[metric] = entry
+        return result
+
+    @staticmethod
+    def _merge(into: list, stats: list) -> None:
+        for i, value in enumerate(stats):
+            into[i] += value
+
+    @staticmethod
+    def _format_breakdown(groups: Dict[str, list]) -> Dict[str, Any]:
+        return {
+            name: {
+                'tasks': stats[0],
+                'avg_score': stats[1] / stats[0],
+                'success_rate': stats[2] / stats[0],
+                'tokens_spent': stats[3],
+            }
+            for name, stats in groups.items() if stats[0]
+        }
@@ -0,0 +1,136 @@
+"""Multi-window performance reports from pre-rolled buckets"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from .performance_aggregates import PerformanceAggregates
+from .earnings_ledger import EarningsLedger
+
+logger = logging.getLogger(__name__)
+
+# Report block -> (days ago the window starts, days ago it ends)
+REPORT_WINDOWS = {
+    'performance_24h': (1, 0),
+    'performance_7day': (7, 0),
+    'performance_30day': (30, 0),
+}
+
+# Comparison -> (current block, previous window)
+COMPARISONS = {
+    'week_over_week': ('performance_7day', (14, 7)),
+}
+
+COMPARED_METRICS = ('tasks_completed', 'average_score', 'success_rate', 'token_spend',
+                    'tao_earned', 'tao_per_1k_tokens')
+
+
+class ReportEngine:
+    """
+    Builds every report window and comparison in one pass.
+
+    All windows are answered together from the hourly buckets and daily
+    sketches of PerformanceAggregates, so a 24h/7d/30d report plus
+    week-over-week deltas costs one walk over ~30 days of buckets instead
+    of one history scan per window. TAO earned comes from the earnings
+    ledger's day rollups (whole UTC days) and is divided by the window's
+    token spend for TAO per 1K tokens. The output is the
+    performance-metrics.json layout (performance_24h, performance_7day, ...).
+    """
+
+    def __init__(self, aggregates: PerformanceAggregates,
+                 windows: Optional[Dict[str, Tuple[float, float]]] = None,
+                 comparisons: Optional[Dict[str, Tuple[str, Tuple[float, float]]]] = None,
+                 min_tasks_for_best: int = 10,
+                 earnings: Optional[EarningsLedger] = None):
+        self.aggregates = aggregates
+        self.earnings = earnings
+        self.windows = windows or REPORT_WINDOWS
+        self.comparisons = comparisons or COMPARISONS
+        self.min_tasks_for_best = min_tasks_for_best
+
+    def build(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Compute all windows and comparisons.
+
+        Returns:
+            Dict with one block per window, one per comparison, and the
+            7-day by_llm/by_subnet breakdowns at the top level
+        """
+        now = now or datetime.utcnow()
+        windows = dict(self.windows)
+        for name, (_, previous) in self.comparisons.items():
+            windows[f'{name}:previous'] = previous
+
+        summaries = self.aggregates.summarize_windows(windows, now)
+        percentiles = self.aggregates.percentiles_windows(self.windows, now=now)
+
+        report = {}
+        for name, bounds in self.windows.items():
+            report[name] = self._block(summaries[name], percentiles[name], self._earned(bounds, now))
+
+        for name, (current, previous_bounds) in self.comparisons.items():
+            previous = self._block(summaries[f'{name}:previous'], {}, self._earned(previous_bounds, now))
+            report[name] = self._compare(report[current], previous)
+
+        weekly = report.get('performance_7day')
+        if weekly:
+            report['by_llm'] = weekly['by_llm']
+            report['by_subnet'] = weekly['by_subnet']
+        report['last_updated'] = now.isoformat()
+        return report
+
+    def _earned(self, bounds: Tuple[float, float], now: datetime) -> Optional[Dict[str, Any]]:
+        """Ledger totals for a window (None without a synced earnings ledger)"""
+        if self.earnings is None or not self.earnings.synced:
+            return None
+        start, end = bounds
+        return self.earnings.totals(int(round(start)), int(round(end)), now)
+
+    def _block(self, summary: Dict[str, Any], percentiles: Dict[str, Any],
+               earned: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """One window in performance-metrics.json form"""
+        tao = earned['tao_earned'] if earned is not None else None
+        by_subnet = summary['by_subnet']
+        if earned is not None:
+            for netuid, stats in by_subnet.items():
+                stats['tao_earned'] = earned['by_subnet'].get(netuid, 0.0)
+                stats['tao_per_1k_tokens'] = EarningsLedger.roi(stats['tao_earned'], stats['tokens_spent'])
+        return {
+            'period_days': summary['period_days'],
+            'tasks_completed': summary['tasks_completed'],
+            'average_score': summary['average_score'],
+            'success_rate': summary['success_rate'],
+            'token_spend': summary['total_tokens_spent'],
+            'tao_earned': tao,
+            'tao_per_1k_tokens': EarningsLedger.roi(tao, summary['total_tokens_spent']),
+            'best_strategy': self._best(summary['by_strategy']),
+            'best_llm': self._best(summary['by_llm']),
+            'by_llm': summary['by_llm'],
+            'by_strategy': summary['by_strategy'],
+            'by_subnet': by_subnet,
+            'percentiles': percentiles,
+        }
+
+    def _best(self, groups: Dict[str, Dict[str, Any]]) -> Optional[str]:
+        """Highest average score among groups with enough tasks to trust"""
+        eligible = {name: stats for name, stats in groups.items()
+                    if stats['tasks'] >= self.min_tasks_for_best}
+        if not eligible:
+            return None
+        return max(eligible.items(), key=lambda item: item[1]['avg_score'])[0]
+
+    @staticmethod
+    def _compare(current: Dict[str, Any], previous: Dict[str, Any]) -> Dict[str, Any]:
+        """Current vs previous window for each compared metric"""
+        deltas = {}
+        for metric in COMPARED_METRICS:
+            now_value = current[metric] or 0
+            before = previous[metric] or 0
+            deltas[metric] = {
+                'current': now_value,
+                'previous': before,
+                'change': now_value - before,
+                'change_pct': (now_value - before) / before * 100 if before else None,
+            }
+        return deltas
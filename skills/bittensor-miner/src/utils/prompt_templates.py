@@ -1,10 +1,50 @@
 """Prompt strategy templates for different subnet types"""
 
 import logging
-from typing import Dict, Optional
+import re
+import string
+from collections import Counter
+from typing import Dict, Optional, List
 
 logger = logging.getLogger(__name__)
 
+# Sentence boundaries for extractive compression
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+class CompiledTemplate:
+    """
+    A prompt template pre-parsed into literal and field segments.
+    Rendering is a single join, and unknown fields fail at compile time
+    instead of on every task.
+    """
+
+    def __init__(self, template: str, allowed_fields: tuple = ('task_content',)):
+        self.template = template
+        self.segments = []  # (is_field, text)
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            if literal:
+                self.segments.append((False, literal))
+            if field is None:
+                continue
+            if field not in allowed_fields or spec or conversion:
+                raise ValueError(f"Unsupported template field: {{{field}}}")
+            self.segments.append((True, field))
+
+        self.static_tokens = estimate_tokens(
+            ''.join(text for is_field, text in self.segments if not is_field)
+        )
+
+    def render(self, **values: str) -> str:
+        """Fill the template fields"""
+        return ''.join([values[text] if is_field else text for is_field, text in self.segments])
+
 
 class PromptTemplateManager:
     """Manages subnet-specific prompt strategies and templates"""
@@ -59,8 +99,15 @@ Be honest about what you don't know.""",
         },
     }
 
+    # Extra weight for sentences that look like the actual question
+    QUESTION_BONUS = 2.0
+
     def __init__(self):
         self.custom_templates = {}
+        self.compiled = {
+            strategy: CompiledTemplate(template)
+            for strategy, template in self.TEMPLATES.items()
+        }
         logger.debug("PromptTemplateManager initialized")
 
     def get_template(self, strategy: str) -> Optional[str]:
@@ -80,18 +127,122 @@ Be honest about what you don't know.""",
         """Get configuration for a strategy"""
         return self.STRATEGIES.get(strategy)
 
+    def get_compiled_template(self, strategy: str) -> Optional[CompiledTemplate]:
+        """Get the pre-parsed template for a strategy (None if unknown)"""
+        return self.compiled.get(strategy)
+
     def apply_template(self, strategy: str, task_content: str) -> str:
-        """Apply a strategy template to task content"""
-        template = self.get_template(strategy)
-        if not template:
+        """Apply a strategy template to task content (raw content if the strategy is unknown)"""
+        compiled = self.get_compiled_template(strategy)
+        if compiled is None:
             logger.error(f"No template found for strategy: {strategy}")
             return task_content
+        return compiled.render(task_content=task_content)
 
-        try:
-            return template.format(task_content=task_content)
-        except KeyError as e:
-            logger.error(f"Failed to apply template: {e}")
-            return task_content
+    def get_input_budget(self, strategy: str, base_input_tokens: int) -> int:
+        """Input token budget for a strategy (base budget scaled by token_multiplier)"""
+        return int(base_input_tokens * self.get_token_multiplier(strategy))
+
+    def compile_prompt(self, strategy: str, task_content: str,
+                       max_input_tokens: Optional[int] = None,
+                       remaining_budget: Optional[int] = None,
+                       max_output_tokens: int = 0) -> str:
+        """
+        Build a prompt that fits an input token budget.
+        The prompt gets at most max_input_tokens, and no more than what the
+        remaining budget leaves after the allocated output tokens, so the
+        whole request (prompt + max_output_tokens) fits. Long task content
+        is compressed extractively (most informative sentences kept in
+        their original order), then truncated if needed. An unknown
+        strategy gets the raw content, as apply_template() does.
+
+        Args:
+            strategy: Prompt strategy name
+            task_content: Raw task text
+            max_input_tokens: Budget for the whole prompt (None = unlimited)
+            remaining_budget: Tokens left for the request (None = unlimited)
+            max_output_tokens: Output tokens allocated to the request
+
+        Returns:
+            Prompt text
+        """
+        compiled = self.get_compiled_template(strategy)
+        if compiled is None:
+            logger.error(f"No template found for strategy: {strategy}")
+        static_tokens = compiled.static_tokens if compiled else 0
+
+        if remaining_budget is not None:
+            left = max(0, remaining_budget - max_output_tokens)
+            max_input_tokens = left if max_input_tokens is None else min(max_input_tokens, left)
+        if max_input_tokens is not None:
+            content_budget = max(0, max_input_tokens - static_tokens)
+            if estimate_tokens(task_content) > content_budget:
+                original = estimate_tokens(task_content)
+                task_content = self.compress_content(task_content, content_budget)
+                logger.debug(
+                    f"Compressed task content {original} -> "
+                    f"{estimate_tokens(task_content)} tokens"
+                )
+        return compiled.render(task_content=task_content) if compiled else task_content
+
+    def compress_content(self, content: str, max_tokens: int) -> str:
+        """
+        Shrink content to about max_tokens with local extractive compression.
+
+        Sentences are scored by term frequency across the content, with a
+        bonus for the opening sentence, the closing sentence and questions.
+        The best sentences that fit are kept in their original order; if a
+        single sentence is still too long, head and tail are kept.
+        """
+        if max_tokens <= 0:
+            return ''
+        if estimate_tokens(content) <= max_tokens:
+            return content
+
+        sentences = [sent.strip() for sent in _SENTENCE_RE.split(content) if sent.strip()]
+        if len(sentences) > 1:
+            scores = self._score_sentences(sentences)
+            ranked = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)
+
+            keep: List[int] = []
+            used = 0
+            for i in ranked:
+                cost = estimate_tokens(sentences[i]) + 1
+                if used + cost <= max_tokens:
+                    keep.append(i)
+                    used += cost
+            if keep:
+                return ' '.join(sentences[i] for i in sorted(keep))
+
+        return self._truncate_middle(content, max_tokens)
+
+    def _score_sentences(self, sentences: List[str]) -> List[float]:
+        """Score sentences by average term frequency plus position/question bonuses"""
+        words_per_sentence = [_WORD_RE.findall(sent.lower()) for sent in sentences]
+        frequencies = Counter(w for words in words_per_sentence for w in set(words) if len(w) > 3)
+
+        scores = []
+        last = len(sentences) - 1
+        for i, (sentence, words) in enumerate(zip(sentences, words_per_sentence)):
+            informative = [frequencies[w] for w in words if w in frequencies]
+            score = sum(informative) / (len(words) or 1)
+            if i == 0 or i == last:
+                score += 1.0
+            if sentence.endswith('?'):
+                score += self.QUESTION_BONUS
+            scores.append(score)
+        return scores
+
+    @staticmethod
+    def _truncate_middle(content: str, max_tokens: int) -> str:
+        """Keep the head and tail of content within max_tokens"""
+        marker = ' [...] '
+        max_chars = max(0, max_tokens * 4 - len(marker))
+        if max_chars <= 0:
+            return content[:max_tokens * 4]
+        head = max_chars * 2 // 3
+        tail = max_chars - head
+        return content[:head] + marker + (content[-tail:] if tail else '')
 
     def get_token_multiplier(self, strategy: str) -> float:
         """Get token budget multiplier for a strategy"""
@@ -101,7 +252,13 @@ Be honest about what you don't know.""",
         return 1.0
 
     def set_custom_template(self, strategy: str, template: str) -> None:
-        """Register a custom template for a strategy"""
+        """
+        Register a custom template for a strategy.
+
+        Raises:
+            ValueError: If the template uses fields other than {task_content}
+        """
+        self.compiled[strategy] = CompiledTemplate(template)
         self.custom_templates[strategy] = template
         logger.info(f"Registered custom template for strategy: {strategy}")
 
@@ -0,0 +1,161 @@
+"""Mergeable streaming quantile sketches"""
+
+import math
+from typing import Dict, Any, Optional, List
+
+PARAM_NAMES = ('mapping', 'relative_accuracy', 'max_buckets', 'low', 'high', 'bins')
+
+
+class QuantileSketch:
+    """
+    Fixed-memory, mergeable quantile sketch.
+
+    'log' mapping (DDSketch-style) keeps every quantile within a relative
+    error of relative_accuracy, which suits latencies and token counts
+    spanning orders of magnitude. When more than max_buckets are in use
+    the lowest buckets are collapsed, so the upper tail (p95/p99) stays
+    exact to the error bound.
+
+    'linear' mapping uses fixed-width bins over [low, high] (absolute error
+    of half a bin), which suits bounded values like validator scores.
+
+    Sketches with the same parameters merge by adding bucket counts, so
+    per-process or per-day sketches combine without losing accuracy.
+    """
+
+    def __init__(self, mapping: str = 'log', relative_accuracy: float = 0.01,
+                 max_buckets: int = 512, low: float = 0.0, high: float = 1.0,
+                 bins: int = 200):
+        if mapping not in ('log', 'linear'):
+            raise ValueError(f"Unknown sketch mapping '{mapping}'")
+        self.mapping = mapping
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.low = low
+        self.high = high
+        self.bins = bins
+
+        self._gamma_log = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0  # log mapping: values <= 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Add a value (count times)"""
+        value = float(value)
+        if math.isnan(value):
+            return
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        if self.mapping == 'log' and value <= 0:
+            self.zero_count += count
+            return
+        index = self._index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """Fold another sketch with the same parameters into this one"""
+        if (other.mapping, other.relative_accuracy, other.low, other.high, other.bins) != \
+                (self.mapping, self.relative_accuracy, self.low, self.high, self.bins):
+            raise ValueError("Cannot merge sketches with different parameters")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q (0-1), or None if empty"""
+        if not self.count:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: List[float]) -> Dict[str, Optional[float]]:
+        """Several quantiles keyed 'p50', 'p95', ..."""
+        return {f"p{round(q * 100, 1):g}": self.quantile(q) for q in qs}
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def empty_copy(self) -> 'QuantileSketch':
+        """Empty sketch with the same parameters (for merging into)"""
+        return QuantileSketch(**self.params())
+
+    def to_dict(self, include_params: bool = True) -> Dict[str, Any]:
+        """Serialize; owners that know the parameters can leave them out"""
+        data = {
+            'buckets': [[index, count] for index, count in self.buckets.items()],
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+        }
+        if include_params:
+            data.update(self.params())
+        return data
+
+    def params(self) -> Dict[str, Any]:
+        """Constructor parameters (sketches merge only with equal parameters)"""
+        return {name: getattr(self, name) for name in PARAM_NAMES}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], **params: Any) -> 'QuantileSketch':
+        """Deserialize; params fill in what to_dict(include_params=False) left out"""
+        params.update({key: data[key] for key in PARAM_NAMES if key in data})
+        sketch = cls(**params)
+        sketch.buckets = {int(index): count for index, count in data['buckets']}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        if sketch.count:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        return sketch
+
+    def _index(self, value: float) -> int:
+        if self.mapping == 'log':
+            return math.ceil(math.log(value) / self._gamma_log)
+        position = (value - self.low) / (self.high - self.low) * self.bins
+        return min(max(int(position), 0), self.bins - 1)
+
+    def _value(self, index: int) -> float:
+        """Representative value of a bucket"""
+        if self.mapping == 'log':
+            gamma = math.exp(self._gamma_log)
+            return 2 * gamma ** index / (gamma + 1)
+        return self.low + (index + 0.5) * (self.high - self.low) / self.bins
+
+    def _collapse(self) -> None:
+        """Merge the lowest buckets so at most max_buckets remain"""
+        indexes = sorted(self.buckets)
+        excess = len(indexes) - self.max_buckets
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.buckets[target] += self.buckets.pop(index)
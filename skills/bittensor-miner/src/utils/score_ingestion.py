@@ -0,0 +1,212 @@
+"""Late validator-score ingestion joined onto task records by task_id"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from .history_writer import HistoryWriter
+
+logger = logging.getLogger(__name__)
+
+# Task fields copied onto the score record so analytics never has to join
+JOINED_FIELDS = ('subnet_id', 'llm', 'strategy', 'task_type', 'tokens', 'latency_ms', 'ttft_ms')
+
+
+class ScoreIngestor:
+    """
+    Joins validator scores, which arrive after submission, onto the task
+    record that produced them.
+
+    Task records are remembered as the shared HistoryWriter writes them
+    (bounded in-memory task_id map), and older ones are found through the
+    history store's task_id index (the .idx sidecars of the newest
+    segments), so each join is a dict lookup rather than a scan. The score
+    path never flushes the writer: a task record still in the writer's
+    queue is caught by the pending buffer when it is written. The joined score record is written back through
+    the writer, whose listeners (the performance aggregates) count it with
+    the model, strategy and subnet that earned it.
+
+    Scores for tasks not seen yet wait in a pending buffer until the task
+    record shows up or their TTL runs out; expired scores are written with
+    status 'unmatched' so they are kept but not attributed.
+    """
+
+    def __init__(self, writer: HistoryWriter,
+                 pending_file: str = "state/pending-scores.json",
+                 pending_ttl_seconds: float = 3600,
+                 max_pending: int = 10000,
+                 max_recent_tasks: int = 50000):
+        self.writer = writer
+        self.store = writer.store
+        self.pending_file = Path(pending_file)
+        self.pending_ttl_seconds = pending_ttl_seconds
+        self.max_pending = max_pending
+        self.max_recent_tasks = max_recent_tasks
+
+        self._recent: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()  # task_id -> joined fields
+        self._pending: 'OrderedDict[str, list]' = OrderedDict()  # task_id -> [(score record, expires_at)]
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        self.stats = {'joined': 0, 'joined_late': 0, 'buffered': 0, 'unmatched': 0}
+
+        self._load_pending()
+        writer.add_listener(self._on_written)
+        atexit.register(self.close)
+        logger.debug("ScoreIngestor initialized")
+
+    def ingest(self, task_id: str, validator_score: float,
+               fallback: Optional[Dict[str, Any]] = None,
+               **extra: Any) -> Optional[Dict[str, Any]]:
+        """
+        Record a validator score for a task.
+
+        Args:
+            task_id: Task the score is for
+            validator_score: Score (0-1)
+            fallback: Task fields to use if no task record exists
+                (callers that already know llm/strategy skip the buffer)
+            **extra: Additional context stored on the score record
+                (e.g. validator hotkey)
+
+        Returns:
+            The joined score record, or None if buffered until the task appears
+        """
+        score = {'task_id': task_id, 'validator_score': validator_score}
+        score.update(extra)
+        self._expire_pending()
+
+        task = self._lookup_task(task_id)
+        if task is None and fallback:
+            task = {field: fallback.get(field) for field in JOINED_FIELDS}
+        if task is None:
+            with self._lock:
+                self._pending.setdefault(task_id, []).append(
+                    (score, time.time() + self.pending_ttl_seconds)
+                )
+                self._pending_total += 1
+                self.stats['buffered'] += 1
+                overflow = self._pending_total > self.max_pending
+            if overflow:
+                self._expire_pending(force_oldest=True)
+            logger.debug(f"Score for unknown task {task_id} buffered")
+            return None
+
+        self.stats['joined'] += 1
+        return self._emit(score, task)
+
+    def expire_pending(self) -> int:
+        """
+        Write out pending scores whose TTL has passed as unmatched.
+
+        Returns:
+            Number of scores expired
+        """
+        return self._expire_pending()
+
+    def pending_count(self) -> int:
+        """Scores waiting for their task record"""
+        return self._pending_total
+
+    def close(self) -> None:
+        """Persist the pending buffer so restarts don't lose late scores"""
+        with self._lock:
+            pending = {task_id: entries for task_id, entries in self._pending.items()}
+        try:
+            if not pending:
+                if self.pending_file.exists():
+                    self.pending_file.unlink()
+                return
+            self.pending_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.pending_file.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(pending, f)
+            os.replace(tmp_path, self.pending_file)
+        except OSError as e:
+            logger.error(f"Failed to save pending scores: {e}")
+
+    def _on_written(self, record: Dict[str, Any], position: Tuple[str, int, int]) -> None:
+        """Writer listener: remember task records and release scores waiting for them"""
+        if record.get('event') != 'task' or not record.get('task_id'):
+            return
+        task_id = record['task_id']
+        fields = {field: record.get(field) for field in JOINED_FIELDS}
+        with self._lock:
+            self._remember(task_id, fields)
+            waiting = self._pending.pop(task_id, None)
+            self._pending_total -= len(waiting or ())
+        for score, _ in waiting or ():
+            self.stats['joined_late'] += 1
+            self._emit(score, fields)
+
+    def _lookup_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Task fields from memory, else from the store's task_id index"""
+        with self._lock:
+            fields = self._recent.get(task_id)
+            if fields is not None:
+                self._recent.move_to_end(task_id)
+                return fields
+
+        for record in self.store.find(task_id):
+            if record.get('event', 'task') == 'task' and record.get('validator_score') is None:
+                fields = {field: record.get(field) for field in JOINED_FIELDS}
+                with self._lock:
+                    self._remember(task_id, fields)
+                return fields
+        return None
+
+    def _emit(self, score: Dict[str, Any], task: Dict[str, Any]) -> Dict[str, Any]:
+        """Write the denormalized score record (feeds the aggregates via the writer)"""
+        record = dict(task)
+        record.update(score)
+        record['status'] = record.get('status') or 'scored'
+        return self.writer.submit(record, event='score')
+
+    def _remember(self, task_id: str, fields: Dict[str, Any]) -> None:
+        """Bounded LRU of recent task records (lock held)"""
+        self._recent[task_id] = fields
+        self._recent.move_to_end(task_id)
+        while len(self._recent) > self.max_recent_tasks:
+            self._recent.popitem(last=False)
+
+    def _expire_pending(self, force_oldest: bool = False) -> int:
+        """
+        Write out expired (or, when over capacity, the oldest) pending scores.
+        The buffer is in arrival order, so this stops at the first live entry.
+        """
+        now = time.time()
+        expired = []
+        with self._lock:
+            while self._pending:
+                task_id, entries = next(iter(self._pending.items()))
+                if not force_oldest and entries[0][1] > now:
+                    break
+                expired.extend(score for score, _ in entries)
+                del self._pending[task_id]
+                self._pending_total -= len(entries)
+                force_oldest = False
+
+        for score in expired:
+            self.writer.submit(dict(score, status='unmatched'), event='score')
+        if expired:
+            self.stats['unmatched'] += len(expired)
+            logger.warning(f"{len(expired)} validator scores expired without a task record")
+        return len(expired)
+
+    def _load_pending(self) -> None:
+        """Load scores that were pending at the last shutdown"""
+        if not self.pending_file.exists():
+            return
+        try:
+            with open(self.pending_file, 'r') as f:
+                pending = json.load(f)
+            for task_id, entries in pending.items():
+                self._pending[task_id] = [(score, expires_at) for score, expires_at in entries]
+                self._pending_total += len(entries)
+        except (json.JSONDecodeError, OSError, ValueError) as e:
+            logger.error(f"Failed to load pending scores: {e}")
@@ -0,0 +1,330 @@
+"""Validator request signature verification: cached, batched, off the event loop"""
+
+import hashlib
+import hmac
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+
+try:
+    from bittensor_wallet import Keypair
+except ImportError:
+    try:
+        from substrateinterface import Keypair
+    except ImportError:  # Optional: only needed against the real network
+        Keypair = None
+
+logger = logging.getLogger(__name__)
+
+SR25519_AVAILABLE = Keypair is not None
+
+# Decoded public keys (or keyed HMACs for the mock scheme), per process.
+# Validators are few and send many requests each, so this is what repeats.
+KEYPAIR_CACHE_SIZE = 4096
+_keypairs: Dict[str, Any] = {}
+
+# (hotkey, message, signature) as handed to a scheme
+Item = Tuple[str, bytes, bytes]
+
+
+def body_hash(body) -> str:
+    """SHA3-256 of the raw request body (bytes or memoryview)"""
+    return hashlib.sha3_256(body).hexdigest()
+
+
+def _cached_key(hotkey: str, decode) -> Tuple[Any, bool]:
+    """(decoded key, whether it was cached); the oldest entry goes when full"""
+    key = _keypairs.get(hotkey)
+    if key is not None:
+        return key, True
+    key = decode(hotkey)
+    if len(_keypairs) >= KEYPAIR_CACHE_SIZE:
+        _keypairs.pop(next(iter(_keypairs)), None)
+    _keypairs[hotkey] = key
+    return key, False
+
+
+def signed_message(nonce: int, caller: str, axon_hotkey: str, request_uuid: str, digest: str) -> bytes:
+    """The string a dendrite signs: nonce.caller.axon.uuid.body_hash"""
+    return f"{nonce}.{caller}.{axon_hotkey}.{request_uuid}.{digest}".encode()
+
+
+class Sr25519Scheme:
+    """Substrate sr25519 signatures (the hotkey is the SS58 public key)"""
+
+    name = 'sr25519'
+
+    def verify_batch(self, items: List[Item]) -> Tuple[List[bool], int]:
+        """
+        Verify a batch. The available bindings have no batch API, so this
+        amortizes the hand-off over the batch and decodes each hotkey once.
+
+        Returns:
+            (result per item, items whose keypair was already decoded)
+        """
+        if Keypair is None:
+            raise RuntimeError("sr25519 verification needs bittensor-wallet or substrate-interface")
+        results, hits = [], 0
+        for hotkey, message, signature in items:
+            try:
+                keypair, hit = _cached_key(hotkey, lambda address: Keypair(ss58_address=address))
+                hits += hit
+                results.append(bool(keypair.verify(message, signature)))
+            except Exception:
+                results.append(False)
+        return results, hits
+
+
+class MockScheme:
+    """
+    Stand-in for the local mock chain: HMAC-SHA256 keyed by the hotkey.
+    Anyone who knows a hotkey can sign for it; never use it on a network.
+    """
+
+    name = 'mock'
+
+    @staticmethod
+    def sign(hotkey: str, message: bytes) -> bytes:
+        return hmac.new(hotkey.encode(), message, hashlib.sha256).digest()
+
+    def verify_batch(self, items: List[Item]) -> Tuple[List[bool], int]:
+        results, hits = [], 0
+        for hotkey, message, signature in items:
+            keyed, hit = _cached_key(hotkey, lambda key: hmac.new(key.encode(), digestmod=hashlib.sha256))
+            hits += hit
+            mac = keyed.copy()
+            mac.update(message)
+            results.append(hmac.compare_digest(mac.digest(), signature))
+        return results, hits
+
+
+SCHEMES = {'sr25519': Sr25519Scheme, 'mock': MockScheme}
+
+_shared: Dict[str, 'SignatureVerifier'] = {}
+_shared_lock = threading.Lock()
+
+
+def _run_batch(scheme, items: List[Item]) -> Tuple[List[bool], int, float]:
+    """Pool job: verify a batch and time it (module level so it pickles)"""
+    started = time.perf_counter()
+    results, keypair_hits = scheme.verify_batch(items)
+    return results, keypair_hits, time.perf_counter() - started
+
+
+class SignatureVerifier:
+    """
+    Checks validator request signatures without blocking the caller.
+
+    verify() refuses a stale nonce on the spot and queues everything else;
+    the caller gets a concurrent Future, so the axon's event loop only
+    attaches a callback. A dispatcher thread refuses replayed nonces,
+    hashes the body and sends the signature to a thread or process pool
+    in batches of up to batch_size; requests arriving within
+    batch_linger_ms of each other share one pool job.
+
+    Signature results are not cached: every validly signed request carries
+    a new nonce, so no two are alike. What repeats is the caller's key, so
+    the pool keeps decoded keypairs per hotkey (keypair_hit_rate).
+
+    Nonces are the dendrite's time.time_ns(). One older than
+    max_nonce_age_seconds is rejected before any crypto runs. Within that
+    window, each (caller, axon, dendrite uuid) must send increasing nonces,
+    like the Bittensor axon: a validly signed request whose nonce is not
+    above the last accepted one is a replay and is refused, cached or not.
+    """
+
+    def __init__(self, scheme: str = 'sr25519', executor: str = 'thread',
+                 workers: int = 2, batch_size: int = 32, batch_linger_ms: float = 1.0,
+                 max_nonce_age_seconds: float = 60.0):
+        """
+        Args:
+            scheme: 'sr25519' or 'mock' (local mock chain only)
+            executor: 'thread' or 'process' pool for the crypto
+            workers: Pool size
+            batch_size: Most signatures per pool job
+            batch_linger_ms: Wait this long for a batch to fill
+            max_nonce_age_seconds: Oldest nonce accepted
+
+        Raises:
+            RuntimeError: sr25519 requested but no Keypair binding is installed
+        """
+        if scheme == 'sr25519' and not SR25519_AVAILABLE:
+            # Fail at startup rather than refusing every request with 401
+            raise RuntimeError("sr25519 verification needs bittensor-wallet or substrate-interface")
+        self.scheme = SCHEMES[scheme]()
+        self.batch_size = batch_size
+        self.batch_linger = batch_linger_ms / 1000.0
+        self.max_nonce_age_seconds = max_nonce_age_seconds
+        pool = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+        self._pool = pool(max_workers=workers)
+        # (caller, axon, dendrite uuid) -> last accepted nonce, oldest first
+        self._nonces: 'OrderedDict[tuple, int]' = OrderedDict()
+        self._nonce_lock = threading.Lock()
+        self._queue: 'queue.Queue[Optional[tuple]]' = queue.Queue()
+        self.stats = {'requests': 0, 'keypair_hits': 0, 'verified': 0, 'rejected': 0,
+                      'stale_nonces': 0, 'replayed_nonces': 0, 'errors': 0, 'batches': 0,
+                      'computed': 0,
+                      'verify_seconds': 0.0, 'max_verify_seconds': 0.0, 'wait_seconds': 0.0}
+
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name='signature-dispatch',
+                                            daemon=True)
+        self._dispatcher.start()
+        logger.info(f"Signature verification: {self.scheme.name}, {workers} {executor} workers, "
+                    f"batches of {batch_size}")
+
+    @classmethod
+    def shared(cls, config: Dict[str, Any], default_scheme: str = 'sr25519') -> 'SignatureVerifier':
+        """One verifier (nonces and pool) per scheme for every axon in the process"""
+        scheme = config.get('scheme', default_scheme)
+        with _shared_lock:
+            if scheme not in _shared:
+                _shared[scheme] = cls.from_config(config, default_scheme)
+            return _shared[scheme]
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], default_scheme: str = 'sr25519') -> 'SignatureVerifier':
+        """Build from the axon's 'signatures' section"""
+        return cls(
+            scheme=config.get('scheme', default_scheme),
+            executor=config.get('executor', 'thread'),
+            workers=config.get('workers', 2),
+            batch_size=config.get('batch_size', 32),
+            batch_linger_ms=config.get('batch_linger_ms', 1.0),
+            max_nonce_age_seconds=config.get('max_nonce_age_seconds', 60.0),
+        )
+
+    def verify(self, caller: str, axon_hotkey: str, nonce: int, request_uuid: str,
+               signature: bytes, body) -> Future:
+        """
+        Verify one request.
+
+        Args:
+            caller: Dendrite (validator) hotkey
+            axon_hotkey: Our hotkey the request was addressed to
+            nonce: Dendrite nonce (time.time_ns() when signed)
+            request_uuid: Dendrite uuid header (one per dendrite instance)
+            signature: Raw signature bytes
+            body: Raw request body
+
+        Returns:
+            Future resolving to True if the signature is valid and the
+            nonce is fresh
+        """
+        self.stats['requests'] += 1
+        future: Future = Future()
+        if abs(time.time_ns() - nonce) > self.max_nonce_age_seconds * 1e9:
+            self.stats['stale_nonces'] += 1
+            self.stats['rejected'] += 1
+            future.set_result(False)
+            return future
+
+        self._queue.put((caller, axon_hotkey, nonce, request_uuid, signature, body,
+                         future, time.perf_counter()))
+        return future
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus per-request verification cost"""
+        stats = dict(self.stats)
+        computed = stats.pop('computed')
+        stats['keypair_hit_rate'] = round(stats['keypair_hits'] / computed, 4) if computed else 0.0
+        stats['mean_batch_size'] = round(computed / stats['batches'], 2) if stats['batches'] else 0.0
+        stats['verify_us_per_request'] = round(stats['verify_seconds'] / computed * 1e6, 1) if computed else 0.0
+        stats['wait_us_per_request'] = round(stats['wait_seconds'] / computed * 1e6, 1) if computed else 0.0
+        return stats
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._dispatcher.join(5)
+        self._pool.shutdown(wait=False)
+
+    def _dispatch_loop(self) -> None:
+        """Refuse replays, hash bodies and gather the rest into pool batches"""
+        batch = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.perf_counter()) if batch else None
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                entry = ()
+            if entry is None:
+                self._submit(batch)
+                return
+            if entry:
+                pending = self._prepare(entry)
+                if pending is not None:
+                    if not batch:
+                        deadline = time.perf_counter() + self.batch_linger
+                    batch.append(pending)
+            if batch and (len(batch) >= self.batch_size or time.perf_counter() >= deadline):
+                self._submit(batch)
+                batch = []
+
+    def _prepare(self, entry: tuple) -> Optional[tuple]:
+        """Refuse a replayed nonce, or build the request's batch item"""
+        caller, axon_hotkey, nonce, request_uuid, signature, body, future, queued_at = entry
+        dendrite = (caller, axon_hotkey, request_uuid)
+        if not self._nonce_fresh(dendrite, nonce):
+            self._reject_replay(future)
+            return None
+        message = signed_message(nonce, caller, axon_hotkey, request_uuid, body_hash(body))
+        return (caller, message, signature), dendrite, nonce, future, queued_at
+
+    def _nonce_fresh(self, dendrite: tuple, nonce: int) -> bool:
+        """Cheap pre-check: is the nonce above the last one accepted?"""
+        with self._nonce_lock:
+            return nonce > self._nonces.get(dendrite, -1)
+
+    def _accept_nonce(self, dendrite: tuple, nonce: int) -> bool:
+        """Record a validly signed nonce; False if it is a replay"""
+        with self._nonce_lock:
+            if nonce <= self._nonces.get(dendrite, -1):
+                return False
+            self._nonces[dendrite] = nonce
+            self._nonces.move_to_end(dendrite)
+            # Nonces past max age are refused anyway, so their dendrites can go
+            oldest = time.time_ns() - self.max_nonce_age_seconds * 1e9
+            while self._nonces and next(iter(self._nonces.values())) < oldest:
+                self._nonces.popitem(last=False)
+            return True
+
+    def _reject_replay(self, future: Future) -> None:
+        self.stats['replayed_nonces'] += 1
+        self.stats['rejected'] += 1
+        future.set_result(False)
+
+    def _submit(self, batch: list) -> None:
+        if not batch:
+            return
+        self.stats['batches'] += 1
+        self.stats['computed'] += len(batch)
+        job = self._pool.submit(_run_batch, self.scheme, [entry[0] for entry in batch])
+        job.add_done_callback(lambda done: self._finish(batch, done))
+
+    def _finish(self, batch: list, done: Future) -> None:
+        """Record results and resolve the callers' futures"""
+        now = time.perf_counter()
+        try:
+            results, keypair_hits, seconds = done.result()
+        except Exception as e:
+            # Fail closed: the next attempt may succeed
+            self.stats['errors'] += 1
+            logger.error(f"Signature verification failed: {e}")
+            results, keypair_hits, seconds = [False] * len(batch), 0, 0.0
+
+        self.stats['keypair_hits'] += keypair_hits
+        self.stats['verify_seconds'] += seconds
+        self.stats['max_verify_seconds'] = max(self.stats['max_verify_seconds'], seconds / len(batch))
+        for *_, queued_at in batch:
+            self.stats['wait_seconds'] += max(0.0, now - queued_at - seconds)
+        for (_, dendrite, nonce, future, _), ok in zip(batch, results):
+            # A copy of this request may have been accepted while it was in the pool
+            if ok and not self._accept_nonce(dendrite, nonce):
+                self._reject_replay(future)
+                continue
+            self.stats['verified' if ok else 'rejected'] += 1
+            future.set_result(ok)
@@ -0,0 +1,326 @@
+"""Sliding-window token spend counters with O(1) update and query"""
+
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+
+class RingCounter:
+    """
+    Time-bucketed counter over a fixed ring of buckets.
+
+    Each slot stores the running total at the end of its bucket, so the sum
+    over any trailing window is total - cumulative[start slot]: O(1) query.
+    Advancing over idle buckets touches each skipped slot once (amortized O(1)).
+    """
+
+    def __init__(self, bucket_seconds: int, num_buckets: int):
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.cumulative = [0] * num_buckets
+        self.total = 0
+        self.current = None  # absolute index of the newest bucket
+
+    @property
+    def span_seconds(self) -> int:
+        """Longest trailing window this counter can answer exactly"""
+        return self.bucket_seconds * (self.num_buckets - 1)
+
+    def add(self, value: int, ts: float) -> None:
+        """Add a value at a unix timestamp (late values land in the newest bucket)"""
+        self._advance(int(ts // self.bucket_seconds))
+        self.total += value
+        self.cumulative[self.current % self.num_buckets] = self.total
+
+    def window_sum(self, seconds: float, now: float) -> int:
+        """Sum of values in the trailing window ending at now"""
+        self._advance(int(now // self.bucket_seconds))
+        buckets = min(math.ceil(seconds / self.bucket_seconds), self.num_buckets - 1)
+        if buckets <= 0:
+            return 0
+        return self.total - self.cumulative[(self.current - buckets) % self.num_buckets]
+
+    def bucket_sums(self, count: int, now: float) -> List[tuple]:
+        """
+        Values of the newest count buckets ending at now, oldest first.
+
+        Returns:
+            [(bucket start timestamp, value)]
+        """
+        self._advance(int(now // self.bucket_seconds))
+        count = min(count, self.num_buckets - 1)
+        return [
+            (bucket * self.bucket_seconds,
+             self.cumulative[bucket % self.num_buckets] - self.cumulative[(bucket - 1) % self.num_buckets])
+            for bucket in range(self.current - count + 1, self.current + 1)
+        ]
+
+    def _advance(self, bucket: int) -> None:
+        """Move the ring forward to bucket, carrying the running total"""
+        if self.current is None:
+            self.current = bucket
+            return
+        if bucket <= self.current:
+            return
+        steps = min(bucket - self.current, self.num_buckets)
+        for i in range(1, steps + 1):
+            self.cumulative[(self.current + i) % self.num_buckets] = self.total
+        self.current = bucket
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'bucket_seconds': self.bucket_seconds,
+            'num_buckets': self.num_buckets,
+            'cumulative': self.cumulative,
+            'total': self.total,
+            'current': self.current,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RingCounter':
+        counter = cls(data['bucket_seconds'], data['num_buckets'])
+        counter.cumulative = list(data['cumulative'])
+        counter.total = data['total']
+        counter.current = data['current']
+        return counter
+
+
+class SpendWindows:
+    """
+    Per-model, per-subnet and per-task-type spend counters.
+
+    Each key keeps minute, hour and day rings so any trailing window up to
+    ~a year is answered in O(1), plus calendar 'today' and 'this_month'
+    totals that roll over automatically.
+
+    Queries advance the rings too, so every access takes the instance lock
+    (one SpendWindows is shared by all bulkhead worker threads).
+    """
+
+    # (bucket_seconds, num_buckets): 24h of minutes, 35 days of hours, 400 days
+    RESOLUTIONS = ((60, 1441), (3600, 24 * 35 + 1), (86400, 401))
+
+    STANDARD_WINDOWS = {
+        '1h': 3600,
+        '24h': 86400,
+        '7d': 7 * 86400,
+        '30d': 30 * 86400,
+    }
+
+    def __init__(self, track_by_subnet: bool = True,
+                 track_by_task_type: bool = True,
+                 reset_day_of_month: int = 1):
+        self.track_by_subnet = track_by_subnet
+        self.track_by_task_type = track_by_task_type
+        self.reset_day_of_month = min(reset_day_of_month, 28)
+        self.counters = {}  # key -> [RingCounter per resolution]
+        self.periods = {}   # key -> {'day', 'today', 'month', 'this_month'}
+        self.seq = 0        # last ledger sequence folded in
+        self._lock = threading.RLock()
+        logger.debug("SpendWindows initialized")
+
+    @classmethod
+    def from_config(cls, tracking_config: Dict[str, Any]) -> 'SpendWindows':
+        """Create from the 'tracking' section of token-budgets.json"""
+        return cls(
+            track_by_subnet=tracking_config.get('track_by_subnet', True),
+            track_by_task_type=tracking_config.get('track_by_task_type', True),
+            reset_day_of_month=tracking_config.get('reset_day_of_month', 1),
+        )
+
+    @staticmethod
+    def make_key(model: Optional[str] = None, subnet_id: Optional[int] = None,
+                 task_type: Optional[str] = None) -> str:
+        """Build the counter key for one dimension (or 'total')"""
+        if model is not None:
+            return f"model:{model}"
+        if subnet_id is not None:
+            return f"subnet:{subnet_id}"
+        if task_type is not None:
+            return f"task_type:{task_type}"
+        return 'total'
+
+    def record(self, tokens: int, model: str, subnet_id: Optional[int] = None,
+               task_type: Optional[str] = None, ts: Optional[float] = None) -> None:
+        """
+        Record a spend against every tracked dimension.
+
+        Args:
+            tokens: Tokens spent
+            model: LLM API name
+            subnet_id: Subnet the task came from
+            task_type: Task type (generation, evaluation, ranking)
+            ts: Unix timestamp (defaults to now)
+        """
+        ts = ts if ts is not None else time.time()
+        keys = ['total', self.make_key(model=model)]
+        if self.track_by_subnet and subnet_id is not None:
+            keys.append(self.make_key(subnet_id=subnet_id))
+        if self.track_by_task_type and task_type is not None:
+            keys.append(self.make_key(task_type=task_type))
+
+        day, month = self._period_labels(ts)
+        with self._lock:
+            for key in keys:
+                for counter in self._get_counters(key):
+                    counter.add(tokens, ts)
+
+                period = self.periods.setdefault(key, {'day': day, 'today': 0,
+                                                       'month': month, 'this_month': 0})
+                self._roll_period(period, day, month)
+                period['today'] += tokens
+                period['this_month'] += tokens
+
+    def window_total(self, seconds: float, now: Optional[float] = None, **dimension) -> int:
+        """
+        Tokens spent in the trailing window for one dimension.
+
+        Args:
+            seconds: Window length
+            now: Unix timestamp the window ends at (defaults to now)
+            **dimension: One of model=, subnet_id=, task_type= (none for the total)
+        """
+        key = self.make_key(**dimension)
+        with self._lock:
+            if key not in self.counters:
+                return 0
+            return self._window_for_key(key, seconds, now if now is not None else time.time())
+
+    def burn_rate_per_hour(self, seconds: float = 3600, now: Optional[float] = None,
+                           **dimension) -> float:
+        """Average tokens/hour over the trailing window"""
+        return self.window_total(seconds, now, **dimension) / (seconds / 3600)
+
+    def period_totals(self, now: Optional[float] = None, **dimension) -> Dict[str, int]:
+        """Calendar totals ('today', 'this_month') for one dimension"""
+        key = self.make_key(**dimension)
+        with self._lock:
+            return self._period_for_key(key, now if now is not None else time.time())
+
+    def daily_totals(self, days: int, now: Optional[float] = None, **dimension) -> Dict[str, int]:
+        """
+        Tokens spent on each of the last days UTC days (today included),
+        read from the day ring: O(days).
+
+        Returns:
+            Day label (YYYY-MM-DD) -> tokens, oldest first
+        """
+        key = self.make_key(**dimension)
+        now = now if now is not None else time.time()
+        with self._lock:
+            if key not in self.counters:
+                return {}
+            sums = self.counters[key][-1].bucket_sums(days, now)
+        return {datetime.utcfromtimestamp(start).strftime('%Y-%m-%d'): tokens for start, tokens in sums}
+
+    def get_burn_rates(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Standard windows and calendar totals for every key (for heartbeat checks)"""
+        now = now if now is not None else time.time()
+        result = {}
+        with self._lock:
+            for key in sorted(self.counters):
+                windows = {
+                    name: self._window_for_key(key, seconds, now)
+                    for name, seconds in self.STANDARD_WINDOWS.items()
+                }
+                windows.update(self._period_for_key(key, now))
+                result[key] = windows
+        return result
+
+    def keys(self) -> List[str]:
+        """All tracked counter keys"""
+        with self._lock:
+            return list(self.counters)
+
+    def save(self, path: str) -> None:
+        """Atomically persist counters to a JSON file"""
+        path = Path(path)
+        with self._lock:
+            data = json.dumps({
+                'seq': self.seq,
+                'saved_at': datetime.utcnow().isoformat(),
+                'counters': {key: [c.to_dict() for c in rings] for key, rings in self.counters.items()},
+                'periods': self.periods,
+            })
+        # Unique temp file: the daemon and heartbeat may save concurrently
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=path.parent, prefix=path.name, suffix='.tmp',
+                                         delete=False) as f:
+            f.write(data)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.remove(f.name)
+            raise
+
+    def load(self, path: str) -> bool:
+        """Load counters persisted by save(); returns False if unavailable"""
+        path = Path(path)
+        if not path.exists():
+            return False
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            counters = {
+                key: [RingCounter.from_dict(c) for c in rings]
+                for key, rings in data.get('counters', {}).items()
+            }
+            with self._lock:
+                self.counters = counters
+                self.periods = data.get('periods', {})
+                self.seq = data.get('seq', 0)
+            return True
+        except (json.JSONDecodeError, KeyError, OSError) as e:
+            logger.error(f"Failed to load spend windows: {e}")
+            return False
+
+    def _get_counters(self, key: str) -> List[RingCounter]:
+        if key not in self.counters:
+            self.counters[key] = [RingCounter(b, n) for b, n in self.RESOLUTIONS]
+        return self.counters[key]
+
+    def _window_for_key(self, key: str, seconds: float, now: float) -> int:
+        """Answer from the finest resolution that covers the window"""
+        for counter in self.counters[key]:
+            if seconds <= counter.span_seconds:
+                return counter.window_sum(seconds, now)
+        return self.counters[key][-1].window_sum(seconds, now)
+
+    def _period_for_key(self, key: str, now: float) -> Dict[str, int]:
+        period = self.periods.get(key)
+        if not period:
+            return {'today': 0, 'this_month': 0}
+        day, month = self._period_labels(now)
+        self._roll_period(period, day, month)
+        return {'today': period['today'], 'this_month': period['this_month']}
+
+    def _period_labels(self, ts: float) -> tuple:
+        """UTC day label and billing-month label (honours reset_day_of_month)"""
+        dt = datetime.utcfromtimestamp(ts)
+        year, month = dt.year, dt.month
+        if dt.day < self.reset_day_of_month:
+            year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+        return dt.strftime('%Y-%m-%d'), f"{year:04d}-{month:02d}-{self.reset_day_of_month:02d}"
+
+    @staticmethod
+    def _roll_period(period: Dict[str, Any], day: str, month: str) -> None:
+        """
+        Reset calendar totals when a later day or billing month starts.
+        A spend stamped just before midnight that arrives after the roll
+        counts toward the new day instead of resetting it back.
+        """
+        if day > period['day']:
+            period['day'] = day
+            period['today'] = 0
+        if month > period['month']:
+            period['month'] = month
+            period['this_month'] = 0
@@ -0,0 +1,163 @@
+"""ChainBackend on the Bittensor SDK, for real Subtensor nodes"""
+
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+
+try:
+    import bittensor
+except ImportError:  # Optional: only needed against the real network
+    bittensor = None
+
+from .chain_backend import ChainBackend
+
+logger = logging.getLogger(__name__)
+
+SDK_AVAILABLE = bittensor is not None
+
+RAO_PER_TAO = 1e9
+
+
+def _value(result: Any) -> Any:
+    """Plain value of an SDK/substrate query result"""
+    return getattr(result, 'value', result)
+
+
+def _event_fields(record: Any) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+    """(module, event, attributes) of a System.Events record, None if unreadable"""
+    value = _value(record)
+    if not isinstance(value, dict):
+        return None
+    event = value.get('event', value)
+    module, name = event.get('module_id'), event.get('event_id')
+    attributes = event.get('attributes')
+    if isinstance(attributes, (list, tuple)) and (module, name) == ('Balances', 'Transfer'):
+        attributes = dict(zip(('from', 'to', 'amount'), attributes))
+    if not module or not isinstance(attributes, dict):
+        return None
+    return module, name, attributes
+
+
+class SubtensorChainBackend(ChainBackend):
+    """
+    ChainBackend over the SDK's Subtensor client (finney, test, or a
+    local subtensor node at a ws:// URL).
+
+    Metagraphs come from the SDK (lite: no weights or bonds). There is no
+    incremental query, so get_neuron_updates keeps the default and the
+    metagraph cache refetches the full metagraph on each refresh.
+
+    Earning events are read from chain storage, block by block:
+        transfer - Balances.Transfer events (System.Events) to our addresses
+        emission - for every epoch of a mined subnet in the range (from
+                   LastMechansimStepBlock, stepping back tempo + 1 blocks),
+                   the Emission entry of each of our hotkeys' uids. Amounts
+                   are the stored rao; after dynamic TAO that is the
+                   subnet's alpha, not TAO.
+    Subnets are the netuids given plus every subnet whose metagraph was
+    fetched. The SDK's websocket client is not thread-safe, so calls are
+    serialized on one connection.
+    """
+
+    def __init__(self, network: str = 'finney', netuids: Iterable[int] = (),
+                 subtensor: Any = None):
+        """
+        Args:
+            network: SDK network name or ws(s):// endpoint
+            netuids: Subnets whose emissions to report
+            subtensor: Existing SDK Subtensor client (None = connect)
+
+        Raises:
+            RuntimeError: No client given and the bittensor package is missing
+        """
+        if subtensor is None:
+            if not SDK_AVAILABLE:
+                raise RuntimeError("The subtensor chain backend needs the bittensor package")
+            subtensor = bittensor.subtensor(network=network)
+        self.subtensor = subtensor
+        self.network = network
+        self.netuids = set(netuids)
+        self._lock = threading.Lock()
+        logger.info(f"Subtensor chain backend on {network}")
+
+    def get_block_number(self) -> int:
+        with self._lock:
+            return int(self.subtensor.get_current_block())
+
+    def get_metagraph(self, netuid: int) -> Dict[str, Any]:
+        with self._lock:
+            self.netuids.add(netuid)
+            metagraph = self.subtensor.metagraph(netuid=netuid, lite=True)
+            tempo = self._query('Tempo', [netuid])
+        neurons = []
+        for i, uid in enumerate(metagraph.uids.tolist()):
+            neurons.append({
+                'uid': int(uid),
+                'hotkey': metagraph.hotkeys[i],
+                'coldkey': metagraph.coldkeys[i],
+                'stake': float(metagraph.S[i]),
+                'validator_permit': bool(metagraph.validator_permit[i]),
+                'active': bool(metagraph.active[i]),
+                'last_update': int(metagraph.last_update[i]),
+            })
+        return {'netuid': netuid, 'block': int(metagraph.block), 'tempo': int(tempo or 360),
+                'neurons': neurons}
+
+    def get_balance(self, address: str) -> float:
+        with self._lock:
+            balance = self.subtensor.get_balance(address)
+        return float(getattr(balance, 'tao', balance))
+
+    def get_earning_events(self, addresses: List[str], from_block: int,
+                           to_block: int) -> List[Dict[str, Any]]:
+        wanted = set(addresses)
+        events = []
+        with self._lock:
+            substrate = self.subtensor.substrate
+            for block in range(from_block, to_block + 1):
+                block_hash = substrate.get_block_hash(block)
+                transfers = []
+                for record in substrate.get_events(block_hash=block_hash):
+                    fields = _event_fields(record)
+                    if fields is None or fields[:2] != ('Balances', 'Transfer'):
+                        continue
+                    attributes = fields[2]
+                    if attributes.get('to') in wanted:
+                        transfers.append((attributes['to'], int(attributes['amount'])))
+                if transfers:
+                    ts = self._timestamp(block_hash)
+                    events.extend({'block': block, 'ts': ts, 'kind': 'transfer', 'address': address,
+                                   'amount': amount / RAO_PER_TAO, 'netuid': None}
+                                  for address, amount in transfers)
+            events.extend(self._emission_events(wanted, from_block, to_block))
+        events.sort(key=lambda event: event['block'])
+        return events
+
+    def _emission_events(self, wanted: set, from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        """Per-epoch emissions to our hotkeys in [from_block, to_block] (lock held)"""
+        events = []
+        for netuid in sorted(self.netuids):
+            tempo = int(self._query('Tempo', [netuid]) or 360)
+            step = self._query('LastMechansimStepBlock', [netuid], block=to_block)
+            while step and step >= from_block:
+                emission = self._query('Emission', [netuid], block=step) or []
+                ts = None
+                for address in sorted(wanted):
+                    uid = self._query('Uids', [netuid, address], block=step)
+                    if uid is None or uid >= len(emission) or not emission[uid]:
+                        continue
+                    if ts is None:
+                        ts = self._timestamp(self.subtensor.substrate.get_block_hash(step))
+                    events.append({'block': step, 'ts': ts, 'kind': 'emission', 'address': address,
+                                   'amount': int(emission[uid]) / RAO_PER_TAO, 'netuid': netuid})
+                step -= tempo + 1
+        return events
+
+    def _query(self, name: str, params: List[Any], block: Optional[int] = None) -> Any:
+        """SubtensorModule storage value (lock held)"""
+        return _value(self.subtensor.query_subtensor(name, block=block, params=params))
+
+    def _timestamp(self, block_hash: str) -> float:
+        """Unix time of a block from Timestamp.Now (lock held)"""
+        now_ms = _value(self.subtensor.substrate.query('Timestamp', 'Now', block_hash=block_hash))
+        return int(now_ms) / 1000
@@ -2,19 +2,49 @@
 
 import json
 import logging
+import os
+import tempfile
+import threading
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, Optional
+from datetime import datetime, timezone
+from typing import Dict, Optional, Any
+
+from .budget_pacer import BudgetPacer
+from .token_ledger import TokenLedger
+from .spend_windows import SpendWindows
+from .budget_reservations import BudgetReservations
 
 logger = logging.getLogger(__name__)
 
 
+def _timestamp(dt: datetime) -> float:
+    """Unix timestamp of a naive UTC datetime"""
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
 class TokenBudgetManager:
-    """Manages token budgets for multiple LLM API providers"""
+    """
+    Manages token budgets for multiple LLM API providers.
+    Spend is recorded to an append-only TokenLedger; the JSON config is
+    only rewritten on ledger compaction and monthly resets.
+    Usage shared between worker processes lives in a BudgetReservations
+    segment, so concurrent workers reserve tokens before inference instead
+    of each checking a private copy of the budgets.
+
+    One manager is shared by every bulkhead worker thread; recording,
+    compaction, rollover and saves run under a single re-entrant lock.
+    """
 
     def __init__(self, config_path: str = "config/token-budgets.json"):
         self.config_path = Path(config_path)
+        self.config = {}
         self.budgets = {}
+        self.pacer = BudgetPacer()
+        self.ledger = None
+        self.reservations = None
+        self.windows = SpendWindows()
+        self._period_end = None
+        self._lock = threading.RLock()
         self.load_budgets()
 
     def load_budgets(self) -> None:
@@ -26,33 +56,155 @@ class TokenBudgetManager:
         try:
             with open(self.config_path, 'r') as f:
                 config = json.load(f)
+            self.config = config
             self.budgets = config.get('budgets', {})
+            self.pacer = BudgetPacer(
+                config.get('pacing', {}),
+                config.get('tracking', {}),
+                config.get('allocation_rules', {}).get('min_budget_threshold_for_task_percent', 0.1)
+            )
             logger.info(f"Loaded budgets for {len(self.budgets)} LLM providers")
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse budget config: {e}")
             raise
 
+        self._load_ledger()
+
+    def _load_ledger(self) -> None:
+        """Open the spend ledger and take used_this_month from its counters"""
+        if self.ledger is None:
+            self.ledger = TokenLedger.from_config(self.config.get('ledger', {}))
+            self.ledger.seed({
+                api_name: budget_info.get('used_this_month', 0)
+                for api_name, budget_info in self.budgets.items()
+            })
+
+        if self.reservations is None:
+            self.reservations = BudgetReservations.from_config(self.config.get('reservations', {}))
+            self.reservations.register_apis({
+                api_name: self.ledger.get_used(api_name) for api_name in self.budgets
+            })
+
+        for api_name in self.budgets:
+            self._sync_used(api_name)
+
+        # Rebuild spend windows: last saved state plus the ledger tail
+        tracking = self.config.get('tracking', {})
+        self.windows = SpendWindows.from_config(tracking)
+        self.windows.load(tracking.get('windows_path', 'state/spend-windows.json'))
+        self.ledger.replay(self._fold_into_windows, after_seq=self.windows.seq)
+        self.windows.seq = self.ledger.seq
+
+    def _fold_into_windows(self, entry: Dict[str, Any]) -> None:
+        """Apply a replayed ledger entry to the spend windows"""
+        if entry.get('type') == 'reset':
+            return
+        ts = datetime.fromisoformat(entry['ts']).replace(tzinfo=timezone.utc).timestamp()
+        self.windows.record(
+            entry.get('tokens', 0), entry['api'],
+            subnet_id=entry.get('subnet_id'),
+            task_type=entry.get('task_type'),
+            ts=ts
+        )
+
+    def check_period_rollover(self, now: Optional[datetime] = None) -> bool:
+        """
+        Reset monthly usage automatically once a new billing period starts
+        (per tracking.reset_day_of_month).
+
+        The period is tracked in the shared reservation segment, so when
+        several worker processes cross the boundary only the first one
+        resets usage; the others adopt the new period without erasing
+        spend already committed in it.
+
+        Returns:
+            True if this process reset usage
+        """
+        if not self.budgets:
+            return False
+
+        now = now or datetime.utcnow()
+        if self._period_end is not None and now < self._period_end:
+            return False
+
+        with self._lock:
+            if self._period_end is not None and now < self._period_end:
+                return False
+            period_start, period_end = self.pacer.period_bounds(now)
+            tracking = self.config.setdefault('tracking', {})
+            last_reset = tracking.get('last_reset')
+            last_reset = datetime.fromisoformat(last_reset) if last_reset else None
+            if self.reservations:
+                reset = self.reservations.roll_period(
+                    _timestamp(period_start), _timestamp(last_reset) if last_reset else None
+                )
+            else:
+                reset = not (last_reset and last_reset >= period_start)
+
+            if reset:
+                logger.info(f"New billing period started {period_start.date()}, resetting usage")
+                self._start_period(period_start.date().isoformat())
+            elif last_reset is None or last_reset < period_start:
+                # Another process already rolled the shared counters
+                logger.info(f"Billing period {period_start.date()} already started by another worker")
+                tracking['last_reset'] = period_start.date().isoformat()
+                if self.ledger:
+                    self.ledger.record_reset(log_entry=False)
+                for api_name in self.budgets:
+                    self._sync_used(api_name)
+            # Published only after the reset, so the unlocked fast path above
+            # never lets another thread spend into a period still being reset
+            self._period_end = period_end
+            return reset
+
     def save_budgets(self) -> None:
-        """Save budget configuration back to JSON file"""
+        """
+        Write usage back to the JSON file. Only used_this_month,
+        tracking.last_reset and last_updated are taken from this process;
+        everything else is re-read from disk, so edits made while the
+        miner runs (and other processes' saves) are never reverted.
+        """
+        tmp_path = None
         try:
-            config = {
-                'budgets': self.budgets,
-                'last_updated': datetime.utcnow().isoformat()
-            }
-            self.config_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.config_path, 'w') as f:
-                json.dump(config, f, indent=2)
+            with self._lock:
+                config = self._read_config_file() or dict(self.config, budgets={})
+                for api_name, budget_info in self.budgets.items():
+                    saved = config.setdefault('budgets', {}).setdefault(api_name, dict(budget_info))
+                    saved['used_this_month'] = budget_info.get('used_this_month', 0)
+                last_reset = self.config.get('tracking', {}).get('last_reset')
+                if last_reset:
+                    config.setdefault('tracking', {})['last_reset'] = last_reset
+                config['last_updated'] = datetime.utcnow().isoformat()
+
+                # Unique temp file: other processes may be saving the same config
+                self.config_path.parent.mkdir(parents=True, exist_ok=True)
+                with tempfile.NamedTemporaryFile('w', dir=self.config_path.parent, prefix=self.config_path.name,
+                                                 suffix='.tmp', delete=False) as f:
+                    tmp_path = f.name
+                    json.dump(config, f, indent=2)
+                os.replace(tmp_path, self.config_path)
             logger.debug("Budgets saved")
         except Exception as e:
             logger.error(f"Failed to save budgets: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
             raise
 
+    def _read_config_file(self) -> Optional[Dict[str, Any]]:
+        """Current contents of the budget config file (None if unreadable)"""
+        try:
+            with open(self.config_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
     def get_remaining_budget(self, api_name: str) -> int:
         """Get remaining monthly budget tokens for an API"""
         if api_name not in self.budgets:
             logger.warning(f"Unknown API: {api_name}")
             return 0
 
+        self._sync_used(api_name)
         budget_info = self.budgets[api_name]
         monthly = budget_info.get('monthly_allowance', 0)
         used = budget_info.get('used_this_month', 0)
@@ -75,9 +227,13 @@ class TokenBudgetManager:
             logger.warning(f"Unknown API: {api_name}")
             return False
 
+        self.check_period_rollover()
+        self._sync_used(api_name)
         budget_info = self.budgets[api_name]
         monthly = budget_info.get('monthly_allowance', 0)
         used = budget_info.get('used_this_month', 0)
+        if self.reservations:
+            used += self.reservations.get_usage(api_name)[1]
         remaining = monthly - used
 
         # Apply minimum threshold
@@ -92,15 +248,136 @@ class TokenBudgetManager:
             )
         return can_afford
 
-    def record_token_spend(self, api_name: str, tokens_spent: int) -> None:
-        """Record token spending for an API"""
+    def record_token_spend(self, api_name: str, tokens_spent: int,
+                           **dimensions) -> None:
+        """
+        Record token spending for an API that was not reserved up front.
+        Appends to the ledger; the config file is not rewritten here.
+
+        Args:
+            api_name: Name of the LLM API
+            tokens_spent: Tokens consumed
+            **dimensions: Optional context stored with the entry (subnet_id, task_type)
+        """
+        if api_name not in self.budgets:
+            logger.warning(f"Unknown API: {api_name}")
+            return
+
+        self.check_period_rollover()
+        if self.reservations:
+            self.reservations.add_usage(api_name, tokens_spent)
+        self._record_spend(api_name, tokens_spent, dimensions)
+
+    def reserve_tokens(self, api_name: str, tokens_estimate: int,
+                       ttl_seconds: Optional[float] = None) -> Optional[int]:
+        """
+        Atomically reserve tokens before inference (safe across worker processes).
+
+        Args:
+            api_name: Name of the LLM API
+            tokens_estimate: Expected prompt + completion tokens
+            ttl_seconds: Auto-release the reservation after this long
+
+        Returns:
+            Reservation id, or None if the budget cannot cover the estimate
+        """
+        if self.reservations is None:
+            logger.warning(f"No budget config loaded, cannot reserve tokens for {api_name}")
+            return None
+        if api_name not in self.budgets:
+            logger.warning(f"Unknown API: {api_name}")
+            return None
+
+        self.check_period_rollover()
+        reservation_id = self.reservations.reserve(
+            api_name, tokens_estimate, self._get_limit(api_name), ttl_seconds
+        )
+        if reservation_id is None:
+            logger.warning(f"Could not reserve {tokens_estimate} tokens for {api_name}")
+        return reservation_id
+
+    def commit_reservation(self, reservation_id: int, api_name: str,
+                           actual_tokens: int, **dimensions) -> None:
+        """Commit actual usage for a reservation made with reserve_tokens()"""
         if api_name not in self.budgets:
             logger.warning(f"Unknown API: {api_name}")
             return
 
-        self.budgets[api_name]['used_this_month'] += tokens_spent
-        logger.debug(f"Recorded {tokens_spent} tokens for {api_name}")
-        self.save_budgets()
+        self.reservations.commit(reservation_id, api_name, actual_tokens)
+        self._record_spend(api_name, actual_tokens, dimensions)
+
+    def release_reservation(self, reservation_id: int) -> None:
+        """Release a reservation after a failed or skipped inference"""
+        if self.reservations:
+            self.reservations.release(reservation_id)
+
+    def _record_spend(self, api_name: str, tokens_spent: int,
+                      dimensions: Dict[str, Any]) -> None:
+        """Append a spend to the ledger and update the local views"""
+        with self._lock:
+            self.ledger.append(api_name, tokens_spent, **dimensions)
+            self._sync_used(api_name)
+            self.pacer.record_spend(api_name, tokens_spent)
+            self.windows.record(
+                tokens_spent, api_name,
+                subnet_id=dimensions.get('subnet_id'),
+                task_type=dimensions.get('task_type')
+            )
+            self.windows.seq = self.ledger.seq
+            logger.debug(f"Recorded {tokens_spent} tokens for {api_name}")
+
+            if self.ledger.needs_compaction():
+                # The spend is already in the ledger; a failed save must not
+                # fail the task that made it (compaction retries next time)
+                try:
+                    self.compact()
+                except OSError as e:
+                    logger.error(f"Ledger compaction failed: {e}")
+
+    def _sync_used(self, api_name: str) -> None:
+        """Refresh used_this_month from the shared segment (all workers' usage)"""
+        if self.reservations:
+            used = self.reservations.get_usage(api_name)[0]
+        elif self.ledger:
+            used = self.ledger.get_used(api_name)
+        else:
+            return
+        self.budgets[api_name]['used_this_month'] = used
+
+    def _get_limit(self, api_name: str) -> Optional[int]:
+        """Spend ceiling for reservations (None if the API has no hard limit)"""
+        budget_info = self.budgets[api_name]
+        if not budget_info.get('hard_limit', True):
+            return None
+        buffer = self.config.get('allocation_rules', {}).get('min_budget_threshold_for_task_percent', 0.1)
+        return int(budget_info.get('monthly_allowance', 0) * (1.0 - buffer))
+
+    def compact(self) -> None:
+        """Compact the spend ledger and sync used_this_month into the config file"""
+        with self._lock:
+            if self.ledger:
+                self.ledger.compact()
+            self._save_windows()
+            self.save_budgets()
+
+    def close(self) -> None:
+        """Flush pending ledger entries and persist spend windows"""
+        with self._lock:
+            if self.ledger:
+                self.ledger.close()
+            self._save_windows()
+
+    def _save_windows(self) -> None:
+        """Persist spend windows so other processes (heartbeat) can read them"""
+        try:
+            tracking = self.config.get('tracking', {})
+            self.windows.save(tracking.get('windows_path', 'state/spend-windows.json'))
+        except OSError as e:
+            logger.error(f"Failed to save spend windows: {e}")
+
+    def get_burn_rates(self) -> Dict[str, Dict]:
+        """Trailing-window spend (1h/24h/7d/30d) and calendar totals per model/subnet/task type"""
+        return self.windows.get_burn_rates()
 
     def get_budget_info(self, api_name: str) -> Optional[Dict]:
         """Get full budget information for an API"""
@@ -110,18 +387,36 @@ class TokenBudgetManager:
         """Get all budget information"""
         return self.budgets.copy()
 
-    def reset_monthly_budgets(self) -> None:
-        """Reset monthly usage counters (call on first day of month)"""
-        for api_name in self.budgets:
-            self.budgets[api_name]['used_this_month'] = 0
-        self.save_budgets()
+    def reset_monthly_budgets(self, reset_date: Optional[str] = None) -> None:
+        """
+        Reset monthly usage counters now (manual reset; the automatic reset
+        at the start of each billing period is check_period_rollover).
+
+        Args:
+            reset_date: ISO date recorded as tracking.last_reset (defaults to today)
+        """
+        with self._lock:
+            if self.reservations:
+                self.reservations.reset_usage()
+            self._start_period(reset_date or datetime.utcnow().date().isoformat())
         logger.info("Monthly budgets reset")
 
+    def _start_period(self, reset_date: str) -> None:
+        """Log the reset and zero local usage (shared counters already zeroed)"""
+        with self._lock:
+            self.config.setdefault('tracking', {})['last_reset'] = reset_date
+            if self.ledger:
+                self.ledger.record_reset()
+            for api_name in self.budgets:
+                self.budgets[api_name]['used_this_month'] = 0
+            self.compact()
+
     def get_budget_utilization_percent(self, api_name: str) -> float:
         """Get budget utilization as percentage (0-100)"""
         if api_name not in self.budgets:
             return 0.0
 
+        self._sync_used(api_name)
         budget_info = self.budgets[api_name]
         monthly = budget_info.get('monthly_allowance', 1)  # Avoid divide by zero
         used = budget_info.get('used_this_month', 0)
@@ -129,9 +424,48 @@ class TokenBudgetManager:
         return (used / monthly) * 100 if monthly > 0 else 100.0
 
     def get_daily_limit_remaining(self, api_name: str) -> int:
-        """Get remaining daily token limit (simplified - doesn't track per-day)"""
+        """Get remaining daily token limit (UTC day)"""
         if api_name not in self.budgets:
             return 0
 
         budget_info = self.budgets[api_name]
-        return budget_info.get('daily_limit', 0)
+        spent_today = self.windows.period_totals(model=api_name)['today']
+        return max(0, budget_info.get('daily_limit', 0) - spent_today)
+
+    def get_pace(self, api_name: str) -> float:
+        """
+        Get the pacing factor for an API (1.0 = on the ideal monthly trajectory).
+        Multiply participation rates and max_tokens by this value.
+        """
+        if api_name not in self.budgets:
+            return 1.0
+
+        budget_info = self.budgets[api_name]
+        return self.pacer.get_pace(
+            api_name,
+            budget_info.get('used_this_month', 0),
+            budget_info.get('monthly_allowance', 0)
+        )
+
+    def get_projected_exhaustion(self, api_name: str) -> Optional[datetime]:
+        """Get projected budget exhaustion time at the current burn rate"""
+        if api_name not in self.budgets:
+            return None
+
+        budget_info = self.budgets[api_name]
+        return self.pacer.projected_exhaustion(
+            api_name,
+            budget_info.get('used_this_month', 0),
+            budget_info.get('monthly_allowance', 0)
+        )
+
+    def get_pacing_status(self) -> Dict[str, Dict]:
+        """Get pacing status (pace, burn rate, projected exhaustion) for all APIs"""
+        return {
+            api_name: self.pacer.get_status(
+                api_name,
+                budget_info.get('used_this_month', 0),
+                budget_info.get('monthly_allowance', 0)
+            )
+            for api_name, budget_info in self.budgets.items()
+        }
@@ -0,0 +1,328 @@
+"""Write-behind append-only ledger for token spend"""
+
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenLedger:
+    """
+    Append-only token spend ledger with in-memory counters.
+
+    Spends are appended to a JSONL log and fsync'd in groups (by batch size
+    or linger time) instead of rewriting the budget config on every task.
+    The log is periodically compacted into a snapshot; on startup the
+    snapshot is loaded and the log tail is replayed.
+
+    Several processes may share one ledger. Each append takes an flock on
+    the log, first folds in whatever the others appended since (so seq
+    numbers stay unique and increasing across processes, and the counters
+    cover everyone's spend), then writes its entry. A compaction by
+    another process is noticed by the snapshot file changing.
+    """
+
+    def __init__(self, log_path: str = "state/token-ledger.jsonl",
+                 snapshot_path: str = "state/token-ledger-snapshot.json",
+                 commit_batch_size: int = 32,
+                 commit_interval_seconds: float = 1.0,
+                 compact_every: int = 1000):
+        self.log_path = Path(log_path)
+        self.snapshot_path = Path(snapshot_path)
+        self.commit_batch_size = commit_batch_size
+        self.commit_interval_seconds = commit_interval_seconds
+        self.compact_every = compact_every
+
+        self.used = {}            # api -> tokens used this period
+        self.seq = 0              # sequence number of the last entry
+        self.snapshot_seq = 0     # sequence number covered by the snapshot
+        self.last_reset = None    # ISO timestamp of the last period reset
+
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None  # O_APPEND log, also the cross-process lock
+        self._offset = 0                # Bytes of the log folded into the counters
+        self._snapshot_id: Optional[Tuple[int, int]] = None  # (inode, mtime) loaded
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        self._stop = threading.Event()
+        self._flusher = None
+
+        self._recover()
+        atexit.register(self.close)
+        logger.debug(f"TokenLedger ready at seq {self.seq}")
+
+    @classmethod
+    def from_config(cls, ledger_config: Dict[str, Any]) -> 'TokenLedger':
+        """Create a ledger from the 'ledger' section of token-budgets.json"""
+        return cls(
+            log_path=ledger_config.get('path', 'state/token-ledger.jsonl'),
+            snapshot_path=ledger_config.get('snapshot_path', 'state/token-ledger-snapshot.json'),
+            commit_batch_size=ledger_config.get('commit_batch_size', 32),
+            commit_interval_seconds=ledger_config.get('commit_interval_seconds', 1.0),
+            compact_every=ledger_config.get('compact_every', 1000),
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        """True if nothing has ever been recorded (no snapshot, no log entries)"""
+        return self.seq == 0
+
+    def seed(self, used: Dict[str, int]) -> None:
+        """Initialize counters from legacy used_this_month values (empty ledger only)"""
+        if not self.is_empty:
+            return
+        with self._lock, self._file_locked():
+            self._catch_up()
+            if not self.is_empty:
+                return  # Another process got there first
+            self.used = {api: int(tokens) for api, tokens in used.items() if tokens}
+            self.seq += 1
+            self._write_snapshot()
+        logger.info("Token ledger seeded from budget config")
+
+    def append(self, api_name: str, tokens: int, **dimensions: Any) -> None:
+        """
+        Record a spend. Updates counters immediately; durability follows
+        at the next group commit.
+
+        Args:
+            api_name: Name of the LLM API
+            tokens: Tokens spent
+            **dimensions: Optional context (subnet_id, task_type, ...)
+        """
+        entry = {'ts': datetime.utcnow().isoformat(), 'api': api_name, 'tokens': tokens}
+        entry.update(dimensions)
+        with self._lock, self._file_locked():
+            self._catch_up()
+            self.used[api_name] = self.used.get(api_name, 0) + tokens
+            self._write_entry(entry)
+
+    def record_reset(self, log_entry: bool = True) -> None:
+        """
+        Record a billing period reset (zeroes all counters).
+
+        Args:
+            log_entry: Append a reset entry; False when another process
+                already logged this period's reset and only the local
+                counters need to follow
+        """
+        with self._lock:
+            if not log_entry:
+                self.used = {}
+                self.last_reset = datetime.utcnow().isoformat()
+                return
+            with self._file_locked():
+                self._catch_up()
+                self.used = {}
+                self.last_reset = datetime.utcnow().isoformat()
+                self._write_entry({'ts': self.last_reset, 'type': 'reset'})
+                self._commit()
+
+    def get_used(self, api_name: str) -> int:
+        """Get tokens used this period for an API"""
+        return self.used.get(api_name, 0)
+
+    def replay(self, handler: Callable[[Dict[str, Any]], None], after_seq: int = 0) -> int:
+        """
+        Feed committed log entries newer than after_seq to a handler.
+        Used by derived views (e.g. spend windows) to catch up on startup.
+
+        Returns:
+            Number of entries replayed
+        """
+        self.flush()
+        if not self.log_path.exists():
+            return 0
+
+        replayed = 0
+        with open(self.log_path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if entry.get('seq', 0) > after_seq:
+                    handler(entry)
+                    replayed += 1
+        return replayed
+
+    def needs_compaction(self) -> bool:
+        """True once enough entries accumulated since the last snapshot"""
+        return self.seq - self.snapshot_seq >= self.compact_every
+
+    def compact(self) -> None:
+        """Fold the log into a new snapshot and truncate the log"""
+        with self._lock, self._file_locked():
+            self._catch_up()
+            self._commit()
+            self._write_snapshot()
+            # Entries <= snapshot_seq are skipped on replay, so a crash
+            # between the snapshot rename and this truncate is harmless
+            os.ftruncate(self._fd, 0)
+            self._offset = 0
+        logger.debug(f"Token ledger compacted at seq {self.seq}")
+
+    def flush(self) -> None:
+        """Force a group commit of pending entries"""
+        with self._lock:
+            self._commit()
+
+    def close(self) -> None:
+        """Flush pending entries and stop the background flusher"""
+        self._stop.set()
+        with self._lock:
+            self._commit()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    @contextmanager
+    def _file_locked(self):
+        """Exclusive flock on the log across processes (thread lock held)"""
+        if self._fd is None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.log_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _write_entry(self, entry: Dict[str, Any]) -> None:
+        """Append an entry and commit if the group is full (both locks held)"""
+        self.seq += 1
+        entry['seq'] = self.seq
+        line = (json.dumps(entry) + '\n').encode()
+        os.write(self._fd, line)
+        self._offset += len(line)
+        self._pending += 1
+
+        if (self._pending >= self.commit_batch_size or
+                time.monotonic() - self._last_commit >= self.commit_interval_seconds):
+            self._commit()
+        else:
+            self._ensure_flusher()
+
+    def _commit(self) -> None:
+        """Flush and fsync pending entries (lock held)"""
+        if self._fd is not None and self._pending:
+            os.fsync(self._fd)
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def _ensure_flusher(self) -> None:
+        """Start the linger-time flusher thread on first use"""
+        if self._flusher is None:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name='token-ledger-flusher', daemon=True
+            )
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        """Commit lingering entries so a quiet period never leaves them unsynced"""
+        while not self._stop.wait(self.commit_interval_seconds):
+            with self._lock:
+                if self._pending:
+                    self._commit()
+
+    def _write_snapshot(self) -> None:
+        """Atomically write the snapshot (lock held)"""
+        snapshot = {
+            'seq': self.seq,
+            'used': self.used,
+            'last_reset': self.last_reset,
+            'written_at': datetime.utcnow().isoformat(),
+        }
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.snapshot_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self.snapshot_seq = self.seq
+        self._snapshot_id = self._stat_snapshot()
+
+    def _stat_snapshot(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _load_snapshot(self) -> None:
+        """Reset the counters to the snapshot (before folding in the log)"""
+        self.used, self.seq, self.snapshot_seq = {}, 0, 0
+        self._snapshot_id = self._stat_snapshot()
+        if self._snapshot_id is None:
+            return
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+            self.used = {api: int(v) for api, v in snapshot.get('used', {}).items()}
+            self.seq = self.snapshot_seq = snapshot.get('seq', 0)
+            self.last_reset = snapshot.get('last_reset')
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"Failed to load ledger snapshot: {e}")
+
+    def _catch_up(self) -> int:
+        """
+        Fold in log entries appended since we last looked (flock held).
+        After another process's compaction, start over from its snapshot.
+
+        Returns:
+            Number of entries folded in
+        """
+        if self._stat_snapshot() != self._snapshot_id:
+            self._load_snapshot()
+            self._offset = 0
+
+        size = os.fstat(self._fd).st_size
+        if size <= self._offset:
+            return 0
+        data = os.pread(self._fd, size - self._offset, self._offset)
+
+        folded = 0
+        consumed = 0
+        for raw in data.splitlines(keepends=True):
+            try:
+                if not raw.endswith(b'\n'):
+                    raise ValueError("unterminated entry")
+                entry = json.loads(raw)
+            except ValueError:
+                # Torn write from a crash; drop it so new appends start clean
+                logger.warning(f"Truncating torn entry at byte {self._offset + consumed} of token ledger")
+                os.ftruncate(self._fd, self._offset + consumed)
+                break
+            consumed += len(raw)
+
+            seq = entry.get('seq', 0)
+            if seq <= self.snapshot_seq:
+                continue
+            if entry.get('type') == 'reset':
+                self.used = {}
+                self.last_reset = entry.get('ts')
+            else:
+                api = entry['api']
+                self.used[api] = self.used.get(api, 0) + entry.get('tokens', 0)
+            self.seq = max(self.seq, seq)
+            folded += 1
+
+        self._offset += consumed
+        return folded
+
+    def _recover(self) -> None:
+        """Load the snapshot and replay the log tail"""
+        with self._lock, self._file_locked():
+            replayed = self._catch_up()
+        if replayed:
+            logger.info(f"Replayed {replayed} token ledger entries")
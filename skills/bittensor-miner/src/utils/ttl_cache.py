@@ -0,0 +1,132 @@
+"""TTL cache that never blocks readers: stale-while-revalidate with background refresh"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Values fetched by slow loaders (wallet process, RPC), served without
+    ever waiting on them.
+
+    get() returns a value fetched within ttl_seconds as is. An older value
+    is still returned, and one background refresh for that key is started.
+    A key never fetched returns the default and starts its first load. A
+    failed refresh keeps the old value and is not retried for
+    retry_seconds. Values and their fetch times are saved to cache_file,
+    so after a restart the last known values are served (as stale)
+    while the loaders warm up.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, retry_seconds: float = 10.0,
+                 cache_file: Optional[str] = None):
+        """
+        Args:
+            ttl_seconds: Age at which a value is refreshed
+            retry_seconds: Wait after a failed refresh before trying again
+            cache_file: JSON copy for warm restarts (None = memory only)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self.cache_file = Path(cache_file) if cache_file else None
+        self._entries: Dict[str, Dict[str, Any]] = {}  # key -> {'value', 'fetched_at'}
+        self._refreshing = set()
+        self._retry_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'errors': 0}
+        self._load()
+
+    def get(self, key: str, loader: Callable[[], Any], default: Any = None) -> Any:
+        """
+        Cached value for key; never waits for loader.
+
+        Args:
+            key: Cache key
+            loader: Fetches a fresh value (runs on a background thread)
+            default: Returned while a never-fetched key loads
+        """
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry['fetched_at'] < self.ttl_seconds:
+            self.stats['hits'] += 1
+            return entry['value']
+        self.stats['stale_hits' if entry is not None else 'misses'] += 1
+        self.refresh_async(key, loader)
+        return entry['value'] if entry is not None else default
+
+    def age_seconds(self, key: str) -> Optional[float]:
+        """Seconds since key was fetched (None if never)"""
+        entry = self._entries.get(key)
+        return time.time() - entry['fetched_at'] if entry is not None else None
+
+    def refresh(self, key: str, loader: Callable[[], Any]) -> bool:
+        """
+        Fetch key now (on the calling thread).
+
+        Returns:
+            True if the value was updated
+        """
+        self.stats['refreshes'] += 1
+        try:
+            value = loader()
+        except Exception as e:
+            self.stats['errors'] += 1
+            self._retry_at[key] = time.monotonic() + self.retry_seconds
+            logger.warning(f"Refreshing {key} failed: {e}")
+            return False
+        with self._lock:
+            self._entries = dict(self._entries, **{key: {'value': value, 'fetched_at': time.time()}})
+        self._save()
+        return True
+
+    def refresh_async(self, key: str, loader: Callable[[], Any]) -> bool:
+        """
+        Start a background refresh of key unless one is running or a
+        recent one failed.
+
+        Returns:
+            True if a refresh was started
+        """
+        with self._lock:
+            if key in self._refreshing or time.monotonic() < self._retry_at.get(key, 0.0):
+                return False
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.refresh(key, loader)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f"cache-refresh-{key}", daemon=True).start()
+        return True
+
+    def _load(self) -> None:
+        if self.cache_file is None or not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                self._entries = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"Failed to load {self.cache_file}: {e}")
+
+    def _save(self) -> None:
+        """Atomically write the cache for warm restarts"""
+        if self.cache_file is None:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_file.with_suffix('.tmp')
+            with self._lock:
+                with open(tmp_path, 'w') as f:
+                    json.dump(self._entries, f)
+                os.replace(tmp_path, self.cache_file)
+        except (OSError, TypeError) as e:
+            logger.error(f"Failed to save {self.cache_file}: {e}")
@@ -0,0 +1,158 @@
+"""Virtual clock for deterministic simulations of the miner"""
+
+import importlib.abc
+import importlib.machinery
+import sys
+import time
+import types
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+
+class _PatchingLoader(importlib.abc.Loader):
+    """Loader wrapper that runs a callback on each module after it executes"""
+
+    def __init__(self, loader: importlib.abc.Loader, callback: Callable[[types.ModuleType], None]):
+        self.loader = loader
+        self.callback = callback
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module: types.ModuleType) -> None:
+        self.loader.exec_module(module)
+        self.callback(module)
+
+
+class _PatchingFinder(importlib.abc.MetaPathFinder):
+    """Finds modules like the path finder, wrapping the loaders of those under src_dir"""
+
+    def __init__(self, src_dir: str, callback: Callable[[types.ModuleType], None]):
+        self.src_dir = src_dir
+        self.callback = callback
+
+    def find_spec(self, name, path=None, target=None):
+        spec = importlib.machinery.PathFinder.find_spec(name, path, target)
+        if spec is None or spec.loader is None or not (spec.origin or '').startswith(self.src_dir):
+            return None
+        spec.loader = _PatchingLoader(spec.loader, self.callback)
+        return spec
+
+
+class VirtualClock:
+    """
+    Simulated time that only moves when the simulator moves it.
+
+    install() points the miner modules' time and datetime names at this
+    clock: 'import time' gets a stand-in time module whose time(),
+    monotonic() (and _ns variants) read the clock, and 'from time import
+    time' / 'from datetime import datetime' names get the virtual
+    callables. Pacing, spend windows, ledgers, metagraph staleness and
+    deadlines then run on simulated time without any change to their
+    code, and a month passes as fast as the events in it can be processed.
+    The real time module, and everything outside the miner's source
+    tree (logging, threading, the test runner), keeps real time.
+
+    Threads blocked on Events and Conditions still wait in real time, so
+    simulations keep background flushers idle and flush from the
+    simulating thread.
+    """
+
+    def __init__(self, start: float):
+        """
+        Args:
+            start: Unix timestamp the simulation starts at
+        """
+        self.start = float(start)
+        self.now = float(start)
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time_ns(self) -> int:
+        return int(self.now * 1e9)
+
+    def utcnow(self) -> datetime:
+        return datetime.utcfromtimestamp(self.now)
+
+    def advance(self, seconds: float) -> float:
+        """Move forward by seconds; returns the new time"""
+        self.now += max(0.0, seconds)
+        return self.now
+
+    def set(self, ts: float) -> None:
+        """Jump to ts (the simulator rewinds to an event's time after running a task from it)"""
+        self.now = float(ts)
+
+    def datetime_class(self) -> type:
+        """datetime subclass whose now()/utcnow() read this clock"""
+        clock = self
+
+        class VirtualDatetime(datetime):
+            @classmethod
+            def utcnow(cls):
+                return cls.utcfromtimestamp(clock.now)
+
+            @classmethod
+            def now(cls, tz=None):
+                return cls.fromtimestamp(clock.now, tz)
+
+        return VirtualDatetime
+
+    def time_module(self) -> types.ModuleType:
+        """Stand-in for the time module with its clock functions on this clock"""
+        module = types.ModuleType('time', time.__doc__)
+        module.__dict__.update({k: v for k, v in vars(time).items() if not k.startswith('__')})
+        module.time, module.time_ns = self.time, self.time_ns
+        module.monotonic, module.monotonic_ns = self.monotonic, self.time_ns
+        return module
+
+    @contextmanager
+    def install(self, src_dir: Optional[Path] = None) -> Iterator['VirtualClock']:
+        """
+        Run the block on this clock.
+
+        Modules under src_dir are patched: those already imported right
+        away, and those imported inside the block as they load. All of
+        them are restored on exit.
+
+        Args:
+            src_dir: Source tree whose modules are patched (default: this package's)
+        """
+        src_dir = str(src_dir or SRC_DIR)
+        replacements = {
+            id(time): self.time_module(),
+            id(time.time): self.time,
+            id(time.monotonic): self.monotonic,
+            id(time.time_ns): self.time_ns,
+            id(datetime): self.datetime_class(),
+        }
+        patched: List[Tuple[types.ModuleType, str, Any]] = []
+
+        def patch(module: types.ModuleType) -> None:
+            if module.__name__ == __name__:
+                return
+            for name, value in list(vars(module).items()):
+                replacement = replacements.get(id(value))
+                if replacement is not None:
+                    setattr(module, name, replacement)
+                    patched.append((module, name, value))
+
+        for module in list(sys.modules.values()):
+            if (getattr(module, '__file__', None) or '').startswith(src_dir):
+                patch(module)
+        finder = _PatchingFinder(src_dir, patch)
+        sys.meta_path.insert(0, finder)
+        try:
+            yield self
+        finally:
+            sys.meta_path.remove(finder)
+            for module, name, value in reversed(patched):
+                setattr(module, name, value)
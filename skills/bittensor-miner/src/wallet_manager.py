@@ -1,35 +1,86 @@
 """TAO wallet management via latinum-wallet-mcp"""
 
-import json
 import logging
-import subprocess
-from pathlib import Path
+import shlex
+import shutil
 from typing import Optional, Dict, Any
 
+from utils.mcp_session import MCPSupervisor, MCPUnavailable
+from utils.ttl_cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
+# MCP tool per wallet operation (override under wallet_mcp.tools)
+DEFAULT_TOOLS = {
+    'balance': 'get_balance',
+    'earnings': 'get_earnings',
+    'stake_info': 'get_stake_info',
+    'sign': 'sign_transaction',
+}
 
-class WalletManager:
-    """Manages TAO wallet operations via latinum-wallet-mcp MCP server"""
 
-    def __init__(self, mcp_command: str = "latinum-wallet-mcp"):
-        self.mcp_command = mcp_command
-        self.mcp_process = None
+class WalletManager:
+    """
+    Manages TAO wallet operations via latinum-wallet-mcp MCP server.
+
+    One MCP session is kept open for the life of the daemon and restarted
+    if it dies (see MCPSupervisor). Reads (balance, earnings, stake) are
+    served from a TTL cache that refreshes in the background, so heartbeat
+    and reporting never wait on the wallet process, even while it is
+    starting. Without the server binary (or with enabled false) the
+    Phase 1 mock values are returned.
+    """
+
+    def __init__(self, mcp_command: str = "latinum-wallet-mcp", config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            mcp_command: Server command (used when config has no 'command')
+            config: The 'wallet_mcp' config section
+        """
+        config = config or {}
+        self.config = config
+        self.mcp_command = config.get('command', mcp_command)
+        self.tools = dict(DEFAULT_TOOLS, **config.get('tools', {}))
+        self.request_timeout = config.get('request_timeout', 10)
+        self.mcp_process = None  # MCPSupervisor once started
+        self.earnings = None     # EarningsLedger, when the daemon keeps one
+        self.cache = TTLCache(
+            ttl_seconds=config.get('cache_ttl_seconds', 60),
+            retry_seconds=config.get('cache_retry_seconds', 10),
+            cache_file=config.get('cache_file'),
+        )
+
+        self.command = shlex.split(self.mcp_command) + list(config.get('args', []))
+        self.mock = not config.get('enabled', True) or shutil.which(self.command[0]) is None
         logger.debug("WalletManager initialized")
 
     def start_mcp_server(self) -> bool:
         """
         Start the latinum-wallet-mcp MCP server.
-        Phase 1: Mock implementation
+
+        Does not wait for the server: the supervisor brings it up in the
+        background and reads return cached (or default) values until it
+        is ready. With auto_start false the server starts on first use.
 
         Returns:
             True if successful, False otherwise
         """
         try:
-            logger.info("Starting latinum-wallet-mcp MCP server...")
-            # Phase 1: Mock - in real implementation would spawn latinum-wallet-mcp
-            # For now, just log that it would start
-            logger.info("✅ MCP server started (mock mode)")
+            if self.mock:
+                # Phase 1: Mock - no server binary (or wallet_mcp disabled)
+                logger.info("✅ MCP server started (mock mode)")
+                return True
+            if self.mcp_process is None:
+                self.mcp_process = MCPSupervisor(
+                    self.command,
+                    request_timeout=self.request_timeout,
+                    startup_timeout=self.config.get('startup_timeout', 15),
+                    backoff_max=self.config.get('backoff_max', 60),
+                    max_consecutive_timeouts=self.config.get('max_consecutive_timeouts', 3),
+                )
+            if self.config.get('auto_start', True):
+                self._ensure_started()
+                self.prewarm()
             return True
         except Exception as e:
             logger.error(f"Failed to start MCP server: {e}")
@@ -39,64 +90,72 @@ class WalletManager:
         """Stop the MCP server"""
         try:
             if self.mcp_process:
-                self.mcp_process.terminate()
+                self.mcp_process.stop()
                 logger.info("MCP server stopped")
         except Exception as e:
             logger.error(f"Failed to stop MCP server: {e}")
 
+    def prewarm(self) -> None:
+        """Queue background refreshes of the cached reads (returns at once)"""
+        for key, loader in self._loaders(days=7).items():
+            self.cache.refresh_async(key, loader)
+
     def get_balance(self) -> Optional[float]:
         """
-        Get current TAO wallet balance.
-        Phase 1: Mock implementation
+        Get current TAO wallet balance (cached; never waits on the wallet).
 
         Returns:
-            Balance in TAO, or None if failed
+            Balance in TAO, or None if not known yet
         """
         try:
-            logger.debug("Getting wallet balance...")
-            # Phase 1: Mock balance
-            balance = 0.05
-            logger.debug(f"Wallet balance: {balance} TAO")
-            return balance
+            if self.mock:
+                # Phase 1: Mock balance
+                return 0.05
+            balance = self.cache.get('balance', self._loaders()['balance'])
+            return float(balance) if balance is not None else None
         except Exception as e:
             logger.error(f"Failed to get balance: {e}")
             return None
 
     def get_earnings(self, days: int = 7) -> Optional[float]:
         """
-        Get TAO earnings from mining.
-        Phase 1: Mock implementation
+        Get TAO earnings from mining. With an earnings ledger this sums its
+        day rollups (O(days)); otherwise it is cached and never waits on
+        the wallet.
 
         Args:
             days: Number of days to look back
 
         Returns:
-            Total earnings in TAO, or None if failed
+            Total earnings in TAO, or None if not known yet
         """
         try:
-            logger.debug(f"Getting earnings for last {days} days...")
-            # Phase 1: Mock earnings
-            earnings = 0.0
-            return earnings
+            if self.earnings is not None and self.earnings.synced:
+                return self.earnings.tao_earned(days)
+            if self.mock:
+                # Phase 1: Mock earnings
+                return 0.0
+            earnings = self.cache.get(f'earnings:{days}', self._loaders(days)[f'earnings:{days}'])
+            return float(earnings) if earnings is not None else None
         except Exception as e:
             logger.error(f"Failed to get earnings: {e}")
             return None
 
     def get_stake_info(self) -> Optional[Dict[str, Any]]:
         """
-        Get stake information for the hotkey.
-        Phase 1: Mock implementation
+        Get stake information for the hotkey (cached; never waits on the wallet).
 
         Returns:
-            Dict with stake info, or None if failed
+            Dict with stake info, or None if not known yet
         """
         try:
-            info = {
-                'total_stake': 0.05,
-                'hotkey': 'default',
-                'subnet_stake': 0.05,
-            }
-            return info
+            if self.mock:
+                return {
+                    'total_stake': 0.05,
+                    'hotkey': 'default',
+                    'subnet_stake': 0.05,
+                }
+            return self.cache.get('stake_info', self._loaders()['stake_info'])
         except Exception as e:
             logger.error(f"Failed to get stake info: {e}")
             return None
@@ -104,7 +163,9 @@ class WalletManager:
     def sign_transaction(self, tx_data: Dict[str, Any]) -> Optional[str]:
         """
         Sign a transaction with the wallet key.
-        Phase 1: Mock implementation
+
+        Not cached: goes to the live session and waits at most
+        request_timeout for it.
 
         Args:
             tx_data: Transaction data to sign
@@ -113,14 +174,51 @@ class WalletManager:
             Signed transaction, or None if failed
         """
         try:
-            logger.debug("Signing transaction...")
-            # Phase 1: Mock signature
-            signature = "mock_signature_" + str(hash(str(tx_data)))
-            return signature
+            if self.mock:
+                # Phase 1: Mock signature
+                return "mock_signature_" + str(hash(str(tx_data)))
+            self._ensure_started()
+            signature = self.mcp_process.call_tool(self.tools['sign'], {'transaction': tx_data})
+            return signature if isinstance(signature, str) else signature.get('signature')
         except Exception as e:
             logger.error(f"Failed to sign transaction: {e}")
             return None
 
     def is_connected(self) -> bool:
-        """Check if wallet is connected"""
-        return True  # Phase 1: always true
+        """Check if wallet is connected (a live MCP session, or mock mode)"""
+        return self.mock or (self.mcp_process is not None and self.mcp_process.alive)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cached wallet figures and session health, for the state file (non-blocking)"""
+        snapshot = {
+            'mode': 'mock' if self.mock else 'mcp',
+            'connected': self.is_connected(),
+            'balance': self.get_balance(),
+            'balance_age_seconds': self.cache.age_seconds('balance'),
+            'cache': dict(self.cache.stats),
+        }
+        if self.mcp_process is not None:
+            snapshot['session'] = dict(self.mcp_process.stats)
+        return snapshot
+
+    def _ensure_started(self) -> None:
+        if self.mcp_process is not None and not self.mcp_process.started:
+            self.mcp_process.start()
+
+    def _loaders(self, days: int = 7) -> Dict[str, Any]:
+        """Cache key -> function fetching it from the wallet server"""
+        def call(tool: str, arguments: Optional[Dict[str, Any]] = None):
+            def load():
+                # Runs on a cache refresh thread, so it may wait for a cold start
+                if self.mcp_process is None:
+                    raise MCPUnavailable("MCP server not started")
+                self._ensure_started()
+                self.mcp_process.wait_ready(self.mcp_process.startup_timeout)
+                return self.mcp_process.call_tool(self.tools[tool], arguments)
+            return load
+
+        return {
+            'balance': call('balance'),
+            f'earnings:{days}': call('earnings', {'days': days}),
+            'stake_info': call('stake_info'),
+        }
@@ -0,0 +1,16 @@
+"""Shared fixtures: src/ importable, every test run from its own scratch directory"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+sys.path.insert(0, str(SRC_DIR))
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Relative config/, state/ and logs/ paths land in a per-test temp dir"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
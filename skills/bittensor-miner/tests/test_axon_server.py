@@ -0,0 +1,80 @@
+"""Keeping the axon's event loop from stalling or buffering without bound"""
+
+import socket
+import threading
+import time
+
+from utils.axon_server import AxonServer
+from utils.chain_backend import LocalChainBackend
+from utils.metagraph_cache import MetagraphCache
+
+
+def post(hotkey='validator', body=b'{}'):
+    return (f"POST /TextSynapse HTTP/1.1\r\nHost: x\r\nContent-Length: {len(body)}\r\n"
+            f"bt_header_dendrite_hotkey: {hotkey}\r\n\r\n").encode() + body
+
+
+def test_pipelined_flood_pauses_reading_until_response():
+    tasks = []
+    axon = AxonServer(host='127.0.0.1', port=0, on_task=lambda task: tasks.append(task) or True,
+                      max_body_bytes=4096, max_header_bytes=1024)
+    axon.start()
+    client = socket.create_connection(('127.0.0.1', axon.port))
+    try:
+        client.sendall(post())
+        deadline = time.monotonic() + 5
+        while not tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert tasks
+
+        # Keep pipelining while the first request is in flight
+        client.settimeout(0.5)
+        sent = 0
+        try:
+            while sent < 64 << 20:
+                sent += client.send(post(body=b'x' * 4000) * 16)
+        except socket.timeout:
+            pass
+        time.sleep(0.2)
+        protocol = next(iter(axon.protocols))
+        assert axon.stats['paused_reads'] == 1
+        assert len(protocol.buffer) < 1 << 20
+        assert sent < 64 << 20
+
+        axon.respond(tasks[0]['id'], payload={'ok': True})
+        deadline = time.monotonic() + 5
+        while len(tasks) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(tasks) == 2  # Reading resumed and the next request was parsed
+    finally:
+        client.close()
+        axon.stop()
+
+
+def test_cached_validator_lookup_never_syncs_inline():
+    backend = LocalChainBackend()
+    backend.register(1, 'validator', stake=100.0, validator_permit=True)
+    backend.advance()
+    cache = MetagraphCache(backend, 1, 'miner', refresh_interval_seconds=1.0, max_stale_seconds=2.0)
+    assert cache.sync()
+
+    synced_on = []
+    release = threading.Event()
+    sync = cache.sync
+
+    def slow_sync(force_full=False):
+        synced_on.append(threading.current_thread())
+        release.wait(5)
+        return sync(force_full)
+
+    cache.sync = slow_sync
+    cache.synced_at -= 10.0  # Past max_stale_seconds
+    started = time.monotonic()
+    assert cache.is_validator_cached('validator', 50.0)
+    assert time.monotonic() - started < 0.5
+    release.set()
+    deadline = time.monotonic() + 5
+    while not synced_on and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert synced_on and synced_on[0] is not threading.current_thread()
+    assert cache.stats['background_refreshes'] == 1
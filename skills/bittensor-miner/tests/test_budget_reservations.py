@@ -0,0 +1,85 @@
+"""Reservation segment shared by several workers"""
+
+import threading
+import time
+
+from utils.budget_reservations import BudgetReservations
+
+
+def open_segment(workdir):
+    # Each instance has its own descriptor, so flock treats them like processes
+    return BudgetReservations(path=str(workdir / 'state' / 'reservations.bin'), max_slots=64)
+
+
+def test_concurrent_reservations_never_exceed_the_limit(workdir):
+    segments = [open_segment(workdir) for _ in range(4)]
+    segments[0].register_apis({'gemini-pro': 0})
+    granted = []
+    lock = threading.Lock()
+
+    def work(segment):
+        for i in range(200):
+            reservation = segment.reserve('gemini-pro', 10, limit=1000)
+            if reservation is None:
+                continue
+            with lock:
+                granted.append(reservation)
+            if i % 2:
+                segment.commit(reservation, 'gemini-pro', 10)
+            else:
+                segment.release(reservation)
+            used, reserved = segment.get_usage('gemini-pro')
+            assert used + reserved <= 1000
+
+    threads = [threading.Thread(target=work, args=(segment,)) for segment in segments]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    used, reserved = segments[0].get_usage('gemini-pro')
+    assert reserved == 0
+    assert used <= 1000
+    assert segments[0].reserve('gemini-pro', 10, limit=used + 9) is None
+    for segment in segments:
+        segment.close()
+
+
+def test_expired_reservations_are_reaped(workdir):
+    first, second = open_segment(workdir), open_segment(workdir)
+    first.register_apis({'gemini-pro': 0})
+    assert first.reserve('gemini-pro', 600, limit=1000, ttl_seconds=0.05) is not None
+    assert second.reserve('gemini-pro', 600, limit=1000) is None
+
+    time.sleep(0.1)
+    second._last_reap = 0.0
+    reservation = second.reserve('gemini-pro', 600, limit=1000)
+    assert reservation is not None
+    assert not first.commit(0, 'gemini-pro', 0)  # Unknown id: nothing to take
+    assert second.commit(reservation, 'gemini-pro', 500)
+    assert first.get_usage('gemini-pro') == (500, 0)
+    first.close()
+    second.close()
+
+
+def test_period_rolls_once_across_workers(workdir):
+    segments = [open_segment(workdir) for _ in range(4)]
+    segments[0].register_apis({'gemini-pro': 700})
+    period_start = time.time()
+    results = []
+
+    def roll(segment):
+        results.append(segment.roll_period(period_start, last_reset=period_start - 86400))
+        segment.add_usage('gemini-pro', 5)
+
+    threads = [threading.Thread(target=roll, args=(segment,)) for segment in segments]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 1
+    assert segments[1].get_usage('gemini-pro') == (20, 0)
+    assert segments[2].get_period_start() == period_start
+    for segment in segments:
+        segment.close()
@@ -0,0 +1,143 @@
+"""Cheap-first model cascade: draft scoring, escalation and hit rates"""
+
+import json
+import shutil
+import time
+
+import pytest
+
+from conftest import SRC_DIR
+from llm_router import LLMRouter
+from task_handler import TaskHandler
+from utils.draft_scorer import DraftScorer
+
+CONFIG_DIR = SRC_DIR.parent / 'config'
+
+GOOD = "Paris is the capital of France, on the Seine."
+REFUSAL = "I don't know."
+STEPS = """1. Understanding: the task compares two sorting algorithms on nearly sorted input.
+2. Reasoning: insertion sort does linear work when few elements are out of place, while
+   quicksort with a naive pivot degrades towards quadratic time on such input.
+3. Conclusion: insertion sort is the better choice here, and merge sort is a safe default."""
+
+
+class ScriptedHandler(TaskHandler):
+    """TaskHandler whose models answer from a script"""
+
+    def __init__(self, drafts):
+        super().__init__()
+        self.drafts = drafts
+        self.called = []
+
+    def execute_inference(self, task, llm_config=None):
+        self.called.append(llm_config['model'])
+        return self.drafts[llm_config['model']]
+
+
+@pytest.fixture
+def handler_factory(workdir):
+    shutil.copytree(CONFIG_DIR, workdir / 'config')
+    config_path = workdir / 'config' / 'miner-config.json'
+    config = json.loads(config_path.read_text())
+    # Own history directory, so this test gets its own shared writer
+    config['performance_tracking']['history_dir'] = str(workdir / 'state' / 'history')
+    config_path.write_text(json.dumps(config))
+    handlers = []
+
+    def make(drafts):
+        handler = ScriptedHandler(drafts)
+        handlers.append(handler)
+        return handler
+
+    yield make
+    for handler in handlers:
+        handler.history_writer.close()
+        handler.budget_manager.close()
+
+
+def classification(depth='medium'):
+    return {'task_type': 'generation', 'reasoning_depth': depth, 'time_sensitivity': 'normal',
+            'confidence': 0.7}
+
+
+def test_draft_scorer_signals():
+    scorer = DraftScorer()
+    assert scorer.score('') == 0.0 and scorer.score(None) == 0.0
+
+    # Structured answers need steps; a concise one does not
+    assert scorer.score(STEPS, strategy='structured_reasoning') > 0.65
+    assert scorer.score(GOOD, strategy='structured_reasoning') < 0.65
+    assert scorer.score(GOOD, strategy='concise_generation') > 0.9
+
+    # Refusals and echoes of the task are penalized
+    assert scorer.score(REFUSAL, strategy='concise_generation') < 0.5
+    task = "Explain why the sky is blue during the day"
+    assert scorer.score(task, task, 'concise_generation') < scorer.score(GOOD, task, 'concise_generation')
+
+    # Calibrated answers blend in their stated confidence
+    hedged = "The answer is probably 42, based on the given constraints and known values. Confidence: 20%"
+    sure = hedged.replace('20%', '95%')
+    assert scorer.score(sure, strategy='calibrated_uncertainty') > scorer.score(hedged, strategy='calibrated_uncertainty')
+
+
+def test_router_cascade_order_and_escalation(workdir):
+    shutil.copy(CONFIG_DIR / 'subnet-profiles.json', workdir / 'profiles.json')
+    router = LLMRouter(str(workdir / 'profiles.json'))
+
+    assert [stage['model'] for stage in router.select_cascade(subnet_id=1)] == \
+        ['gemini-pro', 'claude-sonnet', 'openai-gpt4']
+    assert [stage['cascade_stage'] for stage in router.select_cascade(subnet_id=1)] == [0, 1, 2]
+    # Complex reasoning skips the cheap draft
+    assert [stage['model'] for stage in router.select_cascade('generation', 'complex', 1)] == \
+        ['claude-sonnet', 'openai-gpt4']
+    # No cascade configured: the single select_llm() choice
+    assert len(router.select_cascade(subnet_id=99)) == 1
+
+    assert not router.should_escalate(0.7, subnet_id=1, seconds_remaining=30)
+    assert router.should_escalate(0.5, subnet_id=1, seconds_remaining=30)
+    assert not router.should_escalate(0.5, subnet_id=1, seconds_remaining=10)  # min_remaining_seconds 15
+    assert not router.should_escalate(0.0, subnet_id=99)
+
+    router.record_cascade_outcome(1, 0)
+    router.record_cascade_outcome(1, 0)
+    router.record_cascade_outcome(1, 1)
+    stats = router.get_cascade_stats()['1']
+    assert stats['tasks'] == 3 and stats['hit_rate'] == pytest.approx(2 / 3)
+    assert stats['escalations'] == 1 and stats['escalations_skipped_deadline'] == 1
+
+
+def test_good_draft_is_submitted_without_escalation(handler_factory):
+    handler = handler_factory({'gemini-pro': GOOD, 'claude-sonnet': GOOD, 'openai-gpt4': GOOD})
+    task = {'id': 't1', 'content': 'What is the capital of France?'}
+    response, llm_config, info = handler.execute_cascade(task, classification(), 1)
+
+    assert response == GOOD and llm_config['model'] == 'gemini-pro'
+    assert handler.called == ['gemini-pro']
+    assert info['stages_run'] == 1 and info['accepted_stage'] == 0
+    assert handler.llm_router.get_cascade_stats()['1']['hit_rate'] == 1.0
+
+
+def test_weak_draft_escalates_until_good(handler_factory):
+    handler = handler_factory({'gemini-pro': REFUSAL, 'claude-sonnet': GOOD, 'openai-gpt4': GOOD})
+    task = {'id': 't2', 'content': 'What is the capital of France?'}
+    remaining = {model: handler.budget_manager.get_remaining_budget(model) for model in handler.drafts}
+    response, llm_config, info = handler.execute_cascade(task, classification(), 1)
+
+    assert response == GOOD and llm_config['model'] == 'claude-sonnet'
+    assert handler.called == ['gemini-pro', 'claude-sonnet']
+    assert info['accepted_stage'] == 1 and len(info['draft_scores']) == 2
+    assert info['draft_scores'][0] < 0.65 <= info['draft_scores'][1]
+    # Both stages' tokens were committed; the unused stage spent nothing
+    spent = {model: remaining[model] - handler.budget_manager.get_remaining_budget(model)
+             for model in handler.drafts}
+    assert spent['gemini-pro'] > 0 and spent['claude-sonnet'] > 0 and spent['openai-gpt4'] == 0
+    assert info['tokens'] == spent['gemini-pro'] + spent['claude-sonnet']
+
+
+def test_weak_draft_kept_when_deadline_is_near(handler_factory):
+    handler = handler_factory({'gemini-pro': REFUSAL, 'claude-sonnet': GOOD, 'openai-gpt4': GOOD})
+    task = {'id': 't3', 'content': 'What is the capital of France?', 'deadline': time.time() + 5}
+    response, llm_config, info = handler.execute_cascade(task, classification(), 1)
+
+    assert response == REFUSAL and handler.called == ['gemini-pro']
+    assert handler.llm_router.get_cascade_stats()['1']['escalations_skipped_deadline'] == 1
@@ -0,0 +1,115 @@
+"""Timeouts and hung-node recovery in the chain connection pool"""
+
+import time
+
+import pytest
+
+from utils.chain_backend import ChainBackend, LocalChainBackend
+from utils.chain_pool import ChainConnectionPool, RPCChainBackend
+from utils.fake_chain_endpoint import FakeChainEndpoint
+
+
+@pytest.fixture
+def endpoint():
+    endpoint = FakeChainEndpoint()
+    endpoint.start()
+    yield endpoint
+    endpoint.stop()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_timed_out_requests_are_forgotten(endpoint):
+    pool = ChainConnectionPool([endpoint.url], size=1, max_consecutive_timeouts=10)
+    try:
+        conn = pool._pick()
+        endpoint.latency_seconds = 0.5
+        for _ in range(3):
+            with pytest.raises(TimeoutError):
+                pool.call('system_health', timeout=0.05)
+        with pytest.raises(TimeoutError):
+            pool.call_many([('system_health', None)] * 4, timeout=0.05)
+        assert conn.in_flight == 0
+        assert conn.timeouts == 4
+        assert pool.stats['timeouts'] == 4
+
+        endpoint.latency_seconds = 0.0
+        assert pool.call('system_health', timeout=2.0) is not None
+        assert conn.timeouts == 0
+        assert pool._pick() is conn
+    finally:
+        pool.close()
+
+
+def test_hung_node_is_replaced_after_consecutive_timeouts(endpoint):
+    pool = ChainConnectionPool([endpoint.url], size=1, max_consecutive_timeouts=3,
+                               backoff_initial=0.01)
+    try:
+        hung = pool._pick()
+        endpoint.latency_seconds = 1.0
+        for _ in range(3):
+            with pytest.raises(TimeoutError):
+                pool.call('system_health', timeout=0.05)
+        assert not hung.healthy
+        assert pool.stats['disconnects'] == 1
+
+        endpoint.latency_seconds = 0.0
+        assert wait_for(lambda: pool.healthy_connections() == 1)
+        assert pool._pick() is not hung
+        assert pool.call('system_health', timeout=2.0) is not None
+        assert endpoint.handshakes == 2
+    finally:
+        pool.close()
+
+
+def test_busy_connection_is_still_health_checked(endpoint):
+    pool = ChainConnectionPool([endpoint.url], size=1, health_check_interval=0.2,
+                               connect_timeout=0.1, max_consecutive_timeouts=100,
+                               backoff_initial=0.01)
+    try:
+        hung = pool._pick()
+        endpoint.latency_seconds = 5.0
+        stuck = hung.request('system_health')
+        assert hung.in_flight == 1
+
+        # The node answers nothing, so the ping fails even though a request waits
+        assert wait_for(lambda: not hung.healthy)
+        assert pool.stats['health_checks'] >= 1
+        with pytest.raises(ConnectionError):
+            stuck.result(1.0)
+    finally:
+        pool.close()
+
+
+def test_incomplete_backend_fails_at_construction(endpoint):
+    class BlockOnly(ChainBackend):
+        def get_block_number(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        BlockOnly()
+    assert isinstance(LocalChainBackend(), ChainBackend)
+    pool = ChainConnectionPool([endpoint.url], size=1)
+    try:
+        assert RPCChainBackend(pool).get_block_number() >= 0
+    finally:
+        pool.close()
+
+
+def test_pooled_backend_refuses_an_endpoint_without_the_miner_methods(endpoint):
+    pool = ChainConnectionPool([endpoint.url], size=1)
+    try:
+        RPCChainBackend(pool).check_endpoint()
+        endpoint._handle = lambda request: {'jsonrpc': '2.0', 'id': request.get('id'),
+                                            'result': {'methods': ['chain_getHeader', 'system_health']}}
+        with pytest.raises(RuntimeError, match='neuron_getMetagraph'):
+            RPCChainBackend(pool).check_endpoint()
+    finally:
+        pool.close()
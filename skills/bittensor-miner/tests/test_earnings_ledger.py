@@ -0,0 +1,102 @@
+"""TAO earnings ledger: incremental sync, restarts and day windows"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+from utils.chain_backend import LocalChainBackend
+from utils.earnings_ledger import EarningsLedger
+
+HOTKEY = 'hotkey-1'
+NOW = datetime(2026, 3, 20, 12, 0)
+
+
+def at(days_ago, hours=0):
+    return (NOW - timedelta(days=days_ago, hours=hours)).replace(tzinfo=timezone.utc).timestamp()
+
+
+def pay(backend, amount, days_ago=0, netuid=1):
+    backend.credit(HOTKEY, amount, netuid=netuid, ts=at(days_ago))
+    backend.advance()
+
+
+class FlakyBackend(LocalChainBackend):
+    """Returns a malformed event in one block range"""
+
+    def __init__(self, bad_block):
+        super().__init__()
+        self.bad_block = bad_block
+
+    def get_earning_events(self, addresses, from_block, to_block):
+        events = super().get_earning_events(addresses, from_block, to_block)
+        if from_block <= self.bad_block <= to_block:
+            events.append({'block': self.bad_block, 'ts': at(0), 'kind': 'emission',
+                           'address': HOTKEY, 'amount': None, 'netuid': 1})
+        return events
+
+
+def test_incremental_sync_and_restart(workdir):
+    backend = LocalChainBackend()
+    ledger = EarningsLedger(backend, [HOTKEY], max_blocks_per_fetch=5)
+    pay(backend, 1.0)
+    pay(backend, 2.0)
+    assert ledger.sync() == 2
+    assert ledger.tao_earned(1, NOW) == 3.0
+
+    # Only blocks after the cursor are asked for: none yet, so no fetch
+    fetches = backend.calls['get_earning_events']
+    assert ledger.sync() == 0
+    assert backend.calls['get_earning_events'] == fetches
+    pay(backend, 0.5, netuid=2)
+    assert ledger.sync() == 1
+    assert backend.calls['get_earning_events'] == fetches + 1
+    assert ledger.totals(1, 0, NOW)['by_subnet'] == {'1': 3.0, '2': 0.5}
+
+    # A restarted ledger resumes from the saved cursor: nothing counted twice
+    restarted = EarningsLedger(backend, [HOTKEY], max_blocks_per_fetch=5)
+    assert restarted.last_block == ledger.last_block
+    pay(backend, 4.0)
+    assert restarted.sync() == 1
+    assert restarted.tao_earned(1, NOW) == 7.5
+
+    # Reporting processes read the file without a chain
+    assert EarningsLedger().tao_earned(1, NOW) == 7.5
+
+
+def test_failed_page_leaves_no_partial_rollup(workdir):
+    backend = FlakyBackend(bad_block=8)
+    ledger = EarningsLedger(backend, [HOTKEY], max_blocks_per_fetch=5)
+    for _ in range(10):
+        pay(backend, 1.0)
+
+    ledger.sync()
+    # Blocks 0-4 applied; the page holding the bad event (5-9) left no trace
+    assert ledger.last_block == 4 and ledger.stats['errors'] == 1
+    saved = json.loads((workdir / 'state' / 'earnings-ledger.json').read_text())
+    assert saved['last_block'] == 4
+    assert saved['days'][NOW.date().isoformat()]['events'] == 4
+
+    backend.bad_block = -1
+    assert ledger.sync() == 6
+    assert ledger.tao_earned(1, NOW) == 10.0
+
+
+def test_week_over_week_windows(workdir):
+    backend = LocalChainBackend()
+    ledger = EarningsLedger(backend, [HOTKEY])
+    pay(backend, 1.0, days_ago=0)
+    pay(backend, 2.0, days_ago=6)    # Last day of this week's window
+    pay(backend, 4.0, days_ago=7)    # First day of the previous week
+    pay(backend, 8.0, days_ago=13)
+    pay(backend, 16.0, days_ago=14)  # Outside both
+    backend.credit('someone-else', 32.0, netuid=1, ts=at(0))
+    backend.advance()
+    ledger.sync()
+
+    this_week = ledger.totals(7, 0, NOW)
+    last_week = ledger.totals(14, 7, NOW)
+    assert this_week['tao_earned'] == 3.0 and this_week['period_days'] == 7
+    assert last_week['tao_earned'] == 12.0 and last_week['events'] == 2
+
+    rows = ledger.daily(8, now=NOW)
+    assert [row['day'] for row in rows][0] == (NOW - timedelta(days=7)).date().isoformat()
+    assert [row['tao_earned'] for row in rows] == [4.0, 2.0, 0, 0, 0, 0, 0, 1.0]
@@ -0,0 +1,89 @@
+"""Stake-weighted queue: concurrency, fairness and shutdown"""
+
+import threading
+import time
+
+from utils.bulkhead import SubnetBulkhead
+from utils.fair_queue import StakeWeightedQueue
+
+STAKES = {'heavy': 300.0, 'light': 100.0}
+
+
+def test_service_follows_stake():
+    queue = StakeWeightedQueue(max_size=400, max_per_caller=200, weight_of=STAKES.get, quantum=3.0)
+    for i in range(200):
+        for caller in STAKES:
+            assert queue.put({'id': f"{caller}-{i}", 'caller': caller})[0]
+    served = [queue.get(timeout=0)['caller'] for _ in range(200)]
+    assert served.count('heavy') == 150
+    assert queue.qsize() == 200
+
+
+def test_concurrent_producers_and_consumers_lose_nothing():
+    queue = StakeWeightedQueue(max_size=64, max_per_caller=64, weight_of=STAKES.get)
+    accepted, evicted, served = [], [], []
+    lock = threading.Lock()
+
+    def produce(caller, producer):
+        for i in range(500):
+            ok, victim = queue.put({'id': f"{caller}-{producer}-{i}", 'caller': caller})
+            with lock:
+                if ok:
+                    accepted.append(1)
+                if victim is not None:
+                    evicted.append(victim)
+
+    def consume():
+        while True:
+            task = queue.get(timeout=1.0)
+            if task is None:
+                return
+            with lock:
+                served.append(task)
+
+    consumers = [threading.Thread(target=consume) for _ in range(4)]
+    producers = [threading.Thread(target=produce, args=(caller, n)) for caller in STAKES for n in range(2)]
+    for thread in consumers + producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+    while queue.qsize():
+        time.sleep(0.01)
+    queue.close()
+    for thread in consumers:
+        thread.join()
+
+    assert len(accepted) == len(served) + len(evicted)
+    assert len({task['id'] for task in served}) == len(served)
+
+
+def test_stop_declines_waiting_tasks():
+    results = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def handler(task):
+        started.set()
+        release.wait(5)
+        return {'task_id': task['id']}
+
+    bulkhead = SubnetBulkhead(1, handler, max_concurrent=1, queue_size=10,
+                              on_result=lambda task, result: results.append((task, result)))
+    bulkhead.start()
+    for i in range(4):
+        assert bulkhead.submit({'id': i, 'caller': 'v'})
+    assert started.wait(5)
+
+    stopper = threading.Thread(target=bulkhead.stop)
+    stopper.start()
+    time.sleep(0.1)
+    assert not bulkhead.submit({'id': 99, 'caller': 'v'})  # Closed to new work
+    release.set()
+    stopper.join()
+
+    assert [task['id'] for task, result in results if result] == [0]
+    declined = [task for task, result in results if result is None]
+    assert [task['id'] for task in declined] == [1, 2, 3]
+    assert all(task['reject_status'] == 503 for task in declined)
+    assert bulkhead.stats['declined_on_stop'] == 3
+    assert bulkhead.queued() == 0
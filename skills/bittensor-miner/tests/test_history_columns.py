@@ -0,0 +1,90 @@
+"""Columnar history: day partitions, re-sorting and retention"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils.history_store import HistoryStore
+
+np = pytest.importorskip('numpy')
+
+from utils.history_columns import HistoryColumns  # noqa: E402
+
+TODAY = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+YESTERDAY = TODAY - timedelta(days=1)
+
+
+def record(when, minutes, score=0.8):
+    return {'timestamp': (when + timedelta(minutes=minutes)).isoformat(), 'task_id': f"t{minutes}",
+            'validator_score': score, 'llm': 'gpt', 'strategy': 's', 'subnet_id': 1, 'task_type': 'generation'}
+
+
+def ts(when, minutes=0):
+    return (when + timedelta(minutes=minutes)).replace(tzinfo=timezone.utc).timestamp()
+
+
+def test_out_of_order_batches_are_resorted(workdir):
+    store = HistoryStore()
+    columns = HistoryColumns(store)
+    store.append_many([record(TODAY, m) for m in (5, 6, 7)])
+    store.sync()
+    assert columns.sync() == 3
+
+    # A late batch, partly before what is already stored, and a row from yesterday
+    store.append_many([record(TODAY, m) for m in (8, 1, 9)] + [record(YESTERDAY, 30)])
+    store.sync()
+    assert columns.sync() == 4
+
+    day = TODAY.strftime('%Y-%m-%d')
+    assert sorted(columns.days) == [YESTERDAY.strftime('%Y-%m-%d'), day]
+    assert columns.days[day] == {'count': 6, 'sorted': True}
+    everything = columns.window(0.0)['timestamp']
+    assert list(everything) == sorted(everything) and len(everything) == 7
+
+    window = columns.window(ts(TODAY, 5), ts(TODAY, 9), ('timestamp', 'score'))
+    assert list(window['timestamp']) == [ts(TODAY, m) for m in (5, 6, 7, 8)]
+    assert np.allclose(window['score'], 0.8)
+
+    # Reopening keeps the sorted rows and the cursor
+    reopened = HistoryColumns(store)
+    assert reopened.count == 7 and reopened.sync() == 0
+    assert list(reopened.window(0.0)['timestamp']) == list(everything)
+
+
+def test_retention_follows_the_store(workdir):
+    store = HistoryStore(retention_days=3)
+    columns = HistoryColumns(store)
+    old = TODAY - timedelta(days=10)
+    recent = TODAY - timedelta(days=2)
+    columns.append_records([record(old, 0), record(recent, 0), record(TODAY, 0)])
+
+    assert sorted(columns.days) == [recent.strftime('%Y-%m-%d'), TODAY.strftime('%Y-%m-%d')]
+    assert not (workdir / 'state' / 'history-columns' / old.strftime('%Y-%m-%d')).exists()
+
+    # Once the store keeps less, the columns follow at the next sync
+    store.retention_days = 1
+    columns.sync()
+    assert list(columns.days) == [TODAY.strftime('%Y-%m-%d')]
+    assert not (workdir / 'state' / 'history-columns' / recent.strftime('%Y-%m-%d')).exists()
+
+
+def test_interrupted_compaction_is_finished_on_load(workdir):
+    store = HistoryStore()
+    columns = HistoryColumns(store)
+    columns.append_records([record(TODAY, m) for m in (3, 1, 2)])
+    day = TODAY.strftime('%Y-%m-%d')
+    directory = workdir / 'state' / 'history-columns'
+
+    # Crash after the old day was moved aside, before the sorted copy was moved in
+    (directory / day).rename(directory / f"{day}.old")
+    sorted_dir = directory / f"{day}.tmp"
+    sorted_dir.mkdir()
+    for name, dtype in HistoryColumns.COLUMNS.items():
+        values = np.fromfile(directory / f"{day}.old" / f"{name}.bin", dtype=dtype)
+        values.tofile(sorted_dir / f"{name}.bin")
+
+    reopened = HistoryColumns(store)
+    assert list(reopened.window(0.0)['timestamp']) == [ts(TODAY, m) for m in (1, 2, 3)]
+    assert sorted(p.name for p in directory.iterdir()) == [day, 'meta.json']
+    assert json.loads((directory / 'meta.json').read_text())['days'][day]['count'] == 3
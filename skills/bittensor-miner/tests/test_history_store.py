@@ -0,0 +1,54 @@
+"""Daily history segments: sparse block index and task_id lookups"""
+
+from datetime import datetime, timedelta
+
+from utils.history_store import HistoryStore
+
+DAY = datetime(2026, 3, 10)
+
+
+def at(minutes):
+    return (DAY + timedelta(minutes=minutes)).isoformat()
+
+
+def test_range_with_out_of_order_timestamps(workdir):
+    store = HistoryStore(index_block_size=4)
+    # Interleaved batches from two writers: timestamps are not sorted
+    minutes = [0, 1, 2, 10, 3, 4, 11, 12, 5, 30, 31, 6, 32, 33, 34, 35]
+    store._append_to_segment('2026-03-10', [{'timestamp': at(m), 'task_id': f"t{m}"} for m in minutes])
+
+    found = [r['task_id'] for r in store.range(DAY + timedelta(minutes=4), DAY + timedelta(minutes=11))]
+    assert found == ['t10', 't4', 't5', 't6']
+
+    index = store._get_index('2026-03-10')
+    assert len(index.blocks) == 4 and index.count == 16
+    assert index.block_spans(at(32), at(40)) == [(index.blocks[3][0], index.end)]  # Only the last block
+    assert index.block_spans(at(36), at(50)) == []
+
+
+def test_last_n_across_segments(workdir):
+    store = HistoryStore(index_block_size=3)
+    store._append_to_segment('2026-03-09', [{'timestamp': at(-60), 'task_id': 'old'}])
+    store._append_to_segment('2026-03-10', [{'timestamp': at(m), 'task_id': f"t{m}"} for m in range(7)])
+    assert [r['task_id'] for r in store.last_n(5)] == ['t2', 't3', 't4', 't5', 't6']
+    assert [r['task_id'] for r in store.last_n(9)][0] == 'old'
+
+
+def test_task_lookups_stay_in_the_window(workdir):
+    store = HistoryStore(task_lookup_days=2)
+    today = datetime.utcnow()
+    old_day = (today - timedelta(days=5)).strftime('%Y-%m-%d')
+    store._append_to_segment(old_day, [{'timestamp': at(0), 'task_id': 'old-task'}])
+    store.append_many([{'task_id': 'new-task', 'event': 'task'},
+                       {'task_id': 'new-task', 'event': 'score'}])
+
+    assert [r['event'] for r in store.find('new-task')] == ['task', 'score']
+    assert store.get('new-task')['event'] == 'score'
+    assert store.find('missing') == []
+    assert store.find('old-task') == []
+    assert old_day not in store._indexes  # Never loaded for a hot-path lookup
+    assert store.find('old-task', all_segments=True)[0]['task_id'] == 'old-task'
+
+    list(store.range(today - timedelta(days=6)))  # Loads the old segment's block index only
+    assert store._indexes[old_day].task_ids is None
+    store.close()
@@ -0,0 +1,146 @@
+"""History writer: group commit, listeners, and retries with backoff"""
+
+import time
+
+import pytest
+
+from utils.history_store import HistoryStore
+from utils.history_writer import HistoryWriter
+
+
+class RecordingStore(HistoryStore):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def append_many(self, records, fsync=True):
+        self.batches.append(len(records))
+        return super().append_many(records, fsync=fsync)
+
+
+class FailingStore(HistoryStore):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+        self.attempts = []
+
+    def append_many(self, records, fsync=True):
+        self.attempts.append(time.monotonic())
+        if len(self.attempts) <= self.failures:
+            raise OSError('disk full')
+        return super().append_many(records, fsync=fsync)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_full_batch_is_one_write(workdir):
+    store = RecordingStore()
+    writer = HistoryWriter(store, batch_size=4, linger_seconds=10.0)
+    for i in range(4):
+        writer.submit({'task_id': f"t{i}", 'subnet_id': 1})
+    # A full batch goes out without waiting for the linger time
+    assert wait_for(lambda: store.batches == [4])
+
+    writer.submit({'task_id': 't4', 'subnet_id': 1})
+    time.sleep(0.05)
+    assert writer.pending() == 1 and store.batches == [4]
+    # Readers flush for read-your-writes
+    assert writer.flush() == 1
+    assert store.get('t4')['subnet_id'] == 1 and store.batches == [4, 1]
+    writer.close()
+
+
+def test_partial_batch_waits_for_linger(workdir):
+    store = RecordingStore()
+    writer = HistoryWriter(store, batch_size=64, linger_seconds=0.1)
+    writer.submit({'task_id': 't1'})
+    writer.submit({'task_id': 't2'})
+    assert store.batches == []
+    assert wait_for(lambda: store.batches == [2])
+    writer.close()
+
+
+def test_full_queue_flushes_in_the_caller(workdir):
+    store = RecordingStore()
+    writer = HistoryWriter(store, batch_size=64, linger_seconds=10.0, max_queue=3)
+    writer.submit({'task_id': 't1'})
+    writer.submit({'task_id': 't2'})
+    writer.submit({'task_id': 't3'})
+    assert writer.pending() == 0 and store.batches == [3]
+    writer.close()
+
+
+def test_listeners_see_normalized_records_and_positions(workdir):
+    store = HistoryStore()
+    writer = HistoryWriter(store, linger_seconds=10.0, fsync='never')
+    seen = []
+    writer.add_listener(lambda record, position: seen.append((record, position)))
+    writer.add_listener(lambda record, position: 1 / 0)  # A failing listener doesn't stop the others
+
+    submitted = writer.submit({'task_id': 't1', 'llm_used': 'gemini-pro', 'tokens_spent': 120,
+                               'classification': {'task_type': 'qa'}})
+    writer.submit({'task_id': 't1', 'validator_score': 0.9}, event='score')
+    assert writer.flush() == 2
+
+    assert [record['event'] for record, _ in seen] == ['task', 'score']
+    record, (day, start, end) = seen[0]
+    assert record is submitted
+    assert (record['llm'], record['tokens'], record['task_type']) == ('gemini-pro', 120, 'qa')
+    assert record['validator_score'] is None and record['timestamp']
+    assert store._read_at(day, start)['task_id'] == 't1' and seen[1][1][1] == end
+    writer.close()
+
+
+def test_shared_writer_per_directory(workdir):
+    first = HistoryWriter.shared({'history_dir': str(workdir / 'a')})
+    try:
+        assert HistoryWriter.shared({'history_dir': str(workdir / 'a')}) is first
+        other = HistoryWriter.shared({'history_dir': str(workdir / 'b')})
+        assert other is not first
+    finally:
+        for directory in ('a', 'b'):
+            writer = HistoryWriter._shared.pop(str(workdir / directory), None)
+            if writer:
+                writer.close()
+
+    with pytest.raises(ValueError):
+        HistoryWriter(HistoryStore(), fsync='sometimes')
+
+
+def test_failed_writes_back_off_then_succeed(workdir):
+    store = FailingStore(failures=2)
+    writer = HistoryWriter(store, linger_seconds=0.0, retry_backoff_seconds=0.1)
+    writer.submit({'task_id': 't1', 'subnet_id': 1})
+    deadline = time.monotonic() + 5
+    while len(store.attempts) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+
+    assert len(store.attempts) == 3
+    assert writer.pending() == 0
+    gaps = [b - a for a, b in zip(store.attempts, store.attempts[1:])]
+    assert gaps[0] >= 0.1 and gaps[1] >= 0.2
+    assert writer.stats == {'write_errors': 2, 'dropped': 0}
+
+
+def test_records_are_dropped_after_max_retries(workdir):
+    store = FailingStore(failures=100)
+    writer = HistoryWriter(store, linger_seconds=0.0, max_write_retries=2,
+                           retry_backoff_seconds=0.01)
+    writer.submit({'task_id': 't1', 'subnet_id': 1})
+    writer.submit({'task_id': 't2', 'subnet_id': 1})
+    deadline = time.monotonic() + 5
+    while writer.stats['dropped'] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    attempts = len(store.attempts)
+    time.sleep(0.1)
+
+    assert writer.pending() == 0
+    assert attempts == 3 and len(store.attempts) == 3  # No spinning once dropped
+    assert writer.stats == {'write_errors': 3, 'dropped': 2}
+    writer.close()
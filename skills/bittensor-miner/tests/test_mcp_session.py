@@ -0,0 +1,48 @@
+"""MCP session timeouts and restarts of a hung wallet process"""
+
+import sys
+import time
+
+import pytest
+
+from conftest import SRC_DIR
+from utils.mcp_session import MCPSupervisor
+
+COMMAND = [sys.executable, str(SRC_DIR / 'utils' / 'fake_wallet_mcp.py')]
+
+
+@pytest.fixture
+def supervisor():
+    supervisor = MCPSupervisor(COMMAND, backoff_initial=0.05, max_consecutive_timeouts=3)
+    supervisor.start()
+    assert supervisor.wait_ready(10)
+    yield supervisor
+    supervisor.stop()
+
+
+def test_timed_out_calls_are_forgotten(supervisor):
+    session = supervisor.session
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            supervisor.call_tool('hang', timeout=0.1)
+    assert session.in_flight == 0
+    assert supervisor.call_tool('get_balance') == 0.05
+    assert session.timeouts == 0
+    assert supervisor.session is session
+
+
+def test_hung_process_is_restarted(supervisor):
+    hung = supervisor.session
+    for _ in range(3):
+        with pytest.raises(TimeoutError):
+            supervisor.call_tool('hang', timeout=0.1)
+    assert not hung.alive
+    assert hung.process.poll() is not None
+
+    deadline = time.monotonic() + 10
+    while not (supervisor.alive and supervisor.session is not hung) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert supervisor.session is not hung
+    assert supervisor.call_tool('get_balance') == 0.05
+    assert supervisor.stats['restarts'] == 1
+    assert supervisor.stats['timeouts'] == 3
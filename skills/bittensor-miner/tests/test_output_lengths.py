@@ -0,0 +1,65 @@
+"""Learned max_tokens caps ignore responses cut short by pacing or budget"""
+
+import json
+from datetime import datetime, timedelta
+
+from utils.history_store import HistoryStore
+from utils.history_writer import HistoryWriter
+from utils.output_lengths import OutputLengthModel, length_key
+
+
+def record(output_tokens, **flags):
+    return dict({'event': 'task', 'timestamp': datetime.utcnow().isoformat(), 'subnet_id': 1,
+                 'task_type': 'generation', 'strategy': 'concise_generation',
+                 'output_tokens': output_tokens, 'truncated': False}, **flags)
+
+
+def test_clipped_responses_do_not_shrink_the_cap(workdir):
+    model = OutputLengthModel(HistoryStore(), min_samples=10)
+    for _ in range(20):
+        assert model.add_record(record(600))
+    for _ in range(20):
+        assert not model.add_record(record(100, clipped=True))
+    cap = model.cap(1, 'generation', 'concise_generation', 1000)
+    assert cap >= 600 * model.headroom
+
+
+def learn_through_writer(workdir, model, store, records):
+    writer = HistoryWriter(store, linger_seconds=0.0)
+    writer.add_listener(model.note_append)
+    for rec in records:
+        writer.submit(rec)
+    writer.flush()
+    return writer
+
+
+def test_learns_from_an_empty_store(workdir):
+    store = HistoryStore()
+    model = OutputLengthModel(store, min_samples=10)
+    assert model.refresh() == 0 and model.cursor is None
+
+    writer = learn_through_writer(workdir, model, store, [record(400) for _ in range(20)])
+    assert model.stats()[length_key(1, 'generation', 'concise_generation')]['samples'] == 20
+    assert model.cap(1, 'generation', 'concise_generation', 1000) < 1000
+    writer.close()
+
+
+def test_keeps_learning_across_a_day_boundary(workdir):
+    store = HistoryStore()
+    yesterday = (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d')
+    store._segment_path(yesterday).write_text(
+        ''.join(json.dumps(record(300)) + '\n' for _ in range(5)))
+    model = OutputLengthModel(store, min_samples=10)
+    model.refresh()
+    assert model.cursor[0] == yesterday
+
+    # Today's appends start at offset 0 of a new segment
+    writer = learn_through_writer(workdir, model, store, [record(300) for _ in range(10)])
+    key = length_key(1, 'generation', 'concise_generation')
+    assert model.stats()[key]['samples'] == 15
+    assert model.cursor[0] == datetime.utcnow().strftime('%Y-%m-%d')
+
+    writer.submit(record(300))
+    writer.flush()
+    assert model.stats()[key]['samples'] == 16  # Caught up: no double counting
+    writer.close()
@@ -0,0 +1,98 @@
+"""Hourly performance rollups kept current from the history writer"""
+
+import json
+from datetime import datetime, timedelta
+
+from utils.history_store import HistoryStore
+from utils.history_writer import HistoryWriter
+from utils.performance_aggregates import PerformanceAggregates
+
+
+def scored(score, when=None, **fields):
+    when = when or datetime.utcnow()
+    return dict({'event': 'score', 'timestamp': when.isoformat(), 'task_id': None,
+                 'llm': 'gemini-pro', 'strategy': 'concise_generation', 'subnet_id': 1,
+                 'tokens': 100, 'validator_score': score}, **fields)
+
+
+def test_writer_appends_are_counted_across_a_day_boundary(workdir):
+    store = HistoryStore()
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    store._segment_path(yesterday.strftime('%Y-%m-%d')).write_text(
+        ''.join(json.dumps(scored(0.8, yesterday)) + '\n' for _ in range(3)))
+    aggregates = PerformanceAggregates(store)
+    assert aggregates.refresh() == 3
+
+    writer = HistoryWriter(store, linger_seconds=0.0)
+    writer.add_listener(aggregates.note_append)
+    for _ in range(4):
+        writer.submit(scored(0.6))
+    writer.flush()
+    writer.submit(scored(0.6))
+    writer.close()
+
+    assert aggregates.summarize(days=7)['tasks_completed'] == 8
+    assert aggregates.refresh() == 0
+
+
+def test_writer_appends_are_counted_from_an_empty_store(workdir):
+    store = HistoryStore()
+    aggregates = PerformanceAggregates(store)
+    writer = HistoryWriter(store, linger_seconds=0.0)
+    writer.add_listener(aggregates.note_append)
+    writer.submit(scored(0.9))
+    writer.close()
+    assert aggregates.summarize(days=1)['tasks_completed'] == 1
+
+
+def test_windows_and_breakdowns_from_hourly_buckets(workdir):
+    store = HistoryStore()
+    now = datetime.utcnow()
+    store.append_many([
+        scored(1.0, now - timedelta(hours=1)),
+        scored(0.4, now - timedelta(hours=5), llm='claude-sonnet', tokens=300),
+        scored(0.8, now - timedelta(days=3)),
+        scored(0.2, now - timedelta(days=9), subnet_id=19),
+        scored(0.9, now - timedelta(days=20)),                # Outside every window
+        scored(0.9, now - timedelta(hours=2), status='unmatched'),
+        {'event': 'task', 'timestamp': now.isoformat(), 'task_id': 't', 'llm': 'gemini-pro',
+         'tokens': 50, 'latency_ms': 120.0},                  # Not scored yet
+    ])
+    store.sync()
+    aggregates = PerformanceAggregates(store)
+    assert aggregates.refresh() == 5
+
+    windows = aggregates.summarize_windows(
+        {'24h': (1, 0), '7day': (7, 0), 'previous_7day': (14, 7)}, now)
+    day, week, previous = windows['24h'], windows['7day'], windows['previous_7day']
+
+    assert day['tasks_completed'] == 2 and day['average_score'] == 0.7 and day['success_rate'] == 0.5
+    assert day['by_llm'] == {
+        'gemini-pro': {'tasks': 1, 'avg_score': 1.0, 'success_rate': 1.0, 'tokens_spent': 100},
+        'claude-sonnet': {'tasks': 1, 'avg_score': 0.4, 'success_rate': 0.0, 'tokens_spent': 300},
+    }
+    assert week['tasks_completed'] == 3 and week['total_tokens_spent'] == 500
+    assert previous['tasks_completed'] == 1 and previous['period_days'] == 7
+    assert previous['by_subnet'] == {'19': {'tasks': 1, 'avg_score': 0.2, 'success_rate': 0.0,
+                                            'tokens_spent': 100}}
+    assert aggregates.summarize(7, now) == dict(week)
+
+
+def test_checkpoint_resumes_and_prunes(workdir):
+    store = HistoryStore()
+    now = datetime.utcnow()
+    store.append_many([scored(0.7, now), scored(0.9, now - timedelta(days=40))])
+    store.sync()
+    aggregates = PerformanceAggregates(store, retention_days=30)
+    aggregates.refresh()
+    # The 40-day-old bucket is past retention
+    assert sorted(aggregates.hours) == [now.strftime('%Y-%m-%dT%H')]
+
+    # A new process loads the checkpoint and counts only what came after it
+    reloaded = PerformanceAggregates(store, retention_days=30)
+    assert reloaded.cursor == aggregates.cursor
+    assert reloaded.refresh() == 0
+    store.append_many([scored(0.5, now)])
+    store.sync()
+    assert reloaded.refresh() == 1
+    assert reloaded.summarize(1, now)['tasks_completed'] == 2
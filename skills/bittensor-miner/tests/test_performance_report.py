@@ -0,0 +1,82 @@
+"""Multi-window performance reports: windows, comparisons and TAO per token"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils.chain_backend import LocalChainBackend
+from utils.earnings_ledger import EarningsLedger
+from utils.history_store import HistoryStore
+from utils.performance_aggregates import PerformanceAggregates
+from utils.performance_report import ReportEngine
+
+HOTKEY = 'hotkey-1'
+
+
+def scored(score, when, llm='gemini-pro'):
+    return {'event': 'score', 'timestamp': when.isoformat(), 'task_id': None, 'llm': llm,
+            'strategy': 'concise_generation', 'subnet_id': 1, 'tokens': 100, 'validator_score': score}
+
+
+@pytest.fixture
+def aggregates(workdir):
+    now = datetime.utcnow()
+    store = HistoryStore()
+    store.append_many(
+        [scored(0.8, now - timedelta(hours=1)) for _ in range(12)]
+        + [scored(0.9, now - timedelta(hours=2), llm='claude-sonnet') for _ in range(3)]
+        + [scored(0.2, now - timedelta(days=3))]
+        + [scored(0.5, now - timedelta(days=10)) for _ in range(2)]
+        + [scored(0.5, now - timedelta(days=20))]
+    )
+    store.sync()
+    aggregates = PerformanceAggregates(store)
+    aggregates.refresh()
+    return aggregates
+
+
+def test_windows_comparison_and_best_groups(aggregates):
+    now = datetime.utcnow()
+    report = ReportEngine(aggregates, min_tasks_for_best=10).build(now)
+
+    assert [report[name]['tasks_completed'] for name in
+            ('performance_24h', 'performance_7day', 'performance_30day')] == [15, 16, 19]
+    day = report['performance_24h']
+    assert day['average_score'] == pytest.approx((12 * 0.8 + 3 * 0.9) / 15)
+    assert day['token_spend'] == 1500
+    # claude-sonnet scores higher but has too few tasks to be named
+    assert day['best_llm'] == 'gemini-pro' and day['best_strategy'] == 'concise_generation'
+    assert ReportEngine(aggregates, min_tasks_for_best=100).build(now)['performance_24h']['best_llm'] is None
+
+    scores = day['percentiles']['score']['total']
+    assert scores['count'] == 15 and scores['p50'] == pytest.approx(0.8, abs=0.0025)
+
+    tasks = report['week_over_week']['tasks_completed']
+    assert tasks == {'current': 16, 'previous': 2, 'change': 14, 'change_pct': 700.0}
+    assert report['by_llm'] == report['performance_7day']['by_llm']
+    assert report['last_updated'] == now.isoformat()
+
+    # No earnings ledger: TAO fields are unknown, not zero
+    assert day['tao_earned'] is None and day['tao_per_1k_tokens'] is None
+
+
+def test_tao_per_token_from_earnings_ledger(aggregates):
+    now = datetime.utcnow()
+    backend = LocalChainBackend()
+    for amount, when in ((2.0, now), (1.0, now - timedelta(days=10))):
+        backend.credit(HOTKEY, amount, netuid=1, ts=when.replace(tzinfo=timezone.utc).timestamp())
+        backend.advance()
+    ledger = EarningsLedger(backend, [HOTKEY])
+
+    # Not synced yet: same as having no ledger
+    assert ReportEngine(aggregates, earnings=ledger).build(now)['performance_7day']['tao_earned'] is None
+    ledger.sync()
+    report = ReportEngine(aggregates, earnings=ledger).build(now)
+
+    week = report['performance_7day']
+    assert week['tao_earned'] == 2.0 and week['tao_per_1k_tokens'] == pytest.approx(2.0 / 1.6)
+    assert week['by_subnet']['1']['tao_earned'] == 2.0
+    assert week['by_subnet']['1']['tao_per_1k_tokens'] == pytest.approx(2.0 / 1.6)
+
+    roi = report['week_over_week']['tao_per_1k_tokens']
+    assert roi['previous'] == pytest.approx(1.0 / 0.2) and roi['change'] < 0
@@ -0,0 +1,82 @@
+"""A/B promotion state overlaid on the subnet profiles, and live reloads"""
+
+import json
+import os
+import shutil
+
+from conftest import SRC_DIR
+from llm_router import LLMRouter
+from utils.ab_testing import ABTestManager, overlay_state
+
+PROFILES = SRC_DIR.parent / 'config' / 'subnet-profiles.json'
+
+
+def winner_result(winner, loser):
+    return {'status': 'winner', 'winner': winner, 'variants': {
+        winner: {'p_best': 0.99, 'samples': 500},
+        loser: {'p_best': 0.01, 'samples': 500},
+    }}
+
+
+def test_promotion_goes_to_state_overlay(workdir):
+    path = workdir / 'subnet-profiles.json'
+    shutil.copy(PROFILES, path)
+    original = path.read_text()
+    router = LLMRouter(str(path), reload_check_seconds=0.0)
+    manager = ABTestManager.from_profiles(str(path))
+    manager.promotion_step = 0.25
+
+    result = {'sn1_generation_strategy': winner_result('concise_generation', 'structured_reasoning')}
+    steps = manager.promote_winners(result)
+    assert steps and not steps[0]['final']
+    steps = manager.promote_winners(result)
+    assert steps[0]['final']
+
+    # The checked-in profiles are untouched; everything is in the state file
+    assert path.read_text() == original
+    state = json.loads((workdir / 'state' / 'ab-testing.json').read_text())
+    saved = state['experiments']['sn1_generation_strategy']
+    assert saved['enabled'] is False and saved['promoted']['variant'] == 'concise_generation'
+    assert state['subnets']['1'] == {'strategy_overrides': {'generation': 'concise_generation'}}
+
+    # The router sees the promotion; other subnet settings still come from the profiles
+    subnet = router.profiles['subnets']['1']
+    assert router.get_best_strategy('generation', 1) == 'concise_generation'
+    assert router.profiles['ab_testing']['experiments']['sn1_generation_strategy']['enabled'] is False
+    assert subnet['participation_rate'] == json.loads(original)['subnets']['1']['participation_rate']
+
+    # A restarted manager picks up where the last one stopped
+    assert ABTestManager.from_profiles(str(path)).experiments['sn1_generation_strategy']['enabled'] is False
+
+
+def test_redefined_experiment_drops_saved_split(workdir):
+    profiles = {'ab_testing': {'experiments': {'exp': {
+        'subnet_id': 1, 'dimension': 'llm', 'variants': {'a': 0.5, 'b': 0.5}}}},
+        'subnets': {'1': {'preferred_llm': 'a', 'strategy_overrides': {'ranking': 'x'}}}}
+    state = {'experiments': {'exp': {'variants': {'a': 0.9, 'b': 0.1}}},
+             'subnets': {'1': {'strategy_overrides': {'generation': 'y'}}, '7': {'preferred_llm': 'b'}}}
+
+    merged = overlay_state(profiles, state)
+    assert merged['ab_testing']['experiments']['exp']['variants'] == {'a': 0.9, 'b': 0.1}
+    assert merged['subnets'] == {'1': {'preferred_llm': 'a',
+                                       'strategy_overrides': {'ranking': 'x', 'generation': 'y'}}}
+    assert profiles['ab_testing']['experiments']['exp']['variants'] == {'a': 0.5, 'b': 0.5}
+
+    profiles['ab_testing']['experiments']['exp']['variants'] = {'a': 0.5, 'c': 0.5}
+    merged = overlay_state(profiles, state)
+    assert merged['ab_testing']['experiments']['exp']['variants'] == {'a': 0.5, 'c': 0.5}
+
+
+def test_router_reloads_changed_profiles(workdir):
+    path = workdir / 'subnet-profiles.json'
+    shutil.copy(PROFILES, path)
+    router = LLMRouter(str(path), reload_check_seconds=0.0)
+    assert router.get_best_strategy('generation', 1) == 'concise_generation'
+
+    profiles = json.loads(path.read_text())
+    profiles['subnets']['1']['strategy_overrides'] = {'generation': 'structured_reasoning'}
+    path.write_text(json.dumps(profiles))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert router.get_best_strategy('generation', 1) == 'structured_reasoning'
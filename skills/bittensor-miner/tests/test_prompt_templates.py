@@ -0,0 +1,61 @@
+"""Prompt compilation: input budgets, compression and truncation"""
+
+from utils.prompt_templates import PromptTemplateManager, estimate_tokens
+
+FILLER = [f"Background note {i} mentions the weather, the harbour and the old market square." for i in range(30)]
+QUESTION = "Which harbour ships arrive before the market opens?"
+CONTENT = ' '.join(FILLER[:15] + [QUESTION] + FILLER[15:])
+
+
+def test_compression_keeps_the_question_in_order():
+    manager = PromptTemplateManager()
+    compressed = manager.compress_content(CONTENT, 120)
+
+    assert estimate_tokens(compressed) <= 120
+    assert QUESTION in compressed
+    kept = [s for s in FILLER if s in compressed]
+    assert kept and len(kept) < len(FILLER)
+    # Kept sentences stay in their original order
+    assert [compressed.index(s) for s in kept] == sorted(compressed.index(s) for s in kept)
+
+
+def test_single_long_sentence_is_truncated_head_and_tail():
+    manager = PromptTemplateManager()
+    content = 'start ' + 'x' * 2000 + ' end'
+    truncated = manager.compress_content(content, 50)
+
+    assert estimate_tokens(truncated) <= 50
+    assert truncated.startswith('start ') and truncated.endswith(' end')
+    assert ' [...] ' in truncated
+    assert manager.compress_content(content, 0) == ''
+
+
+def test_prompt_fits_remaining_budget_after_output():
+    manager = PromptTemplateManager()
+    static = manager.get_compiled_template('concise_generation').static_tokens
+
+    # The input budget alone leaves the content untouched
+    prompt = manager.compile_prompt('concise_generation', CONTENT, 2000)
+    assert CONTENT in prompt
+
+    # Only 300 tokens left and 200 of them allocated to the output
+    prompt = manager.compile_prompt('concise_generation', CONTENT, 2000,
+                                    remaining_budget=300, max_output_tokens=200)
+    assert CONTENT not in prompt and FILLER[0] in prompt
+    assert estimate_tokens(prompt) <= 100 + 1  # Template and content estimates round separately
+    assert estimate_tokens(prompt) > static
+
+    # Nothing left for the prompt: the content goes, the template stays
+    prompt = manager.compile_prompt('concise_generation', CONTENT, 2000,
+                                    remaining_budget=150, max_output_tokens=200)
+    assert estimate_tokens(prompt) <= static + 1
+
+
+def test_unknown_strategy_uses_raw_content():
+    manager = PromptTemplateManager()
+    assert manager.get_compiled_template('no_such_strategy') is None
+    assert manager.apply_template('no_such_strategy', 'just the task') == 'just the task'
+    assert manager.compile_prompt('no_such_strategy', 'just the task', 100) == 'just the task'
+
+    compressed = manager.compile_prompt('no_such_strategy', CONTENT, 80)
+    assert estimate_tokens(compressed) <= 80 and compressed.startswith(FILLER[0])
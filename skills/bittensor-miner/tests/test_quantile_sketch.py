@@ -0,0 +1,106 @@
+"""Quantile sketches: accuracy bounds, merging and serialization"""
+
+import random
+
+import pytest
+
+from utils.quantile_sketch import QuantileSketch
+
+
+def exact(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_log_mapping_within_relative_accuracy():
+    rng = random.Random(7)
+    latencies = [rng.lognormvariate(5, 1.5) for _ in range(5000)]
+    sketch = QuantileSketch('log', relative_accuracy=0.01)
+    for value in latencies:
+        sketch.add(value)
+
+    for q in (0.5, 0.9, 0.95, 0.99):
+        assert sketch.quantile(q) == pytest.approx(exact(latencies, q), rel=0.01)
+    assert sketch.quantile(0) == min(latencies) and sketch.quantile(1) == max(latencies)
+    assert sketch.mean == pytest.approx(sum(latencies) / len(latencies))
+    assert list(sketch.quantiles([0.5, 0.999])) == ['p50', 'p99.9']
+
+
+def test_linear_mapping_within_half_a_bin():
+    rng = random.Random(11)
+    scores = [rng.random() for _ in range(2000)]
+    sketch = QuantileSketch('linear', low=0.0, high=1.0, bins=100)
+    for value in scores:
+        sketch.add(value)
+
+    for q in (0.1, 0.5, 0.9):
+        assert abs(sketch.quantile(q) - exact(scores, q)) <= 0.005 + 1e-9
+    assert len(sketch.buckets) <= 100
+
+    # Out-of-range values land in the edge bins; min/max stay exact
+    sketch.add(1.5)
+    assert sketch.max == 1.5 and max(sketch.buckets) == 99
+
+
+def test_zeros_nans_and_empty():
+    sketch = QuantileSketch()
+    assert sketch.quantile(0.5) is None and sketch.mean is None
+    sketch.add(float('nan'))
+    assert sketch.count == 0
+
+    # Log mapping: zero and below have their own bucket
+    sketch.add(0.0)
+    sketch.add(10.0, count=3)
+    assert sketch.zero_count == 1 and sketch.quantile(0.2) == 0.0
+    assert sketch.quantile(0.5) == pytest.approx(10.0, rel=0.01)
+
+
+def test_collapse_keeps_the_upper_tail():
+    sketch = QuantileSketch(max_buckets=50)
+    values = [1.05 ** i for i in range(400)]
+    for value in values:
+        sketch.add(value)
+
+    assert len(sketch.buckets) <= 50
+    assert sketch.quantile(0.99) == pytest.approx(exact(values, 0.99), rel=0.01)
+
+
+def test_merge_matches_a_single_sketch():
+    rng = random.Random(3)
+    values = [rng.expovariate(0.01) for _ in range(3000)]
+    whole = QuantileSketch()
+    parts = [QuantileSketch() for _ in range(3)]
+    for i, value in enumerate(values):
+        whole.add(value)
+        parts[i % 3].add(value)
+
+    merged = parts[0].empty_copy()
+    assert merged.count == 0 and merged.params() == whole.params()
+    for part in parts:
+        merged.merge(part)
+    assert merged.buckets == whole.buckets and merged.count == whole.count
+    assert merged.quantiles([0.5, 0.95]) == whole.quantiles([0.5, 0.95])
+
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(relative_accuracy=0.02))
+    with pytest.raises(ValueError):
+        QuantileSketch('exponential')
+
+
+def test_round_trip_with_and_without_params():
+    sketch = QuantileSketch('linear', bins=20)
+    for value in (0.1, 0.4, 0.4, 0.95):
+        sketch.add(value)
+
+    restored = QuantileSketch.from_dict(sketch.to_dict())
+    assert restored.params() == sketch.params()
+    assert restored.quantiles([0.25, 0.5, 0.75]) == sketch.quantiles([0.25, 0.5, 0.75])
+
+    # Owners that store the parameters once pass them back in
+    bare = sketch.to_dict(include_params=False)
+    assert 'mapping' not in bare
+    restored = QuantileSketch.from_dict(bare, mapping='linear', bins=20)
+    assert restored.buckets == sketch.buckets and restored.max == 0.95
+
+    empty = QuantileSketch.from_dict(QuantileSketch().to_dict())
+    assert empty.quantile(0.5) is None and empty.to_dict()['min'] is None
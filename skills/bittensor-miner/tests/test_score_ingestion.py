@@ -0,0 +1,44 @@
+"""Late validator scores joined onto task records without flushing the writer"""
+
+from utils.history_store import HistoryStore
+from utils.history_writer import HistoryWriter
+from utils.score_ingestion import ScoreIngestor
+
+
+def task(task_id):
+    return {'event': 'task', 'task_id': task_id, 'subnet_id': 1, 'llm': 'gemini-pro',
+            'strategy': 'concise_generation', 'tokens': 120}
+
+
+def test_score_for_a_queued_task_waits_instead_of_flushing(workdir):
+    writer = HistoryWriter(HistoryStore(), linger_seconds=60.0)
+    ingestor = ScoreIngestor(writer)
+    flushes = []
+    flush = writer.flush
+    writer.flush = lambda *args, **kwargs: flushes.append(1) or flush(*args, **kwargs)
+
+    writer.submit(task('t1'))
+    assert ingestor.ingest('t1', 0.8) is None  # Still queued: buffered, no flush
+    assert flushes == [] and ingestor.pending_count() == 1
+
+    flush()
+    assert ingestor.pending_count() == 0
+    assert ingestor.stats['joined_late'] == 1
+    flush()
+    records = writer.store.find('t1')
+    assert [r['event'] for r in records] == ['task', 'score']
+    assert records[1]['llm'] == 'gemini-pro'
+    writer.close()
+
+
+def test_task_written_before_a_restart_is_found_in_the_index(workdir):
+    writer = HistoryWriter(HistoryStore(), linger_seconds=0.0)
+    writer.submit(task('t2'))
+    writer.close()
+
+    writer = HistoryWriter(HistoryStore(), linger_seconds=60.0)
+    ingestor = ScoreIngestor(writer)
+    joined = ingestor.ingest('t2', 0.4)
+    assert joined['strategy'] == 'concise_generation' and joined['validator_score'] == 0.4
+    assert ingestor.stats['joined'] == 1
+    writer.close()
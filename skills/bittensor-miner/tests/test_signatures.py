@@ -0,0 +1,63 @@
+"""Replay protection in the signature verifier"""
+
+import time
+
+import pytest
+
+from utils import signatures
+from utils.signatures import MockScheme, SignatureVerifier, body_hash, signed_message
+
+CALLER, AXON, DENDRITE = 'validator-1', 'miner-1', 'dendrite-a'
+BODY = b'{"prompt": "hi"}'
+
+
+@pytest.fixture
+def verifier():
+    verifier = SignatureVerifier(scheme='mock', batch_linger_ms=5.0)
+    yield verifier
+    verifier.close()
+
+
+def verify(verifier, nonce, dendrite=DENDRITE, signature=None):
+    if signature is None:
+        message = signed_message(nonce, CALLER, AXON, dendrite, body_hash(BODY))
+        signature = MockScheme.sign(CALLER, message)
+    return verifier.verify(CALLER, AXON, nonce, dendrite, signature, BODY)
+
+
+def test_replayed_and_older_nonces_are_refused(verifier):
+    first = time.time_ns()
+    assert verify(verifier, first).result(2)
+    assert not verify(verifier, first).result(2)       # Identical replay
+    assert not verify(verifier, first - 1).result(2)   # Older nonce
+    assert verify(verifier, first + 1).result(2)
+    assert verify(verifier, first - 1, dendrite='dendrite-b').result(2)
+    assert verifier.stats['replayed_nonces'] == 2
+
+
+def test_keypairs_are_decoded_once_per_hotkey(verifier):
+    signatures._keypairs.clear()
+    nonce = time.time_ns()
+    for i in range(20):
+        assert verify(verifier, nonce + i).result(2)
+    stats = verifier.snapshot()
+    assert stats['verified'] == 20
+    assert stats['keypair_hits'] == 19 and stats['keypair_hit_rate'] == 0.95
+
+
+def test_copies_verified_together_accept_once(verifier):
+    nonce = time.time_ns()
+    futures = [verify(verifier, nonce) for _ in range(4)]
+    assert sorted(future.result(2) for future in futures) == [False, False, False, True]
+
+
+def test_bad_signature_does_not_advance_nonce(verifier):
+    nonce = time.time_ns()
+    assert not verify(verifier, nonce + 10, signature=b'\0' * 32).result(2)
+    assert verify(verifier, nonce).result(2)
+
+
+def test_sr25519_without_keypair_fails_at_construction(monkeypatch):
+    monkeypatch.setattr(signatures, 'SR25519_AVAILABLE', False)
+    with pytest.raises(RuntimeError):
+        SignatureVerifier(scheme='sr25519')
@@ -0,0 +1,70 @@
+"""Virtual clock scoping and deterministic simulator runs"""
+
+import sys
+import time
+from datetime import datetime
+
+from simulator import DEFAULT_SCENARIO, Simulator, load_scenario
+from utils.virtual_clock import VirtualClock
+
+START = 978307200.0  # 2001-01-01T00:00:00Z
+
+MODULE = '''
+import time
+from time import monotonic
+from datetime import datetime
+
+
+def readings():
+    return time.time(), monotonic(), datetime.utcnow()
+'''
+
+
+def test_install_patches_only_the_source_tree(workdir, monkeypatch):
+    src = workdir / 'src'
+    src.mkdir()
+    (src / 'early_clock_user.py').write_text(MODULE)
+    (src / 'late_clock_user.py').write_text(MODULE)
+    monkeypatch.syspath_prepend(str(src))
+    import early_clock_user
+
+    clock = VirtualClock(START)
+    try:
+        with clock.install(src):
+            import late_clock_user
+            clock.advance(30)
+            for module in (early_clock_user, late_clock_user):
+                assert module.readings() == (START + 30, START + 30, datetime.utcfromtimestamp(START + 30))
+            # The time module itself, and code outside the tree, keep real time
+            assert time.time() > START + 86400 * 3650
+            assert sys.modules['time'] is time and time.time is not clock.time
+
+        assert early_clock_user.readings()[0] > START + 86400 * 3650
+        assert late_clock_user.readings()[0] > START + 86400 * 3650
+        assert early_clock_user.datetime is datetime
+    finally:
+        sys.modules.pop('early_clock_user', None)
+        sys.modules.pop('late_clock_user', None)
+
+
+def test_same_seed_same_report(workdir):
+    scenario = load_scenario(str(DEFAULT_SCENARIO))
+    first = Simulator(scenario, days=0.25, workdir=str(workdir / 'a')).run()
+    second = Simulator(scenario, days=0.25, workdir=str(workdir / 'b')).run()
+
+    assert first == second
+    assert first['totals']['offered'] > 0 and 0 < first['totals']['answered'] <= first['totals']['offered']
+    assert first['daily'][0]['day'] == '2026-01-01'
+    # The run happened on the virtual clock: wall time never leaked into the history
+    history = list((workdir / 'a' / 'state' / 'history').glob('*.jsonl'))
+    assert [path.stem for path in history] == ['2026-01-01']
+
+
+def test_overrides_change_the_run(workdir):
+    baseline = Simulator(load_scenario(str(DEFAULT_SCENARIO)), days=0.25, workdir=str(workdir / 'a')).run()
+    scenario = load_scenario(str(DEFAULT_SCENARIO), ['subnet-profiles:subnets.1.participation_rate=0'])
+    variant = Simulator(scenario, days=0.25, workdir=str(workdir / 'b')).run()
+
+    assert variant['subnets']['1']['answered'] == 0
+    assert variant['subnets']['1']['skipped'] == variant['subnets']['1']['offered'] > 0
+    assert baseline['subnets']['1']['answered'] > 0
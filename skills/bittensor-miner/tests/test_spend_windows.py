@@ -0,0 +1,50 @@
+"""Spend windows under concurrent recording and across day/month rollover"""
+
+import threading
+from datetime import datetime, timezone
+
+from utils.spend_windows import SpendWindows
+
+
+def ts(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_concurrent_records_are_all_counted():
+    windows = SpendWindows()
+    now = ts(2026, 3, 10, 12)
+
+    def spend(model):
+        for i in range(1000):
+            windows.record(3, model, subnet_id=1, task_type='generation', ts=now + i * 0.01)
+
+    threads = [threading.Thread(target=spend, args=(model,)) for model in ('a', 'b', 'a', 'b')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    end = now + 20
+    assert windows.window_total(3600, end) == 12000
+    assert windows.window_total(3600, end, model='a') == 6000
+    assert windows.window_total(3600, end, subnet_id=1) == 12000
+    assert windows.period_totals(end) == {'today': 12000, 'this_month': 12000}
+
+
+def test_windows_and_periods_roll_over():
+    windows = SpendWindows(reset_day_of_month=15)
+    windows.record(100, 'a', ts=ts(2026, 3, 14, 23, 59))
+    windows.record(50, 'a', ts=ts(2026, 3, 15, 0, 1))
+
+    midnight = ts(2026, 3, 15, 0, 2)
+    assert windows.window_total(3600, midnight) == 150
+    assert windows.period_totals(midnight) == {'today': 50, 'this_month': 50}
+
+    # A late record stamped before the roll lands in the newest day and bucket
+    windows.record(10, 'a', ts=ts(2026, 3, 14, 23, 59, 30))
+    assert windows.period_totals(midnight) == {'today': 60, 'this_month': 60}
+
+    later = ts(2026, 3, 15, 1, 30)
+    assert windows.window_total(3600, later) == 0
+    assert windows.window_total(86400, later) == 160
+    assert windows.daily_totals(2, later) == {'2026-03-14': 100, '2026-03-15': 60}
@@ -0,0 +1,90 @@
+"""SDK-backed chain access, against a stand-in for the SDK's Subtensor client"""
+
+from types import SimpleNamespace
+
+from utils.subtensor_backend import SubtensorChainBackend
+
+RAO = 10 ** 9
+
+
+class Column(list):
+    def tolist(self):
+        return list(self)
+
+
+class FakeSubstrate:
+    def __init__(self, events):
+        self.events = events  # block -> [event record values]
+
+    def get_block_hash(self, block):
+        return f"0x{block:x}"
+
+    def get_events(self, block_hash):
+        return [SimpleNamespace(value=value) for value in self.events.get(int(block_hash, 16), [])]
+
+    def query(self, module, storage, block_hash):
+        assert (module, storage) == ('Timestamp', 'Now')
+        return SimpleNamespace(value=int(block_hash, 16) * 12_000)
+
+
+class FakeSubtensor:
+    def __init__(self, events, storage):
+        self.substrate = FakeSubstrate(events)
+        self.storage = storage  # (name, params..., block) -> value
+
+    def get_current_block(self):
+        return 1000
+
+    def metagraph(self, netuid, lite):
+        return SimpleNamespace(uids=Column([0, 1]), hotkeys=['validator', 'miner'], coldkeys=['c0', 'c1'],
+                               S=[1000.0, 0.5], validator_permit=[True, False], active=[True, True],
+                               last_update=[990, 995], block=1000)
+
+    def get_balance(self, address):
+        return SimpleNamespace(tao=2.5)
+
+    def query_subtensor(self, name, block=None, params=None):
+        key = (name, *params, block)
+        return SimpleNamespace(value=self.storage.get(key, self.storage.get((name, *params))))
+
+
+def transfer(to, amount, nested=True):
+    event = {'module_id': 'Balances', 'event_id': 'Transfer',
+             'attributes': {'from': 'someone', 'to': to, 'amount': amount}}
+    return {'phase': 'ApplyExtrinsic', 'event': event} if nested else dict(event, attributes=('someone', to, amount))
+
+
+def test_metagraph_and_balance():
+    backend = SubtensorChainBackend(subtensor=FakeSubtensor({}, {('Tempo', 1): 99}))
+    metagraph = backend.get_metagraph(1)
+    assert metagraph['tempo'] == 99 and metagraph['block'] == 1000
+    assert metagraph['neurons'][0] == {'uid': 0, 'hotkey': 'validator', 'coldkey': 'c0', 'stake': 1000.0,
+                                       'validator_permit': True, 'active': True, 'last_update': 990}
+    assert backend.get_balance('miner') == 2.5
+    assert backend.get_neuron_updates(1, 990) is None  # Full refetch
+    assert backend.netuids == {1}
+
+
+def test_earning_events_from_transfers_and_epochs():
+    events = {
+        101: [transfer('miner', 3 * RAO), transfer('stranger', RAO),
+              {'event': {'module_id': 'System', 'event_id': 'ExtrinsicSuccess', 'attributes': {}}}],
+        105: [transfer('coldkey', RAO // 2, nested=False)],
+    }
+    storage = {
+        ('Tempo', 1): 9,
+        ('LastMechansimStepBlock', 1, 120): 115,
+        ('Emission', 1, 115): [0, 2 * RAO],
+        ('Emission', 1, 105): [0, RAO],
+        ('Uids', 1, 'miner'): 1,
+    }
+    backend = SubtensorChainBackend(subtensor=FakeSubtensor(events, storage), netuids=[1])
+    found = backend.get_earning_events(['miner', 'coldkey'], 100, 120)
+
+    assert [(e['block'], e['kind'], e['address'], e['amount'], e['netuid']) for e in found] == [
+        (101, 'transfer', 'miner', 3.0, None),
+        (105, 'transfer', 'coldkey', 0.5, None),
+        (105, 'emission', 'miner', 1.0, 1),
+        (115, 'emission', 'miner', 2.0, 1),
+    ]
+    assert found[0]['ts'] == 101 * 12
@@ -0,0 +1,129 @@
+"""TokenBudgetManager shared by bulkhead worker threads"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+
+from utils.token_budget import TokenBudgetManager
+
+APIS = ('openai-gpt4', 'gemini-pro')
+
+
+def make_manager(workdir, compact_every=5, used=0, ledger='ledger', **tracking):
+    """A manager on configs and state under workdir (ledger names one worker's log)"""
+    config = {
+        'budgets': {api: {'monthly_allowance': 10 ** 9, 'used_this_month': used, 'hard_limit': True}
+                    for api in APIS},
+        'ledger': {'path': str(workdir / 'state' / f'{ledger}.jsonl'),
+                   'snapshot_path': str(workdir / 'state' / f'{ledger}-snapshot.json'),
+                   'commit_batch_size': 1000, 'commit_interval_seconds': 60,
+                   'compact_every': compact_every},
+        'reservations': {'path': str(workdir / 'state' / 'reservations.bin')},
+        'tracking': dict({'last_reset': '2000-01-01', 'reset_day_of_month': 1,
+                          'windows_path': str(workdir / 'state' / 'spend-windows.json')}, **tracking),
+    }
+    path = workdir / 'config' / 'token-budgets.json'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(config))
+    return TokenBudgetManager(str(path))
+
+
+def run_threads(target, count=5):
+    errors = []
+
+    def guarded(i):
+        try:
+            target(i)
+        except Exception as e:  # Collected and asserted on below
+            errors.append(e)
+
+    threads = [threading.Thread(target=guarded, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_concurrent_spend_and_compaction(workdir):
+    manager = make_manager(workdir)
+
+    def worker(i):
+        for n in range(200):
+            manager.record_token_spend(APIS[n % 2], 10, subnet_id=i, task_type='generation')
+            if n % 25 == 0:
+                manager.compact()
+
+    assert run_threads(worker) == []
+    assert manager.get_budget_info('openai-gpt4')['used_this_month'] == 5 * 100 * 10
+    assert manager.get_burn_rates()['total']['1h'] == 5 * 200 * 10
+    assert not list((workdir / 'config').glob('*.tmp')) and not list((workdir / 'state').glob('*.tmp'))
+
+    manager.close()
+    manager.reservations.close()
+    (workdir / 'state' / 'reservations.bin').unlink()
+    reopened = TokenBudgetManager(str(workdir / 'config' / 'token-budgets.json'))
+    assert reopened.get_budget_info('gemini-pro')['used_this_month'] == 5 * 100 * 10
+
+
+def test_concurrent_reserve_and_commit(workdir):
+    manager = make_manager(workdir)
+
+    def worker(i):
+        for _ in range(100):
+            reservation = manager.reserve_tokens('gemini-pro', 50)
+            assert reservation is not None
+            manager.commit_reservation(reservation, 'gemini-pro', 20, subnet_id=i)
+
+    assert run_threads(worker) == []
+    assert manager.reservations.get_usage('gemini-pro') == (5 * 100 * 20, 0)
+    manager.close()
+
+
+def test_period_rolls_over_once_across_processes(workdir):
+    # Two managers on one reservation segment behave like two worker processes
+    first = make_manager(workdir, ledger='first')
+    second = make_manager(workdir, ledger='second')
+    period_start, _ = first.pacer.period_bounds(datetime.utcnow())
+    last_period = period_start - timedelta(days=1)
+    assert first.check_period_rollover(last_period)
+    assert not second.check_period_rollover(last_period)
+
+    # first crosses into the current period and spends; second follows
+    first.record_token_spend('gemini-pro', 100)
+    second.record_token_spend('gemini-pro', 50)
+    assert first.reservations.get_usage('gemini-pro') == (150, 0)
+    assert second.get_budget_info('gemini-pro')['used_this_month'] == 150
+    assert not first.check_period_rollover() and not second.check_period_rollover()
+
+    # Saves keep settings changed on disk while the workers ran
+    path = workdir / 'config' / 'token-budgets.json'
+    config = json.loads(path.read_text())
+    config['budgets']['gemini-pro']['monthly_allowance'] = 12345
+    path.write_text(json.dumps(config))
+    second.compact()
+    saved = json.loads(path.read_text())
+    assert saved['budgets']['gemini-pro']['monthly_allowance'] == 12345
+    assert saved['budgets']['gemini-pro']['used_this_month'] == 150
+    assert saved['tracking']['last_reset'] == period_start.date().isoformat()
+    first.close()
+    second.close()
+
+
+def test_new_segment_keeps_current_period_usage(workdir):
+    period_start = datetime.utcnow().replace(day=1).date().isoformat()
+    manager = make_manager(workdir, used=500, last_reset=period_start)
+    assert not manager.check_period_rollover()
+    assert manager.get_budget_info('openai-gpt4')['used_this_month'] == 500
+    manager.close()
+
+
+def test_reserve_without_budget_config(workdir, caplog):
+    manager = TokenBudgetManager(str(workdir / 'config' / 'missing.json'))
+    assert manager.reserve_tokens('openai-gpt4', 100) is None
+    assert 'No budget config loaded' in caplog.text and 'Unknown API' not in caplog.text
+
+    manager = make_manager(workdir)
+    caplog.clear()
+    assert manager.reserve_tokens('no-such-api', 100) is None
+    assert 'Unknown API: no-such-api' in caplog.text
@@ -0,0 +1,50 @@
+"""Token ledger shared by several processes"""
+
+import json
+import threading
+
+from utils.token_ledger import TokenLedger
+
+
+def open_ledger(workdir, compact_every=1000):
+    return TokenLedger(log_path=str(workdir / 'state' / 'ledger.jsonl'),
+                       snapshot_path=str(workdir / 'state' / 'ledger-snapshot.json'),
+                       commit_interval_seconds=0.05, compact_every=compact_every)
+
+
+def test_seq_is_unique_across_ledgers(workdir):
+    # Each instance has its own descriptor, so flock treats them like processes
+    ledgers = [open_ledger(workdir), open_ledger(workdir)]
+
+    def spend(ledger):
+        for _ in range(200):
+            ledger.append('gemini-pro', 5)
+
+    threads = [threading.Thread(target=spend, args=(ledger,)) for ledger in ledgers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for ledger in ledgers:
+        ledger.close()
+
+    with open(workdir / 'state' / 'ledger.jsonl') as f:
+        seqs = [json.loads(line)['seq'] for line in f]
+    assert seqs == list(range(1, 401))
+    assert open_ledger(workdir).get_used('gemini-pro') == 2000
+
+
+def test_compaction_by_another_ledger_is_picked_up(workdir):
+    first, second = open_ledger(workdir, compact_every=3), open_ledger(workdir, compact_every=3)
+    for _ in range(3):
+        first.append('openai-gpt4', 10)
+    first.compact()
+    second.append('openai-gpt4', 1)
+    assert second.get_used('openai-gpt4') == 31
+    assert second.seq == 4
+
+    first.append('openai-gpt4', 2)
+    assert first.get_used('openai-gpt4') == 33
+    first.close()
+    second.close()
+    assert open_ledger(workdir).get_used('openai-gpt4') == 33